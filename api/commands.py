@@ -7,11 +7,12 @@ from typing import Any, Optional
 import click
 from flask import current_app
 from pydantic import TypeAdapter
-from sqlalchemy import select
+from sqlalchemy import select, update
 from werkzeug.exceptions import NotFound
 
 from configs import dify_config
 from constants.languages import languages
+from core.helper import encrypter
 from core.plugin.entities.plugin import ToolProviderID
 from core.rag.datasource.vdb.vector_factory import Vector
 from core.rag.datasource.vdb.vector_type import VectorType
@@ -26,13 +27,26 @@ from libs.helper import email as email_validate
 from libs.password import hash_password, password_pattern, valid_password
 from libs.rsa import generate_key_pair
 from models import Tenant
+from models.api_based_extension import APIBasedExtension
 from models.dataset import Dataset, DatasetCollectionBinding, DatasetMetadata, DatasetMetadataBinding, DocumentSegment
 from models.dataset import Document as DatasetDocument
-from models.model import Account, App, AppAnnotationSetting, AppMode, Conversation, MessageAnnotation
-from models.provider import Provider, ProviderModel
-from models.tools import ToolOAuthSystemClient
+from models.model import (
+    Account,
+    App,
+    AppAnnotationSetting,
+    AppMode,
+    AppModelConfig,
+    Conversation,
+    MessageAnnotation,
+    TraceAppConfig,
+)
+from models.provider import LoadBalancingModelConfig, Provider, ProviderModel
+from models.source import DataSourceApiKeyAuthBinding
+from models.tools import ApiToolProvider, BuiltinToolProvider, MCPToolProvider, ToolOAuthSystemClient
+from models.workflow import Workflow, WorkflowGraphBlob, WorkflowRun
 from services.account_service import AccountService, RegisterService, TenantService
 from services.clear_free_plan_tenant_expired_logs import ClearFreePlanTenantExpiredLogs
+from services.conversation_search_service import ConversationSearchService
 from services.plugin.data_migration import PluginDataMigration
 from services.plugin.plugin_migration import PluginMigration
 
@@ -148,6 +162,123 @@ def reset_encrypt_key_pair():
         )
 
 
+@click.command(
+    "migrate-credentials-to-envelope-encryption",
+    help="Re-encrypt stored credentials, API extension keys, agent tool parameters and workflow secret variables"
+    " with the per-workspace data keys of envelope encryption.",
+)
+@click.option("--batch-size", default=500, show_default=True, help="Number of rows re-encrypted per transaction.")
+def migrate_credentials_to_envelope_encryption(batch_size: int):
+    """
+    Re-encrypt the hybrid RSA encrypted credentials of model providers, tools, data sources, API extensions, tracing
+    configs, agent tool parameters and workflow secret variables with AES-GCM under the data key of their workspace.
+    The command can be run again, converted values are skipped.
+    """
+    if not dify_config.CREDENTIAL_ENVELOPE_ENCRYPTION_ENABLED:
+        click.echo(click.style("Set CREDENTIAL_ENVELOPE_ENCRYPTION_ENABLED=true before migrating.", fg="red"))
+        return
+
+    columns = [
+        Provider.encrypted_config,
+        ProviderModel.encrypted_config,
+        LoadBalancingModelConfig.encrypted_config,
+        BuiltinToolProvider.encrypted_credentials,
+        ApiToolProvider.credentials_str,
+        MCPToolProvider.encrypted_credentials,
+        MCPToolProvider.server_url,
+        DataSourceApiKeyAuthBinding.credentials,
+        APIBasedExtension.api_key,
+        Workflow._environment_variables,
+        # the following belong to an app, their workspace is the one of the app
+        TraceAppConfig.tracing_config,
+        AppModelConfig.agent_mode,
+    ]
+    for column in columns:
+        _migrate_column_to_envelope_encryption(column, batch_size)
+
+
+def _migrate_column_to_envelope_encryption(column: Any, batch_size: int) -> None:
+    model = column.class_
+    tenant_id_column = getattr(model, "tenant_id", App.tenant_id)
+    migrated = failed = 0
+    last_id = None
+    while True:
+        query = db.session.query(model, tenant_id_column)
+        if tenant_id_column is App.tenant_id:
+            query = query.join(App, App.id == model.app_id)
+        query = query.where(column.isnot(None)).order_by(model.id).limit(batch_size)
+        if last_id is not None:
+            query = query.where(model.id > last_id)
+        rows = query.all()
+        if not rows:
+            break
+        for row, tenant_id in rows:
+            value = getattr(row, column.key)
+            try:
+                if isinstance(value, str):
+                    converted = encrypter.envelope_encrypt_serialized_tokens(tenant_id, value)
+                else:
+                    converted = encrypter.envelope_encrypt_tokens(tenant_id, value)
+            except Exception:
+                logging.exception("Failed to re-encrypt %s %s", model.__tablename__, row.id)
+                failed += 1
+                continue
+            if converted != value:
+                setattr(row, column.key, converted)
+                migrated += 1
+        db.session.commit()
+        last_id = rows[-1][0].id
+    column_name = column.expression.name
+    click.echo(
+        click.style(f"{model.__tablename__}.{column_name}: {migrated} re-encrypted, {failed} failed.", fg="green")
+    )
+
+
+@click.command(
+    "dedupe-workflow-run-graphs",
+    help="Move the graphs stored inline in workflow runs to the deduplicated workflow graph blobs.",
+)
+@click.option("--batch-size", default=500, show_default=True, help="Number of workflow runs moved per transaction.")
+def dedupe_workflow_run_graphs(batch_size: int):
+    """
+    Store the graph of each workflow run once per workspace in `workflow_graph_blobs` and reference it by its hash.
+    The command can be run again and interrupted, moved runs no longer have an inline graph and are skipped.
+    """
+    moved = failed = 0
+    last_id = None
+    while True:
+        query = (
+            db.session.query(WorkflowRun.id, WorkflowRun.tenant_id, WorkflowRun.graph)
+            .where(WorkflowRun.graph.isnot(None))
+            .order_by(WorkflowRun.id)
+            .limit(batch_size)
+        )
+        if last_id is not None:
+            query = query.where(WorkflowRun.id > last_id)
+        rows = query.all()
+        if not rows:
+            break
+        blobs: dict[tuple[str, str], str] = {}
+        updates = []
+        for run_id, tenant_id, graph in rows:
+            try:
+                graph_hash, serialized = WorkflowGraphBlob.serialize(json.loads(graph))
+            except ValueError:
+                logging.exception("Failed to parse the graph of workflow run %s", run_id)
+                failed += 1
+                continue
+            blobs[(tenant_id, graph_hash)] = serialized
+            updates.append({"id": run_id, "graph": None, "graph_hash": graph_hash})
+        for (tenant_id, graph_hash), serialized in blobs.items():
+            db.session.execute(WorkflowGraphBlob.insert_statement(tenant_id, graph_hash, serialized))
+        if updates:
+            db.session.execute(update(WorkflowRun), updates)
+        db.session.commit()
+        moved += len(updates)
+        last_id = rows[-1].id
+    click.echo(click.style(f"workflow_runs.graph: {moved} moved, {failed} failed.", fg="green"))
+
+
 @click.command("vdb-migrate", help="Migrate vector db.")
 @click.option("--scope", default="all", prompt=False, help="The scope of vector database to migrate, Default is All.")
 def vdb_migrate(scope: str):
@@ -826,6 +957,26 @@ def clear_free_plan_tenant_expired_logs(days: int, batch: int, tenant_ids: list[
     click.echo(click.style("Clear free plan tenant expired logs completed.", fg="green"))
 
 
+@click.command("rebuild-conversation-search-index", help="Build missing or invalid conversation search indexes.")
+@click.option(
+    "--skip-invalid", is_flag=True, help="Only build missing indexes, leave indexes left invalid by a failed build."
+)
+def rebuild_conversation_search_index(skip_invalid: bool):
+    """
+    Build the trigram indexes used by the conversation log keyword search.
+
+    The migration builds them concurrently, use this command when that build was interrupted or skipped.
+    """
+    click.echo(click.style("Start building conversation search indexes.", fg="white"))
+
+    built = ConversationSearchService.ensure_indexes(rebuild_invalid=not skip_invalid)
+
+    if built:
+        click.echo(click.style(f"Built conversation search indexes: {', '.join(built)}.", fg="green"))
+    else:
+        click.echo(click.style("Conversation search indexes are up to date.", fg="green"))
+
+
 @click.option("-f", "--force", is_flag=True, help="Skip user confirmation and force the command to execute.")
 @click.command("clear-orphaned-file-records", help="Clear orphaned file records.")
 def clear_orphaned_file_records(force: bool):
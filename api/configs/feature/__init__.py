@@ -56,6 +56,13 @@ class SecurityConfig(BaseSettings):
         default=None,
     )
 
+    CREDENTIAL_ENVELOPE_ENCRYPTION_ENABLED: bool = Field(
+        description="Encrypt new credentials with AES-GCM under a per-workspace data key wrapped by the workspace RSA"
+        " key, so decrypting them is a symmetric operation. Credentials encrypted before stay readable, run"
+        " `flask migrate-credentials-to-envelope-encryption` to convert them",
+        default=False,
+    )
+
 
 class AppExecutionConfig(BaseSettings):
     """
@@ -74,6 +81,32 @@ class AppExecutionConfig(BaseSettings):
         description="Maximum number of requests per app per day",
         default=5000,
     )
+    STREAM_COALESCING_ENABLED: bool = Field(
+        description="Merge consecutive streamed text chunks into fewer events when a request does not set"
+        " stream_coalescing",
+        default=False,
+    )
+    STREAM_COALESCING_MAX_CHARS: PositiveInt = Field(
+        description="Number of characters after which merged text chunks are sent",
+        default=256,
+    )
+    STREAM_COALESCING_MAX_LATENCY_MS: PositiveInt = Field(
+        description="Milliseconds after which merged text chunks are sent",
+        default=50,
+    )
+    TTS_WORKER_POOL_SIZE: PositiveInt = Field(
+        description="Number of threads synthesizing the auto-play speech of all streaming responses of a process",
+        default=16,
+    )
+    APP_GENERATE_ON_CELERY: bool = Field(
+        description="Run streaming Service API generations on Celery workers of the generation queue, the API only"
+        " tails their events from a Redis Stream",
+        default=False,
+    )
+    APP_GENERATE_STREAM_TTL: PositiveInt = Field(
+        description="Seconds for which the events of a generation are kept after the last one, so clients may resume",
+        default=600,
+    )
 
 
 class CodeExecutionSandboxConfig(BaseSettings):
@@ -487,6 +520,23 @@ class BillingConfig(BaseSettings):
         default=False,
     )
 
+    BILLING_INFO_CACHE_TTL: NonNegativeInt = Field(
+        description="Seconds a subscription read from the billing API is served without refreshing it,"
+        " 0 to read the billing API on every request",
+        default=60,
+    )
+
+    BILLING_INFO_CACHE_STALE_TTL: NonNegativeInt = Field(
+        description="Seconds an expired subscription is still served while it is refreshed in the background",
+        default=600,
+    )
+
+    BILLING_INFO_LOCAL_CACHE_TTL: NonNegativeInt = Field(
+        description="Seconds a subscription is kept in process memory in front of redis,"
+        " bounds how long other processes may serve a subscription after it was invalidated",
+        default=5,
+    )
+
 
 class UpdateConfig(BaseSettings):
     """
@@ -529,6 +579,12 @@ class WorkflowConfig(BaseSettings):
         default=200 * 1024,
     )
 
+    WORKFLOW_LARGE_VALUE_OFFLOAD_THRESHOLD: NonNegativeInt = Field(
+        description="Size in bytes above which draft variable values and node execution inputs, process data and"
+        " outputs are saved to the storage, their database rows keeping a preview. 0 to disable.",
+        default=100 * 1024,
+    )
+
 
 class WorkflowNodeExecutionConfig(BaseSettings):
     """
@@ -633,6 +689,22 @@ class AuthConfig(BaseSettings):
         default=86400,
     )
 
+    SERVICE_API_AUTH_CACHE_TTL: NonNegativeInt = Field(
+        description="Time (in seconds) the Service API caches the app, tenant, owner and end user of a token,"
+        " 0 disables the cache",
+        default=30,
+    )
+
+    SERVICE_API_AUTH_CACHE_SIZE: PositiveInt = Field(
+        description="Maximum number of entries in the per-process Service API auth cache",
+        default=10000,
+    )
+
+    API_TOKEN_LAST_USED_FLUSH_INTERVAL: PositiveInt = Field(
+        description="Interval in seconds at which buffered last_used_at of API tokens are written to the database",
+        default=60,
+    )
+
 
 class ModerationConfig(BaseSettings):
     """
@@ -644,6 +716,23 @@ class ModerationConfig(BaseSettings):
         default=300,
     )
 
+    MODERATION_WINDOW_OVERLAP: NonNegativeInt = Field(
+        description="Number of already moderated characters sent again as context with each incremental output"
+        " moderation window, for moderation providers that support incremental checks",
+        default=100,
+    )
+
+    MODERATION_WORKER_POOL_SIZE: PositiveInt = Field(
+        description="Maximum number of threads shared by all responses to run streaming output moderation checks",
+        default=32,
+    )
+
+    MODERATION_CHECK_TIMEOUT: PositiveFloat = Field(
+        description="Seconds the final output moderation waits for a running streaming check before moderating"
+        " the whole output on its own",
+        default=10.0,
+    )
+
 
 class ToolConfig(BaseSettings):
     """
@@ -655,6 +744,58 @@ class ToolConfig(BaseSettings):
         default=3600,
     )
 
+    TOOL_RUNTIME_CACHE_TTL: NonNegativeInt = Field(
+        description="Time (in seconds) a process reuses the resolved provider and decrypted credentials of a tool,"
+        " 0 disables the cache",
+        default=300,
+    )
+
+    TOOL_RUNTIME_CACHE_SIZE: PositiveInt = Field(
+        description="Maximum number of resolved tool runtimes cached per process",
+        default=4096,
+    )
+
+    MCP_SESSION_POOL_ENABLED: bool = Field(
+        description="Reuse initialized MCP client sessions across tool calls instead of connecting for each call",
+        default=True,
+    )
+
+    MCP_SESSION_POOL_MAX_SIZE: PositiveInt = Field(
+        description="Maximum number of idle MCP sessions a process keeps per provider and credentials",
+        default=4,
+    )
+
+    MCP_SESSION_IDLE_TIMEOUT: PositiveInt = Field(
+        description="Time (in seconds) after which an unused pooled MCP session is closed",
+        default=300,
+    )
+
+    MCP_SESSION_HEALTH_CHECK_INTERVAL: NonNegativeInt = Field(
+        description="Time (in seconds) a pooled MCP session may stay unused before it is pinged ahead of reuse",
+        default=30,
+    )
+
+    MCP_SESSION_MAX_CONCURRENT_REQUESTS: PositiveInt = Field(
+        description="Maximum number of concurrent requests sent over one pooled MCP session using the SSE transport",
+        default=8,
+    )
+
+    AGENT_TOOL_CALL_WORKER_POOL_SIZE: PositiveInt = Field(
+        description="Maximum number of threads shared by all agent runs of a process to invoke tool calls",
+        default=32,
+    )
+
+    AGENT_TOOL_CALL_MAX_CONCURRENCY: PositiveInt = Field(
+        description="Maximum number of tool calls of one agent round invoked at the same time,"
+        " 1 invokes them one after another",
+        default=5,
+    )
+
+    AGENT_TOOL_CALL_TIMEOUT: PositiveInt = Field(
+        description="Time (in seconds) an agent waits for a tool call before answering the model with a timeout error",
+        default=300,
+    )
+
 
 class MailConfig(BaseSettings):
     """
@@ -754,6 +895,16 @@ class RagEtlConfig(BaseSettings):
         default="false",
     )
 
+    PDF_EXTRACT_PARALLEL_WORKERS: NonNegativeInt = Field(
+        description="Number of worker processes used to parse PDF pages in parallel, 0 or 1 parses pages sequentially",
+        default=0,
+    )
+
+    PDF_EXTRACT_PAGES_PER_TASK: PositiveInt = Field(
+        description="Number of PDF pages each worker process parses per task",
+        default=16,
+    )
+
 
 class DataSetConfig(BaseSettings):
     """
@@ -790,6 +941,21 @@ class DataSetConfig(BaseSettings):
         default=30,
     )
 
+    MESSAGE_CLEAN_BATCH_SIZE: PositiveInt = Field(
+        description="Number of expired messages deleted per batch by the clean messages task",
+        default=1000,
+    )
+
+    MESSAGE_CLEAN_MAX_ROWS_PER_SECOND: NonNegativeInt = Field(
+        description="Maximum number of messages each clean messages worker deletes per second, 0 means unlimited",
+        default=0,
+    )
+
+    MESSAGE_CLEAN_TENANT_WORKERS: PositiveInt = Field(
+        description="Number of tenants the clean messages task sweeps in parallel",
+        default=1,
+    )
+
 
 class WorkspaceConfig(BaseSettings):
     """
@@ -817,6 +983,21 @@ class IndexingConfig(BaseSettings):
         default=50,
     )
 
+    INDEXING_PIPELINE_ENABLED: bool = Field(
+        description="Index documents through the staged pipeline that batches embeddings across documents",
+        default=False,
+    )
+
+    INDEXING_PIPELINE_QUEUE_SIZE: PositiveInt = Field(
+        description="Maximum number of work items buffered between two stages of the indexing pipeline",
+        default=16,
+    )
+
+    INDEXING_PIPELINE_BATCH_WAIT_MS: NonNegativeInt = Field(
+        description="Time in milliseconds the embedding stage waits for more chunks before sending a partial batch",
+        default=100,
+    )
+
 
 class MultiModalTransferConfig(BaseSettings):
     MULTIMODAL_SEND_FORMAT: Literal["base64", "url"] = Field(
@@ -865,6 +1046,36 @@ class CeleryScheduleTasksConfig(BaseSettings):
         description="Enable check upgradable plugin task",
         default=True,
     )
+    ENABLE_APP_STATISTIC_ROLLUP_TASK: bool = Field(
+        description="Enable the task rolling up messages and workflow runs into the hourly app statistics",
+        default=False,
+    )
+    APP_STATISTIC_ROLLUP_INTERVAL: PositiveInt = Field(
+        description="Interval in minutes between two runs of the app statistic rollup task",
+        default=10,
+    )
+    APP_STATISTIC_ROLLUP_SETTLE_MINUTES: NonNegativeInt = Field(
+        description="Minutes a message or workflow run is read live before it is rolled up,"
+        " leaving time for its tokens, price and latency to be recorded",
+        default=60,
+    )
+    APP_STATISTIC_ROLLUP_BATCH_HOURS: PositiveInt = Field(
+        description="Hours of messages and workflow runs rolled up in one transaction",
+        default=24,
+    )
+    ENABLE_PROVIDER_QUOTA_LEDGER: bool = Field(
+        description="Record the usage of hosted provider quotas in Redis and reconcile it into the database"
+        " periodically, instead of updating the quota of the provider on every LLM call",
+        default=False,
+    )
+    PROVIDER_QUOTA_RECONCILE_INTERVAL: PositiveInt = Field(
+        description="Interval in seconds between two reconciliations of the provider quota ledger",
+        default=60,
+    )
+    PROVIDER_QUOTA_RECONCILE_BATCH_SIZE: PositiveInt = Field(
+        description="Number of provider quotas reconciled in one transaction",
+        default=500,
+    )
 
 
 class PositionConfig(BaseSettings):
@@ -182,9 +182,9 @@ class DatabaseConfig(BaseSettings):
         default=False,
     )
 
-    RETRIEVAL_SERVICE_EXECUTORS: NonNegativeInt = Field(
-        description="Number of processes for the retrieval service, default to CPU cores.",
-        default=os.cpu_count() or 1,
+    RETRIEVAL_SERVICE_EXECUTORS: PositiveInt = Field(
+        description="Maximum number of threads shared by all requests of a process to search knowledge bases.",
+        default=32,
     )
 
     @computed_field  # type: ignore[misc]
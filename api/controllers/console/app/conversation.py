@@ -4,7 +4,7 @@ import pytz  # pip install pytz
 from flask_login import current_user
 from flask_restful import Resource, marshal_with, reqparse
 from flask_restful.inputs import int_range
-from sqlalchemy import func, or_
+from sqlalchemy import func
 from sqlalchemy.orm import joinedload
 from werkzeug.exceptions import Forbidden, NotFound
 
@@ -22,8 +22,10 @@ from fields.conversation_fields import (
 from libs.datetime_utils import naive_utc_now
 from libs.helper import DatetimeString
 from libs.login import login_required
-from models import Conversation, EndUser, Message, MessageAnnotation
+from models import Conversation, Message, MessageAnnotation
 from models.model import AppMode
+from services.conversation_projection_service import ConversationProjectionService
+from services.conversation_search_service import ConversationSearchService
 
 
 class CompletionConversationApi(Resource):
@@ -49,10 +51,11 @@ class CompletionConversationApi(Resource):
         query = db.select(Conversation).where(Conversation.app_id == app_model.id, Conversation.mode == "completion")
 
         if args["keyword"]:
-            query = query.join(Message, Message.conversation_id == Conversation.id).where(
-                or_(
-                    Message.query.ilike(f"%{args['keyword']}%"),
-                    Message.answer.ilike(f"%{args['keyword']}%"),
+            query = query.where(
+                Conversation.id.in_(
+                    ConversationSearchService.matching_conversation_ids(
+                        app_model.id, args["keyword"], include_conversation_fields=False
+                    )
                 )
             )
 
@@ -93,6 +96,7 @@ class CompletionConversationApi(Resource):
         query = query.order_by(Conversation.created_at.desc())
 
         conversations = db.paginate(query, page=args["page"], per_page=args["limit"], error_out=False)
+        conversations.items = ConversationProjectionService.project_conversations(conversations.items)
 
         return conversations
 
@@ -163,34 +167,11 @@ class ChatConversationApi(Resource):
         )
         args = parser.parse_args()
 
-        subquery = (
-            db.session.query(
-                Conversation.id.label("conversation_id"), EndUser.session_id.label("from_end_user_session_id")
-            )
-            .outerjoin(EndUser, Conversation.from_end_user_id == EndUser.id)
-            .subquery()
-        )
-
         query = db.select(Conversation).where(Conversation.app_id == app_model.id)
 
         if args["keyword"]:
-            keyword_filter = f"%{args['keyword']}%"
-            query = (
-                query.join(
-                    Message,
-                    Message.conversation_id == Conversation.id,
-                )
-                .join(subquery, subquery.c.conversation_id == Conversation.id)
-                .where(
-                    or_(
-                        Message.query.ilike(keyword_filter),
-                        Message.answer.ilike(keyword_filter),
-                        Conversation.name.ilike(keyword_filter),
-                        Conversation.introduction.ilike(keyword_filter),
-                        subquery.c.from_end_user_session_id.ilike(keyword_filter),
-                    ),
-                )
-                .group_by(Conversation.id)
+            query = query.where(
+                Conversation.id.in_(ConversationSearchService.matching_conversation_ids(app_model.id, args["keyword"]))
             )
 
         account = current_user
@@ -258,6 +239,7 @@ class ChatConversationApi(Resource):
                 query = query.order_by(Conversation.created_at.desc())
 
         conversations = db.paginate(query, page=args["page"], per_page=args["limit"], error_out=False)
+        conversations.items = ConversationProjectionService.project_conversations(conversations.items)
 
         return conversations
 
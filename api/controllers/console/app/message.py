@@ -30,6 +30,7 @@ from libs.infinite_scroll_pagination import InfiniteScrollPagination
 from libs.login import login_required
 from models.model import AppMode, Conversation, Message, MessageAnnotation
 from services.annotation_service import AppAnnotationService
+from services.conversation_projection_service import ConversationProjectionService
 from services.errors.conversation import ConversationNotExistsError
 from services.errors.message import MessageNotExistsError, SuggestedQuestionsAfterAnswerDisabledError
 from services.message_service import MessageService
@@ -109,9 +110,9 @@ class ChatMessageListApi(Resource):
             if rest_count > 0:
                 has_more = True
 
-        history_messages = list(reversed(history_messages))
+        data = ConversationProjectionService.project_messages(list(reversed(history_messages)))
 
-        return InfiniteScrollPagination(data=history_messages, limit=args["limit"], has_more=has_more)
+        return InfiniteScrollPagination(data=data, limit=args["limit"], has_more=has_more)
 
 
 class MessageFeedbackApi(Resource):
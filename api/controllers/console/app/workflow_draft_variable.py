@@ -40,7 +40,15 @@ def _convert_values_to_json_serializable_object(value: Segment) -> Any:
 
 
 def _serialize_var_value(variable: WorkflowDraftVariable) -> Any:
-    value = variable.get_value()
+    return _serialize_segment(variable.get_value())
+
+
+def _serialize_var_value_preview(variable: WorkflowDraftVariable) -> Any:
+    # Lists show the preview of the values saved to the storage, `VariableApi` returns them in full.
+    return _serialize_segment(variable.get_value_preview())
+
+
+def _serialize_segment(value: Segment) -> Any:
     # create a copy of the value to avoid affecting the model cache.
     value = value.model_copy(deep=True)
     # Refresh the url signature before returning it to client.
@@ -89,6 +97,12 @@ _WORKFLOW_DRAFT_VARIABLE_FIELDS = dict(
     value=fields.Raw(attribute=_serialize_var_value),
 )
 
+_WORKFLOW_DRAFT_VARIABLE_PREVIEW_FIELDS = dict(
+    _WORKFLOW_DRAFT_VARIABLE_WITHOUT_VALUE_FIELDS,
+    value=fields.Raw(attribute=_serialize_var_value_preview),
+    is_truncated=fields.Boolean,
+)
+
 _WORKFLOW_DRAFT_ENV_VARIABLE_FIELDS = {
     "id": fields.String,
     "type": fields.String(attribute=lambda _: "env"),
@@ -115,7 +129,7 @@ _WORKFLOW_DRAFT_VARIABLE_LIST_WITHOUT_VALUE_FIELDS = {
 }
 
 _WORKFLOW_DRAFT_VARIABLE_LIST_FIELDS = {
-    "items": fields.List(fields.Nested(_WORKFLOW_DRAFT_VARIABLE_FIELDS), attribute=_get_items),
+    "items": fields.List(fields.Nested(_WORKFLOW_DRAFT_VARIABLE_PREVIEW_FIELDS), attribute=_get_items),
 }
 
 
@@ -1,6 +1,5 @@
 import json
 import os
-import time
 from functools import wraps
 
 from flask import abort, request
@@ -9,11 +8,10 @@ from flask_login import current_user
 from configs import dify_config
 from controllers.console.workspace.error import AccountNotInitializedError
 from extensions.ext_database import db
-from extensions.ext_redis import redis_client
 from models.account import AccountStatus
 from models.dataset import RateLimitLog
 from models.model import DifySetup
-from services.feature_service import FeatureService, LicenseStatus
+from services.feature_service import FeatureService, LicenseStatus, knowledge_rate_limiter
 from services.operation_service import OperationService
 
 from .error import NotInitValidateError, NotSetupError, UnauthorizedAndForceLogout
@@ -147,16 +145,7 @@ def cloud_edition_billing_rate_limit_check(resource: str):
             if resource == "knowledge":
                 knowledge_rate_limit = FeatureService.get_knowledge_rate_limit(current_user.current_tenant_id)
                 if knowledge_rate_limit.enabled:
-                    current_time = int(time.time() * 1000)
-                    key = f"rate_limit_{current_user.current_tenant_id}"
-
-                    redis_client.zadd(key, {current_time: current_time})
-
-                    redis_client.zremrangebyscore(key, 0, current_time - 60000)
-
-                    request_count = redis_client.zcard(key)
-
-                    if request_count > knowledge_rate_limit.limit:
+                    if not knowledge_rate_limiter.acquire(current_user.current_tenant_id, knowledge_rate_limit.limit):
                         # add ratelimit record
                         rate_limit_log = RateLimitLog(
                             tenant_id=current_user.current_tenant_id,
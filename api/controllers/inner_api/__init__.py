@@ -5,6 +5,6 @@ from libs.external_api import ExternalApi
 bp = Blueprint("inner_api", __name__, url_prefix="/inner/api")
 api = ExternalApi(bp)
 
-from . import mail
+from . import billing, mail
 from .plugin import plugin
 from .workspace import workspace
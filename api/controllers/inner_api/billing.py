@@ -0,0 +1,24 @@
+from flask_restful import (
+    Resource,  # type: ignore
+    reqparse,
+)
+
+from controllers.console.wraps import setup_required
+from controllers.inner_api import api
+from controllers.inner_api.wraps import billing_inner_api_only
+from services.billing_service import BillingService
+
+
+class BillingSubscriptionChanged(Resource):
+    @setup_required
+    @billing_inner_api_only
+    def post(self):
+        parser = reqparse.RequestParser()
+        parser.add_argument("tenant_id", type=str, required=True, location="json")
+        args = parser.parse_args()
+
+        BillingService.invalidate_tenant_cache(args["tenant_id"])
+        return {"message": "success"}, 200
+
+
+api.add_resource(BillingSubscriptionChanged, "/billing/subscription-changed")
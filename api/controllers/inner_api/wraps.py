@@ -1,6 +1,7 @@
 from base64 import b64encode
 from functools import wraps
 from hashlib import sha1
+from hmac import compare_digest
 from hmac import new as hmac_new
 
 from flask import abort, request
@@ -8,6 +9,7 @@ from flask import abort, request
 from configs import dify_config
 from extensions.ext_database import db
 from models.model import EndUser
+from services.billing_service import BillingService
 
 
 def enterprise_inner_api_only(view):
@@ -76,3 +78,19 @@ def plugin_inner_api_only(view):
         return view(*args, **kwargs)
 
     return decorated
+
+
+def billing_inner_api_only(view):
+    @wraps(view)
+    def decorated(*args, **kwargs):
+        if not dify_config.BILLING_ENABLED:
+            abort(404)
+
+        # the billing service signs its calls with the secret key it checks on ours
+        secret_key = request.headers.get("Billing-Api-Secret-Key")
+        if not secret_key or not compare_digest(secret_key, BillingService.secret_key):
+            abort(401)
+
+        return view(*args, **kwargs)
+
+    return decorated
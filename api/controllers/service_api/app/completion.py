@@ -2,7 +2,7 @@ import logging
 
 from flask import request
 from flask_restful import Resource, reqparse
-from werkzeug.exceptions import InternalServerError, NotFound
+from werkzeug.exceptions import BadRequest, InternalServerError, NotFound
 
 import services
 from controllers.service_api import api
@@ -18,6 +18,7 @@ from controllers.service_api.app.error import (
 from controllers.service_api.wraps import FetchUserArg, WhereisUserArg, validate_app_token
 from controllers.web.error import InvokeRateLimitError as InvokeRateLimitHttpError
 from core.app.apps.base_app_queue_manager import AppQueueManager
+from core.app.apps.stream_event_bus import AppStreamEventBus
 from core.app.entities.app_invoke_entities import InvokeFrom
 from core.errors.error import (
     ModelCurrentlyNotSupportError,
@@ -44,6 +45,7 @@ class CompletionApi(Resource):
         parser.add_argument("query", type=str, location="json", default="")
         parser.add_argument("files", type=list, required=False, location="json")
         parser.add_argument("response_mode", type=str, choices=["blocking", "streaming"], location="json")
+        parser.add_argument("stream_coalescing", type=bool, required=False, location="json")
         parser.add_argument("retriever_from", type=str, required=False, default="dev", location="json")
 
         args = parser.parse_args()
@@ -107,6 +109,7 @@ class ChatApi(Resource):
         parser.add_argument("query", type=str, required=True, location="json")
         parser.add_argument("files", type=list, required=False, location="json")
         parser.add_argument("response_mode", type=str, choices=["blocking", "streaming"], location="json")
+        parser.add_argument("stream_coalescing", type=bool, required=False, location="json")
         parser.add_argument("conversation_id", type=uuid_value, location="json")
         parser.add_argument("retriever_from", type=str, required=False, default="dev", location="json")
         parser.add_argument("auto_generate_name", type=bool, required=False, default=True, location="json")
@@ -161,7 +164,25 @@ class ChatStopApi(Resource):
         return {"result": "success"}, 200
 
 
+class GenerateStreamEventsApi(Resource):
+    @validate_app_token(fetch_user_arg=FetchUserArg(fetch_from=WhereisUserArg.QUERY, required=True))
+    def get(self, app_model: App, end_user: EndUser, stream_id):
+        """Resume the events of a generation run on a Celery worker after the given Last-Event-ID."""
+        stream_id = str(stream_id)
+        if not AppStreamEventBus.is_owner(stream_id, app_model.id, end_user.id):
+            raise NotFound("Stream Not Exists.")
+
+        last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+        try:
+            last_entry_id = AppStreamEventBus.parse_last_event_id(stream_id, last_event_id)
+        except ValueError as e:
+            raise BadRequest(str(e))
+
+        return helper.compact_generate_response(AppStreamEventBus.tail(stream_id, last_entry_id))
+
+
 api.add_resource(CompletionApi, "/completion-messages")
 api.add_resource(CompletionStopApi, "/completion-messages/<string:task_id>/stop")
 api.add_resource(ChatApi, "/chat-messages")
 api.add_resource(ChatStopApi, "/chat-messages/<string:task_id>/stop")
+api.add_resource(GenerateStreamEventsApi, "/streams/<uuid:stream_id>/events")
@@ -91,6 +91,7 @@ class WorkflowRunApi(Resource):
         parser.add_argument("inputs", type=dict, required=True, nullable=False, location="json")
         parser.add_argument("files", type=list, required=False, location="json")
         parser.add_argument("response_mode", type=str, choices=["blocking", "streaming"], location="json")
+        parser.add_argument("stream_coalescing", type=bool, required=False, location="json")
         args = parser.parse_args()
         external_trace_id = get_external_trace_id(request)
         if external_trace_id:
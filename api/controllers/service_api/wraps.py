@@ -1,6 +1,4 @@
-import time
 from collections.abc import Callable
-from datetime import timedelta
 from enum import Enum
 from functools import wraps
 from typing import Optional
@@ -9,18 +7,17 @@ from flask import current_app, request
 from flask_login import user_logged_in  # type: ignore
 from flask_restful import Resource
 from pydantic import BaseModel
-from sqlalchemy import select, update
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from werkzeug.exceptions import Forbidden, NotFound, Unauthorized
 
 from extensions.ext_database import db
-from extensions.ext_redis import redis_client
-from libs.datetime_utils import naive_utc_now
 from libs.login import _get_user
 from models.account import Account, Tenant, TenantAccountJoin, TenantStatus
 from models.dataset import Dataset, RateLimitLog
 from models.model import ApiToken, App, EndUser
-from services.feature_service import FeatureService
+from services.api_token_service import ApiTokenService
+from services.feature_service import FeatureService, knowledge_rate_limiter
 
 
 class WhereisUserArg(Enum):
@@ -43,43 +40,10 @@ def validate_app_token(view: Optional[Callable] = None, *, fetch_user_arg: Optio
         @wraps(view_func)
         def decorated_view(*args, **kwargs):
             api_token = validate_and_get_api_token("app")
+            app_model, tenant, account = _get_app_auth_context(api_token)
 
-            app_model = db.session.query(App).where(App.id == api_token.app_id).first()
-            if not app_model:
-                raise Forbidden("The app no longer exists.")
-
-            if app_model.status != "normal":
-                raise Forbidden("The app's status is abnormal.")
-
-            if not app_model.enable_api:
-                raise Forbidden("The app's API service has been disabled.")
-
-            tenant = db.session.query(Tenant).where(Tenant.id == app_model.tenant_id).first()
-            if tenant is None:
-                raise ValueError("Tenant does not exist.")
-            if tenant.status == TenantStatus.ARCHIVE:
-                raise Forbidden("The workspace's status is archived.")
-
-            tenant_account_join = (
-                db.session.query(Tenant, TenantAccountJoin)
-                .where(Tenant.id == api_token.tenant_id)
-                .where(TenantAccountJoin.tenant_id == Tenant.id)
-                .where(TenantAccountJoin.role.in_(["owner"]))
-                .where(Tenant.status == TenantStatus.NORMAL)
-                .one_or_none()
-            )  # TODO: only owner information is required, so only one is returned.
-            if tenant_account_join:
-                tenant, ta = tenant_account_join
-                account = db.session.query(Account).where(Account.id == ta.account_id).first()
-                # Login admin
-                if account:
-                    account.current_tenant = tenant
-                    current_app.login_manager._update_request_context_with_user(account)  # type: ignore
-                    user_logged_in.send(current_app._get_current_object(), user=_get_user())  # type: ignore
-                else:
-                    raise Unauthorized("Tenant owner account does not exist.")
-            else:
-                raise Unauthorized("Tenant does not exist.")
+            # Login admin
+            _login_tenant_owner(account, tenant)
 
             kwargs["app_model"] = app_model
 
@@ -178,16 +142,7 @@ def cloud_edition_billing_rate_limit_check(resource: str, api_token_type: str):
             if resource == "knowledge":
                 knowledge_rate_limit = FeatureService.get_knowledge_rate_limit(api_token.tenant_id)
                 if knowledge_rate_limit.enabled:
-                    current_time = int(time.time() * 1000)
-                    key = f"rate_limit_{api_token.tenant_id}"
-
-                    redis_client.zadd(key, {current_time: current_time})
-
-                    redis_client.zremrangebyscore(key, 0, current_time - 60000)
-
-                    request_count = redis_client.zcard(key)
-
-                    if request_count > knowledge_rate_limit.limit:
+                    if not knowledge_rate_limiter.acquire(api_token.tenant_id, knowledge_rate_limit.limit):
                         # add ratelimit record
                         rate_limit_log = RateLimitLog(
                             tenant_id=api_token.tenant_id,
@@ -211,26 +166,10 @@ def validate_dataset_token(view=None):
         @wraps(view)
         def decorated(*args, **kwargs):
             api_token = validate_and_get_api_token("dataset")
-            tenant_account_join = (
-                db.session.query(Tenant, TenantAccountJoin)
-                .where(Tenant.id == api_token.tenant_id)
-                .where(TenantAccountJoin.tenant_id == Tenant.id)
-                .where(TenantAccountJoin.role.in_(["owner"]))
-                .where(Tenant.status == TenantStatus.NORMAL)
-                .one_or_none()
-            )  # TODO: only owner information is required, so only one is returned.
-            if tenant_account_join:
-                tenant, ta = tenant_account_join
-                account = db.session.query(Account).where(Account.id == ta.account_id).first()
-                # Login admin
-                if account:
-                    account.current_tenant = tenant
-                    current_app.login_manager._update_request_context_with_user(account)  # type: ignore
-                    user_logged_in.send(current_app._get_current_object(), user=_get_user())  # type: ignore
-                else:
-                    raise Unauthorized("Tenant owner account does not exist.")
-            else:
-                raise Unauthorized("Tenant does not exist.")
+            tenant, account = _get_tenant_owner(api_token.tenant_id)
+
+            # Login admin
+            _login_tenant_owner(account, tenant)
             return view(api_token.tenant_id, *args, **kwargs)
 
         return decorated
@@ -257,33 +196,96 @@ def validate_and_get_api_token(scope: str | None = None):
     if auth_scheme != "bearer":
         raise Unauthorized("Authorization scheme must be 'Bearer'")
 
-    current_time = naive_utc_now()
-    cutoff_time = current_time - timedelta(minutes=1)
-    with Session(db.engine, expire_on_commit=False) as session:
-        update_stmt = (
-            update(ApiToken)
-            .where(
-                ApiToken.token == auth_token,
-                (ApiToken.last_used_at.is_(None) | (ApiToken.last_used_at < cutoff_time)),
-                ApiToken.type == scope,
-            )
-            .values(last_used_at=current_time)
-            .returning(ApiToken)
-        )
-        result = session.execute(update_stmt)
-        api_token = result.scalar_one_or_none()
-
+    cache_key = ("api_token", scope, ApiTokenService.hash_token(auth_token))
+    api_token = ApiTokenService.get(cache_key)
+    if api_token is None:
+        with Session(db.engine, expire_on_commit=False) as session:
+            api_token = session.scalar(select(ApiToken).where(ApiToken.token == auth_token, ApiToken.type == scope))
         if not api_token:
-            stmt = select(ApiToken).where(ApiToken.token == auth_token, ApiToken.type == scope)
-            api_token = session.scalar(stmt)
-            if not api_token:
-                raise Unauthorized("Access token is invalid")
-        else:
-            session.commit()
+            raise Unauthorized("Access token is invalid")
+        if api_token.tenant_id:
+            # the tenant is only known once the token is loaded, a deletion racing this lookup lives one TTL at most
+            tenant_version = ApiTokenService.get_tenant_version(api_token.tenant_id)
+            ApiTokenService.set(cache_key, api_token.tenant_id, tenant_version, api_token)
 
+    ApiTokenService.record_last_used(api_token.id)
     return api_token
 
 
+def _get_app_auth_context(api_token: ApiToken) -> tuple[App, Tenant, Account]:
+    """
+    Get the app of an app token, its tenant and the tenant owner, attached to the request session.
+    """
+    cache_key = ("app_auth_context", api_token.id)
+    context = ApiTokenService.get(cache_key)
+    if context is None:
+        tenant_version = ApiTokenService.get_tenant_version(api_token.tenant_id)
+        with Session(db.engine, expire_on_commit=False) as session:
+            app_model = session.scalar(select(App).where(App.id == api_token.app_id))
+            if not app_model:
+                raise Forbidden("The app no longer exists.")
+
+            if app_model.status != "normal":
+                raise Forbidden("The app's status is abnormal.")
+
+            if not app_model.enable_api:
+                raise Forbidden("The app's API service has been disabled.")
+
+            tenant = session.scalar(select(Tenant).where(Tenant.id == app_model.tenant_id))
+            if tenant is None:
+                raise ValueError("Tenant does not exist.")
+            if tenant.status == TenantStatus.ARCHIVE:
+                raise Forbidden("The workspace's status is archived.")
+
+            owner_tenant, account = _load_tenant_owner(session, api_token.tenant_id)
+        context = (app_model, owner_tenant, account)
+        ApiTokenService.set(cache_key, api_token.tenant_id, tenant_version, context)
+
+    app_model, tenant, account = context
+    return (
+        db.session.merge(app_model, load=False),
+        db.session.merge(tenant, load=False),
+        db.session.merge(account, load=False),
+    )
+
+
+def _get_tenant_owner(tenant_id: str) -> tuple[Tenant, Account]:
+    cache_key = ("tenant_owner", tenant_id)
+    owner = ApiTokenService.get(cache_key)
+    if owner is None:
+        tenant_version = ApiTokenService.get_tenant_version(tenant_id)
+        with Session(db.engine, expire_on_commit=False) as session:
+            owner = _load_tenant_owner(session, tenant_id)
+        ApiTokenService.set(cache_key, tenant_id, tenant_version, owner)
+
+    tenant, account = owner
+    return db.session.merge(tenant, load=False), db.session.merge(account, load=False)
+
+
+def _load_tenant_owner(session: Session, tenant_id: str) -> tuple[Tenant, Account]:
+    tenant_account_join = session.execute(
+        select(Tenant, TenantAccountJoin)
+        .where(Tenant.id == tenant_id)
+        .where(TenantAccountJoin.tenant_id == Tenant.id)
+        .where(TenantAccountJoin.role.in_(["owner"]))
+        .where(Tenant.status == TenantStatus.NORMAL)
+    ).one_or_none()  # TODO: only owner information is required, so only one is returned.
+    if not tenant_account_join:
+        raise Unauthorized("Tenant does not exist.")
+
+    tenant, ta = tenant_account_join
+    account = session.scalar(select(Account).where(Account.id == ta.account_id))
+    if not account:
+        raise Unauthorized("Tenant owner account does not exist.")
+    return tenant, account
+
+
+def _login_tenant_owner(account: Account, tenant: Tenant) -> None:
+    account.current_tenant = tenant
+    current_app.login_manager._update_request_context_with_user(account)  # type: ignore
+    user_logged_in.send(current_app._get_current_object(), user=_get_user())  # type: ignore
+
+
 def create_or_update_end_user_for_user_id(app_model: App, user_id: Optional[str] = None) -> EndUser:
     """
     Create or update session terminal based on user ID.
@@ -291,29 +293,38 @@ def create_or_update_end_user_for_user_id(app_model: App, user_id: Optional[str]
     if not user_id:
         user_id = "DEFAULT-USER"
 
-    end_user = (
-        db.session.query(EndUser)
-        .where(
-            EndUser.tenant_id == app_model.tenant_id,
-            EndUser.app_id == app_model.id,
-            EndUser.session_id == user_id,
-            EndUser.type == "service_api",
-        )
-        .first()
-    )
-
+    cache_key = ("end_user", app_model.id, user_id)
+    end_user = ApiTokenService.get(cache_key)
     if end_user is None:
-        end_user = EndUser(
-            tenant_id=app_model.tenant_id,
-            app_id=app_model.id,
-            type="service_api",
-            is_anonymous=user_id == "DEFAULT-USER",
-            session_id=user_id,
-        )
-        db.session.add(end_user)
-        db.session.commit()
-
-    return end_user
+        tenant_version = ApiTokenService.get_tenant_version(app_model.tenant_id)
+        with Session(db.engine, expire_on_commit=False) as session:
+            end_user = session.scalar(
+                select(EndUser)
+                .where(
+                    EndUser.tenant_id == app_model.tenant_id,
+                    EndUser.app_id == app_model.id,
+                    EndUser.session_id == user_id,
+                    EndUser.type == "service_api",
+                )
+                .limit(1)
+            )
+
+            if end_user is None:
+                end_user = EndUser(
+                    tenant_id=app_model.tenant_id,
+                    app_id=app_model.id,
+                    type="service_api",
+                    is_anonymous=user_id == "DEFAULT-USER",
+                    session_id=user_id,
+                )
+                session.add(end_user)
+                session.commit()
+                # load the server side defaults so the cached instance is complete
+                session.refresh(end_user)
+        ApiTokenService.set(cache_key, app_model.tenant_id, tenant_version, end_user)
+
+    attached_end_user: EndUser = db.session.merge(end_user, load=False)
+    return attached_end_user
 
 
 class DatasetApiResource(Resource):
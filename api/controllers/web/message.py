@@ -27,6 +27,7 @@ from libs import helper
 from libs.helper import TimestampField, uuid_value
 from models.model import AppMode
 from services.app_generate_service import AppGenerateService
+from services.conversation_projection_service import ConversationProjectionService
 from services.errors.app import MoreLikeThisDisabledError
 from services.errors.conversation import ConversationNotExistsError
 from services.errors.message import MessageNotExistsError, SuggestedQuestionsAfterAnswerDisabledError
@@ -70,9 +71,11 @@ class MessageListApi(WebApiResource):
         args = parser.parse_args()
 
         try:
-            return MessageService.pagination_by_first_id(
+            pagination = MessageService.pagination_by_first_id(
                 app_model, end_user, args["conversation_id"], args["first_id"], args["limit"]
             )
+            pagination.data = ConversationProjectionService.project_messages(pagination.data)
+            return pagination
         except services.errors.conversation.ConversationNotExistsError:
             raise NotFound("Conversation Not Exists.")
         except services.errors.message.FirstMessageNotExistsError:
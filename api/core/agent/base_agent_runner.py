@@ -3,17 +3,18 @@ import logging
 import uuid
 from typing import Optional, Union, cast
 
-from sqlalchemy import select
+from sqlalchemy import insert, inspect, select, update
 
 from core.agent.entities import AgentEntity, AgentToolEntity
 from core.app.app_config.features.file_upload.manager import FileUploadConfigManager
 from core.app.apps.agent_chat.app_config_manager import AgentChatAppConfig
-from core.app.apps.base_app_queue_manager import AppQueueManager
+from core.app.apps.base_app_queue_manager import AppQueueManager, PublishFrom
 from core.app.apps.base_app_runner import AppRunner
 from core.app.entities.app_invoke_entities import (
     AgentChatAppGenerateEntity,
     ModelConfigWithCredentialsEntity,
 )
+from core.app.entities.queue_entities import QueueAgentThoughtEvent
 from core.callback_handler.agent_tool_callback_handler import DifyAgentCallbackHandler
 from core.callback_handler.index_tool_callback_handler import DatasetIndexToolCallbackHandler
 from core.file import file_manager
@@ -41,6 +42,7 @@ from core.tools.tool_manager import ToolManager
 from core.tools.utils.dataset_retriever_tool import DatasetRetrieverTool
 from extensions.ext_database import db
 from factories import file_factory
+from libs.datetime_utils import naive_utc_now
 from models.model import Conversation, Message, MessageAgentThought, MessageFile
 
 logger = logging.getLogger(__name__)
@@ -105,6 +107,11 @@ class BaseAgentRunner(AppRunner):
             .count()
         )
         db.session.close()
+        # Scratchpad of the agent thoughts of this run, they are published from memory and persisted in bulk
+        # by `flush_agent_thoughts` at the end of each step instead of on every change.
+        self._agent_thoughts: dict[str, MessageAgentThought] = {}
+        self._inserted_agent_thought_ids: set[str] = set()
+        self._unsaved_agent_thought_ids: set[str] = set()
 
         # check if model supports stream tool call
         llm_model = cast(LargeLanguageModel, model_instance.model_type_instance)
@@ -285,6 +292,7 @@ class BaseAgentRunner(AppRunner):
         Create agent thought
         """
         thought = MessageAgentThought(
+            id=str(uuid.uuid4()),
             message_id=message_id,
             message_chain_id=None,
             thought="",
@@ -309,13 +317,13 @@ class BaseAgentRunner(AppRunner):
             latency=0,
             created_by_role="account",
             created_by=self.user_id,
+            created_at=naive_utc_now(),
         )
 
-        db.session.add(thought)
-        db.session.commit()
         agent_thought_id = str(thought.id)
+        self._agent_thoughts[agent_thought_id] = thought
+        self._unsaved_agent_thought_ids.add(agent_thought_id)
         self.agent_thought_count += 1
-        db.session.close()
 
         return agent_thought_id
 
@@ -330,13 +338,15 @@ class BaseAgentRunner(AppRunner):
         answer: str | None,
         messages_ids: list[str],
         llm_usage: LLMUsage | None = None,
+        latency: float | None = None,
     ):
         """
         Save agent thought
         """
-        agent_thought = db.session.query(MessageAgentThought).where(MessageAgentThought.id == agent_thought_id).first()
+        agent_thought = self._agent_thoughts.get(agent_thought_id)
         if not agent_thought:
             raise ValueError("agent thought not found")
+        self._unsaved_agent_thought_ids.add(agent_thought_id)
 
         if thought:
             agent_thought.thought += thought
@@ -378,6 +388,9 @@ class BaseAgentRunner(AppRunner):
             agent_thought.tokens = llm_usage.total_tokens
             agent_thought.total_price = llm_usage.total_price
 
+        if latency is not None:
+            agent_thought.latency = latency
+
         # check if tool labels is not empty
         labels = agent_thought.tool_labels or {}
         tools = agent_thought.tool.split(";") if agent_thought.tool else []
@@ -402,9 +415,55 @@ class BaseAgentRunner(AppRunner):
 
             agent_thought.tool_meta_str = tool_invoke_meta
 
+    def publish_agent_thought(self, agent_thought_id: str) -> None:
+        """
+        Publish the current state of an agent thought, which may not be persisted yet
+        """
+        agent_thought = self._agent_thoughts[agent_thought_id]
+        self.queue_manager.publish(
+            QueueAgentThoughtEvent(
+                agent_thought_id=agent_thought_id,
+                position=agent_thought.position,
+                thought=agent_thought.thought,
+                observation=agent_thought.observation,
+                tool=agent_thought.tool,
+                tool_labels=agent_thought.tool_labels,
+                tool_input=agent_thought.tool_input,
+                message_files=agent_thought.files,
+            ),
+            PublishFrom.APPLICATION_MANAGER,
+        )
+
+    def flush_agent_thoughts(self) -> None:
+        """
+        Persist the agent thoughts created or changed since the last flush, in a single transaction
+        """
+        if not self._unsaved_agent_thought_ids:
+            return
+
+        columns = [attribute.key for attribute in inspect(MessageAgentThought).column_attrs]
+        new_rows = []
+        changed_rows = []
+        for agent_thought_id in sorted(
+            self._unsaved_agent_thought_ids, key=lambda thought_id: self._agent_thoughts[thought_id].position
+        ):
+            agent_thought = self._agent_thoughts[agent_thought_id]
+            row = {column: getattr(agent_thought, column) for column in columns}
+            if agent_thought_id in self._inserted_agent_thought_ids:
+                changed_rows.append(row)
+            else:
+                new_rows.append(row)
+
+        if new_rows:
+            db.session.execute(insert(MessageAgentThought), new_rows)
+        if changed_rows:
+            db.session.execute(update(MessageAgentThought), changed_rows)
         db.session.commit()
         db.session.close()
 
+        self._inserted_agent_thought_ids.update(self._unsaved_agent_thought_ids)
+        self._unsaved_agent_thought_ids.clear()
+
     def organize_agent_history(self, prompt_messages: list[PromptMessage]) -> list[PromptMessage]:
         """
         Organize agent history
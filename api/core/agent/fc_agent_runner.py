@@ -1,12 +1,20 @@
+import contextvars
 import json
 import logging
-from collections.abc import Generator
+import threading
+import time
+from collections import deque
+from collections.abc import Generator, Mapping
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from copy import deepcopy
 from typing import Any, Optional, Union
 
+from flask import Flask, current_app
+
+from configs import dify_config
 from core.agent.base_agent_runner import BaseAgentRunner
 from core.app.apps.base_app_queue_manager import PublishFrom
-from core.app.entities.queue_entities import QueueAgentThoughtEvent, QueueMessageEndEvent, QueueMessageFileEvent
+from core.app.entities.queue_entities import QueueMessageEndEvent, QueueMessageFileEvent
 from core.file import file_manager
 from core.model_runtime.entities import (
     AssistantPromptMessage,
@@ -22,13 +30,30 @@ from core.model_runtime.entities import (
     UserPromptMessage,
 )
 from core.model_runtime.entities.message_entities import ImagePromptMessageContent, PromptMessageContentUnionTypes
+from core.ops.ops_trace_manager import TraceQueueManager
 from core.prompt.agent_history_prompt_transform import AgentHistoryPromptTransform
+from core.tools.__base.tool import Tool
 from core.tools.entities.tool_entities import ToolInvokeMeta
 from core.tools.tool_engine import ToolEngine
+from libs.flask_utils import preserve_flask_contexts
 from models.model import Message
 
 logger = logging.getLogger(__name__)
 
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """The pool invoking the tool calls of all agent runs of the process."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=dify_config.AGENT_TOOL_CALL_WORKER_POOL_SIZE, thread_name_prefix="agent_tool_call"
+            )
+        return _executor
+
 
 class FunctionCallAgentRunner(BaseAgentRunner):
     def run(self, message: Message, query: str, **kwargs: Any) -> Generator[LLMResultChunk, None, None]:
@@ -113,9 +138,7 @@ class FunctionCallAgentRunner(BaseAgentRunner):
                 is_first_chunk = True
                 for chunk in chunks:
                     if is_first_chunk:
-                        self.queue_manager.publish(
-                            QueueAgentThoughtEvent(agent_thought_id=agent_thought_id), PublishFrom.APPLICATION_MANAGER
-                        )
+                        self.publish_agent_thought(agent_thought_id)
                         is_first_chunk = False
                     # check if there is any tool call
                     if self.check_tool_calls(chunk):
@@ -171,9 +194,7 @@ class FunctionCallAgentRunner(BaseAgentRunner):
                 if not result.message.content:
                     result.message.content = ""
 
-                self.queue_manager.publish(
-                    QueueAgentThoughtEvent(agent_thought_id=agent_thought_id), PublishFrom.APPLICATION_MANAGER
-                )
+                self.publish_agent_thought(agent_thought_id)
 
                 yield LLMResultChunk(
                     model=model_instance.model,
@@ -215,53 +236,24 @@ class FunctionCallAgentRunner(BaseAgentRunner):
                 messages_ids=[],
                 llm_usage=current_llm_usage,
             )
-            self.queue_manager.publish(
-                QueueAgentThoughtEvent(agent_thought_id=agent_thought_id), PublishFrom.APPLICATION_MANAGER
-            )
+            self.publish_agent_thought(agent_thought_id)
 
             final_answer += response + "\n"
 
             # call tools
+            tool_call_started_at = time.perf_counter()
+            tool_call_results = self._invoke_tool_calls(tool_calls, tool_instances, trace_manager)
+            tool_wall_time = time.perf_counter() - tool_call_started_at
             tool_responses = []
-            for tool_call_id, tool_call_name, tool_call_args in tool_calls:
-                tool_instance = tool_instances.get(tool_call_name)
-                if not tool_instance:
-                    tool_response = {
-                        "tool_call_id": tool_call_id,
-                        "tool_call_name": tool_call_name,
-                        "tool_response": f"there is not a tool named {tool_call_name}",
-                        "meta": ToolInvokeMeta.error_instance(f"there is not a tool named {tool_call_name}").to_dict(),
-                    }
-                else:
-                    # invoke tool
-                    tool_invoke_response, message_files, tool_invoke_meta = ToolEngine.agent_invoke(
-                        tool=tool_instance,
-                        tool_parameters=tool_call_args,
-                        user_id=self.user_id,
-                        tenant_id=self.tenant_id,
-                        message=self.message,
-                        invoke_from=self.application_generate_entity.invoke_from,
-                        agent_tool_callback=self.agent_callback,
-                        trace_manager=trace_manager,
-                        app_id=self.application_generate_entity.app_config.app_id,
-                        message_id=self.message.id,
-                        conversation_id=self.conversation.id,
+            for (tool_call_id, tool_call_name, _), (tool_response, message_files) in zip(tool_calls, tool_call_results):
+                # publish files
+                for message_file_id in message_files:
+                    # publish message file
+                    self.queue_manager.publish(
+                        QueueMessageFileEvent(message_file_id=message_file_id), PublishFrom.APPLICATION_MANAGER
                     )
-                    # publish files
-                    for message_file_id in message_files:
-                        # publish message file
-                        self.queue_manager.publish(
-                            QueueMessageFileEvent(message_file_id=message_file_id), PublishFrom.APPLICATION_MANAGER
-                        )
-                        # add message file ids
-                        message_file_ids.append(message_file_id)
-
-                    tool_response = {
-                        "tool_call_id": tool_call_id,
-                        "tool_call_name": tool_call_name,
-                        "tool_response": tool_invoke_response,
-                        "meta": tool_invoke_meta.to_dict(),
-                    }
+                    # add message file ids
+                    message_file_ids.append(message_file_id)
 
                 tool_responses.append(tool_response)
                 if tool_response["tool_response"] is not None:
@@ -289,15 +281,15 @@ class FunctionCallAgentRunner(BaseAgentRunner):
                     },
                     answer="",
                     messages_ids=message_file_ids,
+                    latency=tool_wall_time,
                 )
-                self.queue_manager.publish(
-                    QueueAgentThoughtEvent(agent_thought_id=agent_thought_id), PublishFrom.APPLICATION_MANAGER
-                )
+                self.publish_agent_thought(agent_thought_id)
 
             # update prompt tool
             for prompt_tool in prompt_messages_tools:
                 self.update_prompt_message_tool(tool_instances[prompt_tool.name], prompt_tool)
 
+            self.flush_agent_thoughts()
             iteration_step += 1
 
         # publish end event
@@ -314,6 +306,120 @@ class FunctionCallAgentRunner(BaseAgentRunner):
             PublishFrom.APPLICATION_MANAGER,
         )
 
+    def _invoke_tool_calls(
+        self,
+        tool_calls: list[tuple[str, str, dict[str, Any]]],
+        tool_instances: Mapping[str, Tool],
+        trace_manager: Optional[TraceQueueManager] = None,
+    ) -> list[tuple[dict[str, Any], list[str]]]:
+        """
+        Invoke the tool calls of a round on the shared pool, at most `AGENT_TOOL_CALL_MAX_CONCURRENCY` at a time, the
+        next call is submitted as soon as one of the running calls is done.
+
+        The results are returned in the order of the calls. A call not done `AGENT_TOOL_CALL_TIMEOUT` seconds after
+        it was submitted is answered with a timeout error, it keeps its thread until it returns and its result is
+        discarded.
+        """
+        if not tool_calls:
+            return []
+
+        flask_app = current_app._get_current_object()  # type: ignore
+        timeout = dify_config.AGENT_TOOL_CALL_TIMEOUT
+        max_concurrency = max(dify_config.AGENT_TOOL_CALL_MAX_CONCURRENCY, 1)
+        results: list[Optional[tuple[dict[str, Any], list[str]]]] = [None] * len(tool_calls)
+        pending = deque(enumerate(tool_calls))
+        # the running calls with their index and deadline
+        running: dict[Future, tuple[int, float]] = {}
+        while pending or running:
+            while pending and len(running) < max_concurrency:
+                index, tool_call = pending.popleft()
+                future = _get_executor().submit(
+                    self._invoke_tool_call_in_context,
+                    flask_app,
+                    contextvars.copy_context(),
+                    tool_call,
+                    tool_instances,
+                    trace_manager,
+                )
+                running[future] = (index, time.perf_counter() + timeout)
+
+            next_deadline = min(deadline for _, deadline in running.values())
+            done, _ = wait(running, timeout=max(next_deadline - time.perf_counter(), 0), return_when=FIRST_COMPLETED)
+            for future in done:
+                index, _ = running.pop(future)
+                results[index] = future.result()
+
+            now = time.perf_counter()
+            for future, (index, deadline) in list(running.items()):
+                if deadline > now:
+                    continue
+                future.cancel()
+                del running[future]
+                tool_call_id, tool_call_name, _ = tool_calls[index]
+                logger.warning("Tool call %s of message %s timed out", tool_call_name, self.message.id)
+                error = f"tool {tool_call_name} did not respond within {timeout} seconds"
+                tool_response = {
+                    "tool_call_id": tool_call_id,
+                    "tool_call_name": tool_call_name,
+                    "tool_response": error,
+                    "meta": ToolInvokeMeta.error_instance(error).to_dict(),
+                }
+                results[index] = (tool_response, [])
+        return [result for result in results if result is not None]
+
+    def _invoke_tool_call_in_context(
+        self,
+        flask_app: Flask,
+        context: contextvars.Context,
+        tool_call: tuple[str, str, dict[str, Any]],
+        tool_instances: Mapping[str, Tool],
+        trace_manager: Optional[TraceQueueManager],
+    ) -> tuple[dict[str, Any], list[str]]:
+        with preserve_flask_contexts(flask_app, context_vars=context):
+            return self._invoke_tool_call(tool_call, tool_instances, trace_manager)
+
+    def _invoke_tool_call(
+        self,
+        tool_call: tuple[str, str, dict[str, Any]],
+        tool_instances: Mapping[str, Tool],
+        trace_manager: Optional[TraceQueueManager],
+    ) -> tuple[dict[str, Any], list[str]]:
+        """
+        Invoke a tool call, return the tool response and the ids of the message files it created
+        """
+        tool_call_id, tool_call_name, tool_call_args = tool_call
+        tool_instance = tool_instances.get(tool_call_name)
+        if not tool_instance:
+            tool_response = {
+                "tool_call_id": tool_call_id,
+                "tool_call_name": tool_call_name,
+                "tool_response": f"there is not a tool named {tool_call_name}",
+                "meta": ToolInvokeMeta.error_instance(f"there is not a tool named {tool_call_name}").to_dict(),
+            }
+            return tool_response, []
+
+        # invoke tool
+        tool_invoke_response, message_files, tool_invoke_meta = ToolEngine.agent_invoke(
+            tool=tool_instance,
+            tool_parameters=tool_call_args,
+            user_id=self.user_id,
+            tenant_id=self.tenant_id,
+            message=self.message,
+            invoke_from=self.application_generate_entity.invoke_from,
+            agent_tool_callback=self.agent_callback,
+            trace_manager=trace_manager,
+            app_id=self.application_generate_entity.app_config.app_id,
+            message_id=self.message.id,
+            conversation_id=self.conversation.id,
+        )
+        tool_response = {
+            "tool_call_id": tool_call_id,
+            "tool_call_name": tool_call_name,
+            "tool_response": tool_invoke_response,
+            "meta": tool_invoke_meta.to_dict(),
+        }
+        return tool_response, message_files
+
     def check_tool_calls(self, llm_result_chunk: LLMResultChunk) -> bool:
         """
         Check if there is any tool call in llm result chunk
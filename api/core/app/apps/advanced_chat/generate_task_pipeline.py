@@ -8,7 +8,7 @@ from typing import Any, Optional, Union
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from constants.tts_auto_play_timeout import TTS_AUTO_PLAY_TIMEOUT, TTS_AUTO_PLAY_YIELD_CPU_TIME
+from constants.tts_auto_play_timeout import TTS_AUTO_PLAY_TIMEOUT
 from core.app.apps.base_app_queue_manager import AppQueueManager, PublishFrom
 from core.app.apps.common.workflow_response_converter import WorkflowResponseConverter
 from core.app.entities.app_invoke_entities import (
@@ -256,20 +256,13 @@ class AdvancedChatAppGenerateTaskPipeline:
                     break
             yield response
 
-        start_listener_time = time.time()
-        while (time.time() - start_listener_time) < TTS_AUTO_PLAY_TIMEOUT:
+        while tts_publisher:
             try:
-                if not tts_publisher:
+                # give up once no audio arrived for TTS_AUTO_PLAY_TIMEOUT seconds
+                audio_trunk = tts_publisher.wait_for_audio(timeout=TTS_AUTO_PLAY_TIMEOUT)
+                if audio_trunk is None or audio_trunk.status == "finish":
                     break
-                audio_trunk = tts_publisher.check_and_get_audio()
-                if audio_trunk is None:
-                    time.sleep(TTS_AUTO_PLAY_YIELD_CPU_TIME)
-                    continue
-                if audio_trunk.status == "finish":
-                    break
-                else:
-                    start_listener_time = time.time()
-                    yield MessageAudioStreamResponse(audio=audio_trunk.audio, task_id=task_id)
+                yield MessageAudioStreamResponse(audio=audio_trunk.audio, task_id=task_id)
             except Exception:
                 logger.exception("Failed to listen audio message, task_id: %s", task_id)
                 break
@@ -228,9 +228,13 @@ class AgentChatAppRunner(AppRunner):
         )
 
         # handle invoke result
-        self._handle_invoke_result(
-            invoke_result=invoke_result,
-            queue_manager=queue_manager,
-            stream=application_generate_entity.stream,
-            agent=True,
-        )
+        try:
+            self._handle_invoke_result(
+                invoke_result=invoke_result,
+                queue_manager=queue_manager,
+                stream=application_generate_entity.stream,
+                agent=True,
+            )
+        finally:
+            # persist the thoughts of a step interrupted by an error or a stop
+            runner.flush_agent_thoughts()
@@ -92,7 +92,7 @@ class AppGenerateResponseConverter(ABC):
         return metadata
 
     @classmethod
-    def _error_to_stream_response(cls, e: Exception) -> dict:
+    def error_to_stream_response(cls, e: Exception) -> dict:
         """
         Error to stream response.
         :param e: exception
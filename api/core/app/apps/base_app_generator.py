@@ -1,10 +1,13 @@
 import json
-from collections.abc import Generator, Mapping, Sequence
+from collections.abc import Callable, Generator, Iterable, Mapping, Sequence
 from typing import TYPE_CHECKING, Any, Optional, Union, final
 
 from sqlalchemy.orm import Session
 
+from configs import dify_config
 from core.app.app_config.entities import VariableEntityType
+from core.app.apps.stream_coalescing import coalesce_text_chunks
+from core.app.apps.stream_coalescing import dumps as stream_dumps
 from core.app.entities.app_invoke_entities import InvokeFrom
 from core.file import File, FileUploadConfig
 from core.workflow.nodes.enums import NodeType
@@ -153,18 +156,31 @@ class BaseAppGenerator:
         return value
 
     @classmethod
-    def convert_to_event_stream(cls, generator: Union[Mapping, Generator[Mapping | str, None, None]]):
+    def convert_to_event_stream(
+        cls, generator: Union[Mapping, Generator[Mapping | str, None, None]], coalesce: bool = False
+    ):
         """
         Convert messages into event stream
+
+        :param coalesce: merge consecutive text chunks into fewer events, see `coalesce_text_chunks`
         """
         if isinstance(generator, dict):
             return generator
         else:
+            messages: Iterable[Mapping | str] = generator
+            dumps: Callable[[Mapping], str] = json.dumps
+            if coalesce:
+                messages = coalesce_text_chunks(
+                    generator,
+                    max_chars=dify_config.STREAM_COALESCING_MAX_CHARS,
+                    max_latency_ms=dify_config.STREAM_COALESCING_MAX_LATENCY_MS,
+                )
+                dumps = stream_dumps
 
             def gen():
-                for message in generator:
+                for message in messages:
                     if isinstance(message, Mapping | dict):
-                        yield f"data: {json.dumps(message)}\n\n"
+                        yield f"data: {dumps(message)}\n\n"
                     else:
                         yield f"event: {message}\n\n"
 
@@ -73,7 +73,7 @@ class CompletionAppGenerateResponseConverter(AppGenerateResponseConverter):
             }
 
             if isinstance(sub_stream_response, ErrorStreamResponse):
-                data = cls._error_to_stream_response(sub_stream_response.err)
+                data = cls.error_to_stream_response(sub_stream_response.err)
                 response_chunk.update(data)
             else:
                 response_chunk.update(sub_stream_response.to_dict())
@@ -108,7 +108,7 @@ class CompletionAppGenerateResponseConverter(AppGenerateResponseConverter):
                 sub_stream_response_dict["metadata"] = cls._get_simple_metadata(metadata)
                 response_chunk.update(sub_stream_response_dict)
             if isinstance(sub_stream_response, ErrorStreamResponse):
-                data = cls._error_to_stream_response(sub_stream_response.err)
+                data = cls.error_to_stream_response(sub_stream_response.err)
                 response_chunk.update(data)
             else:
                 response_chunk.update(sub_stream_response.to_dict())
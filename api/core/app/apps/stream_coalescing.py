@@ -0,0 +1,104 @@
+import json
+import time
+from collections.abc import Generator, Iterable, Mapping
+from typing import Any, Optional, cast
+
+import orjson
+
+# events whose text is streamed token by token, with the key of their text
+_TEXT_EVENTS = {"message": "answer", "agent_message": "answer"}
+
+
+def _text_of(message: Mapping[str, Any]) -> Optional[str]:
+    event = message.get("event")
+    if event in _TEXT_EVENTS:
+        text = message.get(_TEXT_EVENTS[event])
+    elif event == "text_chunk" and isinstance(message.get("data"), Mapping):
+        text = message["data"].get("text")
+    else:
+        return None
+    return text if isinstance(text, str) else None
+
+
+def _same_frame(pending: Mapping[str, Any], message: Mapping[str, Any]) -> bool:
+    """Whether the messages only differ by their text."""
+    event = message["event"]
+    if pending["event"] != event or pending.keys() != message.keys():
+        return False
+    text_key = _TEXT_EVENTS.get(event)
+    for key, value in message.items():
+        if key == text_key:
+            continue
+        if key == "data" and event == "text_chunk":
+            if pending["data"].keys() != value.keys():
+                return False
+            if any(pending["data"][k] != v for k, v in value.items() if k != "text"):
+                return False
+        elif pending[key] != value:
+            return False
+    return True
+
+
+def _with_text(message: Mapping[str, Any], text: str) -> dict[str, Any]:
+    merged = dict(message)
+    if merged["event"] == "text_chunk":
+        merged["data"] = {**merged["data"], "text": text}
+    else:
+        merged[_TEXT_EVENTS[merged["event"]]] = text
+    return merged
+
+
+def coalesce_text_chunks(
+    stream: Iterable[Mapping[str, Any] | str], max_chars: int, max_latency_ms: int
+) -> Generator[Mapping[str, Any] | str, None, None]:
+    """
+    Merge consecutive text chunks of a converted app stream into one message.
+
+    A merged message is sent once it holds `max_chars` characters, `max_latency_ms` after its first chunk arrived,
+    or as soon as any other message follows it. The stream is pulled, a text held back while the model is silent is
+    sent with the next chunk, so the added latency is at most the larger of `max_latency_ms` and the gap between
+    two tokens.
+    """
+    max_latency = max_latency_ms / 1000
+    pending: Optional[Mapping[str, Any]] = None
+    pending_texts: list[str] = []
+    pending_chars = 0
+    pending_since = 0.0
+
+    def flush() -> Mapping[str, Any]:
+        nonlocal pending, pending_texts, pending_chars
+        assert pending is not None
+        message = pending if len(pending_texts) == 1 else _with_text(pending, "".join(pending_texts))
+        pending, pending_texts, pending_chars = None, [], 0
+        return message
+
+    for message in stream:
+        text = _text_of(message) if isinstance(message, Mapping) else None
+        if text is None:
+            if pending is not None:
+                yield flush()
+            yield message
+            continue
+
+        chunk = cast(Mapping[str, Any], message)
+        if pending is not None and not _same_frame(pending, chunk):
+            yield flush()
+        if pending is None:
+            pending = chunk
+            pending_since = time.monotonic()
+        pending_texts.append(text)
+        pending_chars += len(text)
+
+        if pending_chars >= max_chars or time.monotonic() - pending_since >= max_latency:
+            yield flush()
+
+    if pending is not None:
+        yield flush()
+
+
+def dumps(message: Mapping[str, Any]) -> str:
+    """Serialize a stream message with orjson, falling back to json for what orjson does not support."""
+    try:
+        return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode()
+    except TypeError:
+        return json.dumps(message)
@@ -0,0 +1,106 @@
+import re
+import time
+from collections.abc import Generator
+from typing import Optional
+
+from configs import dify_config
+from extensions.ext_redis import redis_client
+
+PING_FRAME = "event: ping\n\n"
+
+_ENTRY_ID_PATTERN = re.compile(r"^\d+-\d+$")
+
+
+class AppStreamEventBus:
+    """
+    Events of an app generation published to a Redis Stream, so that the generation and its client may live in
+    different processes.
+
+    A Celery worker publishes the event stream frames of a generation while the API process serving the request tails
+    the stream. Every frame is sent with an SSE id, `<stream_id>/<entry_id>`, a client that lost its connection resumes
+    after the last id it received. The events are kept `APP_GENERATE_STREAM_TTL` seconds after the last one was
+    published.
+    """
+
+    @staticmethod
+    def _key(stream_id: str) -> str:
+        return f"generate_task_events:{stream_id}"
+
+    @staticmethod
+    def _owner_key(stream_id: str) -> str:
+        return f"generate_task_events_owner:{stream_id}"
+
+    @classmethod
+    def open(cls, stream_id: str, app_id: str, end_user_id: str) -> None:
+        """Record who started the stream, only they may tail it."""
+        ttl = dify_config.APP_MAX_EXECUTION_TIME + dify_config.APP_GENERATE_STREAM_TTL
+        redis_client.setex(cls._owner_key(stream_id), ttl, f"{app_id}:{end_user_id}")
+
+    @classmethod
+    def is_owner(cls, stream_id: str, app_id: str, end_user_id: str) -> bool:
+        owner = redis_client.get(cls._owner_key(stream_id))
+        if owner is None:
+            return False
+        if isinstance(owner, bytes):
+            owner = owner.decode()
+        return bool(owner == f"{app_id}:{end_user_id}")
+
+    @classmethod
+    def publish(cls, stream_id: str, frame: str) -> None:
+        """Append an event stream frame, e.g. `data: {...}\\n\\n`."""
+        cls._append(stream_id, {"frame": frame})
+
+    @classmethod
+    def close(cls, stream_id: str) -> None:
+        """Mark the end of the stream, tailing clients stop after the last frame."""
+        cls._append(stream_id, {"end": "1"})
+
+    @classmethod
+    def _append(cls, stream_id: str, fields: dict[str, str]) -> None:
+        key = cls._key(stream_id)
+        pipeline = redis_client.pipeline(transaction=False)
+        pipeline.xadd(key, fields)
+        pipeline.expire(key, dify_config.APP_GENERATE_STREAM_TTL)
+        pipeline.execute()
+
+    @classmethod
+    def tail(cls, stream_id: str, last_entry_id: str = "0-0", block_ms: int = 10000) -> Generator[str, None, None]:
+        """
+        Yield the frames published after `last_entry_id`, prefixed with their SSE id, until the end of the stream.
+
+        A ping is sent whenever no event was published for `block_ms` milliseconds, tailing gives up once the
+        generation could no longer be running.
+        """
+        key = cls._key(stream_id)
+        deadline = time.monotonic() + dify_config.APP_MAX_EXECUTION_TIME
+        while time.monotonic() < deadline:
+            result = redis_client.xread({key: last_entry_id}, count=100, block=block_ms)
+            if not result:
+                yield PING_FRAME
+                continue
+
+            for entry_id, fields in result[0][1]:
+                last_entry_id = entry_id.decode() if isinstance(entry_id, bytes) else entry_id
+                if b"end" in fields or "end" in fields:
+                    return
+                frame = fields.get(b"frame", fields.get("frame"))
+                if isinstance(frame, bytes):
+                    frame = frame.decode()
+                yield f"id: {stream_id}/{last_entry_id}\n{frame}"
+
+    @staticmethod
+    def parse_last_event_id(stream_id: str, last_event_id: Optional[str]) -> str:
+        """
+        Return the stream entry id a client resumes after.
+
+        :param last_event_id: the SSE id of the last frame the client received, or its bare entry id
+        :raises ValueError: if the id does not belong to the stream
+        """
+        if not last_event_id:
+            return "0-0"
+        prefix, _, entry_id = last_event_id.rpartition("/")
+        if prefix and prefix != stream_id:
+            raise ValueError("Last event id does not belong to this stream.")
+        if not _ENTRY_ID_PATTERN.match(entry_id):
+            raise ValueError("Invalid last event id.")
+        return entry_id
@@ -1,12 +1,11 @@
 import logging
-import time
 from collections.abc import Callable, Generator
 from contextlib import contextmanager
 from typing import Any, Optional, Union
 
 from sqlalchemy.orm import Session
 
-from constants.tts_auto_play_timeout import TTS_AUTO_PLAY_TIMEOUT, TTS_AUTO_PLAY_YIELD_CPU_TIME
+from constants.tts_auto_play_timeout import TTS_AUTO_PLAY_TIMEOUT
 from core.app.apps.base_app_queue_manager import AppQueueManager
 from core.app.apps.common.workflow_response_converter import WorkflowResponseConverter
 from core.app.entities.app_invoke_entities import (
@@ -230,21 +229,13 @@ class WorkflowAppGenerateTaskPipeline:
                     break
             yield response
 
-        start_listener_time = time.time()
-        while (time.time() - start_listener_time) < TTS_AUTO_PLAY_TIMEOUT:
+        while tts_publisher:
             try:
-                if not tts_publisher:
+                # give up once no audio arrived for TTS_AUTO_PLAY_TIMEOUT seconds
+                audio_trunk = tts_publisher.wait_for_audio(timeout=TTS_AUTO_PLAY_TIMEOUT)
+                if audio_trunk is None or audio_trunk.status == "finish":
                     break
-                audio_trunk = tts_publisher.check_and_get_audio()
-                if audio_trunk is None:
-                    # release cpu
-                    # sleep 20 ms ( 40ms => 1280 byte audio file,20ms => 640 byte audio file)
-                    time.sleep(TTS_AUTO_PLAY_YIELD_CPU_TIME)
-                    continue
-                if audio_trunk.status == "finish":
-                    break
-                else:
-                    yield MessageAudioStreamResponse(audio=audio_trunk.audio, task_id=task_id)
+                yield MessageAudioStreamResponse(audio=audio_trunk.audio, task_id=task_id)
             except Exception:
                 logger.exception("Fails to get audio trunk, task_id: %s", task_id)
                 break
@@ -593,6 +593,14 @@ class QueueAgentThoughtEvent(AppQueueEvent):
 
     event: QueueEvent = QueueEvent.AGENT_THOUGHT
     agent_thought_id: str
+    # state of the thought when published, the thought is persisted later in bulk
+    position: Optional[int] = None
+    thought: Optional[str] = None
+    observation: Optional[str] = None
+    tool: Optional[str] = None
+    tool_labels: Optional[dict] = None
+    tool_input: Optional[str] = None
+    message_files: Optional[list[str]] = None
 
 
 class QueueMessageFileEvent(AppQueueEvent):
@@ -7,16 +7,17 @@ from typing import Any, Optional, Union
 
 from core.errors.error import AppInvokeQuotaExceededError
 from extensions.ext_redis import redis_client
+from libs.rate_limiter import ConcurrencyLimiter
 
 logger = logging.getLogger(__name__)
 
 
 class RateLimit:
     _MAX_ACTIVE_REQUESTS_KEY = "dify:rate_limit:{}:max_active_requests"
-    _ACTIVE_REQUESTS_KEY = "dify:rate_limit:{}:active_requests"
     _UNLIMITED_REQUEST_ID = "unlimited_request_id"
     _REQUEST_MAX_ALIVE_TIME = 10 * 60  # 10 minutes
-    _ACTIVE_REQUESTS_COUNT_FLUSH_INTERVAL = 5 * 60  # recalculate request_count from request_detail every 5 minutes
+    _MAX_ACTIVE_REQUESTS_FLUSH_INTERVAL = 5 * 60  # reload max_active_requests every 5 minutes
+    _active_requests = ConcurrencyLimiter("dify:rate_limit:active_request_leases", lease=_REQUEST_MAX_ALIVE_TIME)
     _instance_dict: dict[str, "RateLimit"] = {}
 
     def __new__(cls: type["RateLimit"], client_id: str, max_active_requests: int):
@@ -34,7 +35,6 @@ class RateLimit:
             return
         self.initialized = True
         self.client_id = client_id
-        self.active_requests_key = self._ACTIVE_REQUESTS_KEY.format(client_id)
         self.max_active_requests_key = self._MAX_ACTIVE_REQUESTS_KEY.format(client_id)
         self.last_recalculate_time = float("-inf")
         self.flush_cache(use_local_value=True)
@@ -50,40 +50,26 @@ class RateLimit:
             self.max_active_requests = int(redis_client.get(self.max_active_requests_key).decode("utf-8"))
             redis_client.expire(self.max_active_requests_key, timedelta(days=1))
 
-        # flush max active requests (in-transit request list)
-        if not redis_client.exists(self.active_requests_key):
-            return
-        request_details = redis_client.hgetall(self.active_requests_key)
-        redis_client.expire(self.active_requests_key, timedelta(days=1))
-        timeout_requests = [
-            k
-            for k, v in request_details.items()
-            if time.time() - float(v.decode("utf-8")) > RateLimit._REQUEST_MAX_ALIVE_TIME
-        ]
-        if timeout_requests:
-            redis_client.hdel(self.active_requests_key, *timeout_requests)
-
     def enter(self, request_id: Optional[str] = None) -> str:
         if self.disabled():
             return RateLimit._UNLIMITED_REQUEST_ID
-        if time.time() - self.last_recalculate_time > RateLimit._ACTIVE_REQUESTS_COUNT_FLUSH_INTERVAL:
+        if time.time() - self.last_recalculate_time > RateLimit._MAX_ACTIVE_REQUESTS_FLUSH_INTERVAL:
             self.flush_cache()
         if not request_id:
             request_id = RateLimit.gen_request_key()
 
-        active_requests_count = redis_client.hlen(self.active_requests_key)
-        if active_requests_count >= self.max_active_requests:
+        # requests which never exited free their slot once their lease expires
+        if not self._active_requests.acquire(self.client_id, request_id, self.max_active_requests):
             raise AppInvokeQuotaExceededError(
                 f"Too many requests. Please try again later. The current maximum concurrent requests allowed "
                 f"for {self.client_id} is {self.max_active_requests}."
             )
-        redis_client.hset(self.active_requests_key, request_id, str(time.time()))
         return request_id
 
     def exit(self, request_id: str):
         if request_id == RateLimit._UNLIMITED_REQUEST_ID:
             return
-        redis_client.hdel(self.active_requests_key, request_id)
+        self._active_requests.release(self.client_id, request_id)
 
     def disabled(self):
         return self.max_active_requests <= 0
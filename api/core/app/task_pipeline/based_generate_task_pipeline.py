@@ -125,7 +125,7 @@ class BasedGenerateTaskPipeline:
         """
         # response moderation
         if self._output_moderation_handler:
-            self._output_moderation_handler.stop_thread()
+            self._output_moderation_handler.stop_checking()
 
             completion, flagged = self._output_moderation_handler.moderation_completion(
                 completion=completion, public_event=False
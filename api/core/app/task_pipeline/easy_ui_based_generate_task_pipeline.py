@@ -7,7 +7,7 @@ from typing import Optional, Union, cast
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from constants.tts_auto_play_timeout import TTS_AUTO_PLAY_TIMEOUT, TTS_AUTO_PLAY_YIELD_CPU_TIME
+from constants.tts_auto_play_timeout import TTS_AUTO_PLAY_TIMEOUT
 from core.app.apps.base_app_queue_manager import AppQueueManager, PublishFrom
 from core.app.entities.app_invoke_entities import (
     AgentChatAppGenerateEntity,
@@ -231,22 +231,12 @@ class EasyUIBasedGenerateTaskPipeline(BasedGenerateTaskPipeline):
                     break
             yield response
 
-        start_listener_time = time.time()
-        # timeout
-        while (time.time() - start_listener_time) < TTS_AUTO_PLAY_TIMEOUT:
-            if publisher is None:
+        while publisher:
+            # give up once no audio arrived for TTS_AUTO_PLAY_TIMEOUT seconds
+            audio = publisher.wait_for_audio(timeout=TTS_AUTO_PLAY_TIMEOUT)
+            if audio is None or audio.status == "finish":
                 break
-            audio = publisher.check_and_get_audio()
-            if audio is None:
-                # release cpu
-                # sleep 20 ms ( 40ms => 1280 byte audio file,20ms => 640 byte audio file)
-                time.sleep(TTS_AUTO_PLAY_YIELD_CPU_TIME)
-                continue
-            if audio.status == "finish":
-                break
-            else:
-                start_listener_time = time.time()
-                yield MessageAudioStreamResponse(audio=audio.audio, task_id=task_id)
+            yield MessageAudioStreamResponse(audio=audio.audio, task_id=task_id)
         if publisher:
             yield MessageAudioEndStreamResponse(audio="", task_id=task_id)
 
@@ -470,6 +460,19 @@ class EasyUIBasedGenerateTaskPipeline(BasedGenerateTaskPipeline):
         :param event: agent thought event
         :return:
         """
+        if event.position is not None:
+            return AgentThoughtStreamResponse(
+                task_id=self._application_generate_entity.task_id,
+                id=event.agent_thought_id,
+                position=event.position,
+                thought=event.thought,
+                observation=event.observation,
+                tool=event.tool,
+                tool_labels=event.tool_labels,
+                tool_input=event.tool_input,
+                message_files=event.message_files,
+            )
+
         agent_thought: Optional[MessageAgentThought] = (
             db.session.query(MessageAgentThought).where(MessageAgentThought.id == event.agent_thought_id).first()
         )
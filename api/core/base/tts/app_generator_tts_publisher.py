@@ -1,12 +1,14 @@
 import base64
-import concurrent.futures
 import logging
 import queue
 import re
 import threading
-from collections.abc import Iterable
+import time
+from collections import deque
 from typing import Optional
 
+from opentelemetry.metrics import get_meter
+
 from core.app.entities.queue_entities import (
     MessageQueueMessage,
     QueueAgentMessageEvent,
@@ -15,10 +17,18 @@ from core.app.entities.queue_entities import (
     QueueTextChunkEvent,
     WorkflowQueueMessage,
 )
+from core.base.tts.tts_scheduler import get_tts_scheduler
 from core.model_manager import ModelInstance, ModelManager
 from core.model_runtime.entities.message_entities import TextPromptMessageContent
 from core.model_runtime.entities.model_entities import ModelType
 
+_meter = get_meter("tts_metrics")
+_time_to_first_audio = _meter.create_histogram(
+    "tts.time_to_first_audio",
+    description="Time from the start of a streaming response with auto-play speech to its first audio chunk",
+    unit="s",
+)
+
 
 class AudioTrunk:
     def __init__(self, status: str, audio):
@@ -34,34 +44,20 @@ def _invoice_tts(text_content: str, model_instance: ModelInstance, tenant_id: st
     )
 
 
-def _process_future(
-    future_queue: queue.Queue[concurrent.futures.Future[Iterable[bytes] | None] | None],
-    audio_queue: queue.Queue[AudioTrunk],
-):
-    while True:
-        try:
-            future = future_queue.get()
-            if future is None:
-                break
-            invoke_result = future.result()
-            if not invoke_result:
-                continue
-            for audio in invoke_result:
-                audio_base64 = base64.b64encode(bytes(audio))
-                audio_queue.put(AudioTrunk("responding", audio=audio_base64))
-        except Exception as e:
-            logging.getLogger(__name__).warning(e)
-            break
-    audio_queue.put(AudioTrunk("finish", b""))
+class AppGeneratorTTSPublisher:
+    """
+    Speech of a streaming response, synthesized sentence by sentence while the text is generated.
 
+    Published messages are split into sentences as they arrive, each new chunk is only scanned once. Batches of
+    sentences are synthesized on the shared `TTSScheduler` and the audio chunks are queued for the response pipeline,
+    which waits on the queue instead of polling it.
+    """
 
-class AppGeneratorTTSPublisher:
     def __init__(self, tenant_id: str, voice: str, language: Optional[str] = None):
         self.logger = logging.getLogger(__name__)
         self.tenant_id = tenant_id
         self.msg_text = ""
         self._audio_queue: queue.Queue[AudioTrunk] = queue.Queue()
-        self._msg_queue: queue.Queue[WorkflowQueueMessage | MessageQueueMessage | None] = queue.Queue()
         self.match = re.compile(r"[。.!?]")
         self.model_manager = ModelManager()
         self.model_instance = self.model_manager.get_default_model_instance(
@@ -74,83 +70,128 @@ class AppGeneratorTTSPublisher:
             self.voice = self.voices[0].get("value")
         self.MAX_SENTENCE = 2
         self._last_audio_event: Optional[AudioTrunk] = None
-        # FIXME better way to handle this threading.start
-        threading.Thread(target=self._runtime).start()
-        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=3)
+        # sentences of msg_text found so far, the text after the last one is still incomplete
+        self._sentence_count = 0
+        self._sentence_end = 0
+        self._lock = threading.Lock()
+        self._segments: deque[str] = deque()
+        self._synthesizing = False
+        self._finished = False
+        self._started_at = time.perf_counter()
+        self._first_audio_at: Optional[float] = None
 
     def publish(self, message: WorkflowQueueMessage | MessageQueueMessage | None, /):
-        self._msg_queue.put(message)
-
-    def _runtime(self):
-        future_queue: queue.Queue[concurrent.futures.Future[Iterable[bytes] | None] | None] = queue.Queue()
-        threading.Thread(target=_process_future, args=(future_queue, self._audio_queue)).start()
-        while True:
-            try:
-                message = self._msg_queue.get()
-                if message is None:
-                    if self.msg_text and len(self.msg_text.strip()) > 0:
-                        futures_result = self.executor.submit(
-                            _invoice_tts, self.msg_text, self.model_instance, self.tenant_id, self.voice
-                        )
-                        future_queue.put(futures_result)
-                    break
-                elif isinstance(message.event, QueueAgentMessageEvent | QueueLLMChunkEvent):
-                    message_content = message.event.chunk.delta.message.content
-                    if not message_content:
-                        continue
-                    if isinstance(message_content, str):
-                        self.msg_text += message_content
-                    elif isinstance(message_content, list):
-                        for content in message_content:
-                            if not isinstance(content, TextPromptMessageContent):
-                                continue
-                            self.msg_text += content.data
-                elif isinstance(message.event, QueueTextChunkEvent):
-                    self.msg_text += message.event.text
-                elif isinstance(message.event, QueueNodeSucceededEvent):
-                    if message.event.outputs is None:
-                        continue
-                    self.msg_text += message.event.outputs.get("output", "")
-                self.last_message = message
-                sentence_arr, text_tmp = self._extract_sentence(self.msg_text)
-                if len(sentence_arr) >= min(self.MAX_SENTENCE, 7):
-                    self.MAX_SENTENCE += 1
-                    text_content = "".join(sentence_arr)
-                    futures_result = self.executor.submit(
-                        _invoice_tts, text_content, self.model_instance, self.tenant_id, self.voice
-                    )
-                    future_queue.put(futures_result)
-                    if text_tmp:
-                        self.msg_text = text_tmp
-                    else:
-                        self.msg_text = ""
-
-            except Exception as e:
-                self.logger.warning(e)
-                break
-        future_queue.put(None)
-
-    def check_and_get_audio(self):
         try:
-            if self._last_audio_event and self._last_audio_event.status == "finish":
-                if self.executor:
-                    self.executor.shutdown(wait=False)
-                return self._last_audio_event
-            audio = self._audio_queue.get_nowait()
-            if audio and audio.status == "finish":
-                self.executor.shutdown(wait=False)
-            if audio:
-                self._last_audio_event = audio
-            return audio
+            if message is None:
+                if self.msg_text and len(self.msg_text.strip()) > 0:
+                    self._submit(self.msg_text)
+                    self.msg_text = ""
+                self._finish()
+                return
+
+            if isinstance(message.event, QueueAgentMessageEvent | QueueLLMChunkEvent):
+                message_content = message.event.chunk.delta.message.content
+                if not message_content:
+                    return
+                if isinstance(message_content, str):
+                    self._append_text(message_content)
+                elif isinstance(message_content, list):
+                    for content in message_content:
+                        if not isinstance(content, TextPromptMessageContent):
+                            continue
+                        self._append_text(content.data)
+            elif isinstance(message.event, QueueTextChunkEvent):
+                self._append_text(message.event.text)
+            elif isinstance(message.event, QueueNodeSucceededEvent):
+                if message.event.outputs is None:
+                    return
+                self._append_text(message.event.outputs.get("output", ""))
+        except Exception as e:
+            self.logger.warning(e)
+            self._finish()
+
+    def check_and_get_audio(self) -> Optional[AudioTrunk]:
+        """Return the next audio chunk if one is ready, the finish chunk is returned again once reached."""
+        try:
+            return self._next_audio(block=False)
+        except queue.Empty:
+            return None
+
+    def wait_for_audio(self, timeout: float) -> Optional[AudioTrunk]:
+        """Wait at most `timeout` seconds for the next audio chunk."""
+        try:
+            return self._next_audio(block=True, timeout=timeout)
         except queue.Empty:
             return None
 
-    def _extract_sentence(self, org_text):
-        tx = self.match.finditer(org_text)
-        start = 0
-        result = []
-        for i in tx:
-            end = i.regs[0][1]
-            result.append(org_text[start:end])
-            start = end
-        return result, org_text[start:]
+    def _next_audio(self, block: bool, timeout: Optional[float] = None) -> AudioTrunk:
+        if self._last_audio_event and self._last_audio_event.status == "finish":
+            return self._last_audio_event
+        audio = self._audio_queue.get(block=block, timeout=timeout)
+        self._last_audio_event = audio
+        return audio
+
+    def _append_text(self, text: str) -> None:
+        scanned = len(self.msg_text)
+        self.msg_text += text
+        # the delimiters are single characters, so only the new text can hold new sentence ends
+        for match in self.match.finditer(self.msg_text, scanned):
+            self._sentence_count += 1
+            self._sentence_end = match.end()
+
+        if self._sentence_count >= min(self.MAX_SENTENCE, 7):
+            self.MAX_SENTENCE += 1
+            self._submit(self.msg_text[: self._sentence_end])
+            self.msg_text = self.msg_text[self._sentence_end :]
+            self._sentence_count = 0
+            self._sentence_end = 0
+
+    def _submit(self, text: str) -> None:
+        with self._lock:
+            if self._finished:
+                return
+            self._segments.append(text)
+            if self._synthesizing:
+                return
+            self._synthesizing = True
+        get_tts_scheduler().schedule(self)
+
+    def _finish(self) -> None:
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+            if self._synthesizing:
+                # the finish chunk is sent after the last segment
+                return
+        self._audio_queue.put(AudioTrunk("finish", b""))
+
+    def synthesize_next(self) -> None:
+        """Synthesize the next segment, called by the scheduler."""
+        with self._lock:
+            text = self._segments.popleft()
+        try:
+            invoke_result = _invoice_tts(text, self.model_instance, self.tenant_id, self.voice)
+            for audio in invoke_result or []:
+                self._put_audio(base64.b64encode(bytes(audio)))
+        except Exception as e:
+            self.logger.warning(e)
+            with self._lock:
+                self._segments.clear()
+                self._finished = True
+
+        with self._lock:
+            reschedule = bool(self._segments)
+            if not reschedule:
+                self._synthesizing = False
+            finished = self._finished
+        if reschedule:
+            get_tts_scheduler().schedule(self)
+        elif finished:
+            self._audio_queue.put(AudioTrunk("finish", b""))
+
+    def _put_audio(self, audio: bytes) -> None:
+        if self._first_audio_at is None:
+            self._first_audio_at = time.perf_counter()
+            _time_to_first_audio.record(self._first_audio_at - self._started_at)
+        self._audio_queue.put(AudioTrunk("responding", audio=audio))
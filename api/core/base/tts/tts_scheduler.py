@@ -0,0 +1,54 @@
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Protocol
+
+from configs import dify_config
+
+
+class TTSSession(Protocol):
+    tenant_id: str
+
+    def synthesize_next(self) -> None: ...
+
+
+class TTSScheduler:
+    """
+    Process-wide pool synthesizing the speech of all streaming responses.
+
+    A session is scheduled each time it has a segment ready and none running, so the segments of a response are
+    synthesized one at a time and in order. Workers pick the ready sessions round-robin across tenants, and across the
+    sessions of a tenant, so a tenant with many responses does not delay the others.
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tts_scheduler")
+        self._lock = threading.Lock()
+        self._ready: OrderedDict[str, deque[TTSSession]] = OrderedDict()
+
+    def schedule(self, session: TTSSession) -> None:
+        with self._lock:
+            self._ready.setdefault(session.tenant_id, deque()).append(session)
+        # every submission runs exactly one ready segment, which one is decided when a worker is free
+        self._executor.submit(self._run_next)
+
+    def _run_next(self) -> None:
+        with self._lock:
+            tenant_id, sessions = self._ready.popitem(last=False)
+            session = sessions.popleft()
+            if sessions:
+                # the tenant moves to the back of the line
+                self._ready[tenant_id] = sessions
+        session.synthesize_next()
+
+
+_scheduler: Optional[TTSScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_tts_scheduler() -> TTSScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = TTSScheduler(max_workers=dify_config.TTS_WORKER_POOL_SIZE)
+        return _scheduler
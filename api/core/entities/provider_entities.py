@@ -65,6 +65,8 @@ class QuotaConfiguration(BaseModel):
     quota_unit: QuotaUnit
     quota_limit: int
     quota_used: int
+    # usage recorded in the quota ledger and not reconciled into the database yet, included in quota_used
+    quota_pending: int = 0
     is_valid: bool
     restrict_models: list[RestrictModel] = []
 
@@ -1,5 +1,9 @@
 import base64
+import binascii
+import json
+from typing import Any
 
+from configs import dify_config
 from libs import rsa
 
 
@@ -17,7 +21,10 @@ def encrypt_token(tenant_id: str, token: str):
 
     if not (tenant := db.session.query(Tenant).where(Tenant.id == tenant_id).first()):
         raise ValueError(f"Tenant with id {tenant_id} not found")
-    encrypted_token = rsa.encrypt(token, tenant.encrypt_public_key)
+    if dify_config.CREDENTIAL_ENVELOPE_ENCRYPTION_ENABLED:
+        encrypted_token = rsa.encrypt_with_data_key(token, tenant_id)
+    else:
+        encrypted_token = rsa.encrypt(token, tenant.encrypt_public_key)
     return base64.b64encode(encrypted_token).decode()
 
 
@@ -37,3 +44,36 @@ def get_decrypt_decoding(tenant_id: str):
 
 def decrypt_token_with_decoding(token: str, rsa_key, cipher_rsa):
     return rsa.decrypt_token_with_decoding(base64.b64decode(token), rsa_key, cipher_rsa)
+
+
+def _is_hybrid_token(value: str) -> bool:
+    try:
+        return base64.b64decode(value, validate=True).startswith(rsa.prefix_hybrid)
+    except (binascii.Error, ValueError):
+        return False
+
+
+def envelope_encrypt_tokens(tenant_id: str, value: Any) -> Any:
+    """
+    Return `value` with the hybrid encrypted tokens it holds, possibly nested in dicts and lists, re-encrypted with
+    the tenant data key. Legacy tokens without the hybrid prefix cannot be told from plain strings and are kept.
+    """
+    if isinstance(value, dict):
+        return {key: envelope_encrypt_tokens(tenant_id, item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [envelope_encrypt_tokens(tenant_id, item) for item in value]
+    if isinstance(value, str) and _is_hybrid_token(value):
+        return base64.b64encode(rsa.encrypt_with_data_key(decrypt_token(tenant_id, value), tenant_id)).decode()
+    return value
+
+
+def envelope_encrypt_serialized_tokens(tenant_id: str, value: str) -> str:
+    """`envelope_encrypt_tokens` of a JSON serialized value, or of a single token."""
+    try:
+        data = json.loads(value)
+    except ValueError:
+        return str(envelope_encrypt_tokens(tenant_id, value))
+    if not isinstance(data, dict | list):
+        return str(envelope_encrypt_tokens(tenant_id, value))
+    migrated = envelope_encrypt_tokens(tenant_id, data)
+    return value if migrated == data else json.dumps(migrated)
@@ -0,0 +1,59 @@
+"""
+Offloading of large serialized values, e.g. workflow variables and node execution payloads, to the storage.
+
+A value whose JSON serialization is over `WORKFLOW_LARGE_VALUE_OFFLOAD_THRESHOLD` bytes is saved gzip compressed in
+the storage, and the database row keeps a truncated preview of it next to the storage key. The preview has the shape
+of the value, its strings cut and its lists shortened, so that lists and run histories can be shown without reading
+the storage.
+"""
+
+import gzip
+import logging
+from collections.abc import Iterable
+from typing import Any
+
+from configs import dify_config
+from extensions.ext_storage import storage
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_MAX_STRING_LENGTH = 1000
+PREVIEW_MAX_ITEMS = 20
+PREVIEW_MAX_DEPTH = 8
+
+
+def should_offload(serialized: str) -> bool:
+    threshold = dify_config.WORKFLOW_LARGE_VALUE_OFFLOAD_THRESHOLD
+    # the length in characters is a lower bound of the size in bytes, only encode when it may be under
+    if threshold <= 0 or len(serialized) <= threshold // 4:
+        return False
+    return len(serialized) > threshold or len(serialized.encode("utf-8")) > threshold
+
+
+def save(storage_key: str, serialized: str) -> None:
+    storage.save(storage_key, gzip.compress(serialized.encode("utf-8"), compresslevel=6))
+
+
+def load(storage_key: str) -> str:
+    return gzip.decompress(storage.load_once(storage_key)).decode("utf-8")
+
+
+def delete(storage_keys: Iterable[str]) -> None:
+    for storage_key in storage_keys:
+        try:
+            storage.delete(storage_key)
+        except Exception:
+            logger.warning("Failed to delete offloaded value %s", storage_key, exc_info=True)
+
+
+def truncate(value: Any, depth: int = 0) -> Any:
+    """Return a preview of a JSON encodable value, with the same shape."""
+    if isinstance(value, str):
+        return value[:PREVIEW_MAX_STRING_LENGTH]
+    if depth >= PREVIEW_MAX_DEPTH and isinstance(value, dict | list):
+        return type(value)()
+    if isinstance(value, dict):
+        return {key: truncate(item, depth + 1) for key, item in list(value.items())[:PREVIEW_MAX_ITEMS]}
+    if isinstance(value, list):
+        return [truncate(item, depth + 1) for item in value[:PREVIEW_MAX_ITEMS]]
+    return value
@@ -0,0 +1,216 @@
+import json
+import logging
+import uuid
+from collections.abc import Iterable, Mapping, Sequence
+from typing import Any, Optional
+
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+from configs import dify_config
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from libs.datetime_utils import naive_utc_now
+from models.provider import Provider, ProviderQuotaReconcileBatch, ProviderType
+
+logger = logging.getLogger(__name__)
+
+# every key shares the hash tag, so the scripts touching a quota and the set of quotas work on Redis clusters
+_KEY_PREFIX = "{provider_quota_ledger}"
+_PENDING_SET_KEY = f"{_KEY_PREFIX}:pending"
+# the batch being reconciled, its id and the usage it writes to the database
+_BATCH_KEY = f"{_KEY_PREFIX}:batch"
+
+# KEYS[1]: usage of the quota not reconciled yet, KEYS[2]: set of the quotas with such usage
+# ARGV: quota to deduct, quota used as stored in the database, quota limit, member of the set
+_DEDUCT_SCRIPT = """
+local pending = tonumber(redis.call('GET', KEYS[1]) or '0')
+local limit = tonumber(ARGV[3])
+if limit ~= -1 and tonumber(ARGV[2]) + pending >= limit then
+    return 0
+end
+redis.call('INCRBY', KEYS[1], ARGV[1])
+redis.call('SADD', KEYS[2], ARGV[4])
+return 1
+"""
+
+# KEYS[1]: set of the quotas with pending usage, KEYS[2]: the batch, KEYS[3..]: usage of its quotas
+# ARGV[1]: id of the batch, then the member of each quota and the usage written to the database
+# the usage is subtracted once per batch, settling a batch again does nothing
+_SETTLE_SCRIPT = """
+if redis.call('HGET', KEYS[2], 'id') ~= ARGV[1] then
+    return 0
+end
+for i = 3, #KEYS do
+    local member = ARGV[(i - 3) * 2 + 2]
+    local pending = redis.call('DECRBY', KEYS[i], ARGV[(i - 3) * 2 + 3])
+    if pending <= 0 then
+        redis.call('DEL', KEYS[i])
+        redis.call('SREM', KEYS[1], member)
+    end
+end
+redis.call('DEL', KEYS[2])
+return 1
+"""
+
+
+class ProviderQuotaLedger:
+    """
+    Usage of the hosted provider quotas, recorded in Redis and reconciled into `Provider.quota_used`.
+
+    Every LLM call on a hosted provider used to increment the quota row of its tenant, so the calls of a busy tenant
+    queued on the row lock. With `ENABLE_PROVIDER_QUOTA_LEDGER`, a call adds its usage to a Redis counter instead,
+    and a script checks atomically that the quota used, as stored plus the pending usage, is under the limit. The
+    reconcile task writes the pending usage to the database in batches and only then subtracts it from the counters,
+    so readers adding the pending usage to the stored one may briefly overcount but never undercount. Each batch is
+    recorded in the transaction writing its usage, a batch interrupted before its counters were settled is settled
+    by the next reconcile rather than written again.
+    """
+
+    _scripts: dict[str, Any] = {}
+
+    @staticmethod
+    def _member(tenant_id: str, provider_name: str, quota_type: str) -> str:
+        return f"{tenant_id}:{provider_name}:{quota_type}"
+
+    @staticmethod
+    def _key(member: str) -> str:
+        return f"{_KEY_PREFIX}:{member}"
+
+    @staticmethod
+    def _parse_member(member: str) -> tuple[str, str, str]:
+        tenant_id, rest = member.split(":", 1)
+        provider_name, quota_type = rest.rsplit(":", 1)
+        return tenant_id, provider_name, quota_type
+
+    @classmethod
+    def _script(cls, source: str) -> Any:
+        # registered on first use, the Redis client is not initialized when this module is imported
+        script = cls._scripts.get(source)
+        if script is None:
+            script = cls._scripts[source] = redis_client.register_script(source)
+        return script
+
+    @classmethod
+    def deduct(
+        cls,
+        tenant_id: str,
+        provider_name: str,
+        quota_type: str,
+        amount: int,
+        quota_used: int,
+        quota_limit: int,
+    ) -> bool:
+        """
+        Record the usage of a quota.
+
+        :param quota_used: the quota used as stored in the database
+        :param quota_limit: the quota limit, -1 if unlimited
+        :return: False if the quota was already exhausted, the usage is then not recorded
+        """
+        member = cls._member(tenant_id, provider_name, quota_type)
+        result = cls._script(_DEDUCT_SCRIPT)(
+            keys=[cls._key(member), _PENDING_SET_KEY], args=[amount, quota_used, quota_limit, member]
+        )
+        return bool(result)
+
+    @classmethod
+    def get_pending(cls, tenant_id: str, quotas: Iterable[tuple[str, str]]) -> dict[tuple[str, str], int]:
+        """Return the usage not reconciled yet of the given (provider name, quota type) of a tenant."""
+        quotas = list(dict.fromkeys(quotas))
+        if not quotas:
+            return {}
+        values = redis_client.mget(
+            [cls._key(cls._member(tenant_id, provider_name, quota_type)) for provider_name, quota_type in quotas]
+        )
+        return {quota: int(value) for quota, value in zip(quotas, values) if value is not None and int(value) > 0}
+
+    @classmethod
+    def reconcile(cls) -> int:
+        """
+        Write the pending usage of every quota to the database.
+
+        :return: the number of quotas reconciled
+        """
+        lock = redis_client.lock("provider_quota_ledger:reconcile_lock", timeout=600)
+        if not lock.acquire(blocking=False):
+            logger.info("Provider quota reconciliation is already running")
+            return 0
+        try:
+            cls._settle_interrupted_batch()
+            members = [
+                member.decode() if isinstance(member, bytes) else member
+                for member in redis_client.sscan_iter(_PENDING_SET_KEY, count=1000)
+            ]
+            batch_size = dify_config.PROVIDER_QUOTA_RECONCILE_BATCH_SIZE
+            reconciled = 0
+            for start in range(0, len(members), batch_size):
+                reconciled += cls._reconcile_batch(members[start : start + batch_size])
+                lock.reacquire()
+            return reconciled
+        finally:
+            try:
+                lock.release()
+            except Exception:
+                logger.warning("Failed to release provider quota reconcile lock")
+
+    @classmethod
+    def _reconcile_batch(cls, members: Sequence[str]) -> int:
+        values: list[Optional[bytes]] = redis_client.mget([cls._key(member) for member in members])
+        pending = {member: int(value) if value is not None else 0 for member, value in zip(members, values)}
+
+        batch_id = str(uuid.uuid4())
+        # kept until the counters are settled, for the next reconcile to tell whether the batch was stored
+        redis_client.hset(_BATCH_KEY, mapping={"id": batch_id, "pending": json.dumps(pending)})
+        now = naive_utc_now()
+        with Session(db.engine) as session:
+            for member, amount in pending.items():
+                if amount <= 0:
+                    continue
+                tenant_id, provider_name, quota_type = cls._parse_member(member)
+                result = session.execute(
+                    update(Provider)
+                    .where(
+                        Provider.tenant_id == tenant_id,
+                        Provider.provider_name == provider_name,
+                        Provider.provider_type == ProviderType.SYSTEM.value,
+                        Provider.quota_type == quota_type,
+                    )
+                    .values(quota_used=Provider.quota_used + amount, last_used=now)
+                )
+                if result.rowcount == 0:  # type: ignore[attr-defined]
+                    logger.warning("No provider quota found for pending usage %s of %s, dropping it", amount, member)
+            session.add(ProviderQuotaReconcileBatch(id=batch_id))
+            session.commit()
+
+        cls._settle(batch_id, pending)
+        return sum(1 for amount in pending.values() if amount > 0)
+
+    @classmethod
+    def _settle_interrupted_batch(cls) -> None:
+        values: list[Optional[bytes]] = redis_client.hmget(_BATCH_KEY, ["id", "pending"])
+        if values[0] is None or values[1] is None:
+            return
+        batch_id = values[0].decode() if isinstance(values[0], bytes) else values[0]
+        pending: dict[str, int] = json.loads(values[1])
+        with Session(db.engine) as session:
+            stored = session.get(ProviderQuotaReconcileBatch, batch_id) is not None
+        if stored:
+            logger.warning("Settling provider quota reconcile batch %s interrupted after it was stored", batch_id)
+            cls._settle(batch_id, pending)
+        else:
+            # the batch was not committed, its usage is still pending and reconciled again
+            redis_client.delete(_BATCH_KEY)
+
+    @classmethod
+    def _settle(cls, batch_id: str, pending: Mapping[str, int]) -> None:
+        """Subtract the usage stored by a batch from the counters, what was added meanwhile stays pending."""
+        args: list[Any] = [batch_id]
+        for member, amount in pending.items():
+            args += [member, amount]
+        cls._script(_SETTLE_SCRIPT)(
+            keys=[_PENDING_SET_KEY, _BATCH_KEY, *(cls._key(member) for member in pending)], args=args
+        )
+        with Session(db.engine) as session:
+            session.execute(delete(ProviderQuotaReconcileBatch).where(ProviderQuotaReconcileBatch.id == batch_id))
+            session.commit()
@@ -0,0 +1,497 @@
+import datetime
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from flask import Flask, current_app
+from sqlalchemy.orm.exc import ObjectDeletedError
+
+from configs import dify_config
+from core.errors.error import ProviderTokenNotInitError
+from core.indexing_runner import DocumentIsPausedError, IndexingRunner
+from core.model_manager import ModelInstance
+from core.model_runtime.entities.model_entities import ModelType
+from core.rag.datasource.vdb.vector_factory import Vector
+from core.rag.embedding.cached_embedding import CacheEmbedding
+from core.rag.index_processor.constant.index_type import IndexType
+from core.rag.index_processor.index_processor_factory import IndexProcessorFactory
+from core.rag.models.document import Document
+from extensions.ext_database import db
+from models.dataset import Dataset, DatasetProcessRule, DocumentSegment
+from models.dataset import Document as DatasetDocument
+
+logger = logging.getLogger(__name__)
+
+# marks the end of the work stream on a stage queue
+_END = object()
+
+
+@dataclass
+class StageMetrics:
+    """Throughput counters of one pipeline stage."""
+
+    name: str
+    items: int = 0
+    batches: int = 0
+    busy_seconds: float = 0.0
+    # time spent waiting for room in the downstream queue, i.e. backpressure
+    blocked_seconds: float = 0.0
+
+    @property
+    def items_per_second(self) -> float:
+        return self.items / self.busy_seconds if self.busy_seconds else 0.0
+
+    def record(self, items: int, seconds: float) -> None:
+        self.items += items
+        self.batches += 1
+        self.busy_seconds += seconds
+
+
+@dataclass
+class _ExtractedDocument:
+    dataset_id: str
+    document_id: str
+    text_docs: list[Document]
+    process_rule: dict
+
+
+@dataclass
+class _Segment:
+    """A segment to be indexed, together with the documents whose embeddings go into the vector store."""
+
+    dataset_id: str
+    document_id: str
+    embedding_key: tuple[str, str, str]
+    segment: Document
+    texts: list[Document]
+
+
+@dataclass
+class _EmbeddedBatch:
+    segments: list[_Segment]
+    embeddings: list[list[float]]
+
+
+@dataclass
+class _DocumentProgress:
+    started_at: float
+    pending_segments: int = 0
+    tokens: int = 0
+    split_done: bool = False
+    completed: bool = False
+    failed: bool = False
+
+
+class IndexingPipeline:
+    """
+    Index a list of documents through extract -> split -> embed -> load stages connected by bounded queues.
+
+    Extraction runs on the calling thread, each other stage on its own thread inside the Flask app context.
+    The embedding stage batches segments across documents up to the embedding model's MAX_CHUNKS and the
+    model instances and vector clients are resolved once per pipeline instead of once per chunk group.
+    """
+
+    def __init__(self, runner: IndexingRunner, queue_size: Optional[int] = None, batch_wait: Optional[float] = None):
+        self._runner = runner
+        self._queue_size = queue_size or dify_config.INDEXING_PIPELINE_QUEUE_SIZE
+        self._batch_wait = batch_wait if batch_wait is not None else dify_config.INDEXING_PIPELINE_BATCH_WAIT_MS / 1000
+        self._split_queue: queue.Queue = queue.Queue(maxsize=self._queue_size)
+        self._embed_queue: queue.Queue = queue.Queue(maxsize=self._queue_size)
+        self._load_queue: queue.Queue = queue.Queue(maxsize=self._queue_size)
+        self._progress: dict[str, _DocumentProgress] = {}
+        self._progress_lock = threading.Lock()
+        self._paused_document_ids: list[str] = []
+        self._embeddings: dict[tuple[str, str, str], tuple[ModelInstance, CacheEmbedding]] = {}
+        self._max_chunks: dict[tuple[str, str, str], int] = {}
+        self._vectors: dict[str, Vector] = {}
+        # queues whose end marker was consumed, and the errors that stopped a stage
+        self._ended_queues: set[queue.Queue] = set()
+        self.errors: list[Exception] = []
+        self.metrics = {name: StageMetrics(name) for name in ("extract", "split", "embed", "load")}
+
+    def run(self, dataset_documents: list[DatasetDocument]) -> None:
+        flask_app: Flask = current_app._get_current_object()  # type: ignore
+        stages = [
+            (self._split_stage, self._split_queue, self._embed_queue, "split"),
+            (self._embed_stage, self._embed_queue, self._load_queue, "embed"),
+            (self._load_stage, self._load_queue, None, "load"),
+        ]
+        threads = [threading.Thread(target=self._run_stage, args=(flask_app, *stage), daemon=True) for stage in stages]
+        for thread in threads:
+            thread.start()
+        try:
+            for dataset_document in dataset_documents:
+                self.extract(dataset_document)
+        finally:
+            self._put(self._split_queue, _END, self.metrics["extract"])
+            for thread in threads:
+                thread.join()
+            self._log_metrics()
+
+        if self._paused_document_ids:
+            raise DocumentIsPausedError(f"Document paused, document id: {self._paused_document_ids[0]}")
+
+    def extract(self, dataset_document: DatasetDocument) -> None:
+        start_at = time.perf_counter()
+        try:
+            dataset = db.session.query(Dataset).filter_by(id=dataset_document.dataset_id).first()
+            if not dataset:
+                raise ValueError("no dataset found")
+            processing_rule = (
+                db.session.query(DatasetProcessRule)
+                .where(DatasetProcessRule.id == dataset_document.dataset_process_rule_id)
+                .first()
+            )
+            if not processing_rule:
+                raise ValueError("no process rule found")
+            index_processor = IndexProcessorFactory(dataset_document.doc_form).init_index_processor()
+            text_docs = self._runner.extract(index_processor, dataset_document, processing_rule.to_dict())
+            work = _ExtractedDocument(
+                dataset_id=dataset.id,
+                document_id=dataset_document.id,
+                text_docs=text_docs,
+                process_rule=processing_rule.to_dict(),
+            )
+        except DocumentIsPausedError:
+            self._paused_document_ids.append(dataset_document.id)
+            return
+        except ObjectDeletedError:
+            logger.warning("Document deleted, document id: %s", dataset_document.id)
+            return
+        except Exception as e:
+            self._fail_document(dataset_document.id, e)
+            return
+        self.metrics["extract"].record(len(text_docs), time.perf_counter() - start_at)
+        self._put(self._split_queue, work, self.metrics["extract"])
+
+    def _split_stage(self) -> None:
+        while (work := self._get(self._split_queue)) is not _END:
+            start_at = time.perf_counter()
+            segments: list[_Segment] = []
+            try:
+                segments = self._split(work)
+            except DocumentIsPausedError:
+                self._paused_document_ids.append(work.document_id)
+            except Exception as e:
+                self._fail_document(work.document_id, e)
+            finally:
+                db.session.close()
+            self.metrics["split"].record(len(segments), time.perf_counter() - start_at)
+            for segment in segments:
+                self._put(self._embed_queue, segment, self.metrics["split"])
+            self._mark_split_done(work.document_id)
+
+    def _split(self, work: _ExtractedDocument) -> list[_Segment]:
+        dataset = db.session.query(Dataset).filter_by(id=work.dataset_id).first()
+        dataset_document = db.session.query(DatasetDocument).filter_by(id=work.document_id).first()
+        if not dataset or not dataset_document:
+            raise ValueError("no dataset or document found")
+        index_processor = IndexProcessorFactory(dataset_document.doc_form).init_index_processor()
+        documents = self._runner.transform(
+            index_processor, dataset, work.text_docs, dataset_document.doc_language, work.process_rule
+        )
+        self._runner.load_segments(dataset, dataset_document, documents)
+
+        if dataset.indexing_technique != "high_quality":
+            # economy indexing only builds the keyword table, there is nothing to embed
+            self._runner.load(
+                index_processor=index_processor,
+                dataset=dataset,
+                dataset_document=dataset_document,
+                documents=documents,
+            )
+            return []
+
+        with self._progress_lock:
+            self._progress[work.document_id] = _DocumentProgress(started_at=time.perf_counter())
+
+        embedding_key = (dataset.tenant_id, dataset.embedding_model_provider, dataset.embedding_model)
+        is_parent_child = dataset_document.doc_form == IndexType.PARENT_CHILD_INDEX
+        segments = []
+        for document in documents:
+            if is_parent_child:
+                texts = [Document(**child.model_dump()) for child in document.children or []]
+            else:
+                texts = [document]
+            segments.append(
+                _Segment(
+                    dataset_id=dataset.id,
+                    document_id=work.document_id,
+                    embedding_key=embedding_key,
+                    segment=document,
+                    texts=texts,
+                )
+            )
+        with self._progress_lock:
+            self._progress[work.document_id].pending_segments = len(segments)
+        return segments
+
+    def _embed_stage(self) -> None:
+        pending: dict[tuple[str, str, str], list[_Segment]] = defaultdict(list)
+        while True:
+            try:
+                segment = self._get(self._embed_queue, timeout=self._batch_wait if pending else None)
+            except queue.Empty:
+                # upstream is idle, send what we have instead of waiting for a full batch
+                for key in list(pending):
+                    self._embed(key, pending.pop(key))
+                continue
+            if segment is _END:
+                break
+            if self._is_failed(segment.document_id):
+                continue
+            batch = pending[segment.embedding_key]
+            batch.append(segment)
+            if sum(len(s.texts) for s in batch) >= self._get_max_chunks(segment.embedding_key):
+                self._embed(segment.embedding_key, pending.pop(segment.embedding_key))
+        for key in list(pending):
+            self._embed(key, pending.pop(key))
+
+    def _embed(self, key: tuple[str, str, str], segments: list[_Segment]) -> None:
+        start_at = time.perf_counter()
+        for document_id in {segment.document_id for segment in segments}:
+            try:
+                self._runner.check_document_paused_status(document_id)
+            except DocumentIsPausedError:
+                self._paused_document_ids.append(document_id)
+                self._set_failed(document_id)
+            except Exception as e:
+                self._fail_document(document_id, e)
+        active = [segment for segment in segments if not self._is_failed(segment.document_id)]
+        if not active:
+            return
+        try:
+            model_instance, embedding = self._get_embedding(key)
+            token_counts = model_instance.get_text_embedding_num_tokens(
+                [segment.segment.page_content for segment in active]
+            )
+            embeddings = embedding.embed_documents([text.page_content for segment in active for text in segment.texts])
+        except Exception as e:
+            for document_id in {segment.document_id for segment in active}:
+                self._fail_document(document_id, e)
+            return
+        finally:
+            db.session.close()
+        with self._progress_lock:
+            for segment, count in zip(active, token_counts):
+                self._progress[segment.document_id].tokens += count
+        self.metrics["embed"].record(len(embeddings), time.perf_counter() - start_at)
+        self._put(self._load_queue, _EmbeddedBatch(segments=active, embeddings=embeddings), self.metrics["embed"])
+
+    def _load_stage(self) -> None:
+        while (batch := self._get(self._load_queue)) is not _END:
+            start_at = time.perf_counter()
+            offset = 0
+            by_dataset: dict[str, tuple[list[_Segment], list[Document], list[list[float]]]] = {}
+            for segment in batch.segments:
+                segment_embeddings = batch.embeddings[offset : offset + len(segment.texts)]
+                offset += len(segment.texts)
+                if self._is_failed(segment.document_id):
+                    continue
+                segments, texts, embeddings = by_dataset.setdefault(segment.dataset_id, ([], [], []))
+                segments.append(segment)
+                texts.extend(segment.texts)
+                embeddings.extend(segment_embeddings)
+            for dataset_id, (segments, texts, embeddings) in by_dataset.items():
+                try:
+                    self._get_vector(dataset_id).create_with_embeddings(texts, embeddings)
+                    self._complete_segments(segments)
+                except Exception as e:
+                    db.session.rollback()
+                    for document_id in {segment.document_id for segment in segments}:
+                        self._fail_document(document_id, e)
+                finally:
+                    db.session.close()
+            self.metrics["load"].record(len(batch.embeddings), time.perf_counter() - start_at)
+
+    def _complete_segments(self, segments: list[_Segment]) -> None:
+        node_ids_by_document: dict[str, list[str]] = defaultdict(list)
+        for segment in segments:
+            if segment.segment.metadata:
+                node_ids_by_document[segment.document_id].append(segment.segment.metadata["doc_id"])
+        now = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+        for document_id, node_ids in node_ids_by_document.items():
+            db.session.query(DocumentSegment).where(
+                DocumentSegment.document_id == document_id,
+                DocumentSegment.index_node_id.in_(node_ids),
+                DocumentSegment.status == "indexing",
+            ).update(
+                {
+                    DocumentSegment.status: "completed",
+                    DocumentSegment.enabled: True,
+                    DocumentSegment.completed_at: now,
+                }
+            )
+        db.session.commit()
+
+        for segment in segments:
+            with self._progress_lock:
+                progress = self._progress[segment.document_id]
+                progress.pending_segments -= 1
+            self._finish_if_done(segment.document_id)
+
+    def _mark_split_done(self, document_id: str) -> None:
+        with self._progress_lock:
+            progress = self._progress.get(document_id)
+            if not progress:
+                return
+            progress.split_done = True
+        self._finish_if_done(document_id)
+
+    def _finish_if_done(self, document_id: str) -> None:
+        with self._progress_lock:
+            progress = self._progress[document_id]
+            if progress.completed or progress.failed or not progress.split_done or progress.pending_segments > 0:
+                return
+            progress.completed = True
+        try:
+            self._runner.update_document_index_status(
+                document_id=document_id,
+                after_indexing_status="completed",
+                extra_update_params={
+                    DatasetDocument.tokens: progress.tokens,
+                    DatasetDocument.completed_at: datetime.datetime.now(datetime.UTC).replace(tzinfo=None),
+                    DatasetDocument.indexing_latency: time.perf_counter() - progress.started_at,
+                    DatasetDocument.error: None,
+                },
+            )
+        except DocumentIsPausedError:
+            self._paused_document_ids.append(document_id)
+        except Exception as e:
+            self._fail_document(document_id, e)
+
+    def _fail_document(self, document_id: str, error: Exception) -> None:
+        self._set_failed(document_id)
+        if isinstance(error, ProviderTokenNotInitError):
+            message = str(error.description)
+        else:
+            logger.exception("consume document failed")
+            message = str(error)
+        try:
+            db.session.rollback()
+            db.session.query(DatasetDocument).filter_by(id=document_id).update(
+                {
+                    DatasetDocument.indexing_status: "error",
+                    DatasetDocument.error: message,
+                    DatasetDocument.stopped_at: datetime.datetime.now(datetime.UTC).replace(tzinfo=None),
+                }
+            )
+            db.session.commit()
+        except Exception:
+            logger.exception("Failed to update indexing status of document %s", document_id)
+
+    def _set_failed(self, document_id: str) -> None:
+        with self._progress_lock:
+            progress = self._progress.setdefault(document_id, _DocumentProgress(started_at=time.perf_counter()))
+            progress.failed = True
+
+    def _is_failed(self, document_id: str) -> bool:
+        with self._progress_lock:
+            progress = self._progress.get(document_id)
+            return progress is not None and progress.failed
+
+    def _get_embedding(self, key: tuple[str, str, str]) -> tuple[ModelInstance, CacheEmbedding]:
+        if key not in self._embeddings:
+            tenant_id, provider, model = key
+            model_instance = self._runner.model_manager.get_model_instance(
+                tenant_id=tenant_id,
+                provider=provider,
+                model_type=ModelType.TEXT_EMBEDDING,
+                model=model,
+            )
+            self._embeddings[key] = (model_instance, CacheEmbedding(model_instance))
+        return self._embeddings[key]
+
+    def _get_max_chunks(self, key: tuple[str, str, str]) -> int:
+        if key not in self._max_chunks:
+            try:
+                self._max_chunks[key] = self._get_embedding(key)[1].get_max_chunks()
+            except Exception:
+                # the embedding itself will fail and report the error on the affected documents
+                logger.exception("Failed to resolve max chunks of embedding model %s", key)
+                self._max_chunks[key] = 1
+        return self._max_chunks[key]
+
+    def _get_vector(self, dataset_id: str) -> Vector:
+        if dataset_id not in self._vectors:
+            dataset = db.session.query(Dataset).filter_by(id=dataset_id).first()
+            if not dataset:
+                raise ValueError("no dataset found")
+            self._vectors[dataset_id] = Vector(dataset)
+        return self._vectors[dataset_id]
+
+    def _get(self, source: queue.Queue, timeout: Optional[float] = None) -> Any:
+        item = source.get(timeout=timeout)
+        if item is _END:
+            self._ended_queues.add(source)
+        return item
+
+    @staticmethod
+    def _put(target: queue.Queue, item: Any, metrics: StageMetrics) -> None:
+        start_at = time.perf_counter()
+        target.put(item)
+        metrics.blocked_seconds += time.perf_counter() - start_at
+
+    def _run_stage(
+        self, flask_app: Flask, stage: Callable[[], None], source: queue.Queue, target: Optional[queue.Queue], name: str
+    ) -> None:
+        """
+        Run a stage until its source queue ends, then end its target queue.
+
+        A stage that raises fails the documents still in flight and keeps consuming its source queue, so that
+        neither the upstream stages block on a full queue nor the downstream ones wait for an end that never comes.
+        """
+        with flask_app.app_context():
+            try:
+                stage()
+            except Exception as e:
+                logger.exception("indexing pipeline stage %s failed", name)
+                self.errors.append(e)
+                self._fail_unfinished_documents(self._in_flight_document_ids(), e)
+                while source not in self._ended_queues:
+                    item = self._get(source)
+                    if item is not _END:
+                        self._fail_unfinished_documents(self._item_document_ids(item), e)
+            finally:
+                db.session.remove()
+                if target is not None:
+                    self._put(target, _END, self.metrics[name])
+
+    def _in_flight_document_ids(self) -> list[str]:
+        with self._progress_lock:
+            return [
+                document_id
+                for document_id, progress in self._progress.items()
+                if not progress.completed and not progress.failed
+            ]
+
+    @staticmethod
+    def _item_document_ids(item: Any) -> set[str]:
+        if isinstance(item, _EmbeddedBatch):
+            return {segment.document_id for segment in item.segments}
+        return {item.document_id}
+
+    def _fail_unfinished_documents(self, document_ids: Iterable[str], error: Exception) -> None:
+        for document_id in document_ids:
+            with self._progress_lock:
+                progress = self._progress.get(document_id)
+                if progress and (progress.completed or progress.failed):
+                    continue
+            self._fail_document(document_id, error)
+
+    def _log_metrics(self) -> None:
+        for metrics in self.metrics.values():
+            logger.info(
+                "indexing pipeline stage %s: %s items in %s batches, %.1f items/s, %.2fs busy, %.2fs blocked",
+                metrics.name,
+                metrics.items,
+                metrics.batches,
+                metrics.items_per_second,
+                metrics.busy_seconds,
+                metrics.blocked_seconds,
+            )
@@ -48,6 +48,12 @@ class IndexingRunner:
 
     def run(self, dataset_documents: list[DatasetDocument]):
         """Run the indexing process."""
+        if dify_config.INDEXING_PIPELINE_ENABLED:
+            from core.indexing_pipeline import IndexingPipeline
+
+            IndexingPipeline(self).run(dataset_documents)
+            return
+
         for dataset_document in dataset_documents:
             try:
                 # get dataset
@@ -67,17 +73,17 @@ class IndexingRunner:
                 index_type = dataset_document.doc_form
                 index_processor = IndexProcessorFactory(index_type).init_index_processor()
                 # extract
-                text_docs = self._extract(index_processor, dataset_document, processing_rule.to_dict())
+                text_docs = self.extract(index_processor, dataset_document, processing_rule.to_dict())
 
                 # transform
-                documents = self._transform(
+                documents = self.transform(
                     index_processor, dataset, text_docs, dataset_document.doc_language, processing_rule.to_dict()
                 )
                 # save segment
-                self._load_segments(dataset, dataset_document, documents)
+                self.load_segments(dataset, dataset_document, documents)
 
                 # load
-                self._load(
+                self.load(
                     index_processor=index_processor,
                     dataset=dataset,
                     dataset_document=dataset_document,
@@ -133,17 +139,17 @@ class IndexingRunner:
             index_type = dataset_document.doc_form
             index_processor = IndexProcessorFactory(index_type).init_index_processor()
             # extract
-            text_docs = self._extract(index_processor, dataset_document, processing_rule.to_dict())
+            text_docs = self.extract(index_processor, dataset_document, processing_rule.to_dict())
 
             # transform
-            documents = self._transform(
+            documents = self.transform(
                 index_processor, dataset, text_docs, dataset_document.doc_language, processing_rule.to_dict()
             )
             # save segment
-            self._load_segments(dataset, dataset_document, documents)
+            self.load_segments(dataset, dataset_document, documents)
 
             # load
-            self._load(
+            self.load(
                 index_processor=index_processor, dataset=dataset, dataset_document=dataset_document, documents=documents
             )
         except DocumentIsPausedError:
@@ -218,7 +224,7 @@ class IndexingRunner:
 
             index_type = dataset_document.doc_form
             index_processor = IndexProcessorFactory(index_type).init_index_processor()
-            self._load(
+            self.load(
                 index_processor=index_processor, dataset=dataset, dataset_document=dataset_document, documents=documents
             )
         except DocumentIsPausedError:
@@ -333,7 +339,7 @@ class IndexingRunner:
             return IndexingEstimate(total_segments=total_segments * 20, qa_preview=preview_texts, preview=[])
         return IndexingEstimate(total_segments=total_segments, preview=preview_texts)  # type: ignore
 
-    def _extract(
+    def extract(
         self, index_processor: BaseIndexProcessor, dataset_document: DatasetDocument, process_rule: dict
     ) -> list[Document]:
         # load file
@@ -396,7 +402,7 @@ class IndexingRunner:
             )
             text_docs = index_processor.extract(extract_setting, process_rule_mode=process_rule["mode"])
         # update document status to splitting
-        self._update_document_index_status(
+        self.update_document_index_status(
             document_id=dataset_document.id,
             after_indexing_status="splitting",
             extra_update_params={
@@ -513,7 +519,7 @@ class IndexingRunner:
 
         return [QAPreviewDetail(question=q, answer=re.sub(r"\n\s*", "\n", a.strip())) for q, a in matches if q and a]
 
-    def _load(
+    def load(
         self,
         index_processor: BaseIndexProcessor,
         dataset: Dataset,
@@ -579,7 +585,7 @@ class IndexingRunner:
         indexing_end_at = time.perf_counter()
 
         # update document status to completed
-        self._update_document_index_status(
+        self.update_document_index_status(
             document_id=dataset_document.id,
             after_indexing_status="completed",
             extra_update_params={
@@ -620,7 +626,7 @@ class IndexingRunner:
     ):
         with flask_app.app_context():
             # check document is paused
-            self._check_document_paused_status(dataset_document.id)
+            self.check_document_paused_status(dataset_document.id)
 
             tokens = 0
             if embedding_model_instance:
@@ -649,14 +655,14 @@ class IndexingRunner:
             return tokens
 
     @staticmethod
-    def _check_document_paused_status(document_id: str):
+    def check_document_paused_status(document_id: str):
         indexing_cache_key = f"document_{document_id}_is_paused"
         result = redis_client.get(indexing_cache_key)
         if result:
             raise DocumentIsPausedError()
 
     @staticmethod
-    def _update_document_index_status(
+    def update_document_index_status(
         document_id: str, after_indexing_status: str, extra_update_params: Optional[dict] = None
     ) -> None:
         """
@@ -684,7 +690,7 @@ class IndexingRunner:
         db.session.query(DocumentSegment).filter_by(document_id=dataset_document_id).update(update_params)
         db.session.commit()
 
-    def _transform(
+    def transform(
         self,
         index_processor: BaseIndexProcessor,
         dataset: Dataset,
@@ -718,7 +724,7 @@ class IndexingRunner:
 
         return documents
 
-    def _load_segments(self, dataset, dataset_document, documents):
+    def load_segments(self, dataset, dataset_document, documents):
         # save node to document segment
         doc_store = DatasetDocumentStore(
             dataset=dataset, user_id=dataset_document.created_by, document_id=dataset_document.id
@@ -729,7 +735,7 @@ class IndexingRunner:
 
         # update document status to indexing
         cur_time = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
-        self._update_document_index_status(
+        self.update_document_index_status(
             document_id=dataset_document.id,
             after_indexing_status="indexing",
             extra_update_params={
@@ -23,12 +23,15 @@ class MCPClient:
         authed: bool = True,
         authorization_code: Optional[str] = None,
         for_list: bool = False,
+        connection_method: Optional[str] = None,
     ):
         # Initialize info
         self.provider_id = provider_id
         self.tenant_id = tenant_id
         self.client_type = "streamable"
         self.server_url = server_url
+        # the transport to connect with, "mcp" or "sse", it is probed when not known and set once connected
+        self.connection_method = connection_method
 
         # Authentication info
         self.authed = authed
@@ -70,6 +73,8 @@ class MCPClient:
         parsed_url = urlparse(self.server_url)
         path = parsed_url.path or ""
         method_name = path.rstrip("/").split("/")[-1] if path else ""
+        if method_name not in connection_methods and self.connection_method in connection_methods:
+            method_name = self.connection_method
         if method_name in connection_methods:
             client_factory = connection_methods[method_name]
             self.connect_server(client_factory, method_name)
@@ -107,6 +112,7 @@ class MCPClient:
             self._session = self.exit_stack.enter_context(self._session_context)
             session = cast(ClientSession, self._session)
             session.initialize()
+            self.connection_method = method_name
             return
 
         except MCPAuthError:
@@ -138,6 +144,12 @@ class MCPClient:
             raise ValueError("Session not initialized.")
         return self._session.call_tool(tool_name, tool_args)
 
+    def ping(self):
+        """Check that the server still answers on this session"""
+        if not self._initialized or not self._session:
+            raise ValueError("Session not initialized.")
+        self._session.send_ping()
+
     def cleanup(self):
         """Clean up resources"""
         try:
@@ -1,5 +1,6 @@
 import logging
 import queue
+import threading
 from collections.abc import Callable
 from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
 from contextlib import ExitStack
@@ -166,6 +167,8 @@ class BaseSession(
         self._write_stream = write_stream
         self._response_streams = {}
         self._request_id = 0
+        # requests may be sent from several threads sharing the session
+        self._request_id_lock = threading.Lock()
         self._receive_request_type = receive_request_type
         self._receive_notification_type = receive_notification_type
         self._session_read_timeout_seconds = read_timeout_seconds
@@ -223,11 +226,11 @@ class BaseSession(
         """
         self.check_receiver_status()
 
-        request_id = self._request_id
-        self._request_id = request_id + 1
-
         response_queue: queue.Queue[JSONRPCResponse | JSONRPCError] = queue.Queue()
-        self._response_streams[request_id] = response_queue
+        with self._request_id_lock:
+            request_id = self._request_id
+            self._request_id = request_id + 1
+            self._response_streams[request_id] = response_queue
 
         try:
             jsonrpc_request = JSONRPCRequest(
@@ -0,0 +1,242 @@
+import atexit
+import hashlib
+import logging
+import threading
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional
+
+from celery.signals import worker_process_shutdown, worker_shutdown  # type: ignore
+
+from configs import dify_config
+from core.mcp.error import MCPConnectionError
+from core.mcp.mcp_client import MCPClient
+
+logger = logging.getLogger(__name__)
+
+# tenant id, provider id, server url, fingerprint of the credentials
+PoolKey = tuple[str, str, str, str]
+
+
+@dataclass
+class _PooledSession:
+    key: PoolKey
+    client: MCPClient
+    # requests that may be in flight at once, the streamable HTTP transport sends its requests one after another
+    max_in_flight: int
+    in_flight: int = 0
+    last_used_at: float = field(default_factory=time.monotonic)
+    broken: bool = False
+
+
+class MCPSessionPool:
+    """
+    Per-process pool of initialized MCP client sessions.
+
+    Connecting to an MCP server opens the transport, performs the `initialize` handshake and, when the URL does not
+    name the transport, probes SSE before streamable HTTP. The pool keeps the sessions open between tool calls, keyed
+    by tenant, provider, server URL and credentials, and remembers which transport each server answered on.
+
+    A session unused for `health_check_interval` seconds is pinged before it is reused, one unused for
+    `idle_timeout` seconds is closed, and a session that failed a request is never reused. Sessions over the SSE
+    transport correlate responses by request id, so up to `max_concurrent_requests` calls share one of them.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        idle_timeout: float,
+        health_check_interval: float,
+        max_concurrent_requests: int,
+    ) -> None:
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._health_check_interval = health_check_interval
+        self._max_concurrent_requests = max_concurrent_requests
+        self._lock = threading.Lock()
+        # sessions of each key, the most recently used last
+        self._sessions: dict[PoolKey, list[_PooledSession]] = {}
+        self._connection_methods: dict[str, str] = {}
+
+    @contextmanager
+    def session(self, server_url: str, provider_id: str, tenant_id: str) -> Generator[MCPClient, None, None]:
+        """Lend an initialized client, which must not be used once the context exits."""
+        client = self._create_client(server_url, provider_id, tenant_id)
+        if not dify_config.MCP_SESSION_POOL_ENABLED:
+            with client:
+                yield client
+            return
+
+        key = (tenant_id, provider_id, server_url, self._fingerprint(client))
+        pooled = self._acquire(key) or self._connect(key, client)
+        try:
+            yield pooled.client
+        except BaseException:
+            pooled.broken = True
+            raise
+        finally:
+            self._release(pooled)
+
+    def close_all(self) -> None:
+        with self._lock:
+            sessions = [pooled for pooled_sessions in self._sessions.values() for pooled in pooled_sessions]
+            self._sessions.clear()
+        for pooled in sessions:
+            self._close(pooled.client)
+
+    def _create_client(self, server_url: str, provider_id: str, tenant_id: str) -> MCPClient:
+        return MCPClient(
+            server_url,
+            provider_id,
+            tenant_id,
+            authed=True,
+            connection_method=self._connection_methods.get(server_url),
+        )
+
+    @staticmethod
+    def _fingerprint(client: MCPClient) -> str:
+        token = getattr(client, "token", None)
+        if token is None:
+            return ""
+        return hashlib.sha256(f"{token.token_type}:{token.access_token}".encode()).hexdigest()
+
+    def _acquire(self, key: PoolKey) -> Optional[_PooledSession]:
+        while True:
+            with self._lock:
+                to_close = self._evict_idle(time.monotonic())
+                check = False
+                pooled = next(
+                    (
+                        pooled
+                        for pooled in reversed(self._sessions.get(key, []))
+                        if pooled.in_flight < pooled.max_in_flight
+                    ),
+                    None,
+                )
+                if pooled is not None:
+                    pooled.in_flight += 1
+                    check = (
+                        pooled.in_flight == 1 and time.monotonic() - pooled.last_used_at >= self._health_check_interval
+                    )
+
+            for client in to_close:
+                self._close(client)
+            if pooled is None:
+                return None
+            if not check:
+                return pooled
+            try:
+                pooled.client.ping()
+                return pooled
+            except Exception:
+                logger.info("Pooled MCP session of %s failed its health check, closing it", key[2], exc_info=True)
+                pooled.broken = True
+                self._release(pooled)
+
+    def _connect(self, key: PoolKey, client: MCPClient) -> _PooledSession:
+        try:
+            self._enter(client)
+        except MCPConnectionError:
+            if client.connection_method is None:
+                raise
+            # the server no longer answers on the transport it used to, probe again
+            with self._lock:
+                self._connection_methods.pop(client.server_url, None)
+            client = self._create_client(client.server_url, client.provider_id, client.tenant_id)
+            self._enter(client)
+
+        method = client.connection_method or "mcp"
+        pooled = _PooledSession(
+            key=key,
+            client=client,
+            max_in_flight=self._max_concurrent_requests if method == "sse" else 1,
+            in_flight=1,
+        )
+        with self._lock:
+            self._connection_methods[client.server_url] = method
+            self._sessions.setdefault(key, []).append(pooled)
+        return pooled
+
+    def _release(self, pooled: _PooledSession) -> None:
+        with self._lock:
+            now = time.monotonic()
+            pooled.in_flight -= 1
+            pooled.last_used_at = now
+            sessions = self._sessions.get(pooled.key, [])
+            if pooled in sessions:
+                sessions.remove(pooled)
+                if not pooled.broken:
+                    sessions.append(pooled)
+            to_close = self._evict_idle(now)
+            if pooled.broken and pooled.in_flight == 0:
+                to_close.append(pooled.client)
+
+        for client in to_close:
+            self._close(client)
+
+    def _evict_idle(self, now: float) -> list[MCPClient]:
+        """Remove the sessions unused for too long or over the size of the pool, the caller closes them."""
+        evicted = []
+        for key, sessions in list(self._sessions.items()):
+            idle = [session for session in sessions if session.in_flight == 0]
+            excess = len(idle) - self._max_size
+            for session in idle:
+                if excess > 0 or now - session.last_used_at >= self._idle_timeout:
+                    sessions.remove(session)
+                    evicted.append(session.client)
+                excess -= 1
+            if not sessions:
+                del self._sessions[key]
+        return evicted
+
+    @classmethod
+    def _enter(cls, client: MCPClient) -> None:
+        try:
+            client.__enter__()
+        except Exception:
+            # release what was opened before the connection failed
+            cls._close(client)
+            raise
+
+    @staticmethod
+    def _close(client: MCPClient) -> None:
+        try:
+            client.cleanup()
+        except Exception:
+            logger.warning("Failed to close MCP session of %s", client.server_url, exc_info=True)
+
+
+_pool: Optional[MCPSessionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_mcp_session_pool() -> MCPSessionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = MCPSessionPool(
+                max_size=dify_config.MCP_SESSION_POOL_MAX_SIZE,
+                idle_timeout=dify_config.MCP_SESSION_IDLE_TIMEOUT,
+                health_check_interval=dify_config.MCP_SESSION_HEALTH_CHECK_INTERVAL,
+                max_concurrent_requests=dify_config.MCP_SESSION_MAX_CONCURRENT_REQUESTS,
+            )
+            atexit.register(close_mcp_session_pool)
+        return _pool
+
+
+@worker_shutdown.connect(weak=False)
+@worker_process_shutdown.connect(weak=False)
+def close_mcp_session_pool(*args, **kwargs) -> None:
+    """
+    Close the pooled sessions of the process.
+
+    The transports run on thread pools that the interpreter joins before the atexit callbacks run, and their reader
+    threads only return once the session is closed. Celery workers therefore close the pool on their shutdown
+    signals and gunicorn workers in their `worker_exit` hook, before the interpreter finalizes.
+    """
+    with _pool_lock:
+        pool = _pool
+    if pool is not None:
+        pool.close_all()
@@ -34,6 +34,10 @@ class Moderation(Extensible, ABC):
 
     module: ExtensionModule = ExtensionModule.MODERATION
 
+    # Whether output moderation may only send the text generated since the previous check, with some already
+    # moderated text before it as context, instead of the whole output so far.
+    supports_incremental_output: bool = False
+
     def __init__(self, app_id: str, tenant_id: str, config: Optional[dict] = None) -> None:
         super().__init__(tenant_id, config)
         self.app_id = app_id
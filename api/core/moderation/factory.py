@@ -10,6 +10,10 @@ class ModerationFactory:
         extension_class = code_based_extension.extension_class(ExtensionModule.MODERATION, name)
         self.__extension_instance = extension_class(app_id, tenant_id, config)
 
+    @property
+    def supports_incremental_output(self) -> bool:
+        return self.__extension_instance.supports_incremental_output
+
     @classmethod
     def validate_config(cls, name: str, tenant_id: str, config: dict) -> None:
         """
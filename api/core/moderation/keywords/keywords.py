@@ -1,12 +1,17 @@
-from collections.abc import Sequence
-from typing import Any
+from typing import Optional
 
 from core.moderation.base import Moderation, ModerationAction, ModerationInputsResult, ModerationOutputsResult
+from core.moderation.keywords.matcher import KeywordMatcher, KeywordStream, get_keyword_matcher
 
 
 class KeywordsModeration(Moderation):
     name: str = "keywords"
 
+    # output moderation is called again with the whole grown buffer while the LLM streams, the automaton state is
+    # kept between calls so only the text appended since the last call is scanned and no overlap is needed
+    _output_stream: Optional[KeywordStream] = None
+    _output_scanned: str = ""
+
     @classmethod
     def validate_config(cls, tenant_id: str, config: dict) -> None:
         """
@@ -40,10 +45,7 @@ class KeywordsModeration(Moderation):
             if query:
                 inputs["query__"] = query
 
-            # Filter out empty values
-            keywords_list = [keyword for keyword in self.config["keywords"].split("\n") if keyword]
-
-            flagged = self._is_violated(inputs, keywords_list)
+            flagged = self._is_violated(inputs, self._get_matcher())
 
         return ModerationInputsResult(
             flagged=flagged, action=ModerationAction.DIRECT_OUTPUT, preset_response=preset_response
@@ -56,18 +58,27 @@ class KeywordsModeration(Moderation):
             raise ValueError("The config is not set.")
 
         if self.config["outputs_config"]["enabled"]:
-            # Filter out empty values
-            keywords_list = [keyword for keyword in self.config["keywords"].split("\n") if keyword]
-
-            flagged = self._is_violated({"text": text}, keywords_list)
+            flagged = self._is_violated_incrementally(text)
             preset_response = self.config["outputs_config"]["preset_response"]
 
         return ModerationOutputsResult(
             flagged=flagged, action=ModerationAction.DIRECT_OUTPUT, preset_response=preset_response
         )
 
-    def _is_violated(self, inputs: dict, keywords_list: list) -> bool:
-        return any(self._check_keywords_in_value(keywords_list, value) for value in inputs.values())
+    def _get_matcher(self) -> KeywordMatcher:
+        if self.config is None:
+            raise ValueError("The config is not set.")
+
+        return get_keyword_matcher(self.config["keywords"].split("\n"))
+
+    def _is_violated(self, inputs: dict, matcher: KeywordMatcher) -> bool:
+        return any(matcher.search(str(value)) for value in inputs.values())
+
+    def _is_violated_incrementally(self, text: str) -> bool:
+        if self._output_stream is None or not text.startswith(self._output_scanned):
+            self._output_stream = self._get_matcher().stream()
+            self._output_scanned = ""
 
-    def _check_keywords_in_value(self, keywords_list: Sequence[str], value: Any) -> bool:
-        return any(keyword.lower() in str(value).lower() for keyword in keywords_list)
+        flagged = self._output_stream.feed(text[len(self._output_scanned) :])
+        self._output_scanned = text
+        return flagged
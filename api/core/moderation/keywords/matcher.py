@@ -0,0 +1,132 @@
+import hashlib
+import threading
+from collections import deque
+from collections.abc import Iterable
+
+from cachetools import LRUCache
+
+
+class KeywordMatcher:
+    """
+    Case-insensitive Aho-Corasick automaton over a set of keywords.
+
+    A text is scanned once whatever the number of keywords. The goto trie is turned into a DFA lazily, a transition
+    that falls back through the failure links is resolved on first use and memoized on the state, so the memory stays
+    bounded by the characters the scanned texts actually contain.
+    """
+
+    def __init__(self, keywords: Iterable[str]) -> None:
+        goto: list[dict[str, int]] = [{}]
+        self._matched: list[bool] = [False]
+        for keyword in keywords:
+            if keyword:
+                self._add(goto, keyword.lower())
+        self._fail = self._link(goto)
+        self._transitions = goto
+
+    def search(self, text: str) -> bool:
+        """Return whether any keyword occurs in `text`."""
+        return self.advance(0, text.lower()) < 0
+
+    def stream(self) -> "KeywordStream":
+        """Start an incremental scan over a text that arrives in chunks."""
+        return KeywordStream(self)
+
+    def advance(self, state: int, text: str) -> int:
+        """
+        Feed lowercased `text` to the automaton from `state`.
+
+        :return: the state after the text, or -1 as soon as a keyword is matched
+        """
+        transitions = self._transitions
+        matched = self._matched
+        for char in text:
+            next_state = transitions[state].get(char)
+            if next_state is None:
+                next_state = self._resolve(state, char)
+            state = next_state
+            if matched[state]:
+                return -1
+        return state
+
+    def _add(self, goto: list[dict[str, int]], keyword: str) -> None:
+        state = 0
+        for char in keyword:
+            next_state = goto[state].get(char)
+            if next_state is None:
+                next_state = len(goto)
+                goto[state][char] = next_state
+                goto.append({})
+                self._matched.append(False)
+            state = next_state
+        self._matched[state] = True
+
+    def _link(self, goto: list[dict[str, int]]) -> list[int]:
+        fail = [0] * len(goto)
+        # breadth first, so the failure state of a node is always linked before the node itself
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in goto[state].items():
+                if state:
+                    fallback = fail[state]
+                    while fallback and char not in goto[fallback]:
+                        fallback = fail[fallback]
+                    fail[child] = goto[fallback].get(char, 0)
+                self._matched[child] = self._matched[child] or self._matched[fail[child]]
+                queue.append(child)
+        return fail
+
+    def _resolve(self, state: int, char: str) -> int:
+        fallback = state
+        next_state = None
+        while next_state is None and fallback:
+            fallback = self._fail[fallback]
+            next_state = self._transitions[fallback].get(char)
+        if next_state is None:
+            next_state = 0
+        if state:
+            # memoizing is idempotent, concurrent scans of a shared matcher may race on it safely
+            self._transitions[state][char] = next_state
+        return next_state
+
+
+class KeywordStream:
+    """
+    Incremental scan of a growing text, e.g. a streamed LLM output.
+
+    The automaton state is kept between chunks, so keywords split across chunks are matched and every character is
+    only scanned once.
+    """
+
+    def __init__(self, matcher: KeywordMatcher) -> None:
+        self._matcher = matcher
+        self._state = 0
+
+    @property
+    def matched(self) -> bool:
+        return self._state < 0
+
+    def feed(self, chunk: str) -> bool:
+        """Scan the next chunk, return whether a keyword has been matched so far."""
+        if self._state >= 0 and chunk:
+            self._state = self._matcher.advance(self._state, chunk.lower())
+        return self._state < 0
+
+
+_matchers: LRUCache[str, KeywordMatcher] = LRUCache(maxsize=256)
+_matchers_lock = threading.Lock()
+
+
+def get_keyword_matcher(keywords: Iterable[str]) -> KeywordMatcher:
+    """Return the compiled matcher of a keyword set, built once per distinct set and shared."""
+    normalized = sorted({keyword.lower() for keyword in keywords if keyword})
+    key = hashlib.sha256("\n".join(normalized).encode()).hexdigest()
+    with _matchers_lock:
+        matcher = _matchers.get(key)
+    if matcher is None:
+        # built outside of the lock, a concurrent build of the same keywords just loses the race
+        built = KeywordMatcher(normalized)
+        with _matchers_lock:
+            matcher = _matchers.setdefault(key, built)
+    return matcher
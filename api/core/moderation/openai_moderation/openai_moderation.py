@@ -5,6 +5,7 @@ from core.moderation.base import Moderation, ModerationAction, ModerationInputsR
 
 class OpenAIModeration(Moderation):
     name: str = "openai_moderation"
+    supports_incremental_output: bool = True
 
     @classmethod
     def validate_config(cls, tenant_id: str, config: dict) -> None:
@@ -1,10 +1,10 @@
 import logging
 import threading
-import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Optional
 
 from flask import Flask, current_app
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, PrivateAttr
 
 from configs import dify_config
 from core.app.apps.base_app_queue_manager import AppQueueManager, PublishFrom
@@ -14,6 +14,20 @@ from core.moderation.factory import ModerationFactory
 
 logger = logging.getLogger(__name__)
 
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """The pool running the streaming checks of all responses of the process."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=dify_config.MODERATION_WORKER_POOL_SIZE, thread_name_prefix="output_moderation"
+            )
+        return _executor
+
 
 class ModerationRule(BaseModel):
     type: str
@@ -21,19 +35,36 @@ class ModerationRule(BaseModel):
 
 
 class OutputModeration(BaseModel):
+    """
+    Moderation of a streamed LLM output.
+
+    Appending tokens schedules a check on a shared pool once `MODERATION_BUFFER_SIZE` characters have been generated
+    since the previous check, at most one check of a response runs at a time. Providers that support incremental
+    checks only receive the text generated since the previous check, preceded by `MODERATION_WINDOW_OVERLAP`
+    characters of context, the others receive the whole output so far.
+    """
+
     tenant_id: str
     app_id: str
 
     rule: ModerationRule
     queue_manager: AppQueueManager
 
-    thread: Optional[threading.Thread] = None
-    thread_running: bool = True
+    running: bool = True
     buffer: str = ""
-    is_final_chunk: bool = False
     final_output: Optional[str] = None
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
+    # one moderation instance serves the whole stream so that it may keep incremental state between buffers,
+    # the streaming checks and the final completion check must not use it at the same time
+    _moderation_factory: Optional[ModerationFactory] = PrivateAttr(default=None)
+    _moderation_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    # guards the buffer and the check state below, notified whenever a scheduled check ends
+    _condition: threading.Condition = PrivateAttr(default_factory=threading.Condition)
+    _checking: bool = PrivateAttr(default=False)
+    _checked_length: int = PrivateAttr(default=0)
+    _flask_app: Optional[Flask] = PrivateAttr(default=None)
+
     def should_direct_output(self) -> bool:
         return self.final_output is not None
 
@@ -41,16 +72,45 @@ class OutputModeration(BaseModel):
         return self.final_output or ""
 
     def append_new_token(self, token: str) -> None:
-        self.buffer += token
+        with self._condition:
+            self.buffer += token
+            if self._checking or not self.running:
+                return
+            if len(self.buffer) - self._checked_length < dify_config.MODERATION_BUFFER_SIZE:
+                return
 
-        if not self.thread:
-            self.thread = self.start_thread()
+            if self._flask_app is None:
+                self._flask_app = current_app._get_current_object()  # type: ignore
+            self._checking = True
 
-    def moderation_completion(self, completion: str, public_event: bool = False) -> tuple[str, bool]:
-        self.buffer = completion
-        self.is_final_chunk = True
+        try:
+            _get_executor().submit(self._run_checks, self._flask_app)
+        except RuntimeError:
+            # the pool is shut down when the process exits
+            logger.warning("Output moderation pool is unavailable, app_id: %s", self.app_id)
+            self._end_checks()
 
-        result = self.moderation(tenant_id=self.tenant_id, app_id=self.app_id, moderation_buffer=completion)
+    def moderation_completion(self, completion: str, public_event: bool = False) -> tuple[str, bool]:
+        with self._condition:
+            # the final check reuses the moderation state, let the running streaming check finish first
+            check_ended = self._condition.wait_for(
+                lambda: not self._checking, timeout=dify_config.MODERATION_CHECK_TIMEOUT
+            )
+            previous_buffer = self.buffer
+            checked_length = self._checked_length
+            self.buffer = completion
+            if not check_ended:
+                # the late check must not publish a replacement after the final one
+                self.running = False
+
+        if not check_ended:
+            # the streaming check still holds the moderation state, moderate the whole output without it
+            logger.warning("Output moderation check timed out, moderating the whole output, app_id: %s", self.app_id)
+            result = self._moderate_detached(completion)
+        else:
+            if completion[:checked_length] != previous_buffer[:checked_length]:
+                checked_length = 0
+            result = self._moderate_window(completion, checked_length)
 
         if not result or not result.flagged:
             return completion, False
@@ -70,70 +130,102 @@ class OutputModeration(BaseModel):
 
         return final_output, True
 
-    def start_thread(self) -> threading.Thread:
-        buffer_size = dify_config.MODERATION_BUFFER_SIZE
-        thread = threading.Thread(
-            target=self.worker,
-            kwargs={
-                "flask_app": current_app._get_current_object(),  # type: ignore
-                "buffer_size": buffer_size if buffer_size > 0 else dify_config.MODERATION_BUFFER_SIZE,
-            },
+    def stop_checking(self) -> None:
+        """Stop scheduling streaming checks, a check that already runs is finished."""
+        with self._condition:
+            self.running = False
+
+    def _run_checks(self, flask_app: Flask) -> None:
+        try:
+            with flask_app.app_context():
+                while True:
+                    with self._condition:
+                        moderation_buffer = self.buffer
+                        checked_length = self._checked_length
+                        if not self.running or len(moderation_buffer) - checked_length < (
+                            dify_config.MODERATION_BUFFER_SIZE
+                        ):
+                            return
+
+                    flagged = self._check(moderation_buffer, checked_length)
+
+                    with self._condition:
+                        self._checked_length = len(moderation_buffer)
+                        if flagged:
+                            self.running = False
+        finally:
+            self._end_checks()
+
+    def _end_checks(self) -> None:
+        with self._condition:
+            self._checking = False
+            self._condition.notify_all()
+
+    def _check(self, moderation_buffer: str, checked_length: int) -> bool:
+        """Moderate the buffer, return whether the output was replaced for good."""
+        result = self._moderate_window(moderation_buffer, checked_length)
+        if not result or not result.flagged:
+            return False
+
+        if result.action == ModerationAction.DIRECT_OUTPUT:
+            final_output = result.preset_response
+            self.final_output = final_output
+        else:
+            final_output = result.text + self.buffer[len(moderation_buffer) :]
+
+        # trigger replace event
+        if self.running:
+            self.queue_manager.publish(
+                QueueMessageReplaceEvent(
+                    text=final_output, reason=QueueMessageReplaceEvent.MessageReplaceReason.OUTPUT_MODERATION
+                ),
+                PublishFrom.TASK_PIPELINE,
+            )
+
+        return result.action == ModerationAction.DIRECT_OUTPUT
+
+    def _moderate_window(self, moderation_buffer: str, checked_length: int) -> Optional[ModerationOutputsResult]:
+        if not checked_length or not self._supports_incremental_output():
+            return self.moderation(tenant_id=self.tenant_id, app_id=self.app_id, moderation_buffer=moderation_buffer)
+
+        start = max(checked_length - dify_config.MODERATION_WINDOW_OVERLAP, 0)
+        result = self.moderation(
+            tenant_id=self.tenant_id, app_id=self.app_id, moderation_buffer=moderation_buffer[start:]
         )
+        if result and result.flagged and result.action == ModerationAction.OVERRIDDEN:
+            # the overridden text of a window cannot be spliced into the output, override the whole output
+            return self.moderation(tenant_id=self.tenant_id, app_id=self.app_id, moderation_buffer=moderation_buffer)
+        return result
 
-        thread.start()
-
-        return thread
-
-    def stop_thread(self):
-        if self.thread and self.thread.is_alive():
-            self.thread_running = False
-
-    def worker(self, flask_app: Flask, buffer_size: int):
-        with flask_app.app_context():
-            current_length = 0
-            while self.thread_running:
-                moderation_buffer = self.buffer
-                buffer_length = len(moderation_buffer)
-                if not self.is_final_chunk:
-                    chunk_length = buffer_length - current_length
-                    if 0 <= chunk_length < buffer_size:
-                        time.sleep(1)
-                        continue
-
-                current_length = buffer_length
-
-                result = self.moderation(
-                    tenant_id=self.tenant_id, app_id=self.app_id, moderation_buffer=moderation_buffer
-                )
-
-                if not result or not result.flagged:
-                    continue
-
-                if result.action == ModerationAction.DIRECT_OUTPUT:
-                    final_output = result.preset_response
-                    self.final_output = final_output
-                else:
-                    final_output = result.text + self.buffer[len(moderation_buffer) :]
-
-                # trigger replace event
-                if self.thread_running:
-                    self.queue_manager.publish(
-                        QueueMessageReplaceEvent(
-                            text=final_output, reason=QueueMessageReplaceEvent.MessageReplaceReason.OUTPUT_MODERATION
-                        ),
-                        PublishFrom.TASK_PIPELINE,
-                    )
-
-                if result.action == ModerationAction.DIRECT_OUTPUT:
-                    break
+    def _supports_incremental_output(self) -> bool:
+        try:
+            with self._moderation_lock:
+                return self._get_moderation_factory(self.tenant_id, self.app_id).supports_incremental_output
+        except Exception:
+            return False
+
+    def _get_moderation_factory(self, tenant_id: str, app_id: str) -> ModerationFactory:
+        if self._moderation_factory is None:
+            self._moderation_factory = ModerationFactory(
+                name=self.rule.type, app_id=app_id, tenant_id=tenant_id, config=self.rule.config
+            )
+        return self._moderation_factory
 
-    def moderation(self, tenant_id: str, app_id: str, moderation_buffer: str) -> Optional[ModerationOutputsResult]:
+    def _moderate_detached(self, moderation_buffer: str) -> Optional[ModerationOutputsResult]:
         try:
             moderation_factory = ModerationFactory(
-                name=self.rule.type, app_id=app_id, tenant_id=tenant_id, config=self.rule.config
+                name=self.rule.type, app_id=self.app_id, tenant_id=self.tenant_id, config=self.rule.config
             )
+            return moderation_factory.moderation_for_outputs(moderation_buffer)
+        except Exception:
+            logger.exception("Moderation Output error, app_id: %s", self.app_id)
+        return None
 
-            result: ModerationOutputsResult = moderation_factory.moderation_for_outputs(moderation_buffer)
+    def moderation(self, tenant_id: str, app_id: str, moderation_buffer: str) -> Optional[ModerationOutputsResult]:
+        try:
+            with self._moderation_lock:
+                moderation_factory = self._get_moderation_factory(tenant_id, app_id)
+                result: ModerationOutputsResult = moderation_factory.moderation_for_outputs(moderation_buffer)
             return result
         except Exception as e:
             logger.exception("Moderation Output error, app_id: %s", app_id)
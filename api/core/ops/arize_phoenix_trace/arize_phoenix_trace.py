@@ -184,7 +184,9 @@ class ArizePhoenixDataTrace(BaseTraceInstance):
                 elapsed_time = node_execution.elapsed_time
                 finished_at = created_at + timedelta(seconds=elapsed_time)
 
-                process_data = json.loads(node_execution.process_data) if node_execution.process_data else {}
+                # the payloads may be offloaded to the storage, the dicts load the full values
+                process_data = node_execution.process_data_dict or {}
+                outputs = node_execution.outputs_dict or {}
 
                 node_metadata = {
                     "node_id": node_execution.id,
@@ -197,8 +199,7 @@ class ArizePhoenixDataTrace(BaseTraceInstance):
                     "level": "ERROR" if node_execution.status != "succeeded" else "DEFAULT",
                 }
 
-                if node_execution.execution_metadata:
-                    node_metadata.update(json.loads(node_execution.execution_metadata))
+                node_metadata.update(node_execution.execution_metadata_dict)
 
                 # Determine the correct span kind based on node type
                 span_kind = OpenInferenceSpanKindValues.CHAIN.value
@@ -211,7 +212,6 @@ class ArizePhoenixDataTrace(BaseTraceInstance):
                     if model:
                         node_metadata["ls_model_name"] = model
 
-                    outputs = json.loads(node_execution.outputs).get("usage", {}) if "outputs" in node_execution else {}
                     usage_data = process_data.get("usage", {}) if "usage" in process_data else outputs.get("usage", {})
                     if usage_data:
                         node_metadata["total_tokens"] = usage_data.get("total_tokens", 0)
@@ -227,8 +227,8 @@ class ArizePhoenixDataTrace(BaseTraceInstance):
                 node_span = self.tracer.start_span(
                     name=node_execution.node_type,
                     attributes={
-                        SpanAttributes.INPUT_VALUE: node_execution.inputs or "{}",
-                        SpanAttributes.OUTPUT_VALUE: node_execution.outputs or "{}",
+                        SpanAttributes.INPUT_VALUE: json.dumps(node_execution.inputs_dict or {}, ensure_ascii=False),
+                        SpanAttributes.OUTPUT_VALUE: json.dumps(outputs, ensure_ascii=False),
                         SpanAttributes.OPENINFERENCE_SPAN_KIND: span_kind,
                         SpanAttributes.METADATA: json.dumps(node_metadata, ensure_ascii=False),
                         SpanAttributes.SESSION_ID: trace_info.conversation_id or "",
@@ -248,9 +248,6 @@ class ArizePhoenixDataTrace(BaseTraceInstance):
                             llm_attributes[SpanAttributes.LLM_PROVIDER] = provider
                         if model:
                             llm_attributes[SpanAttributes.LLM_MODEL_NAME] = model
-                        outputs = (
-                            json.loads(node_execution.outputs).get("usage", {}) if "outputs" in node_execution else {}
-                        )
                         usage_data = (
                             process_data.get("usage", {}) if "usage" in process_data else outputs.get("usage", {})
                         )
@@ -689,20 +686,7 @@ class ArizePhoenixDataTrace(BaseTraceInstance):
     def _get_workflow_nodes(self, workflow_run_id: str):
         """Helper method to get workflow nodes"""
         workflow_nodes = (
-            db.session.query(
-                WorkflowNodeExecutionModel.id,
-                WorkflowNodeExecutionModel.tenant_id,
-                WorkflowNodeExecutionModel.app_id,
-                WorkflowNodeExecutionModel.title,
-                WorkflowNodeExecutionModel.node_type,
-                WorkflowNodeExecutionModel.status,
-                WorkflowNodeExecutionModel.inputs,
-                WorkflowNodeExecutionModel.outputs,
-                WorkflowNodeExecutionModel.created_at,
-                WorkflowNodeExecutionModel.elapsed_time,
-                WorkflowNodeExecutionModel.process_data,
-                WorkflowNodeExecutionModel.execution_metadata,
-            )
+            db.session.query(WorkflowNodeExecutionModel)
             .where(WorkflowNodeExecutionModel.workflow_run_id == workflow_run_id)
             .all()
         )
@@ -1,5 +1,6 @@
 import json
 from collections import defaultdict
+from collections.abc import Mapping
 from json import JSONDecodeError
 from typing import Any, Optional, cast
 
@@ -24,6 +25,7 @@ from core.entities.provider_entities import (
 from core.helper import encrypter
 from core.helper.model_provider_cache import ProviderCredentialsCache, ProviderCredentialsCacheType
 from core.helper.position_helper import is_filtered
+from core.helper.provider_quota_ledger import ProviderQuotaLedger
 from core.model_runtime.entities.model_entities import ModelType
 from core.model_runtime.entities.provider_entities import (
     ConfigurateMethod,
@@ -111,6 +113,19 @@ class ProviderManager:
                     provider_name
                 ]
 
+        # Get the usage of the hosted quotas not reconciled into the provider records yet
+        pending_quotas: dict[tuple[str, str], int] = {}
+        if dify_config.ENABLE_PROVIDER_QUOTA_LEDGER:
+            pending_quotas = ProviderQuotaLedger.get_pending(
+                tenant_id,
+                (
+                    (ModelProviderID(provider_record.provider_name).provider_name, provider_record.quota_type)
+                    for provider_records in provider_name_to_provider_records_dict.values()
+                    for provider_record in provider_records
+                    if provider_record.provider_type == ProviderType.SYSTEM.value and provider_record.quota_type
+                ),
+            )
+
         # Get all provider model records of the workspace
         provider_name_to_provider_model_records_dict = self._get_all_provider_models(tenant_id)
         for provider_name in list(provider_name_to_provider_model_records_dict.keys()):
@@ -172,7 +187,9 @@ class ProviderManager:
             )
 
             # Convert to system configuration
-            system_configuration = self._to_system_configuration(tenant_id, provider_entity, provider_records)
+            system_configuration = self._to_system_configuration(
+                tenant_id, provider_entity, provider_records, pending_quotas
+            )
 
             # Get preferred provider type
             preferred_provider_type_record = provider_name_to_preferred_model_provider_records_dict.get(provider_name)
@@ -697,7 +714,11 @@ class ProviderManager:
         return CustomConfiguration(provider=custom_provider_configuration, models=custom_model_configurations)
 
     def _to_system_configuration(
-        self, tenant_id: str, provider_entity: ProviderEntity, provider_records: list[Provider]
+        self,
+        tenant_id: str,
+        provider_entity: ProviderEntity,
+        provider_records: list[Provider],
+        pending_quotas: Optional[Mapping[tuple[str, str], int]] = None,
     ) -> SystemConfiguration:
         """
         Convert to system configuration.
@@ -705,6 +726,7 @@ class ProviderManager:
         :param tenant_id: workspace id
         :param provider_entity: provider entity
         :param provider_records: provider records
+        :param pending_quotas: usage of the quota ledger not reconciled yet, by provider name and quota type
         :return:
         """
         # Get hosting configuration
@@ -745,13 +767,17 @@ class ProviderManager:
                 if provider_record.quota_limit is None:
                     raise ValueError("quota_limit is None")
 
+                quota_pending = (pending_quotas or {}).get(
+                    (ModelProviderID(provider_record.provider_name).provider_name, provider_quota.quota_type.value), 0
+                )
+                quota_used = provider_record.quota_used + quota_pending
                 quota_configuration = QuotaConfiguration(
                     quota_type=provider_quota.quota_type,
                     quota_unit=provider_hosting_configuration.quota_unit or QuotaUnit.TOKENS,
-                    quota_used=provider_record.quota_used,
+                    quota_used=quota_used,
+                    quota_pending=quota_pending,
                     quota_limit=provider_record.quota_limit,
-                    is_valid=provider_record.quota_limit > provider_record.quota_used
-                    or provider_record.quota_limit == -1,
+                    is_valid=provider_record.quota_limit > quota_used or provider_record.quota_limit == -1,
                     restrict_models=provider_quota.restrict_models,
                 )
 
@@ -1,4 +1,7 @@
 import concurrent.futures
+import threading
+import time
+from collections.abc import Callable
 from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
@@ -29,6 +32,31 @@ default_retrieval_model = {
 }
 
 
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """The pool running the keyword, vector and full text searches of all retrievals of the process."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=dify_config.RETRIEVAL_SERVICE_EXECUTORS, thread_name_prefix="retrieval_service"
+            )
+        return _executor
+
+
+# seconds a search of a retrieval may take once it has started on the pool
+_SEARCH_TIMEOUT = 30
+
+
+def _run_search(started_at: dict[str, float], name: str, search: Callable[..., None], **kwargs) -> None:
+    """Run a search of a retrieval, recording when it left the queue of the pool."""
+    started_at[name] = time.monotonic()
+    search(**kwargs)
+
+
 class RetrievalService:
     # Cache precompiled regular expressions to avoid repeated compilation
     @classmethod
@@ -43,7 +71,12 @@ class RetrievalService:
         reranking_mode: str = "reranking_model",
         weights: Optional[dict] = None,
         document_ids_filter: Optional[list[str]] = None,
+        query_vector: Optional[list[float]] = None,
     ):
+        """
+        Search a dataset, `query_vector` is the query embedded by the embedding model of the dataset when the caller
+        embedded it already.
+        """
         if not query:
             return []
         dataset = cls._get_dataset(dataset_id)
@@ -53,55 +86,80 @@ class RetrievalService:
         all_documents: list[Document] = []
         exceptions: list[str] = []
 
-        # Optimize multithreading with thread pools
-        with ThreadPoolExecutor(max_workers=dify_config.RETRIEVAL_SERVICE_EXECUTORS) as executor:  # type: ignore
-            futures = []
-            if retrieval_method == "keyword_search":
-                futures.append(
-                    executor.submit(
-                        cls.keyword_search,
-                        flask_app=current_app._get_current_object(),  # type: ignore
-                        dataset_id=dataset_id,
-                        query=query,
-                        top_k=top_k,
-                        all_documents=all_documents,
-                        exceptions=exceptions,
-                        document_ids_filter=document_ids_filter,
-                    )
-                )
-            if RetrievalMethod.is_support_semantic_search(retrieval_method):
-                futures.append(
-                    executor.submit(
-                        cls.embedding_search,
-                        flask_app=current_app._get_current_object(),  # type: ignore
-                        dataset_id=dataset_id,
-                        query=query,
-                        top_k=top_k,
-                        score_threshold=score_threshold,
-                        reranking_model=reranking_model,
-                        all_documents=all_documents,
-                        retrieval_method=retrieval_method,
-                        exceptions=exceptions,
-                        document_ids_filter=document_ids_filter,
-                    )
-                )
-            if RetrievalMethod.is_support_fulltext_search(retrieval_method):
-                futures.append(
-                    executor.submit(
-                        cls.full_text_index_search,
-                        flask_app=current_app._get_current_object(),  # type: ignore
-                        dataset_id=dataset_id,
-                        query=query,
-                        top_k=top_k,
-                        score_threshold=score_threshold,
-                        reranking_model=reranking_model,
-                        all_documents=all_documents,
-                        retrieval_method=retrieval_method,
-                        exceptions=exceptions,
-                        document_ids_filter=document_ids_filter,
-                    )
-                )
-            concurrent.futures.wait(futures, timeout=30, return_when=concurrent.futures.ALL_COMPLETED)
+        # the searches run on a pool shared by the retrievals of the process, instead of one pool per call
+        executor = _get_executor()
+        futures: dict[str, concurrent.futures.Future] = {}
+        started_at: dict[str, float] = {}
+        if retrieval_method == "keyword_search":
+            futures["keyword_search"] = executor.submit(
+                _run_search,
+                started_at,
+                "keyword_search",
+                cls.keyword_search,
+                flask_app=current_app._get_current_object(),  # type: ignore
+                dataset_id=dataset_id,
+                query=query,
+                top_k=top_k,
+                all_documents=all_documents,
+                exceptions=exceptions,
+                document_ids_filter=document_ids_filter,
+            )
+        if RetrievalMethod.is_support_semantic_search(retrieval_method):
+            futures["embedding_search"] = executor.submit(
+                _run_search,
+                started_at,
+                "embedding_search",
+                cls.embedding_search,
+                flask_app=current_app._get_current_object(),  # type: ignore
+                dataset_id=dataset_id,
+                query=query,
+                top_k=top_k,
+                score_threshold=score_threshold,
+                reranking_model=reranking_model,
+                all_documents=all_documents,
+                retrieval_method=retrieval_method,
+                exceptions=exceptions,
+                document_ids_filter=document_ids_filter,
+                query_vector=query_vector,
+            )
+        if RetrievalMethod.is_support_fulltext_search(retrieval_method):
+            futures["full_text_index_search"] = executor.submit(
+                _run_search,
+                started_at,
+                "full_text_index_search",
+                cls.full_text_index_search,
+                flask_app=current_app._get_current_object(),  # type: ignore
+                dataset_id=dataset_id,
+                query=query,
+                top_k=top_k,
+                score_threshold=score_threshold,
+                reranking_model=reranking_model,
+                all_documents=all_documents,
+                retrieval_method=retrieval_method,
+                exceptions=exceptions,
+                document_ids_filter=document_ids_filter,
+            )
+        concurrent.futures.wait(futures.values(), timeout=_SEARCH_TIMEOUT)
+        # searches still queued behind the searches of other retrievals are given up, those running are given the
+        # timeout from their own start
+        queued = [name for name, future in futures.items() if future.cancel()]
+        slow = []
+        for name, future in futures.items():
+            if name in queued or future.done():
+                continue
+            remaining = started_at.get(name, time.monotonic()) + _SEARCH_TIMEOUT - time.monotonic()
+            if future not in concurrent.futures.wait([future], timeout=max(remaining, 0)).done:
+                slow.append(name)
+        # searches still running keep their thread but no longer add to the results
+        all_documents = list(all_documents)
+        exceptions = list(exceptions)
+        if queued:
+            exceptions.append(
+                f"{', '.join(queued)} of dataset {dataset_id} did not start within {_SEARCH_TIMEOUT}s, "
+                "the retrieval pool is saturated"
+            )
+        if slow:
+            exceptions.append(f"{', '.join(slow)} of dataset {dataset_id} did not finish within {_SEARCH_TIMEOUT}s")
 
         if exceptions:
             raise ValueError(";\n".join(exceptions))
@@ -186,6 +244,7 @@ class RetrievalService:
         retrieval_method: str,
         exceptions: list,
         document_ids_filter: Optional[list[str]] = None,
+        query_vector: Optional[list[float]] = None,
     ):
         with flask_app.app_context():
             try:
@@ -194,14 +253,17 @@ class RetrievalService:
                     raise ValueError("dataset not found")
 
                 vector = Vector(dataset=dataset)
-                documents = vector.search_by_vector(
-                    query,
-                    search_type="similarity_score_threshold",
-                    top_k=top_k,
-                    score_threshold=score_threshold,
-                    filter={"group_id": [dataset.id]},
-                    document_ids_filter=document_ids_filter,
-                )
+                search_kwargs = {
+                    "search_type": "similarity_score_threshold",
+                    "top_k": top_k,
+                    "score_threshold": score_threshold,
+                    "filter": {"group_id": [dataset.id]},
+                    "document_ids_filter": document_ids_filter,
+                }
+                if query_vector is not None:
+                    documents = vector.search_by_query_vector(query_vector, **search_kwargs)
+                else:
+                    documents = vector.search_by_vector(query, **search_kwargs)
 
                 if documents:
                     if (
@@ -8,6 +8,11 @@ import psycopg2.pool  # type: ignore
 from pydantic import BaseModel, model_validator
 
 from configs import dify_config
+from core.rag.datasource.vdb.pg_vector_params import (
+    PreparedStatementConnection,
+    encode_vector_text,
+    execute_prepared,
+)
 from core.rag.datasource.vdb.vector_base import BaseVector
 from core.rag.datasource.vdb.vector_factory import AbstractVectorFactory
 from core.rag.datasource.vdb.vector_type import VectorType
@@ -88,6 +93,7 @@ class OpenGauss(BaseVector):
             user=config.user,
             password=config.password,
             database=config.database,
+            connection_factory=PreparedStatementConnection,
         )
 
     @contextmanager
@@ -182,12 +188,25 @@ class OpenGauss(BaseVector):
         top_k = kwargs.get("top_k", 4)
         if not isinstance(top_k, int) or top_k <= 0:
             raise ValueError("top_k must be a positive integer")
+        document_ids_filter = kwargs.get("document_ids_filter")
+
         with self._get_cursor() as cur:
-            cur.execute(
-                f"SELECT meta, text, embedding <=> %s AS distance FROM {self.table_name}"
-                f" ORDER BY distance LIMIT {top_k}",
-                (json.dumps(query_vector),),
-            )
+            if document_ids_filter:
+                execute_prepared(
+                    cur,
+                    f"SELECT meta, text, embedding <=> $1 AS distance FROM {self.table_name}"
+                    " WHERE meta->>'document_id' = ANY($2) ORDER BY distance LIMIT $3",
+                    ("vector", "text[]", "int"),
+                    (encode_vector_text(query_vector), list(document_ids_filter), top_k),
+                )
+            else:
+                execute_prepared(
+                    cur,
+                    f"SELECT meta, text, embedding <=> $1 AS distance FROM {self.table_name}"
+                    " ORDER BY distance LIMIT $2",
+                    ("vector", "int"),
+                    (encode_vector_text(query_vector), top_k),
+                )
             docs = []
             score_threshold = float(kwargs.get("score_threshold") or 0.0)
             for record in cur:
@@ -0,0 +1,143 @@
+"""
+Parameter encoding shared by the psycopg2 based pgvector-family stores (pgvector, pyvastbase, opengauss).
+
+psycopg2 interpolates bind parameters client side, so a query vector is always sent as text. What can be
+avoided is re-planning the same similarity query on every call and inlining the document id filter as an
+``IN ('..', '..')`` literal list. Queries therefore go through per-connection server-side prepared statements
+with the filter bound as a ``text[]`` array, and bulk inserts into pgvector tables use ``COPY ... (FORMAT BINARY)``
+with pgvector's binary vector representation instead of decimal strings.
+"""
+
+import hashlib
+import io
+import json
+import re
+import struct
+import uuid
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+import numpy as np
+import psycopg2.errors
+import psycopg2.extensions  # type: ignore
+
+# PGCOPY signature, flags field and header extension length
+_COPY_BINARY_HEADER = b"PGCOPY\n\377\r\n\0" + struct.pack(">ii", 0, 0)
+_COPY_BINARY_TRAILER = struct.pack(">h", -1)
+_COPY_FIELD_COUNT = struct.Struct(">h")
+_COPY_FIELD_LENGTH = struct.Struct(">i")
+# pgvector vector_send: uint16 dimension, uint16 unused, then float4 values
+_VECTOR_HEADER = struct.Struct(">HH")
+# jsonb_send prefixes the json text with a version byte
+_JSONB_VERSION = b"\x01"
+_POSITIONAL_PARAMETER = re.compile(r"\$(\d+)")
+
+
+class PreparedStatementConnection(psycopg2.extensions.connection):
+    """
+    psycopg2 connection that remembers the server-side prepared statements created in its session.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements: set[str] = set()
+
+
+def encode_vector_text(embedding: Sequence[float]) -> str:
+    """Encode a vector as the textual ``[x, y, ...]`` literal accepted by every pgvector-family type."""
+    if isinstance(embedding, np.ndarray):
+        embedding = embedding.tolist()
+    return json.dumps(embedding)
+
+
+def encode_vector_binary(embedding: Sequence[float]) -> bytes:
+    """Encode a vector in pgvector's binary send/recv format."""
+    values = np.asarray(embedding, dtype=">f4")
+    return _VECTOR_HEADER.pack(len(values), 0) + values.tobytes()
+
+
+def decode_vector_binary(data: bytes) -> list[float]:
+    """Decode pgvector's binary format, the inverse of :func:`encode_vector_binary`."""
+    dimension, _ = _VECTOR_HEADER.unpack_from(data)
+    values: list[float] = np.frombuffer(data, dtype=">f4", count=dimension, offset=_VECTOR_HEADER.size).tolist()
+    return values
+
+
+def build_copy_binary_payload(rows: Iterable[tuple[str, str, dict, Sequence[float]]]) -> io.BytesIO:
+    """
+    Build a ``COPY ... FROM STDIN (FORMAT BINARY)`` stream for ``(id uuid, text text, meta jsonb, embedding vector)``.
+
+    :param rows: tuples of (id, text, metadata, embedding)
+    :return: a file-like object ready for ``cursor.copy_expert``
+    """
+    buffer = io.BytesIO()
+    buffer.write(_COPY_BINARY_HEADER)
+    for row_id, text, metadata, embedding in rows:
+        fields = (
+            uuid.UUID(str(row_id)).bytes,
+            text.encode("utf-8"),
+            _JSONB_VERSION + json.dumps(metadata).encode("utf-8"),
+            encode_vector_binary(embedding),
+        )
+        buffer.write(_COPY_FIELD_COUNT.pack(len(fields)))
+        for field in fields:
+            buffer.write(_COPY_FIELD_LENGTH.pack(len(field)))
+            buffer.write(field)
+    buffer.write(_COPY_BINARY_TRAILER)
+    buffer.seek(0)
+    return buffer
+
+
+def copy_rows_binary(cursor, table_name: str, rows: Iterable[tuple[str, str, dict, Sequence[float]]]) -> None:
+    """Bulk insert ``(id, text, meta, embedding)`` rows using the binary COPY protocol."""
+    cursor.copy_expert(
+        f"COPY {table_name} (id, text, meta, embedding) FROM STDIN WITH (FORMAT BINARY)",
+        build_copy_binary_payload(rows),
+    )
+
+
+def prepared_statement_name(statement: str) -> str:
+    """Derive a stable statement name from its SQL text so each distinct statement is prepared once per session."""
+    return f"dify_{hashlib.md5(statement.encode()).hexdigest()[:16]}"
+
+
+def execute_prepared(cursor, statement: str, param_types: Sequence[str], params: Sequence[Any]) -> None:
+    """
+    Execute ``statement`` (using ``$n`` placeholders) through a server-side prepared statement.
+
+    The statement is prepared lazily the first time a connection sees it. When the session has lost it (for example
+    behind a transaction pooler or after a reconnect) it is prepared again and executed once more. When the session
+    has it already (a pooler handing over a backend another client prepared it on), the existing one is executed, the
+    name is derived from the SQL text so it is the same statement.
+    """
+    connection = cursor.connection
+    prepared: set[str] | None = getattr(connection, "prepared_statements", None)
+    name = prepared_statement_name(statement)
+    placeholders = ", ".join(["%s"] * len(params))
+    execute_sql = f"EXECUTE {name} ({placeholders})"
+
+    if prepared is None:
+        # connections not created by the PreparedStatementConnection factory keep no session bookkeeping,
+        # so run the statement directly with the same parameters bound client side
+        cursor.execute(
+            _POSITIONAL_PARAMETER.sub(r"%(p\1)s", statement),
+            {f"p{i}": value for i, value in enumerate(params, start=1)},
+        )
+        return
+
+    if name not in prepared:
+        _prepare(cursor, name, statement, param_types)
+        prepared.add(name)
+    try:
+        cursor.execute(execute_sql, tuple(params))
+    except psycopg2.errors.InvalidSqlStatementName:
+        connection.rollback()
+        _prepare(cursor, name, statement, param_types)
+        cursor.execute(execute_sql, tuple(params))
+
+
+def _prepare(cursor, name: str, statement: str, param_types: Sequence[str]) -> None:
+    try:
+        cursor.execute(f"PREPARE {name} ({', '.join(param_types)}) AS {statement}")
+    except psycopg2.errors.DuplicatePreparedStatement:
+        cursor.connection.rollback()
@@ -6,11 +6,16 @@ from contextlib import contextmanager
 from typing import Any
 
 import psycopg2.errors
-import psycopg2.extras  # type: ignore
 import psycopg2.pool  # type: ignore
 from pydantic import BaseModel, model_validator
 
 from configs import dify_config
+from core.rag.datasource.vdb.pg_vector_params import (
+    PreparedStatementConnection,
+    copy_rows_binary,
+    encode_vector_text,
+    execute_prepared,
+)
 from core.rag.datasource.vdb.vector_base import BaseVector
 from core.rag.datasource.vdb.vector_factory import AbstractVectorFactory
 from core.rag.datasource.vdb.vector_type import VectorType
@@ -92,6 +97,7 @@ class PGVector(BaseVector):
             user=config.user,
             password=config.password,
             database=config.database,
+            connection_factory=PreparedStatementConnection,
         )
 
     @contextmanager
@@ -117,18 +123,9 @@ class PGVector(BaseVector):
             if doc.metadata is not None:
                 doc_id = doc.metadata.get("doc_id", str(uuid.uuid4()))
                 pks.append(doc_id)
-                values.append(
-                    (
-                        doc_id,
-                        doc.page_content,
-                        json.dumps(doc.metadata),
-                        embeddings[i],
-                    )
-                )
+                values.append((doc_id, doc.page_content, doc.metadata, embeddings[i]))
         with self._get_cursor() as cur:
-            psycopg2.extras.execute_values(
-                cur, f"INSERT INTO {self.table_name} (id, text, meta, embedding) VALUES %s", values
-            )
+            copy_rows_binary(cur, self.table_name, values)
         return pks
 
     def text_exists(self, id: str) -> bool:
@@ -175,18 +172,24 @@ class PGVector(BaseVector):
         if not isinstance(top_k, int) or top_k <= 0:
             raise ValueError("top_k must be a positive integer")
         document_ids_filter = kwargs.get("document_ids_filter")
-        where_clause = ""
-        if document_ids_filter:
-            document_ids = ", ".join(f"'{id}'" for id in document_ids_filter)
-            where_clause = f" WHERE meta->>'document_id' in ({document_ids}) "
 
         with self._get_cursor() as cur:
-            cur.execute(
-                f"SELECT meta, text, embedding <=> %s AS distance FROM {self.table_name}"
-                f" {where_clause}"
-                f" ORDER BY distance LIMIT {top_k}",
-                (json.dumps(query_vector),),
-            )
+            if document_ids_filter:
+                execute_prepared(
+                    cur,
+                    f"SELECT meta, text, embedding <=> $1 AS distance FROM {self.table_name}"
+                    " WHERE meta->>'document_id' = ANY($2) ORDER BY distance LIMIT $3",
+                    ("vector", "text[]", "int"),
+                    (encode_vector_text(query_vector), list(document_ids_filter), top_k),
+                )
+            else:
+                execute_prepared(
+                    cur,
+                    f"SELECT meta, text, embedding <=> $1 AS distance FROM {self.table_name}"
+                    " ORDER BY distance LIMIT $2",
+                    ("vector", "int"),
+                    (encode_vector_text(query_vector), top_k),
+                )
             docs = []
             score_threshold = float(kwargs.get("score_threshold") or 0.0)
             for record in cur:
@@ -204,9 +207,10 @@ class PGVector(BaseVector):
         with self._get_cursor() as cur:
             document_ids_filter = kwargs.get("document_ids_filter")
             where_clause = ""
+            filter_params: tuple = ()
             if document_ids_filter:
-                document_ids = ", ".join(f"'{id}'" for id in document_ids_filter)
-                where_clause = f" AND meta->>'document_id' in ({document_ids}) "
+                where_clause = " AND meta->>'document_id' = ANY(%s) "
+                filter_params = (list(document_ids_filter),)
             if self.pg_bigm:
                 cur.execute("SET pg_bigm.similarity_limit TO 0.000001")
                 cur.execute(
@@ -217,7 +221,7 @@ class PGVector(BaseVector):
                     ORDER BY score DESC
                     LIMIT {top_k}""",
                     # f"'{query}'" is required in order to account for whitespace in query
-                    (f"'{query}'", f"'{query}'"),
+                    (f"'{query}'", f"'{query}'", *filter_params),
                 )
             else:
                 cur.execute(
@@ -228,7 +232,7 @@ class PGVector(BaseVector):
                     ORDER BY score DESC
                     LIMIT {top_k}""",
                     # f"'{query}'" is required in order to account for whitespace in query
-                    (f"'{query}'", f"'{query}'"),
+                    (f"'{query}'", f"'{query}'", *filter_params),
                 )
 
             docs = []
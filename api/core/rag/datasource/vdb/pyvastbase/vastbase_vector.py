@@ -8,6 +8,11 @@ import psycopg2.pool  # type: ignore
 from pydantic import BaseModel, model_validator
 
 from configs import dify_config
+from core.rag.datasource.vdb.pg_vector_params import (
+    PreparedStatementConnection,
+    encode_vector_text,
+    execute_prepared,
+)
 from core.rag.datasource.vdb.vector_base import BaseVector
 from core.rag.datasource.vdb.vector_factory import AbstractVectorFactory
 from core.rag.datasource.vdb.vector_type import VectorType
@@ -81,6 +86,7 @@ class VastbaseVector(BaseVector):
             user=config.user,
             password=config.password,
             database=config.database,
+            connection_factory=PreparedStatementConnection,
         )
 
     @contextmanager
@@ -158,12 +164,25 @@ class VastbaseVector(BaseVector):
 
         if not isinstance(top_k, int) or top_k <= 0:
             raise ValueError("top_k must be a positive integer")
+        document_ids_filter = kwargs.get("document_ids_filter")
+
         with self._get_cursor() as cur:
-            cur.execute(
-                f"SELECT meta, text, embedding <=> %s AS distance FROM {self.table_name}"
-                f" ORDER BY distance LIMIT {top_k}",
-                (json.dumps(query_vector),),
-            )
+            if document_ids_filter:
+                execute_prepared(
+                    cur,
+                    f"SELECT meta, text, embedding <=> $1 AS distance FROM {self.table_name}"
+                    " WHERE meta->>'document_id' = ANY($2) ORDER BY distance LIMIT $3",
+                    ("floatvector", "text[]", "int"),
+                    (encode_vector_text(query_vector), list(document_ids_filter), top_k),
+                )
+            else:
+                execute_prepared(
+                    cur,
+                    f"SELECT meta, text, embedding <=> $1 AS distance FROM {self.table_name}"
+                    " ORDER BY distance LIMIT $2",
+                    ("floatvector", "int"),
+                    (encode_vector_text(query_vector), top_k),
+                )
             docs = []
             score_threshold = float(kwargs.get("score_threshold") or 0.0)
             for record in cur:
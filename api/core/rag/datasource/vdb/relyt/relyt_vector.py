@@ -8,6 +8,7 @@ from sqlalchemy import text as sql_text
 from sqlalchemy.dialects.postgresql import JSON, TEXT
 from sqlalchemy.orm import Session
 
+from core.rag.datasource.vdb.pg_vector_params import encode_vector_text
 from core.rag.datasource.vdb.vector_factory import AbstractVectorFactory
 from core.rag.datasource.vdb.vector_type import VectorType
 from core.rag.embedding.embedding_base import Embeddings
@@ -243,16 +244,16 @@ class RelytVector(BaseVector):
         k: int = 4,
         filter: Optional[dict] = None,
     ) -> list[tuple[Document, float]]:
-        # Add the filter if provided
-
+        # Bind filter values as arrays so the statement text stays the same for every filter
+        params: dict[str, Any] = {"embedding": encode_vector_text(embedding), "k": k}
         filter_condition = ""
-        if filter is not None:
-            conditions = [
-                f"metadata->>'{key!r}' in ({', '.join(map(repr, value))})"
-                if len(value) > 1
-                else f"metadata->>'{key!r}' = {value[0]!r}"
-                for key, value in filter.items()
-            ]
+        if filter:
+            conditions = []
+            for i, (key, value) in enumerate(filter.items()):
+                values = value if isinstance(value, list | tuple) else [value]
+                conditions.append(f"metadata->>:filter_key_{i} = ANY(:filter_values_{i})")
+                params[f"filter_key_{i}"] = key
+                params[f"filter_values_{i}"] = [str(v) for v in values]
             filter_condition = f"WHERE {' AND '.join(conditions)}"
 
         # Define the base query
@@ -266,11 +267,6 @@ class RelytVector(BaseVector):
             LIMIT :k
         """
 
-        # Set up the query parameters
-        embedding_str = ", ".join(format(x) for x in embedding)
-        embedding_str = "[" + embedding_str + "]"
-        params = {"embedding": embedding_str, "k": k}
-
         # Execute the query and fetch the results
         with self.client.connect() as conn:
             results = conn.execute(sql_text(sql_query), params).fetchall()
@@ -199,6 +199,11 @@ class Vector:
         embeddings = self._embeddings.embed_documents([document.page_content for document in documents])
         self._vector_processor.create(texts=documents, embeddings=embeddings, **kwargs)
 
+    def create_with_embeddings(self, documents: list[Document], embeddings: list[list[float]], **kwargs):
+        """Store documents whose embeddings were computed by the caller."""
+        if documents:
+            self._vector_processor.create(texts=documents, embeddings=embeddings, **kwargs)
+
     def text_exists(self, id: str) -> bool:
         return self._vector_processor.text_exists(id)
 
@@ -210,6 +215,10 @@ class Vector:
 
     def search_by_vector(self, query: str, **kwargs: Any) -> list[Document]:
         query_vector = self._embeddings.embed_query(query)
+        return self.search_by_query_vector(query_vector, **kwargs)
+
+    def search_by_query_vector(self, query_vector: list[float], **kwargs: Any) -> list[Document]:
+        """Search with a query already embedded by the embedding model of the dataset."""
         return self._vector_processor.search_by_vector(query_vector, **kwargs)
 
     def search_by_full_text(self, query: str, **kwargs: Any) -> list[Document]:
@@ -24,6 +24,16 @@ class CacheEmbedding(Embeddings):
         self._model_instance = model_instance
         self._user = user
 
+    def get_max_chunks(self) -> int:
+        """Maximum number of texts the embedding model accepts in a single invocation."""
+        model_type_instance = cast(TextEmbeddingModel, self._model_instance.model_type_instance)
+        model_schema = model_type_instance.get_model_schema(
+            self._model_instance.model, self._model_instance.credentials
+        )
+        if model_schema and ModelPropertyKey.MAX_CHUNKS in model_schema.model_properties:
+            return int(model_schema.model_properties[ModelPropertyKey.MAX_CHUNKS])
+        return 1
+
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
         """Embed search docs in batches of 10."""
         # use doc embedding cache or store if not exists
@@ -46,15 +56,7 @@ class CacheEmbedding(Embeddings):
             embedding_queue_texts = [texts[i] for i in embedding_queue_indices]
             embedding_queue_embeddings = []
             try:
-                model_type_instance = cast(TextEmbeddingModel, self._model_instance.model_type_instance)
-                model_schema = model_type_instance.get_model_schema(
-                    self._model_instance.model, self._model_instance.credentials
-                )
-                max_chunks = (
-                    model_schema.model_properties[ModelPropertyKey.MAX_CHUNKS]
-                    if model_schema and ModelPropertyKey.MAX_CHUNKS in model_schema.model_properties
-                    else 1
-                )
+                max_chunks = self.get_max_chunks()
                 for i in range(0, len(embedding_queue_texts), max_chunks):
                     batch_texts = embedding_queue_texts[i : i + max_chunks]
 
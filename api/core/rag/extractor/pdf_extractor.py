@@ -1,13 +1,69 @@
 """Abstract interface for document loader implementations."""
 
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
 from collections.abc import Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
 from typing import Optional, cast
 
+from configs import dify_config
 from core.rag.extractor.blob.blob import Blob
 from core.rag.extractor.extractor_base import BaseExtractor
 from core.rag.models.document import Document
 from extensions.ext_storage import storage
 
+logger = logging.getLogger(__name__)
+
+_page_pool: Optional[Executor] = None
+_page_pool_pid: Optional[int] = None
+_page_pool_lock = threading.Lock()
+
+
+def _get_page_pool(max_workers: int) -> Executor:
+    """Process pool shared by every PDF extraction of this process, created on first use in the process."""
+    global _page_pool, _page_pool_pid
+    with _page_pool_lock:
+        # a pool inherited from the process the workers forked from is not usable in them
+        if _page_pool is None or _page_pool_pid != os.getpid():
+            # spawned rather than forked, forking a gevent patched or multi-threaded process is unsafe
+            _page_pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+            _page_pool_pid = os.getpid()
+        return _page_pool
+
+
+def _reset_page_pool() -> None:
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is not None and _page_pool_pid == os.getpid():
+            _page_pool.shutdown(wait=False, cancel_futures=True)
+        _page_pool = None
+
+
+atexit.register(_reset_page_pool)
+
+
+def _extract_page_texts(file_path: str, start: int, stop: int) -> list[str]:
+    """Extract the text of pages [start, stop), executed in a worker process."""
+    import pypdfium2  # type: ignore
+
+    pdf_reader = pypdfium2.PdfDocument(file_path, autoclose=True)
+    try:
+        texts = []
+        for page_number in range(start, stop):
+            page = pdf_reader[page_number]
+            text_page = page.get_textpage()
+            texts.append(text_page.get_text_range())
+            text_page.close()
+            page.close()
+        return texts
+    finally:
+        pdf_reader.close()
+
 
 class PdfExtractor(BaseExtractor):
     """Load pdf files.
@@ -31,7 +87,7 @@ class PdfExtractor(BaseExtractor):
                 return [Document(page_content=text)]
             except FileNotFoundError:
                 pass
-        documents = list(self.load())
+        documents = list(self._extract_pages())
         text_list = []
         for document in documents:
             text_list.append(document.page_content)
@@ -43,6 +99,37 @@ class PdfExtractor(BaseExtractor):
 
         return documents
 
+    def _extract_pages(self) -> Iterator[Document]:
+        """
+        Yield the pages in order.
+
+        With PDF_EXTRACT_PARALLEL_WORKERS > 1, page ranges of PDF_EXTRACT_PAGES_PER_TASK pages are parsed
+        concurrently in a process pool shared by the whole process.
+        """
+        max_workers = dify_config.PDF_EXTRACT_PARALLEL_WORKERS
+        pages_per_task = dify_config.PDF_EXTRACT_PAGES_PER_TASK
+        page_count = self._get_page_count() if max_workers > 1 else 0
+        if page_count <= pages_per_task:
+            yield from self.load()
+            return
+
+        starts = list(range(0, page_count, pages_per_task))
+        stops = [min(start + pages_per_task, page_count) for start in starts]
+        try:
+            results = _get_page_pool(max_workers).map(_extract_page_texts, repeat(self._file_path), starts, stops)
+        except Exception:
+            logger.exception("Failed to start parallel PDF extraction, falling back to sequential parsing")
+            yield from self.load()
+            return
+        try:
+            for start, texts in zip(starts, results):
+                for offset, content in enumerate(texts):
+                    yield Document(page_content=content, metadata={"source": self._file_path, "page": start + offset})
+        except BrokenProcessPool:
+            # a worker died (e.g. killed by the OOM killer), let the next extraction start a fresh pool
+            _reset_page_pool()
+            raise
+
     def load(
         self,
     ) -> Iterator[Document]:
@@ -66,3 +153,12 @@ class PdfExtractor(BaseExtractor):
                     yield Document(page_content=content, metadata=metadata)
             finally:
                 pdf_reader.close()
+
+    def _get_page_count(self) -> int:
+        import pypdfium2  # type: ignore
+
+        pdf_reader = pypdfium2.PdfDocument(self._file_path, autoclose=True)
+        try:
+            return len(pdf_reader)
+        finally:
+            pdf_reader.close()
@@ -1,9 +1,11 @@
 import json
+import logging
 import math
 import re
 import threading
 from collections import Counter, defaultdict
 from collections.abc import Generator, Mapping
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Optional, Union, cast
 
 from flask import Flask, current_app
@@ -11,6 +13,7 @@ from sqlalchemy import Float, and_, or_, text
 from sqlalchemy import cast as sqlalchemy_cast
 from sqlalchemy.orm import Session
 
+from configs import dify_config
 from core.app.app_config.entities import (
     DatasetEntity,
     DatasetRetrieveConfigEntity,
@@ -36,6 +39,7 @@ from core.prompt.simple_prompt_transform import ModelMode
 from core.rag.data_post_processor.data_post_processor import DataPostProcessor
 from core.rag.datasource.keyword.jieba.jieba_keyword_table_handler import JiebaKeywordTableHandler
 from core.rag.datasource.retrieval_service import RetrievalService
+from core.rag.embedding.cached_embedding import CacheEmbedding
 from core.rag.entities.citation_metadata import RetrievalSourceMetadata
 from core.rag.entities.context_entities import DocumentContext
 from core.rag.entities.metadata_entities import Condition, MetadataCondition
@@ -61,6 +65,23 @@ from models.dataset import ChildChunk, Dataset, DatasetMetadata, DatasetQuery, D
 from models.dataset import Document as DatasetDocument
 from services.external_knowledge_service import ExternalDatasetService
 
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """The pool retrieving the datasets of all multiple retrievals of the process."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=dify_config.RETRIEVAL_SERVICE_EXECUTORS, thread_name_prefix="dataset_retrieval"
+            )
+        return _executor
+
+
 default_retrieval_model: dict[str, Any] = {
     "search_method": RetrievalMethod.SEMANTIC_SEARCH.value,
     "reranking_enable": False,
@@ -421,7 +442,6 @@ class DatasetRetrieval:
     ):
         if not available_datasets:
             return []
-        threads = []
         all_documents: list[Document] = []
         dataset_ids = [dataset.id for dataset in available_datasets]
         index_type_check = all(
@@ -455,6 +475,7 @@ class DatasetRetrieval:
                     ].embedding_model_provider
                     weights["vector_setting"]["embedding_model_name"] = available_datasets[0].embedding_model
 
+        retrievals = []
         for dataset in available_datasets:
             index_type = dataset.indexing_technique
             document_ids_filter = None
@@ -467,22 +488,30 @@ class DatasetRetrieval:
                         document_ids_filter = document_ids
                     else:
                         continue
-            retrieval_thread = threading.Thread(
-                target=self._retriever,
-                kwargs={
-                    "flask_app": current_app._get_current_object(),  # type: ignore
-                    "dataset_id": dataset.id,
-                    "query": query,
-                    "top_k": top_k,
-                    "all_documents": all_documents,
-                    "document_ids_filter": document_ids_filter,
-                    "metadata_condition": metadata_condition,
-                },
+            retrievals.append((dataset, document_ids_filter))
+
+        # the query is embedded once per embedding model rather than by each dataset
+        query_vectors = self._embed_query(query, top_k, [dataset for dataset, _ in retrievals])
+        flask_app = current_app._get_current_object()  # type: ignore
+        futures = {
+            dataset.id: _get_executor().submit(
+                self._retriever,
+                flask_app=flask_app,
+                dataset_id=dataset.id,
+                query=query,
+                top_k=top_k,
+                all_documents=all_documents,
+                document_ids_filter=document_ids_filter,
+                metadata_condition=metadata_condition,
+                query_vector=query_vectors.get((dataset.embedding_model_provider, dataset.embedding_model)),
             )
-            threads.append(retrieval_thread)
-            retrieval_thread.start()
-        for thread in threads:
-            thread.join()
+            for dataset, document_ids_filter in retrievals
+        }
+        for dataset_id, future in futures.items():
+            try:
+                future.result()
+            except Exception:
+                logger.exception("Failed to retrieve dataset %s", dataset_id)
 
         with measure_time() as timer:
             if reranking_enable:
@@ -588,6 +617,39 @@ class DatasetRetrieval:
             db.session.add_all(dataset_queries)
         db.session.commit()
 
+    def _embed_query(self, query: str, top_k: int, datasets: list[Dataset]) -> dict[tuple[str, str], list[float]]:
+        """
+        Embed the query once per embedding model of the datasets searched by vector, none are searched when `top_k` is
+        not positive.
+
+        Returns the query vectors by embedding model provider and name, a model failing to embed the query is left
+        out so that its datasets embed it themselves and report the error.
+        """
+        query_vectors: dict[tuple[str, str], list[float]] = {}
+        if top_k <= 0:
+            return query_vectors
+        model_manager = ModelManager()
+        for dataset in datasets:
+            if dataset.provider == "external" or dataset.indexing_technique != "high_quality":
+                continue
+            retrieval_model = dataset.retrieval_model or default_retrieval_model
+            if not RetrievalMethod.is_support_semantic_search(retrieval_model["search_method"]):
+                continue
+            embedding_model_key = (dataset.embedding_model_provider, dataset.embedding_model)
+            if embedding_model_key in query_vectors:
+                continue
+            try:
+                embedding_model = model_manager.get_model_instance(
+                    tenant_id=dataset.tenant_id,
+                    provider=dataset.embedding_model_provider,
+                    model_type=ModelType.TEXT_EMBEDDING,
+                    model=dataset.embedding_model,
+                )
+                query_vectors[embedding_model_key] = CacheEmbedding(embedding_model).embed_query(query)
+            except Exception:
+                logger.warning("Failed to embed the query with %s", embedding_model_key, exc_info=True)
+        return query_vectors
+
     def _retriever(
         self,
         flask_app: Flask,
@@ -597,6 +659,7 @@ class DatasetRetrieval:
         all_documents: list,
         document_ids_filter: Optional[list[str]] = None,
         metadata_condition: Optional[MetadataCondition] = None,
+        query_vector: Optional[list[float]] = None,
     ):
         with flask_app.app_context():
             with Session(db.engine) as session:
@@ -657,6 +720,7 @@ class DatasetRetrieval:
                             reranking_mode=retrieval_model.get("reranking_mode") or "reranking_model",
                             weights=retrieval_model.get("weights", None),
                             document_ids_filter=document_ids_filter,
+                            query_vector=query_vector,
                         )
 
                         all_documents.extend(documents)
@@ -8,6 +8,7 @@ from core.model_manager import ModelInstance
 from core.model_runtime.model_providers.__base.tokenizers.gpt2_tokenzier import GPT2Tokenizer
 from core.rag.splitter.text_splitter import (
     TS,
+    CachedLengthFunction,
     Collection,
     Literal,
     RecursiveCharacterTextSplitter,
@@ -30,6 +31,7 @@ class EnhanceRecursiveCharacterTextSplitter(RecursiveCharacterTextSplitter):
         disallowed_special: Union[Literal["all"], Collection[str]] = "all",  # noqa: UP037
         **kwargs: Any,
     ):
+        @CachedLengthFunction
         def _token_encoder(texts: list[str]) -> list[int]:
             if not texts:
                 return []
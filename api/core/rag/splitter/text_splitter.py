@@ -4,6 +4,7 @@ import copy
 import logging
 import re
 from abc import ABC, abstractmethod
+from collections import deque
 from collections.abc import Callable, Collection, Iterable, Sequence, Set
 from dataclasses import dataclass
 from typing import (
@@ -12,8 +13,11 @@ from typing import (
     Optional,
     TypeVar,
     Union,
+    cast,
 )
 
+from cachetools import LRUCache
+
 from core.rag.models.document import BaseDocumentTransformer, Document
 
 logger = logging.getLogger(__name__)
@@ -108,34 +112,37 @@ class TextSplitter(BaseDocumentTransformer, ABC):
         separator_len = self._length_function([separator])[0]
 
         docs = []
-        current_doc: list[str] = []
+        # the window of splits in the current chunk with their precomputed lengths, popped from the left
+        # when building the overlap so that each split is measured once and popped in O(1)
+        current_doc: deque[str] = deque()
+        current_lengths: deque[int] = deque()
         total = 0
-        index = 0
-        for d in splits:
-            _len = lengths[index]
+        for d, _len in zip(splits, lengths):
             if total + _len + (separator_len if len(current_doc) > 0 else 0) > self._chunk_size:
                 if total > self._chunk_size:
                     logger.warning(
                         "Created a chunk of size %s, which is longer than the specified %s", total, self._chunk_size
                     )
                 if len(current_doc) > 0:
-                    doc = self._join_docs(current_doc, separator)
+                    doc = self._join_docs(list(current_doc), separator)
                     if doc is not None:
                         docs.append(doc)
                     # Keep on popping if:
                     # - we have a larger chunk than in the chunk overlap
                     # - or if we still have any chunks and the length is long
-                    while total > self._chunk_overlap or (
-                        total + _len + (separator_len if len(current_doc) > 0 else 0) > self._chunk_size and total > 0
-                    ):
-                        total -= self._length_function([current_doc[0]])[0] + (
-                            separator_len if len(current_doc) > 1 else 0
+                    while current_doc and (
+                        total > self._chunk_overlap
+                        or (
+                            total + _len + (separator_len if len(current_doc) > 0 else 0) > self._chunk_size
+                            and total > 0
                         )
-                        current_doc = current_doc[1:]
+                    ):
+                        total -= current_lengths.popleft() + (separator_len if len(current_doc) > 1 else 0)
+                        current_doc.popleft()
             current_doc.append(d)
+            current_lengths.append(_len)
             total += _len + (separator_len if len(current_doc) > 1 else 0)
-            index += 1
-        doc = self._join_docs(current_doc, separator)
+        doc = self._join_docs(list(current_doc), separator)
         if doc is not None:
             docs.append(doc)
         return docs
@@ -156,7 +163,10 @@ class TextSplitter(BaseDocumentTransformer, ABC):
             raise ValueError(
                 "Could not import transformers python package. Please install it with `pip install transformers`."
             )
-        return cls(length_function=lambda x: [_huggingface_tokenizer_length(text) for text in x], **kwargs)
+        return cls(
+            length_function=CachedLengthFunction(lambda x: [_huggingface_tokenizer_length(text) for text in x]),
+            **kwargs,
+        )
 
     def transform_documents(self, documents: Sequence[Document], **kwargs: Any) -> Sequence[Document]:
         """Transform sequence of documents by splitting them."""
@@ -167,6 +177,30 @@ class TextSplitter(BaseDocumentTransformer, ABC):
         raise NotImplementedError
 
 
+class CachedLengthFunction:
+    """Memoize a batched length function.
+
+    Recursive splitting measures the same fragments (separators, re-split pieces) many times. Lengths are cached
+    per text and every call measures all texts it has not seen before in a single batch, which matters when the
+    length function is a tokenizer or a remote token counting call.
+    """
+
+    def __init__(self, length_function: Callable[[list[str]], list[int]], max_size: int = 4096) -> None:
+        self._length_function = length_function
+        self._cache: LRUCache = LRUCache(maxsize=max_size)
+
+    def __call__(self, texts: list[str]) -> list[int]:
+        missing = [text for text in dict.fromkeys(texts) if text not in self._cache]
+        if missing:
+            for text, length in zip(missing, self._length_function(missing)):
+                self._cache[text] = length
+        lengths = [self._cache.get(text) for text in texts]
+        if any(length is None for length in lengths):
+            # the batch was larger than the cache and evicted its own entries
+            return self._length_function(texts)
+        return cast(list[int], lengths)
+
+
 # @dataclass(frozen=True, kw_only=True, slots=True)
 @dataclass(frozen=True)
 class Tokenizer:
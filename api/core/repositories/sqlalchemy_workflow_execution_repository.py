@@ -21,6 +21,7 @@ from models import (
     Account,
     CreatorUserRole,
     EndUser,
+    WorkflowGraphBlob,
     WorkflowRun,
 )
 from models.enums import WorkflowRunTriggeredFrom
@@ -86,6 +87,10 @@ class SQLAlchemyWorkflowExecutionRepository(WorkflowExecutionRepository):
         # Key: execution_id, Value: WorkflowRun (DB model)
         self._execution_cache: dict[str, WorkflowRun] = {}
 
+        # Hash and serialization of the graph of each execution, and the executions whose graph is stored
+        self._graphs: dict[str, tuple[str, str]] = {}
+        self._stored_graphs: set[str] = set()
+
     def _to_domain_model(self, db_model: WorkflowRun) -> WorkflowExecution:
         """
         Convert a database model to a domain model.
@@ -151,7 +156,9 @@ class SQLAlchemyWorkflowExecutionRepository(WorkflowExecutionRepository):
 
         db_model.type = domain_model.workflow_type
         db_model.version = domain_model.workflow_version
-        db_model.graph = json.dumps(domain_model.graph) if domain_model.graph else None
+        # the graph is stored once in `WorkflowGraphBlob` and referenced by its hash
+        db_model.graph = None
+        db_model.graph_hash = self._serialize_graph(domain_model)[0] if domain_model.graph else None
         db_model.inputs = json.dumps(domain_model.inputs) if domain_model.inputs else None
         db_model.outputs = (
             json.dumps(WorkflowRuntimeTypeConverter().to_json_encodable(domain_model.outputs))
@@ -176,6 +183,13 @@ class SQLAlchemyWorkflowExecutionRepository(WorkflowExecutionRepository):
 
         return db_model
 
+    def _serialize_graph(self, execution: WorkflowExecution) -> tuple[str, str]:
+        # the graph of an execution does not change, it is serialized once
+        graph = self._graphs.get(execution.id_)
+        if graph is None:
+            graph = self._graphs[execution.id_] = WorkflowGraphBlob.serialize(execution.graph)
+        return graph
+
     def save(self, execution: WorkflowExecution) -> None:
         """
         Save or update a WorkflowExecution domain entity to the database.
@@ -197,10 +211,16 @@ class SQLAlchemyWorkflowExecutionRepository(WorkflowExecutionRepository):
 
         # Create a new database session
         with self._session_factory() as session:
+            if db_model.graph_hash and execution.id_ not in self._stored_graphs:
+                graph_hash, graph = self._serialize_graph(execution)
+                session.execute(WorkflowGraphBlob.insert_statement(self._tenant_id, graph_hash, graph))
+
             # SQLAlchemy merge intelligently handles both insert and update operations
             # based on the presence of the primary key
             session.merge(db_model)
             session.commit()
+            if db_model.graph_hash:
+                self._stored_graphs.add(execution.id_)
 
             # Update the in-memory cache for faster subsequent lookups
             logger.debug("Updating cache for execution_id: %s", db_model.id)
@@ -163,16 +163,16 @@ class SQLAlchemyWorkflowNodeExecutionRepository(WorkflowNodeExecutionRepository)
         db_model.node_id = domain_model.node_id
         db_model.node_type = domain_model.node_type
         db_model.title = domain_model.title
-        db_model.inputs = (
-            json.dumps(json_converter.to_json_encodable(domain_model.inputs)) if domain_model.inputs else None
+        # large payloads are saved to the storage, the row keeps their preview
+        db_model.set_payload(
+            "inputs", json_converter.to_json_encodable(domain_model.inputs) if domain_model.inputs else None
         )
-        db_model.process_data = (
-            json.dumps(json_converter.to_json_encodable(domain_model.process_data))
-            if domain_model.process_data
-            else None
+        db_model.set_payload(
+            "process_data",
+            json_converter.to_json_encodable(domain_model.process_data) if domain_model.process_data else None,
         )
-        db_model.outputs = (
-            json.dumps(json_converter.to_json_encodable(domain_model.outputs)) if domain_model.outputs else None
+        db_model.set_payload(
+            "outputs", json_converter.to_json_encodable(domain_model.outputs) if domain_model.outputs else None
         )
         db_model.status = domain_model.status
         db_model.error = domain_model.error
@@ -211,6 +211,8 @@ class SQLAlchemyWorkflowNodeExecutionRepository(WorkflowNodeExecutionRepository)
             # based on the presence of the primary key
             session.merge(db_model)
             session.commit()
+            # large payloads are only saved once the row referencing them is committed
+            db_model.save_offloaded_payloads()
 
             # Update the in-memory cache for faster subsequent lookups
             # Only cache if we have a node_execution_id to use as the cache key
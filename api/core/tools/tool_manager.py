@@ -16,7 +16,6 @@ from core.plugin.entities.plugin import ToolProviderID
 from core.plugin.impl.oauth import OAuthHandler
 from core.plugin.impl.tool import PluginToolManager
 from core.tools.__base.tool_provider import ToolProviderController
-from core.tools.__base.tool_runtime import ToolRuntime
 from core.tools.mcp_tool.provider import MCPToolProviderController
 from core.tools.mcp_tool.tool import MCPTool
 from core.tools.plugin_tool.provider import PluginToolProviderController
@@ -52,6 +51,7 @@ from core.tools.entities.tool_entities import (
 )
 from core.tools.errors import ToolProviderNotFoundError
 from core.tools.tool_label_manager import ToolLabelManager
+from core.tools.tool_runtime_cache import ToolRuntimeCache, ToolRuntimeTemplate
 from core.tools.utils.configuration import (
     ToolParameterConfigurationManager,
 )
@@ -170,6 +170,35 @@ class ToolManager:
 
         :return: the tool
         """
+        if provider_type == ToolProviderType.APP:
+            raise NotImplementedError("app provider not implemented")
+        elif provider_type == ToolProviderType.PLUGIN:
+            return cls.get_plugin_provider(provider_id, tenant_id).get_tool(tool_name)
+
+        cache_key = (tenant_id, provider_type.value, provider_id, tool_name, credential_id or "")
+        template = ToolRuntimeCache.get(cache_key, tenant_id)
+        if template is None:
+            tenant_version = ToolRuntimeCache.get_tenant_version(tenant_id)
+            template = cls._resolve_tool_runtime(provider_type, provider_id, tool_name, tenant_id, credential_id)
+            ToolRuntimeCache.set(cache_key, tenant_version, template)
+
+        return cast(
+            Union[BuiltinTool, ApiTool, WorkflowTool, MCPTool],
+            template.fork(tenant_id=tenant_id, invoke_from=invoke_from, tool_invoke_from=tool_invoke_from),
+        )
+
+    @classmethod
+    def _resolve_tool_runtime(
+        cls,
+        provider_type: ToolProviderType,
+        provider_id: str,
+        tool_name: str,
+        tenant_id: str,
+        credential_id: Optional[str] = None,
+    ) -> ToolRuntimeTemplate:
+        """
+        resolve the tool and its decrypted credentials, refreshing the credentials that are about to expire
+        """
         if provider_type == ToolProviderType.BUILT_IN:
             # check if the builtin tool need credentials
             provider_controller = cls.get_builtin_provider(provider_id, tenant_id)
@@ -179,17 +208,7 @@ class ToolManager:
                 raise ToolProviderNotFoundError(f"builtin tool {tool_name} not found")
 
             if not provider_controller.need_credentials:
-                return cast(
-                    BuiltinTool,
-                    builtin_tool.fork_tool_runtime(
-                        runtime=ToolRuntime(
-                            tenant_id=tenant_id,
-                            credentials={},
-                            invoke_from=invoke_from,
-                            tool_invoke_from=tool_invoke_from,
-                        )
-                    ),
-                )
+                return ToolRuntimeTemplate(tool=builtin_tool)
             builtin_provider = None
             if isinstance(provider_controller, PluginToolProviderController):
                 provider_id_entity = ToolProviderID(provider_id)
@@ -283,18 +302,11 @@ class ToolManager:
                 decrypted_credentials = refreshed_credentials.credentials
                 cache.delete()
 
-            return cast(
-                BuiltinTool,
-                builtin_tool.fork_tool_runtime(
-                    runtime=ToolRuntime(
-                        tenant_id=tenant_id,
-                        credentials=dict(decrypted_credentials),
-                        credential_type=CredentialType.of(builtin_provider.credential_type),
-                        runtime_parameters={},
-                        invoke_from=invoke_from,
-                        tool_invoke_from=tool_invoke_from,
-                    )
-                ),
+            return ToolRuntimeTemplate(
+                tool=builtin_tool,
+                credentials=dict(decrypted_credentials),
+                credential_type=CredentialType.of(builtin_provider.credential_type),
+                expires_at=builtin_provider.expires_at,
             )
 
         elif provider_type == ToolProviderType.API:
@@ -303,16 +315,8 @@ class ToolManager:
                 tenant_id=tenant_id,
                 controller=api_provider,
             )
-            return cast(
-                ApiTool,
-                api_provider.get_tool(tool_name).fork_tool_runtime(
-                    runtime=ToolRuntime(
-                        tenant_id=tenant_id,
-                        credentials=encrypter.decrypt(credentials),
-                        invoke_from=invoke_from,
-                        tool_invoke_from=tool_invoke_from,
-                    )
-                ),
+            return ToolRuntimeTemplate(
+                tool=api_provider.get_tool(tool_name), credentials=encrypter.decrypt(credentials)
             )
         elif provider_type == ToolProviderType.WORKFLOW:
             workflow_provider = (
@@ -329,23 +333,11 @@ class ToolManager:
             if controller_tools is None or len(controller_tools) == 0:
                 raise ToolProviderNotFoundError(f"workflow provider {provider_id} not found")
 
-            return cast(
-                WorkflowTool,
-                controller.get_tools(tenant_id=workflow_provider.tenant_id)[0].fork_tool_runtime(
-                    runtime=ToolRuntime(
-                        tenant_id=tenant_id,
-                        credentials={},
-                        invoke_from=invoke_from,
-                        tool_invoke_from=tool_invoke_from,
-                    )
-                ),
-            )
-        elif provider_type == ToolProviderType.APP:
-            raise NotImplementedError("app provider not implemented")
-        elif provider_type == ToolProviderType.PLUGIN:
-            return cls.get_plugin_provider(provider_id, tenant_id).get_tool(tool_name)
+            return ToolRuntimeTemplate(tool=controller.get_tools(tenant_id=workflow_provider.tenant_id)[0])
         elif provider_type == ToolProviderType.MCP:
-            return cls.get_mcp_provider_controller(tenant_id, provider_id).get_tool(tool_name)
+            return ToolRuntimeTemplate(
+                tool=cls.get_mcp_provider_controller(tenant_id, provider_id).get_tool(tool_name), with_invocation=False
+            )
         else:
             raise ToolProviderNotFoundError(f"provider type {provider_type.value} not found")
 
@@ -0,0 +1,106 @@
+import threading
+import time
+from collections.abc import Hashable, Mapping
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from cachetools import TTLCache
+
+from configs import dify_config
+from core.app.entities.app_invoke_entities import InvokeFrom
+from core.tools.__base.tool import Tool
+from core.tools.__base.tool_runtime import ToolRuntime
+from core.tools.entities.tool_entities import CredentialType, ToolInvokeFrom
+from extensions.ext_redis import redis_client
+
+
+@dataclass(frozen=True)
+class ToolRuntimeTemplate:
+    """
+    A tool resolved from its provider with its decrypted credentials, from which every invocation forks its own
+    runtime.
+    """
+
+    tool: Tool
+    credentials: Mapping[str, Any] = field(default_factory=dict)
+    credential_type: Optional[CredentialType] = None
+    # when the credentials expire, -1 if they never do
+    expires_at: int = -1
+    # whether the runtime records where the tool is invoked from, MCP tools only carry their tenant
+    with_invocation: bool = True
+
+    def is_expired(self) -> bool:
+        # credentials are refreshed a minute before they expire
+        return self.expires_at != -1 and (self.expires_at - 60) < int(time.time())
+
+    def fork(self, tenant_id: str, invoke_from: InvokeFrom, tool_invoke_from: ToolInvokeFrom) -> Tool:
+        if not self.with_invocation:
+            return self.tool.fork_tool_runtime(runtime=ToolRuntime(tenant_id=tenant_id))
+
+        runtime = ToolRuntime(
+            tenant_id=tenant_id,
+            credentials=dict(self.credentials),
+            invoke_from=invoke_from,
+            tool_invoke_from=tool_invoke_from,
+        )
+        if self.credential_type is not None:
+            runtime.credential_type = self.credential_type
+        return self.tool.fork_tool_runtime(runtime=runtime)
+
+
+class ToolRuntimeCache:
+    """
+    Per-process cache of resolved tool runtime templates, so that calling a tool again skips its provider lookup and
+    credential decryption.
+
+    The tool manage services call `invalidate_tenant` when a provider or its credentials change. Templates whose
+    credentials are about to expire are resolved again.
+    """
+
+    _cache: TTLCache = TTLCache(
+        maxsize=dify_config.TOOL_RUNTIME_CACHE_SIZE, ttl=max(dify_config.TOOL_RUNTIME_CACHE_TTL, 1)
+    )
+    _cache_lock = threading.Lock()
+
+    @staticmethod
+    def _version_key(tenant_id: str) -> str:
+        return f"tool_runtime_cache:tenant_version:{tenant_id}"
+
+    @classmethod
+    def get_tenant_version(cls, tenant_id: str) -> Optional[bytes]:
+        """Read before resolving what gets cached, so a change committed meanwhile retires the entry."""
+        version: Optional[bytes] = redis_client.get(cls._version_key(tenant_id))
+        return version
+
+    @classmethod
+    def get(cls, key: Hashable, tenant_id: str) -> Optional[ToolRuntimeTemplate]:
+        if dify_config.TOOL_RUNTIME_CACHE_TTL <= 0:
+            return None
+        with cls._cache_lock:
+            entry = cls._cache.get(key)
+        if entry is None:
+            return None
+        version = entry[0]
+        template: ToolRuntimeTemplate = entry[1]
+        if template.is_expired() or cls.get_tenant_version(tenant_id) != version:
+            return None
+        return template
+
+    @classmethod
+    def set(cls, key: Hashable, tenant_version: Optional[bytes], template: ToolRuntimeTemplate) -> None:
+        if dify_config.TOOL_RUNTIME_CACHE_TTL <= 0:
+            return
+        with cls._cache_lock:
+            cls._cache[key] = (tenant_version, template)
+
+    @classmethod
+    def invalidate_tenant(cls, tenant_id: str) -> None:
+        key = cls._version_key(tenant_id)
+        redis_client.incr(key)
+        # entries live for minutes, the version only has to outlive them
+        redis_client.expire(key, 86400)
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._cache_lock:
+            cls._cache.clear()
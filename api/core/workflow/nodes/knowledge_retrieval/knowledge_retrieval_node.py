@@ -1,7 +1,6 @@
 import json
 import logging
 import re
-import time
 from collections import defaultdict
 from collections.abc import Mapping, Sequence
 from typing import TYPE_CHECKING, Any, Optional, cast
@@ -53,10 +52,9 @@ from core.workflow.nodes.llm.entities import LLMNodeChatModelMessage, LLMNodeCom
 from core.workflow.nodes.llm.file_saver import FileSaverImpl, LLMFileSaver
 from core.workflow.nodes.llm.node import LLMNode
 from extensions.ext_database import db
-from extensions.ext_redis import redis_client
 from libs.json_in_md_parser import parse_and_check_json_markdown
 from models.dataset import Dataset, DatasetMetadata, Document, RateLimitLog
-from services.feature_service import FeatureService
+from services.feature_service import FeatureService, knowledge_rate_limiter
 
 from .entities import KnowledgeRetrievalNodeData
 from .exc import (
@@ -169,12 +167,7 @@ class KnowledgeRetrievalNode(BaseNode):
         # check rate limit
         knowledge_rate_limit = FeatureService.get_knowledge_rate_limit(self.tenant_id)
         if knowledge_rate_limit.enabled:
-            current_time = int(time.time() * 1000)
-            key = f"rate_limit_{self.tenant_id}"
-            redis_client.zadd(key, {current_time: current_time})
-            redis_client.zremrangebyscore(key, 0, current_time - 60000)
-            request_count = redis_client.zcard(key)
-            if request_count > knowledge_rate_limit.limit:
+            if not knowledge_rate_limiter.acquire(self.tenant_id, knowledge_rate_limit.limit):
                 with Session(db.engine) as session:
                     # add ratelimit record
                     rate_limit_log = RateLimitLog(
@@ -9,6 +9,7 @@ from configs import dify_config
 from core.app.entities.app_invoke_entities import ModelConfigWithCredentialsEntity
 from core.entities.provider_entities import QuotaUnit
 from core.file.models import File
+from core.helper.provider_quota_ledger import ProviderQuotaLedger
 from core.memory.token_buffer_memory import TokenBufferMemory
 from core.model_manager import ModelInstance, ModelManager
 from core.model_runtime.entities.llm_entities import LLMUsage
@@ -117,9 +118,11 @@ def deduct_llm_quota(tenant_id: str, model_instance: ModelInstance, usage: LLMUs
     system_configuration = provider_configuration.system_configuration
 
     quota_unit = None
+    current_quota_configuration = None
     for quota_configuration in system_configuration.quota_configurations:
         if quota_configuration.quota_type == system_configuration.current_quota_type:
             quota_unit = quota_configuration.quota_unit
+            current_quota_configuration = quota_configuration
 
             if quota_configuration.quota_limit == -1:
                 return
@@ -136,6 +139,17 @@ def deduct_llm_quota(tenant_id: str, model_instance: ModelInstance, usage: LLMUs
             used_quota = 1
 
     if used_quota is not None and system_configuration.current_quota_type is not None:
+        if dify_config.ENABLE_PROVIDER_QUOTA_LEDGER and current_quota_configuration is not None:
+            ProviderQuotaLedger.deduct(
+                tenant_id=tenant_id,
+                provider_name=ModelProviderID(model_instance.provider).provider_name,
+                quota_type=system_configuration.current_quota_type.value,
+                amount=used_quota,
+                quota_used=current_quota_configuration.quota_used - current_quota_configuration.quota_pending,
+                quota_limit=current_quota_configuration.quota_limit,
+            )
+            return
+
         with Session(db.engine) as session:
             stmt = (
                 update(Provider)
@@ -10,6 +10,7 @@ from sqlalchemy.orm import Session
 from configs import dify_config
 from core.app.entities.app_invoke_entities import AgentChatAppGenerateEntity, ChatAppGenerateEntity
 from core.entities.provider_entities import QuotaUnit, SystemConfiguration
+from core.helper.provider_quota_ledger import ProviderQuotaLedger
 from core.plugin.entities.plugin import ModelProviderID
 from events.message_event import message_was_created
 from extensions.ext_database import db
@@ -106,7 +107,14 @@ def handle(sender: Message, **kwargs):
             model_name=model_config.model,
         )
 
-        if used_quota is not None:
+        if used_quota is not None and dify_config.ENABLE_PROVIDER_QUOTA_LEDGER:
+            _deduct_from_ledger(
+                tenant_id=tenant_id,
+                provider_name=ModelProviderID(model_config.provider).provider_name,
+                system_configuration=system_configuration,
+                used_quota=used_quota,
+            )
+        elif used_quota is not None:
             quota_update = _ProviderUpdateOperation(
                 filters=_ProviderUpdateFilters(
                     tenant_id=tenant_id,
@@ -181,6 +189,30 @@ def _calculate_quota_usage(
         return None
 
 
+def _deduct_from_ledger(
+    *, tenant_id: str, provider_name: str, system_configuration: SystemConfiguration, used_quota: int
+) -> None:
+    """Record the quota usage in the quota ledger, reconciled into the Provider record later."""
+    for quota_configuration in system_configuration.quota_configurations:
+        if quota_configuration.quota_type != system_configuration.current_quota_type:
+            continue
+        if not ProviderQuotaLedger.deduct(
+            tenant_id=tenant_id,
+            provider_name=provider_name,
+            quota_type=quota_configuration.quota_type.value,
+            amount=used_quota,
+            quota_used=quota_configuration.quota_used - quota_configuration.quota_pending,
+            quota_limit=quota_configuration.quota_limit,
+        ):
+            logger.warning(
+                "Quota of provider %s of tenant %s is exhausted, usage %s not deducted",
+                provider_name,
+                tenant_id,
+                used_quota,
+            )
+        return
+
+
 def _execute_provider_updates(updates_to_perform: list[_ProviderUpdateOperation]):
     """Execute all Provider updates in a single transaction."""
     if not updates_to_perform:
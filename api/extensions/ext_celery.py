@@ -119,6 +119,18 @@ def init_app(app: DifyApp) -> Celery:
             "task": "schedule.check_upgradable_plugin_task.check_upgradable_plugin_task",
             "schedule": crontab(minute="*/15"),
         }
+    if dify_config.ENABLE_APP_STATISTIC_ROLLUP_TASK:
+        imports.append("schedule.app_statistic_rollup_task")
+        beat_schedule["app_statistic_rollup_task"] = {
+            "task": "schedule.app_statistic_rollup_task.app_statistic_rollup_task",
+            "schedule": timedelta(minutes=dify_config.APP_STATISTIC_ROLLUP_INTERVAL),
+        }
+    if dify_config.ENABLE_PROVIDER_QUOTA_LEDGER:
+        imports.append("schedule.provider_quota_reconcile_task")
+        beat_schedule["provider_quota_reconcile_task"] = {
+            "task": "schedule.provider_quota_reconcile_task.provider_quota_reconcile_task",
+            "schedule": timedelta(seconds=dify_config.PROVIDER_QUOTA_RECONCILE_INTERVAL),
+        }
 
     celery_app.conf.update(beat_schedule=beat_schedule, imports=imports)
 
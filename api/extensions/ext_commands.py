@@ -8,12 +8,15 @@ def init_app(app: DifyApp):
         clear_orphaned_file_records,
         convert_to_agent_apps,
         create_tenant,
+        dedupe_workflow_run_graphs,
         extract_plugins,
         extract_unique_plugins,
         fix_app_site_missing,
         install_plugins,
+        migrate_credentials_to_envelope_encryption,
         migrate_data_for_plugin,
         old_metadata_migration,
+        rebuild_conversation_search_index,
         remove_orphaned_files_on_storage,
         reset_email,
         reset_encrypt_key_pair,
@@ -42,6 +45,9 @@ def init_app(app: DifyApp):
         clear_orphaned_file_records,
         remove_orphaned_files_on_storage,
         setup_system_tool_oauth_client,
+        rebuild_conversation_search_index,
+        migrate_credentials_to_envelope_encryption,
+        dedupe_workflow_run_graphs,
     ]
     for cmd in cmds_to_register:
         app.cli.add_command(cmd)
@@ -113,6 +113,17 @@ workflow_run_node_execution_fields = {
     "finished_at": TimestampField,
 }
 
+# Lists of executions show the preview of the payloads saved to the storage, which the execution detail returns.
+workflow_run_node_execution_preview_fields = dict(
+    workflow_run_node_execution_fields,
+    inputs=fields.Raw(attribute="inputs_preview"),
+    process_data=fields.Raw(attribute="process_data_preview"),
+    outputs=fields.Raw(attribute="outputs_preview"),
+    inputs_truncated=fields.Boolean,
+    process_data_truncated=fields.Boolean,
+    outputs_truncated=fields.Boolean,
+)
+
 workflow_run_node_execution_list_fields = {
-    "data": fields.List(fields.Nested(workflow_run_node_execution_fields)),
+    "data": fields.List(fields.Nested(workflow_run_node_execution_preview_fields)),
 }
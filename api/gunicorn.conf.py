@@ -0,0 +1,8 @@
+# Gunicorn loads this file from the working directory, command line options take precedence.
+
+
+def worker_exit(server, worker):
+    # close pooled MCP sessions while the worker can still join the threads of their transports
+    from core.mcp.session_pool import close_mcp_session_pool
+
+    close_mcp_session_pool()
@@ -0,0 +1,144 @@
+"""
+Rate limiters on Redis, each checking and updating its state in a single round trip.
+
+The limits are enforced by Lua scripts, which Redis runs atomically, so concurrent requests can neither read a stale
+count nor be admitted past the limit between a check and an update.
+"""
+
+import time
+import uuid
+from typing import Any
+
+from extensions.ext_redis import redis_client
+
+# KEYS[1]: sorted set of the admitted requests scored by their time in milliseconds
+# ARGV: now, window in milliseconds, limit, member of the request
+_SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now, ARGV[4])
+redis.call('PEXPIRE', KEYS[1], window)
+return 1
+"""
+
+# KEYS[1]: hash of the tokens left and the time they were counted at in milliseconds
+# ARGV: now, capacity, tokens refilled per second, tokens to take
+_TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local rate = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return allowed
+"""
+
+# KEYS[1]: sorted set of the leases scored by their expiry in milliseconds
+# ARGV: now, lease in milliseconds, limit, holder of the lease
+_CONCURRENCY_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local lease = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+if not redis.call('ZSCORE', KEYS[1], ARGV[4]) and redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now + lease, ARGV[4])
+redis.call('PEXPIRE', KEYS[1], lease)
+return 1
+"""
+
+
+class _ScriptLimiter:
+    _scripts: dict[str, Any] = {}
+
+    def __init__(self, namespace: str) -> None:
+        self.namespace = namespace
+
+    def _key(self, identifier: str) -> str:
+        return f"{self.namespace}:{identifier}"
+
+    @classmethod
+    def _script(cls, source: str) -> Any:
+        # registered on first use, the Redis client is not initialized when this module is imported
+        script = cls._scripts.get(source)
+        if script is None:
+            script = cls._scripts[source] = redis_client.register_script(source)
+        return script
+
+    @staticmethod
+    def _now_ms() -> int:
+        return int(time.time() * 1000)
+
+
+class SlidingWindowLimiter(_ScriptLimiter):
+    """Admit at most `limit` requests of an identifier within any `window` seconds."""
+
+    def __init__(self, namespace: str, window: float) -> None:
+        super().__init__(namespace)
+        self.window_ms = int(window * 1000)
+
+    def acquire(self, identifier: str, limit: int) -> bool:
+        """Record a request, unless `limit` requests were already admitted in the window."""
+        result = self._script(_SLIDING_WINDOW_SCRIPT)(
+            keys=[self._key(identifier)],
+            args=[self._now_ms(), self.window_ms, limit, uuid.uuid4().hex],
+        )
+        return bool(result)
+
+
+class TokenBucketLimiter(_ScriptLimiter):
+    """Admit requests while an identifier has tokens left, its bucket holds `capacity` tokens refilled at `rate`/s."""
+
+    def __init__(self, namespace: str, capacity: float, rate: float) -> None:
+        super().__init__(namespace)
+        self.capacity = capacity
+        self.rate = rate
+
+    def acquire(self, identifier: str, cost: float = 1) -> bool:
+        """Take `cost` tokens from the bucket, nothing is taken if not enough are left."""
+        result = self._script(_TOKEN_BUCKET_SCRIPT)(
+            keys=[self._key(identifier)],
+            args=[self._now_ms(), self.capacity, self.rate, cost],
+        )
+        return bool(result)
+
+
+class ConcurrencyLimiter(_ScriptLimiter):
+    """
+    Admit at most `limit` requests of an identifier at once.
+
+    Each admitted request holds a slot leased for `lease` seconds, a slot whose holder died without releasing it is
+    freed once its lease expires. Long running holders renew their lease by acquiring the slot again.
+    """
+
+    def __init__(self, namespace: str, lease: float) -> None:
+        super().__init__(namespace)
+        self.lease_ms = int(lease * 1000)
+
+    def acquire(self, identifier: str, holder: str, limit: int) -> bool:
+        """Take a slot for `holder`, or renew its lease if it holds one already."""
+        result = self._script(_CONCURRENCY_ACQUIRE_SCRIPT)(
+            keys=[self._key(identifier)],
+            args=[self._now_ms(), self.lease_ms, limit, holder],
+        )
+        return bool(result)
+
+    def release(self, identifier: str, holder: str) -> None:
+        redis_client.zrem(self._key(identifier), holder)
+
+    def count(self, identifier: str) -> int:
+        """Return the number of slots held, leases expired but not purged yet included."""
+        return int(redis_client.zcard(self._key(identifier)))
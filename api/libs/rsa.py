@@ -1,7 +1,9 @@
 import hashlib
 import os
-from typing import Union
+import threading
+from typing import Optional, Union
 
+from cachetools import TTLCache
 from Crypto.Cipher import AES
 from Crypto.PublicKey import RSA
 from Crypto.Random import get_random_bytes
@@ -10,6 +12,22 @@ from extensions.ext_redis import redis_client
 from extensions.ext_storage import storage
 from libs import gmpy2_pkcs10aep_cipher
 
+# imported private keys, importing a PEM and building its cipher costs more than most decryptions
+_decodings: TTLCache[str, tuple[RSA.RsaKey, "TenantCipher"]] = TTLCache(maxsize=1024, ttl=120)
+_decodings_lock = threading.Lock()
+
+
+def _private_key_path(tenant_id: str) -> str:
+    return os.path.join("privkeys", tenant_id, "private.pem")
+
+
+def _data_key_path(tenant_id: str) -> str:
+    return os.path.join("privkeys", tenant_id, "data_key.bin")
+
+
+def _private_key_cache_key(tenant_id: str) -> str:
+    return f"tenant_privkey:{hashlib.sha3_256(_private_key_path(tenant_id).encode()).hexdigest()}"
+
 
 def generate_key_pair(tenant_id: str) -> str:
     private_key = RSA.generate(2048)
@@ -18,14 +36,68 @@ def generate_key_pair(tenant_id: str) -> str:
     pem_private = private_key.export_key()
     pem_public = public_key.export_key()
 
-    filepath = os.path.join("privkeys", tenant_id, "private.pem")
+    filepath = _private_key_path(tenant_id)
 
     storage.save(filepath, pem_private)
 
+    # the data key was wrapped with the previous key pair
+    if storage.exists(_data_key_path(tenant_id)):
+        storage.delete(_data_key_path(tenant_id))
+    redis_client.delete(_private_key_cache_key(tenant_id))
+    with _decodings_lock:
+        _decodings.pop(tenant_id, None)
+
     return pem_public.decode()
 
 
 prefix_hybrid = b"HYBRID:"
+prefix_envelope = b"ENVELOPE:"
+
+
+class TenantCipher:
+    """
+    OAEP cipher of a tenant private key, which also unwraps the tenant data key.
+
+    The data key is an AES-256 key stored wrapped with the tenant RSA key, values encrypted with it in envelope mode
+    only cost a symmetric decryption once the key was unwrapped.
+    """
+
+    def __init__(self, tenant_id: str, rsa_key: RSA.RsaKey) -> None:
+        self.tenant_id = tenant_id
+        self._cipher = gmpy2_pkcs10aep_cipher.new(rsa_key)
+        self._data_key: Optional[bytes] = None
+        self._lock = threading.Lock()
+
+    def encrypt(self, message: bytes) -> bytes:
+        encrypted: bytes = self._cipher.encrypt(message)
+        return encrypted
+
+    def decrypt(self, ciphertext: bytes) -> bytes:
+        decrypted: bytes = self._cipher.decrypt(ciphertext)
+        return decrypted
+
+    @property
+    def data_key(self) -> bytes:
+        """The unwrapped data key, see `get_data_key` to create it."""
+        if self._data_key is None:
+            try:
+                wrapped = storage.load(_data_key_path(self.tenant_id))
+            except FileNotFoundError:
+                raise DataKeyNotFoundError(f"Data key not found, tenant_id: {self.tenant_id}")
+            self._data_key = self.decrypt(wrapped)
+        return self._data_key
+
+    def get_or_create_data_key(self) -> bytes:
+        try:
+            return self.data_key
+        except DataKeyNotFoundError:
+            pass
+
+        with self._lock, redis_client.lock(f"tenant_data_key_lock:{self.tenant_id}", timeout=30, blocking_timeout=30):
+            # another process may have created it while we waited
+            if not storage.exists(_data_key_path(self.tenant_id)):
+                storage.save(_data_key_path(self.tenant_id), self.encrypt(get_random_bytes(32)))
+            return self.data_key
 
 
 def encrypt(text: str, public_key: Union[str, bytes]) -> bytes:
@@ -47,10 +119,15 @@ def encrypt(text: str, public_key: Union[str, bytes]) -> bytes:
     return prefix_hybrid + encrypted_data
 
 
-def get_decrypt_decoding(tenant_id: str) -> tuple[RSA.RsaKey, object]:
-    filepath = os.path.join("privkeys", tenant_id, "private.pem")
+def get_decrypt_decoding(tenant_id: str) -> tuple[RSA.RsaKey, TenantCipher]:
+    with _decodings_lock:
+        decoding = _decodings.get(tenant_id)
+    if decoding is not None:
+        return decoding
+
+    filepath = _private_key_path(tenant_id)
 
-    cache_key = f"tenant_privkey:{hashlib.sha3_256(filepath.encode()).hexdigest()}"
+    cache_key = _private_key_cache_key(tenant_id)
     private_key = redis_client.get(cache_key)
     if not private_key:
         try:
@@ -61,13 +138,37 @@ def get_decrypt_decoding(tenant_id: str) -> tuple[RSA.RsaKey, object]:
         redis_client.setex(cache_key, 120, private_key)
 
     rsa_key = RSA.import_key(private_key)
-    cipher_rsa = gmpy2_pkcs10aep_cipher.new(rsa_key)
+    cipher_rsa = TenantCipher(tenant_id, rsa_key)
+
+    with _decodings_lock:
+        # a concurrent import of the same key just loses the race
+        decoding = _decodings.setdefault(tenant_id, (rsa_key, cipher_rsa))
+    return decoding
+
+
+def encrypt_with_data_key(text: str, tenant_id: str) -> bytes:
+    """Encrypt `text` with AES-GCM under the tenant data key, which is created on first use."""
+    _, cipher_rsa = get_decrypt_decoding(tenant_id)
+    data_key = cipher_rsa.get_or_create_data_key()
+
+    nonce = get_random_bytes(12)
+    cipher_aes = AES.new(data_key, AES.MODE_GCM, nonce=nonce)
+    ciphertext, tag = cipher_aes.encrypt_and_digest(text.encode())
 
-    return rsa_key, cipher_rsa
+    return prefix_envelope + nonce + tag + ciphertext
 
 
 def decrypt_token_with_decoding(encrypted_text: bytes, rsa_key: RSA.RsaKey, cipher_rsa) -> str:
-    if encrypted_text.startswith(prefix_hybrid):
+    if encrypted_text.startswith(prefix_envelope):
+        encrypted_text = encrypted_text[len(prefix_envelope) :]
+
+        nonce = encrypted_text[:12]
+        tag = encrypted_text[12:28]
+        ciphertext = encrypted_text[28:]
+
+        cipher_gcm = AES.new(cipher_rsa.data_key, AES.MODE_GCM, nonce=nonce)
+        decrypted_text = cipher_gcm.decrypt_and_verify(ciphertext, tag)
+    elif encrypted_text.startswith(prefix_hybrid):
         encrypted_text = encrypted_text[len(prefix_hybrid) :]
 
         enc_aes_key = encrypted_text[: rsa_key.size_in_bytes()]
@@ -93,3 +194,7 @@ def decrypt(encrypted_text: bytes, tenant_id: str) -> str:
 
 class PrivkeyNotFoundError(Exception):
     pass
+
+
+class DataKeyNotFoundError(Exception):
+    pass
@@ -0,0 +1,156 @@
+import json
+import logging
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Optional
+
+from cachetools import TTLCache
+
+from extensions.ext_redis import redis_client
+
+logger = logging.getLogger(__name__)
+
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="tiered_cache_refresh")
+
+
+class TieredCache:
+    """
+    Read-through cache of JSON values loaded from a slow source, e.g. a remote API.
+
+    Values are kept in a small per-process tier for `local_ttl` seconds and in Redis, shared by all processes, for
+    `stale_ttl` seconds. A value younger than `ttl` is served as is. An older one is still served while a single
+    background refresh replaces it, so callers never wait on a slow source once a value was loaded. Concurrent misses
+    of a key in one process share a single load.
+
+    `invalidate` drops the Redis value and the local value of the calling process, other processes keep their local
+    value for at most `local_ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        loader: Callable[[str], Any],
+        ttl: int,
+        stale_ttl: int,
+        local_ttl: int,
+        local_maxsize: int = 1024,
+    ) -> None:
+        self.namespace = namespace
+        self.loader = loader
+        self.ttl = ttl
+        self.stale_ttl = max(stale_ttl, ttl)
+        self._local: Optional[TTLCache] = TTLCache(maxsize=local_maxsize, ttl=local_ttl) if local_ttl > 0 else None
+        self._lock = threading.Lock()
+        self._loads: dict[str, Future] = {}
+
+    def get(self, key: str) -> Any:
+        if self.ttl <= 0:
+            return self.loader(key)
+
+        entry = self._get_entry(key)
+        if entry is not None:
+            fetched_at, value = entry
+            age = time.time() - fetched_at
+            if age < self.ttl:
+                return value
+            if age < self.stale_ttl:
+                self._refresh_in_background(key)
+                return value
+
+        return self._load(key)
+
+    def invalidate(self, key: str) -> None:
+        if self._local is not None:
+            with self._lock:
+                self._local.pop(key, None)
+        # a load that started before the change must not store what it read
+        redis_client.set(f"{self._redis_key(key)}:invalidated_at", time.time(), ex=self.stale_ttl)
+        redis_client.delete(self._redis_key(key))
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def _get_entry(self, key: str) -> Optional[tuple[float, Any]]:
+        if self._local is not None:
+            with self._lock:
+                entry: Optional[tuple[float, Any]] = self._local.get(key)
+            if entry is not None:
+                return entry
+
+        try:
+            cached = redis_client.get(self._redis_key(key))
+        except Exception:
+            logger.exception("Failed to read %s from redis", self._redis_key(key))
+            return None
+        if cached is None:
+            return None
+
+        data = json.loads(cached)
+        entry = (data["fetched_at"], data["value"])
+        if self._local is not None:
+            with self._lock:
+                self._local[key] = entry
+        return entry
+
+    def _store(self, key: str, fetched_at: float, value: Any) -> None:
+        try:
+            invalidated_at = redis_client.get(f"{self._redis_key(key)}:invalidated_at")
+            if invalidated_at is not None and float(invalidated_at) >= fetched_at:
+                return
+        except Exception:
+            logger.exception("Failed to read the invalidation of %s from redis", self._redis_key(key))
+            return
+
+        if self._local is not None:
+            with self._lock:
+                self._local[key] = (fetched_at, value)
+        try:
+            redis_client.set(
+                self._redis_key(key), json.dumps({"fetched_at": fetched_at, "value": value}), ex=self.stale_ttl
+            )
+        except Exception:
+            logger.exception("Failed to write %s to redis", self._redis_key(key))
+
+    def _load(self, key: str) -> Any:
+        with self._lock:
+            load = self._loads.get(key)
+            leader = load is None
+            if load is None:
+                load = self._loads[key] = Future()
+        if not leader:
+            return load.result()
+
+        try:
+            fetched_at = time.time()
+            value = self.loader(key)
+            self._store(key, fetched_at, value)
+            load.set_result(value)
+            return value
+        except BaseException as e:
+            load.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._loads.pop(key, None)
+
+    def _refresh_in_background(self, key: str) -> None:
+        with self._lock:
+            if key in self._loads:
+                return
+        try:
+            # one process refreshes a stale value, the others keep serving it meanwhile
+            if not redis_client.set(f"{self._redis_key(key)}:refreshing", 1, nx=True, ex=max(self.ttl, 30)):
+                return
+            _refresh_executor.submit(self._refresh, key)
+        except Exception:
+            logger.exception("Failed to schedule the refresh of %s", self._redis_key(key))
+
+    def _refresh(self, key: str) -> None:
+        try:
+            self._load(key)
+        except Exception:
+            logger.warning("Failed to refresh %s, serving the stale value", self._redis_key(key), exc_info=True)
+        finally:
+            redis_client.delete(f"{self._redis_key(key)}:refreshing")
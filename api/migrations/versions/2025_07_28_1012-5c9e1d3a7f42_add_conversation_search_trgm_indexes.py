@@ -0,0 +1,52 @@
+"""add trigram indexes for the conversation log keyword search
+
+Revision ID: 5c9e1d3a7f42
+Revises: 8bcc02c9bd07
+Create Date: 2025-07-28 10:12:31.517203
+
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "5c9e1d3a7f42"
+down_revision = "8bcc02c9bd07"
+branch_labels = None
+depends_on = None
+
+
+_INDEXES = [
+    ("message_query_trgm_idx", "messages", "query"),
+    ("message_answer_trgm_idx", "messages", "answer"),
+    ("conversation_name_trgm_idx", "conversations", "name"),
+    ("conversation_introduction_trgm_idx", "conversations", "introduction"),
+    ("end_user_session_id_trgm_idx", "end_users", "session_id"),
+]
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # `CREATE INDEX CONCURRENTLY` cannot run within a transaction, so use the `autocommit_block`
+    # context manager to wrap the index creation statements. Building over a large `messages` table
+    # takes a while but does not block writes; an interrupted build leaves an invalid index behind,
+    # which `flask rebuild-conversation-search-index` rebuilds.
+    with op.get_context().autocommit_block():
+        for index_name, table_name, column_name in _INDEXES:
+            op.create_index(
+                index_name,
+                table_name,
+                [column_name],
+                unique=False,
+                postgresql_using="gin",
+                postgresql_ops={column_name: "gin_trgm_ops"},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for index_name, table_name, _ in reversed(_INDEXES):
+            op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
@@ -63,12 +63,14 @@ from .provider import (
     ProviderModel,
     ProviderModelSetting,
     ProviderOrder,
+    ProviderQuotaReconcileBatch,
     ProviderQuotaType,
     ProviderType,
     TenantDefaultModel,
     TenantPreferredModelProvider,
 )
 from .source import DataSourceApiKeyAuthBinding, DataSourceOauthBinding
+from .statistic import AppStatisticHourly, AppStatisticHourlyMember, AppStatisticMemberKind, StatisticRollupWatermark
 from .task import CeleryTask, CeleryTaskSet
 from .tools import (
     ApiToolProvider,
@@ -85,6 +87,7 @@ from .workflow import (
     Workflow,
     WorkflowAppLog,
     WorkflowAppLogCreatedFrom,
+    WorkflowGraphBlob,
     WorkflowNodeExecutionModel,
     WorkflowNodeExecutionTriggeredFrom,
     WorkflowRun,
@@ -107,6 +110,9 @@ __all__ = [
     "AppMCPServer",  # Added
     "AppMode",
     "AppModelConfig",
+    "AppStatisticHourly",
+    "AppStatisticHourlyMember",
+    "AppStatisticMemberKind",
     "BuiltinToolProvider",
     "CeleryTask",
     "CeleryTaskSet",
@@ -146,11 +152,13 @@ __all__ = [
     "ProviderModel",
     "ProviderModelSetting",
     "ProviderOrder",
+    "ProviderQuotaReconcileBatch",
     "ProviderQuotaType",
     "ProviderType",
     "RecommendedApp",
     "SavedMessage",
     "Site",
+    "StatisticRollupWatermark",
     "Tag",
     "TagBinding",
     "Tenant",
@@ -171,6 +179,7 @@ __all__ = [
     "Workflow",
     "WorkflowAppLog",
     "WorkflowAppLogCreatedFrom",
+    "WorkflowGraphBlob",
     "WorkflowNodeExecutionModel",
     "WorkflowNodeExecutionTriggeredFrom",
     "WorkflowRun",
@@ -612,6 +612,13 @@ class Conversation(Base):
     __table_args__ = (
         db.PrimaryKeyConstraint("id", name="conversation_pkey"),
         db.Index("conversation_app_from_user_idx", "app_id", "from_source", "from_end_user_id"),
+        db.Index("conversation_name_trgm_idx", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        db.Index(
+            "conversation_introduction_trgm_idx",
+            "introduction",
+            postgresql_using="gin",
+            postgresql_ops={"introduction": "gin_trgm_ops"},
+        ),
     )
 
     id: Mapped[str] = mapped_column(StringUUID, server_default=db.text("uuid_generate_v4()"))
@@ -692,8 +699,24 @@ class Conversation(Base):
 
     @property
     def model_config(self):
-        model_config = {}
         app_model_config: Optional[AppModelConfig] = None
+        if self.uses_app_model_config:
+            app_model_config = (
+                db.session.query(AppModelConfig).where(AppModelConfig.id == self.app_model_config_id).first()
+            )
+
+        return self.build_model_config(app_model_config.to_dict() if app_model_config else None)
+
+    @property
+    def uses_app_model_config(self) -> bool:
+        return self.mode != AppMode.ADVANCED_CHAT.value and not self.override_model_configs
+
+    def build_model_config(self, app_model_config_dict: Optional[dict]) -> dict:
+        """
+        Build the model config, `app_model_config_dict` is the stored app model config as a dict, only read when
+        `uses_app_model_config`.
+        """
+        model_config: dict[str, Any] = {}
 
         if self.mode == AppMode.ADVANCED_CHAT.value:
             if self.override_model_configs:
@@ -709,12 +732,8 @@ class Conversation(Base):
                     model_config = app_model_config.to_dict()
                 else:
                     model_config["configs"] = override_model_configs
-            else:
-                app_model_config = (
-                    db.session.query(AppModelConfig).where(AppModelConfig.id == self.app_model_config_id).first()
-                )
-                if app_model_config:
-                    model_config = app_model_config.to_dict()
+            elif app_model_config_dict:
+                model_config = dict(app_model_config_dict)
 
         model_config["model_id"] = self.model_id
         model_config["provider"] = self.model_provider
@@ -890,6 +909,8 @@ class Message(Base):
         Index("message_account_idx", "app_id", "from_source", "from_account_id"),
         Index("message_workflow_run_id_idx", "conversation_id", "workflow_run_id"),
         Index("message_created_at_idx", "created_at"),
+        Index("message_query_trgm_idx", "query", postgresql_using="gin", postgresql_ops={"query": "gin_trgm_ops"}),
+        Index("message_answer_trgm_idx", "answer", postgresql_using="gin", postgresql_ops={"answer": "gin_trgm_ops"}),
     )
 
     id: Mapped[str] = mapped_column(StringUUID, server_default=db.text("uuid_generate_v4()"))
@@ -1428,6 +1449,12 @@ class EndUser(Base, UserMixin):
         db.PrimaryKeyConstraint("id", name="end_user_pkey"),
         db.Index("end_user_session_id_idx", "session_id", "type"),
         db.Index("end_user_tenant_session_id_idx", "tenant_id", "session_id", "type"),
+        db.Index(
+            "end_user_session_id_trgm_idx",
+            "session_id",
+            postgresql_using="gin",
+            postgresql_ops={"session_id": "gin_trgm_ops"},
+        ),
     )
 
     id = mapped_column(StringUUID, server_default=db.text("uuid_generate_v4()"))
@@ -153,6 +153,16 @@ class TenantPreferredModelProvider(Base):
     updated_at: Mapped[datetime] = mapped_column(db.DateTime, nullable=False, server_default=func.current_timestamp())
 
 
+class ProviderQuotaReconcileBatch(Base):
+    """A batch of pending quota usage written to `Provider.quota_used`, recorded in the same transaction."""
+
+    __tablename__ = "provider_quota_reconcile_batches"
+    __table_args__ = (db.PrimaryKeyConstraint("id", name="provider_quota_reconcile_batch_pkey"),)
+
+    id: Mapped[str] = mapped_column(StringUUID, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(db.DateTime, nullable=False, server_default=func.current_timestamp())
+
+
 class ProviderOrder(Base):
     __tablename__ = "provider_orders"
     __table_args__ = (
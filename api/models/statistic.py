@@ -0,0 +1,76 @@
+from datetime import datetime
+from decimal import Decimal
+from enum import StrEnum
+
+from sqlalchemy import func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from models.base import Base
+
+from .engine import db
+from .types import StringUUID
+
+
+class AppStatisticHourly(Base):
+    """
+    Additive counters of an app per UTC hour, maintained by the statistic rollup task.
+
+    Message counters are bucketed by the message creation hour, `session_message_count` by the creation hour of
+    the message's conversation and the workflow counters by the run creation hour.
+    """
+
+    __tablename__ = "app_statistic_hourly"
+    __table_args__ = (db.PrimaryKeyConstraint("app_id", "hour", name="app_statistic_hourly_pkey"),)
+
+    app_id: Mapped[str] = mapped_column(StringUUID, nullable=False)
+    hour: Mapped[datetime] = mapped_column(db.DateTime, nullable=False)
+    message_count: Mapped[int] = mapped_column(db.BigInteger, nullable=False, server_default=db.text("0"))
+    message_tokens: Mapped[int] = mapped_column(db.BigInteger, nullable=False, server_default=db.text("0"))
+    answer_tokens: Mapped[int] = mapped_column(db.BigInteger, nullable=False, server_default=db.text("0"))
+    total_price: Mapped[Decimal] = mapped_column(db.Numeric(20, 7), nullable=False, server_default=db.text("0"))
+    provider_response_latency: Mapped[float] = mapped_column(db.Float, nullable=False, server_default=db.text("0"))
+    session_message_count: Mapped[int] = mapped_column(db.BigInteger, nullable=False, server_default=db.text("0"))
+    workflow_run_count: Mapped[int] = mapped_column(db.BigInteger, nullable=False, server_default=db.text("0"))
+    workflow_total_tokens: Mapped[int] = mapped_column(db.BigInteger, nullable=False, server_default=db.text("0"))
+    updated_at: Mapped[datetime] = mapped_column(db.DateTime, nullable=False, server_default=func.current_timestamp())
+
+
+class AppStatisticMemberKind(StrEnum):
+    # end users that sent messages, by message hour
+    END_USER = "end_user"
+    # conversations with messages not sent from the debugger, by message hour
+    CONVERSATION = "conversation"
+    # conversations with messages, by conversation creation hour
+    SESSION = "session"
+    # users that ran a published workflow, by run hour
+    WORKFLOW_USER = "workflow_user"
+
+
+class AppStatisticHourlyMember(Base):
+    """
+    Distinct members seen by an app per UTC hour.
+
+    Distinct counts cannot be summed across hours, the members of every hour of a day are kept so that a day in
+    any timezone is counted exactly with `COUNT(DISTINCT member_id)`.
+    """
+
+    __tablename__ = "app_statistic_hourly_members"
+    __table_args__ = (
+        db.PrimaryKeyConstraint("app_id", "kind", "hour", "member_id", name="app_statistic_hourly_member_pkey"),
+    )
+
+    app_id: Mapped[str] = mapped_column(StringUUID, nullable=False)
+    kind: Mapped[str] = mapped_column(db.String(32), nullable=False)
+    hour: Mapped[datetime] = mapped_column(db.DateTime, nullable=False)
+    member_id: Mapped[str] = mapped_column(StringUUID, nullable=False)
+
+
+class StatisticRollupWatermark(Base):
+    """Every row of `source` created before `processed_until` has been rolled up."""
+
+    __tablename__ = "statistic_rollup_watermarks"
+    __table_args__ = (db.PrimaryKeyConstraint("source", name="statistic_rollup_watermark_pkey"),)
+
+    source: Mapped[str] = mapped_column(db.String(32), nullable=False)
+    processed_until: Mapped[datetime] = mapped_column(db.DateTime, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(db.DateTime, nullable=False, server_default=func.current_timestamp())
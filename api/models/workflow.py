@@ -1,13 +1,17 @@
+import hashlib
 import json
 import logging
+import threading
 from collections.abc import Mapping, Sequence
 from datetime import datetime
 from enum import Enum, StrEnum
-from typing import TYPE_CHECKING, Any, Optional, Union
+from typing import TYPE_CHECKING, Any, ClassVar, Literal, Optional, Union
 from uuid import uuid4
 
+from cachetools import LRUCache
 from flask_login import current_user
-from sqlalchemy import orm
+from sqlalchemy import orm, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
 
 from core.file.constants import maybe_file_object
 from core.file.models import File
@@ -29,7 +33,7 @@ from sqlalchemy import Index, PrimaryKeyConstraint, UniqueConstraint, func
 from sqlalchemy.orm import Mapped, declared_attr, mapped_column
 
 from constants import DEFAULT_FILE_NUMBER_LIMITS, HIDDEN_VALUE
-from core.helper import encrypter
+from core.helper import encrypter, large_value_offload
 from core.variables import SecretVariable, Segment, SegmentType, Variable
 from factories import variable_factory
 from libs import helper
@@ -470,7 +474,8 @@ class WorkflowRun(Base):
         `app-run` for (published) app execution
 
     - version (string) Version
-    - graph (text) Workflow canvas configuration (JSON)
+    - graph (text) `optional` Workflow canvas configuration (JSON), only set on runs not deduplicated yet
+    - graph_hash (string) `optional` Hash of the workflow canvas configuration in `WorkflowGraphBlob`
     - inputs (text) Input parameters
     - status (string) Execution status, `running` / `succeeded` / `failed` / `stopped`
     - outputs (text) `optional` Output content
@@ -503,7 +508,10 @@ class WorkflowRun(Base):
     type: Mapped[str] = mapped_column(db.String(255))
     triggered_from: Mapped[str] = mapped_column(db.String(255))
     version: Mapped[str] = mapped_column(db.String(255))
+    # The graph of runs created before `graph_hash` was introduced and not deduplicated yet,
+    # new runs reference their graph in `WorkflowGraphBlob` instead.
     graph: Mapped[Optional[str]] = mapped_column(db.Text)
+    graph_hash: Mapped[Optional[str]] = mapped_column(db.String(64))
     inputs: Mapped[Optional[str]] = mapped_column(db.Text)
     status: Mapped[str] = mapped_column(db.String(255))  # running, succeeded, failed, stopped, partial-succeeded
     outputs: Mapped[Optional[str]] = mapped_column(sa.Text, default="{}")
@@ -531,7 +539,10 @@ class WorkflowRun(Base):
 
     @property
     def graph_dict(self) -> Mapping[str, Any]:
-        return json.loads(self.graph) if self.graph else {}
+        graph = self.graph
+        if not graph and self.graph_hash:
+            graph = WorkflowGraphBlob.get_graph(self.tenant_id, self.graph_hash)
+        return json.loads(graph) if graph else {}
 
     @property
     def inputs_dict(self) -> Mapping[str, Any]:
@@ -603,6 +614,57 @@ class WorkflowRun(Base):
         )
 
 
+class WorkflowGraphBlob(Base):
+    """
+    Workflow canvas configuration of runs, stored once per workspace and referenced by the hash of its content.
+
+    Every run of a published workflow used to store a copy of the same graph. `WorkflowRun.graph_hash`
+    references the graph instead, graphs are immutable once stored.
+    """
+
+    __tablename__ = "workflow_graph_blobs"
+    __table_args__ = (db.PrimaryKeyConstraint("tenant_id", "graph_hash", name="workflow_graph_blob_pkey"),)
+
+    tenant_id: Mapped[str] = mapped_column(StringUUID, nullable=False)
+    # sha256 of `graph`
+    graph_hash: Mapped[str] = mapped_column(db.String(64), nullable=False)
+    graph: Mapped[str] = mapped_column(db.Text, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(db.DateTime, nullable=False, server_default=func.current_timestamp())
+
+    # Serialized graphs by tenant id and hash, which never change once stored.
+    _cache: ClassVar[LRUCache[tuple[str, str], str]] = LRUCache(maxsize=256)
+    _cache_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @staticmethod
+    def serialize(graph: Mapping[str, Any]) -> tuple[str, str]:
+        """Return the hash and the canonical serialization of a graph, equal graphs having the same ones."""
+        serialized = json.dumps(graph, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest(), serialized
+
+    @classmethod
+    def insert_statement(cls, tenant_id: str, graph_hash: str, graph: str):
+        return (
+            postgresql_insert(cls)
+            .values(tenant_id=tenant_id, graph_hash=graph_hash, graph=graph)
+            .on_conflict_do_nothing(index_elements=["tenant_id", "graph_hash"])
+        )
+
+    @classmethod
+    def get_graph(cls, tenant_id: str, graph_hash: str) -> Optional[str]:
+        key = (tenant_id, graph_hash)
+        with cls._cache_lock:
+            graph: Optional[str] = cls._cache.get(key)
+        if graph is not None:
+            return graph
+        graph = db.session.scalar(select(cls.graph).where(cls.tenant_id == tenant_id, cls.graph_hash == graph_hash))
+        if graph is None:
+            _logger.warning("Workflow graph %s of tenant %s not found", graph_hash, tenant_id)
+            return None
+        with cls._cache_lock:
+            cls._cache[key] = graph
+        return graph
+
+
 class WorkflowNodeExecutionTriggeredFrom(StrEnum):
     """
     Workflow Node Execution Triggered From Enum
@@ -612,6 +674,9 @@ class WorkflowNodeExecutionTriggeredFrom(StrEnum):
     WORKFLOW_RUN = "workflow-run"
 
 
+PayloadField = Literal["inputs", "process_data", "outputs"]
+
+
 class WorkflowNodeExecutionModel(Base):
     """
     Workflow Node Execution
@@ -638,6 +703,10 @@ class WorkflowNodeExecutionModel(Base):
     - inputs (json) All predecessor node variable content used in the node
     - process_data (json) Node process data
     - outputs (json) `optional` Node output variables
+    - inputs_storage_key / process_data_storage_key / outputs_storage_key (string) `optional`
+
+        Storage key of the payload when it is too large for the database, the column then holds its preview.
+
     - status (string) Execution status, `running` / `succeeded` / `failed`
     - error (string) `optional` Error reason
     - elapsed_time (float) `optional` Time consumption (s)
@@ -661,6 +730,8 @@ class WorkflowNodeExecutionModel(Base):
     """
 
     __tablename__ = "workflow_node_executions"
+    # Required for instance variable annotation.
+    __allow_unmapped__ = True
 
     @declared_attr
     def __table_args__(cls):  # noqa
@@ -716,9 +787,14 @@ class WorkflowNodeExecutionModel(Base):
     node_id: Mapped[str] = mapped_column(db.String(255))
     node_type: Mapped[str] = mapped_column(db.String(255))
     title: Mapped[str] = mapped_column(db.String(255))
+    # The payloads serialized as JSON, or their preview when they are saved to the storage at the
+    # `*_storage_key` columns, see `set_payload`.
     inputs: Mapped[Optional[str]] = mapped_column(db.Text)
     process_data: Mapped[Optional[str]] = mapped_column(db.Text)
     outputs: Mapped[Optional[str]] = mapped_column(db.Text)
+    inputs_storage_key: Mapped[Optional[str]] = mapped_column(db.String(255))
+    process_data_storage_key: Mapped[Optional[str]] = mapped_column(db.String(255))
+    outputs_storage_key: Mapped[Optional[str]] = mapped_column(db.String(255))
     status: Mapped[str] = mapped_column(db.String(255))
     error: Mapped[Optional[str]] = mapped_column(db.Text)
     elapsed_time: Mapped[float] = mapped_column(db.Float, server_default=db.text("0"))
@@ -728,6 +804,21 @@ class WorkflowNodeExecutionModel(Base):
     created_by: Mapped[str] = mapped_column(StringUUID)
     finished_at: Mapped[Optional[datetime]] = mapped_column(db.DateTime)
 
+    # Payloads loaded from the storage, keyed by field.
+    __payloads: dict[str, Any]
+    # Serialized payloads to save to the storage once the row is committed, keyed by storage key.
+    __pending_offloads: dict[str, str]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__payloads = {}
+        self.__pending_offloads = {}
+
+    @orm.reconstructor
+    def _init_on_load(self):
+        self.__payloads = {}
+        self.__pending_offloads = {}
+
     @property
     def created_by_account(self):
         created_by_role = CreatorUserRole(self.created_by_role)
@@ -742,17 +833,100 @@ class WorkflowNodeExecutionModel(Base):
         # TODO(-LAN-): Avoid using db.session.get() here.
         return db.session.get(EndUser, self.created_by) if created_by_role == CreatorUserRole.END_USER else None
 
+    def set_payload(self, field: PayloadField, value: Mapping[str, Any] | None) -> None:
+        """Set the JSON encodable `inputs`, `process_data` or `outputs`, keeping a preview in the row if large.
+
+        Large payloads are only saved to the storage by `save_offloaded_payloads`, once the row is committed, so that
+        a rolled back transaction leaves no object behind. `id` and `tenant_id` must be set before, they name the
+        storage object.
+        """
+        storage_key = None
+        offload_key = f"workflow_node_executions/{self.tenant_id}/{self.id}/{field}.json.gz"
+        self.__pending_offloads.pop(offload_key, None)
+        self.__payloads.pop(field, None)
+        serialized = json.dumps(value) if value is not None else None
+        if serialized is not None and large_value_offload.should_offload(serialized):
+            storage_key = offload_key
+            self.__pending_offloads[storage_key] = serialized
+            self.__payloads[field] = value
+            serialized = json.dumps(large_value_offload.truncate(value))
+        setattr(self, field, serialized)
+        setattr(self, f"{field}_storage_key", storage_key)
+
+    def save_offloaded_payloads(self) -> None:
+        """Save the large payloads set since the last call to the storage, call it once the row is committed.
+
+        Until then, and if saving fails, readers of the row get the previews.
+        """
+        while self.__pending_offloads:
+            storage_key, serialized = self.__pending_offloads.popitem()
+            try:
+                large_value_offload.save(storage_key, serialized)
+            except Exception:
+                _logger.exception("Failed to save offloaded node execution payload %s", storage_key)
+
+    def _load_payload(self, field: PayloadField) -> Any:
+        storage_key = getattr(self, f"{field}_storage_key")
+        if storage_key is None:
+            return self._load_payload_preview(field)
+        if field not in self.__payloads:
+            try:
+                self.__payloads[field] = json.loads(large_value_offload.load(storage_key))
+            except FileNotFoundError:
+                _logger.warning("Offloaded %s of node execution %s not found, using its preview", field, self.id)
+                return self._load_payload_preview(field)
+        return self.__payloads[field]
+
+    def _load_payload_preview(self, field: PayloadField) -> Any:
+        serialized = getattr(self, field)
+        return json.loads(serialized) if serialized else None
+
+    @property
+    def storage_keys(self) -> list[str]:
+        return [
+            key
+            for key in (self.inputs_storage_key, self.process_data_storage_key, self.outputs_storage_key)
+            if key is not None
+        ]
+
     @property
     def inputs_dict(self):
-        return json.loads(self.inputs) if self.inputs else None
+        return self._load_payload("inputs")
 
     @property
     def outputs_dict(self) -> dict[str, Any] | None:
-        return json.loads(self.outputs) if self.outputs else None
+        outputs: dict[str, Any] | None = self._load_payload("outputs")
+        return outputs
 
     @property
     def process_data_dict(self):
-        return json.loads(self.process_data) if self.process_data else None
+        return self._load_payload("process_data")
+
+    # The previews below never read the storage, for lists of executions.
+
+    @property
+    def inputs_preview(self):
+        return self._load_payload_preview("inputs")
+
+    @property
+    def outputs_preview(self):
+        return self._load_payload_preview("outputs")
+
+    @property
+    def process_data_preview(self):
+        return self._load_payload_preview("process_data")
+
+    @property
+    def inputs_truncated(self) -> bool:
+        return self.inputs_storage_key is not None
+
+    @property
+    def outputs_truncated(self) -> bool:
+        return self.outputs_storage_key is not None
+
+    @property
+    def process_data_truncated(self) -> bool:
+        return self.process_data_storage_key is not None
 
     @property
     def execution_metadata_dict(self) -> dict[str, Any]:
@@ -992,8 +1166,13 @@ class WorkflowDraftVariable(Base):
     value_type: Mapped[SegmentType] = mapped_column(EnumText(SegmentType, length=20))
 
     # The variable's value serialized as a JSON string
+    #
+    # When the value is too large for the database, it is saved to the storage at `value_storage_key`
+    # and this field holds a truncated preview of it instead.
     value: Mapped[str] = mapped_column(sa.Text, nullable=False, name="value")
 
+    value_storage_key: Mapped[str | None] = mapped_column(sa.String(255), nullable=True, default=None)
+
     # Controls whether the variable should be displayed in the variable inspection panel
     visible: Mapped[bool] = mapped_column(sa.Boolean, nullable=False, default=True)
 
@@ -1024,6 +1203,11 @@ class WorkflowDraftVariable(Base):
     # making this attribute harder to access from outside the class.
     __value: Segment | None
 
+    # Serialized values to save to the storage once the row is committed, keyed by storage key.
+    __pending_offloads: dict[str, str]
+    # Storage keys of the values replaced since the row was loaded, to delete once the row is committed.
+    __replaced_storage_keys: list[str]
+
     def __init__(self, *args, **kwargs):
         """
         The constructor of `WorkflowDraftVariable` is not intended for
@@ -1036,10 +1220,14 @@ class WorkflowDraftVariable(Base):
         """
         super().__init__(*args, **kwargs)
         self.__value = None
+        self.__pending_offloads = {}
+        self.__replaced_storage_keys = []
 
     @orm.reconstructor
     def _init_on_load(self):
         self.__value = None
+        self.__pending_offloads = {}
+        self.__replaced_storage_keys = []
 
     def get_selector(self) -> list[str]:
         selector = json.loads(self.selector)
@@ -1056,9 +1244,23 @@ class WorkflowDraftVariable(Base):
         self.selector = json.dumps(value)
 
     def _loads_value(self) -> Segment:
+        if self.value_storage_key is None:
+            return self._loads_value_preview()
+        try:
+            value = json.loads(large_value_offload.load(self.value_storage_key))
+        except FileNotFoundError:
+            _logger.warning("offloaded value of draft variable not found, id=%s, using its preview", self.id)
+            return self._loads_value_preview()
+        return self.build_segment_with_type(self.value_type, value)
+
+    def _loads_value_preview(self) -> Segment:
         value = json.loads(self.value)
         return self.build_segment_with_type(self.value_type, value)
 
+    def _new_value_storage_key(self) -> str:
+        # A new object for every value, so that the one the committed row points to is never overwritten.
+        return f"workflow_draft_variables/{self.app_id}/{uuid4()}.json.gz"
+
     @staticmethod
     def rebuild_file_types(value: Any) -> Any:
         # NOTE(QuantumGhost): Temporary workaround for structured data handling.
@@ -1126,6 +1328,19 @@ class WorkflowDraftVariable(Base):
         self.__value = value
         return value
 
+    def get_value_preview(self) -> Segment:
+        """Like `get_value`, but returns the truncated preview of a value saved to the storage without loading it.
+
+        See `is_truncated`.
+        """
+        if self.value_storage_key is None:
+            return self.get_value()
+        return self._loads_value_preview()
+
+    @property
+    def is_truncated(self) -> bool:
+        return self.value_storage_key is not None
+
     def set_name(self, name: str):
         self.name = name
         self._set_selector([self.node_id, name])
@@ -1136,12 +1351,47 @@ class WorkflowDraftVariable(Base):
         This method also stores the provided Segment object in the deserialized cache
         without creating a copy, allowing for efficient value access.
 
+        Values larger than `WORKFLOW_LARGE_VALUE_OFFLOAD_THRESHOLD` are saved to the storage by
+        `save_offloaded_value`, once the row is committed, `value` then holds their preview. Files are
+        small and never offloaded.
+
         Args:
             value: The Segment object to store as the variable's value.
         """
         self.__value = value
         self.value = json.dumps(value, cls=variable_utils.SegmentJSONEncoder)
         self.value_type = value.value_type
+        if self.value_storage_key is not None:
+            # a value set since the last commit was never saved, only a committed one is deleted
+            if self.__pending_offloads.pop(self.value_storage_key, None) is None:
+                self.__replaced_storage_keys.append(self.value_storage_key)
+            self.value_storage_key = None
+        if value.value_type in (SegmentType.FILE, SegmentType.ARRAY_FILE):
+            return
+        if large_value_offload.should_offload(self.value):
+            self.value_storage_key = self._new_value_storage_key()
+            self.__pending_offloads[self.value_storage_key] = self.value
+            self.value = json.dumps(large_value_offload.truncate(json.loads(self.value)))
+
+    def save_offloaded_value(self) -> None:
+        """Save the value set since the last call to the storage and delete the values it replaced, call it once
+        the row is committed.
+
+        Until then, and if saving fails, readers of the row get the preview.
+        """
+        while self.__pending_offloads:
+            storage_key, serialized = self.__pending_offloads.popitem()
+            try:
+                large_value_offload.save(storage_key, serialized)
+            except Exception:
+                _logger.exception("Failed to save offloaded draft variable value %s", storage_key)
+        replaced_storage_keys, self.__replaced_storage_keys = self.__replaced_storage_keys, []
+        large_value_offload.delete(replaced_storage_keys)
+
+    def discard_offloaded_value(self) -> None:
+        """Forget the storage changes of a value whose row was rolled back."""
+        self.__pending_offloads = {}
+        self.__replaced_storage_keys = []
 
     def get_node_id(self) -> str | None:
         if self.get_variable_type() == DraftVariableType.NODE:
@@ -9,12 +9,25 @@ from collections.abc import Sequence
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import delete, desc, select
+from sqlalchemy import Row, delete, desc, select
 from sqlalchemy.orm import Session, sessionmaker
 
+from core.helper import large_value_offload
 from models.workflow import WorkflowNodeExecutionModel
 from repositories.api_workflow_node_execution_repository import DifyAPIWorkflowNodeExecutionRepository
 
+_STORAGE_KEY_COLUMNS = (
+    WorkflowNodeExecutionModel.inputs_storage_key,
+    WorkflowNodeExecutionModel.process_data_storage_key,
+    WorkflowNodeExecutionModel.outputs_storage_key,
+)
+
+
+def _delete_offloaded_payloads(rows: Sequence[Row]) -> None:
+    """Delete the payloads saved to the storage of deleted executions, once their rows are gone."""
+    storage_keys = [getattr(row, column.key) for row in rows for column in _STORAGE_KEY_COLUMNS]
+    large_value_offload.delete(key for key in storage_keys if key is not None)
+
 
 class DifyAPISQLAlchemyWorkflowNodeExecutionRepository(DifyAPIWorkflowNodeExecutionRepository):
     """
@@ -167,7 +180,7 @@ class DifyAPISQLAlchemyWorkflowNodeExecutionRepository(DifyAPIWorkflowNodeExecut
             with self._session_maker() as session:
                 # Find executions to delete in batches
                 stmt = (
-                    select(WorkflowNodeExecutionModel.id)
+                    select(WorkflowNodeExecutionModel.id, *_STORAGE_KEY_COLUMNS)
                     .where(
                         WorkflowNodeExecutionModel.tenant_id == tenant_id,
                         WorkflowNodeExecutionModel.created_at < before_date,
@@ -175,15 +188,17 @@ class DifyAPISQLAlchemyWorkflowNodeExecutionRepository(DifyAPIWorkflowNodeExecut
                     .limit(batch_size)
                 )
 
-                execution_ids = session.execute(stmt).scalars().all()
-                if not execution_ids:
+                rows = session.execute(stmt).all()
+                if not rows:
                     break
+                execution_ids = [row.id for row in rows]
 
                 # Delete the batch
                 delete_stmt = delete(WorkflowNodeExecutionModel).where(WorkflowNodeExecutionModel.id.in_(execution_ids))
                 result = session.execute(delete_stmt)
                 session.commit()
                 total_deleted += result.rowcount
+                _delete_offloaded_payloads(rows)
 
                 # If we deleted fewer than the batch size, we're done
                 if len(execution_ids) < batch_size:
@@ -214,7 +229,7 @@ class DifyAPISQLAlchemyWorkflowNodeExecutionRepository(DifyAPIWorkflowNodeExecut
             with self._session_maker() as session:
                 # Find executions to delete in batches
                 stmt = (
-                    select(WorkflowNodeExecutionModel.id)
+                    select(WorkflowNodeExecutionModel.id, *_STORAGE_KEY_COLUMNS)
                     .where(
                         WorkflowNodeExecutionModel.tenant_id == tenant_id,
                         WorkflowNodeExecutionModel.app_id == app_id,
@@ -222,15 +237,17 @@ class DifyAPISQLAlchemyWorkflowNodeExecutionRepository(DifyAPIWorkflowNodeExecut
                     .limit(batch_size)
                 )
 
-                execution_ids = session.execute(stmt).scalars().all()
-                if not execution_ids:
+                rows = session.execute(stmt).all()
+                if not rows:
                     break
+                execution_ids = [row.id for row in rows]
 
                 # Delete the batch
                 delete_stmt = delete(WorkflowNodeExecutionModel).where(WorkflowNodeExecutionModel.id.in_(execution_ids))
                 result = session.execute(delete_stmt)
                 session.commit()
                 total_deleted += result.rowcount
+                _delete_offloaded_payloads(rows)
 
                 # If we deleted fewer than the batch size, we're done
                 if len(execution_ids) < batch_size:
@@ -284,7 +301,11 @@ class DifyAPISQLAlchemyWorkflowNodeExecutionRepository(DifyAPIWorkflowNodeExecut
             return 0
 
         with self._session_maker() as session:
+            rows = session.execute(
+                select(*_STORAGE_KEY_COLUMNS).where(WorkflowNodeExecutionModel.id.in_(execution_ids))
+            ).all()
             stmt = delete(WorkflowNodeExecutionModel).where(WorkflowNodeExecutionModel.id.in_(execution_ids))
             result = session.execute(stmt)
             session.commit()
+            _delete_offloaded_payloads(rows)
             return result.rowcount
@@ -0,0 +1,20 @@
+import time
+
+import click
+
+import app
+from services.app_statistic_service import AppStatisticRollupService
+
+
+@app.celery.task(queue="dataset")
+def app_statistic_rollup_task():
+    click.echo(click.style("Start roll up app statistics.", fg="green"))
+    start_at = time.perf_counter()
+    watermarks = AppStatisticRollupService.rollup()
+    end_at = time.perf_counter()
+    click.echo(
+        click.style(
+            f"Rolled up app statistics until {watermarks} latency: {end_at - start_at}",
+            fg="green",
+        )
+    )
@@ -0,0 +1,20 @@
+import time
+
+import click
+
+import app
+from core.helper.provider_quota_ledger import ProviderQuotaLedger
+
+
+@app.celery.task(queue="dataset")
+def provider_quota_reconcile_task():
+    click.echo(click.style("Start reconcile provider quotas.", fg="green"))
+    start_at = time.perf_counter()
+    reconciled = ProviderQuotaLedger.reconcile()
+    end_at = time.perf_counter()
+    click.echo(
+        click.style(
+            f"Reconciled {reconciled} provider quotas latency: {end_at - start_at}",
+            fg="green",
+        )
+    )
@@ -0,0 +1,178 @@
+import atexit
+import hashlib
+import logging
+import threading
+import time
+from collections.abc import Hashable
+from datetime import datetime
+from typing import Any, Optional
+
+from cachetools import TTLCache
+from flask import Flask, current_app
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Mapper, Session, object_session
+from sqlalchemy.orm.attributes import get_history
+
+from configs import dify_config
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from libs.datetime_utils import naive_utc_now
+from models.account import Account, Tenant, TenantAccountJoin
+from models.model import ApiToken, App
+
+logger = logging.getLogger(__name__)
+
+_PENDING_INVALIDATIONS_KEY = "service_api_auth_invalidations"
+
+
+class ApiTokenService:
+    """
+    Per-process cache of the apps, tenants, owners and end users the Service API resolves from bearer tokens.
+
+    Entries are detached instances, attach them with `db.session.merge(instance, load=False)`. They are dropped when
+    an app, the tenant or its tokens change, see `invalidate_tenant`. `last_used_at` of tokens is written in batches by
+    a background thread.
+    """
+
+    _cache: TTLCache = TTLCache(
+        maxsize=dify_config.SERVICE_API_AUTH_CACHE_SIZE, ttl=max(dify_config.SERVICE_API_AUTH_CACHE_TTL, 1)
+    )
+    _cache_lock = threading.Lock()
+
+    _pending_last_used: dict[str, datetime] = {}
+    _last_used_lock = threading.Lock()
+    _flusher: Optional[threading.Thread] = None
+
+    @staticmethod
+    def hash_token(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _version_key(tenant_id: str) -> str:
+        return f"service_api_auth:tenant_version:{tenant_id}"
+
+    @classmethod
+    def get_tenant_version(cls, tenant_id: str) -> Optional[bytes]:
+        """Read before loading what gets cached, so a change committed meanwhile retires the entry."""
+        version: Optional[bytes] = redis_client.get(cls._version_key(tenant_id))
+        return version
+
+    @classmethod
+    def get(cls, key: Hashable) -> Any:
+        if dify_config.SERVICE_API_AUTH_CACHE_TTL <= 0:
+            return None
+        with cls._cache_lock:
+            entry = cls._cache.get(key)
+        if entry is None:
+            return None
+        tenant_id, version, value = entry
+        if cls.get_tenant_version(tenant_id) != version:
+            return None
+        return value
+
+    @classmethod
+    def set(cls, key: Hashable, tenant_id: str, tenant_version: Optional[bytes], value: Any) -> None:
+        if dify_config.SERVICE_API_AUTH_CACHE_TTL <= 0:
+            return
+        with cls._cache_lock:
+            cls._cache[key] = (tenant_id, tenant_version, value)
+
+    @classmethod
+    def invalidate_tenant(cls, tenant_id: str) -> None:
+        key = cls._version_key(tenant_id)
+        redis_client.incr(key)
+        # entries live for seconds, the version only has to outlive them
+        redis_client.expire(key, 86400)
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._cache_lock:
+            cls._cache.clear()
+
+    @classmethod
+    def record_last_used(cls, api_token_id: str) -> None:
+        with cls._last_used_lock:
+            cls._pending_last_used[api_token_id] = naive_utc_now()
+            if cls._flusher is None:
+                flask_app: Flask = current_app._get_current_object()  # type: ignore
+                cls._flusher = threading.Thread(
+                    target=cls._run_flusher, args=(flask_app,), name="api_token_last_used_flusher", daemon=True
+                )
+                cls._flusher.start()
+                atexit.register(cls._flush_at_exit, flask_app)
+
+    @classmethod
+    def flush_last_used(cls) -> None:
+        with cls._last_used_lock:
+            pending = cls._pending_last_used
+            cls._pending_last_used = {}
+        cls._flush_last_used(pending)
+
+    @classmethod
+    def _run_flusher(cls, flask_app: Flask) -> None:
+        while True:
+            time.sleep(dify_config.API_TOKEN_LAST_USED_FLUSH_INTERVAL)
+            with flask_app.app_context():
+                cls.flush_last_used()
+
+    @classmethod
+    def _flush_at_exit(cls, flask_app: Flask) -> None:
+        with flask_app.app_context():
+            cls.flush_last_used()
+
+    @staticmethod
+    def _flush_last_used(pending: dict[str, datetime]) -> None:
+        if not pending:
+            return
+        try:
+            with Session(db.engine) as session:
+                session.execute(
+                    update(ApiToken),
+                    [{"id": token_id, "last_used_at": last_used_at} for token_id, last_used_at in pending.items()],
+                )
+                session.commit()
+        except Exception:
+            logger.exception("Failed to flush last_used_at of %d api tokens", len(pending))
+
+
+def _collect_invalidation(mapper: Mapper, connection: Any, target: Any) -> None:
+    tenant_id = target.id if isinstance(target, Tenant) else target.tenant_id
+    session = object_session(target)
+    if session is None or not tenant_id:
+        return
+    session.info.setdefault(_PENDING_INVALIDATIONS_KEY, set()).add(tenant_id)
+
+
+# Versions are bumped after commit: a request that reads the old version while the change is in flight caches
+# the old state under the old version, which the bump then retires. Bulk query deletes and the bulk last_used_at
+# flush do not emit mapper events, callers of bulk deletes invalidate explicitly.
+for _model in (App, Tenant, TenantAccountJoin, ApiToken):
+    event.listen(_model, "after_update", _collect_invalidation)
+    event.listen(_model, "after_delete", _collect_invalidation)
+
+
+@event.listens_for(Account, "after_update")
+def _collect_account_invalidation(mapper: Mapper, connection: Any, target: Account) -> None:
+    """A banned or closed tenant owner must stop authenticating the Service API of all their workspaces."""
+    session = object_session(target)
+    if session is None or not get_history(target, "status").has_changes():
+        return
+    tenant_ids = connection.scalars(
+        select(TenantAccountJoin.tenant_id).where(TenantAccountJoin.account_id == target.id)
+    )
+    session.info.setdefault(_PENDING_INVALIDATIONS_KEY, set()).update(tenant_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_invalidations(session: Session) -> None:
+    tenant_ids = session.info.pop(_PENDING_INVALIDATIONS_KEY, None)
+    for tenant_id in tenant_ids or ():
+        try:
+            ApiTokenService.invalidate_tenant(tenant_id)
+        except Exception:
+            logger.exception("Failed to invalidate service api auth cache, tenant_id=%s", tenant_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session: Session) -> None:
+    session.info.pop(_PENDING_INVALIDATIONS_KEY, None)
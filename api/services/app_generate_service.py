@@ -1,3 +1,4 @@
+import uuid
 from collections.abc import Generator, Mapping
 from typing import Any, Union
 
@@ -8,6 +9,7 @@ from core.app.apps.advanced_chat.app_generator import AdvancedChatAppGenerator
 from core.app.apps.agent_chat.app_generator import AgentChatAppGenerator
 from core.app.apps.chat.app_generator import ChatAppGenerator
 from core.app.apps.completion.app_generator import CompletionAppGenerator
+from core.app.apps.stream_event_bus import AppStreamEventBus
 from core.app.apps.workflow.app_generator import WorkflowAppGenerator
 from core.app.entities.app_invoke_entities import InvokeFrom
 from core.app.features.rate_limiting import RateLimit
@@ -17,6 +19,7 @@ from models.workflow import Workflow
 from services.billing_service import BillingService
 from services.errors.llm import InvokeRateLimitError
 from services.workflow_service import WorkflowService
+from tasks.app_generate_task import generate_app_stream_task
 
 
 class AppGenerateService:
@@ -40,6 +43,42 @@ class AppGenerateService:
         :param streaming: streaming
         :return:
         """
+        if (
+            streaming
+            and dify_config.APP_GENERATE_ON_CELERY
+            and invoke_from == InvokeFrom.SERVICE_API
+            and isinstance(user, EndUser)
+        ):
+            return cls._generate_on_celery(app_model, user, args, invoke_from)
+
+        return cls.generate_in_process(app_model, user, args, invoke_from, streaming)
+
+    @classmethod
+    def _generate_on_celery(
+        cls, app_model: App, user: EndUser, args: Mapping[str, Any], invoke_from: InvokeFrom
+    ) -> Generator[str, None, None]:
+        """
+        Run the generation on a Celery worker and tail the events it publishes.
+
+        Errors raised before the generation starts, e.g. rate limits, are sent as error events of the stream.
+        """
+        stream_id = str(uuid.uuid4())
+        AppStreamEventBus.open(stream_id, app_model.id, user.id)
+        generate_app_stream_task.delay(stream_id, app_model.id, user.id, dict(args), invoke_from.value)
+        return AppStreamEventBus.tail(stream_id)
+
+    @classmethod
+    def generate_in_process(
+        cls,
+        app_model: App,
+        user: Union[Account, EndUser],
+        args: Mapping[str, Any],
+        invoke_from: InvokeFrom,
+        streaming: bool = True,
+    ):
+        """
+        App Content Generate in the current process
+        """
         # system level rate limiter
         if dify_config.BILLING_ENABLED:
             # check if it's free plan
@@ -52,6 +91,9 @@ class AppGenerateService:
                     )
                 cls.system_rate_limiter.increment_rate_limit(app_model.tenant_id)
 
+        stream_coalescing = args.get("stream_coalescing")
+        coalesce = dify_config.STREAM_COALESCING_ENABLED if stream_coalescing is None else bool(stream_coalescing)
+
         # app level rate limiter
         max_active_request = AppGenerateService._get_max_active_requests(app_model)
         rate_limit = RateLimit(app_model.id, max_active_request)
@@ -64,6 +106,7 @@ class AppGenerateService:
                         CompletionAppGenerator().generate(
                             app_model=app_model, user=user, args=args, invoke_from=invoke_from, streaming=streaming
                         ),
+                        coalesce=coalesce,
                     ),
                     request_id=request_id,
                 )
@@ -73,6 +116,7 @@ class AppGenerateService:
                         AgentChatAppGenerator().generate(
                             app_model=app_model, user=user, args=args, invoke_from=invoke_from, streaming=streaming
                         ),
+                        coalesce=coalesce,
                     ),
                     request_id,
                 )
@@ -82,6 +126,7 @@ class AppGenerateService:
                         ChatAppGenerator().generate(
                             app_model=app_model, user=user, args=args, invoke_from=invoke_from, streaming=streaming
                         ),
+                        coalesce=coalesce,
                     ),
                     request_id=request_id,
                 )
@@ -97,6 +142,7 @@ class AppGenerateService:
                             invoke_from=invoke_from,
                             streaming=streaming,
                         ),
+                        coalesce=coalesce,
                     ),
                     request_id=request_id,
                 )
@@ -114,6 +160,7 @@ class AppGenerateService:
                             call_depth=0,
                             workflow_thread_pool_id=None,
                         ),
+                        coalesce=coalesce,
                     ),
                     request_id,
                 )
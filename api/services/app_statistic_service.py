@@ -0,0 +1,763 @@
+import datetime
+import logging
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, field
+from decimal import Decimal
+from enum import StrEnum
+from typing import Any, Optional
+
+import pytz
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    and_,
+    false,
+    func,
+    literal,
+    literal_column,
+    null,
+    or_,
+    select,
+    true,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from configs import dify_config
+from core.app.entities.app_invoke_entities import InvokeFrom
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from libs.datetime_utils import naive_utc_now
+from models.enums import WorkflowRunTriggeredFrom
+from models.model import Conversation, Message, MessageFeedback
+from models.statistic import (
+    AppStatisticHourly,
+    AppStatisticHourlyMember,
+    AppStatisticMemberKind,
+    StatisticRollupWatermark,
+)
+from models.workflow import WorkflowRun
+
+logger = logging.getLogger(__name__)
+
+HOUR = datetime.timedelta(hours=1)
+
+
+class RollupSource(StrEnum):
+    MESSAGES = "messages"
+    WORKFLOW_RUNS = "workflow_runs"
+
+
+def floor_hour(value: datetime.datetime) -> datetime.datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_hour(value: datetime.datetime) -> datetime.datetime:
+    floored = floor_hour(value)
+    return floored if floored == value else floored + HOUR
+
+
+def _trunc_hour(column: Any) -> ColumnElement:
+    # a literal unit renders the same in SELECT and GROUP BY, a bound parameter would not
+    return func.date_trunc(literal_column("'hour'"), column)
+
+
+def _local_date(column: Any, timezone: str) -> ColumnElement:
+    """`DATE(column AT TIME ZONE 'UTC' AT TIME ZONE :tz)`, the day of a naive UTC timestamp in `timezone`."""
+    return func.date(func.timezone(timezone, func.timezone("UTC", column)))
+
+
+class AppStatisticRollupService:
+    """
+    Incremental rollup of messages and workflow runs into per-app hourly statistics.
+
+    Each source keeps a watermark, hour aligned, before which every row has been rolled up. A run advances it in
+    batches of `APP_STATISTIC_ROLLUP_BATCH_HOURS`, each batch adding its counters and moving the watermark in one
+    transaction, and stops `APP_STATISTIC_ROLLUP_SETTLE_MINUTES` before now, so that messages and runs still being
+    generated are read live until their tokens, price and latency are final.
+    """
+
+    @classmethod
+    def rollup(cls, now: Optional[datetime.datetime] = None) -> dict[str, datetime.datetime]:
+        lock = redis_client.lock("app_statistic_rollup:lock", timeout=600)
+        if not lock.acquire(blocking=False):
+            logger.info("App statistic rollup is already running")
+            return {}
+        try:
+            now = now or naive_utc_now()
+            until = floor_hour(now - datetime.timedelta(minutes=dify_config.APP_STATISTIC_ROLLUP_SETTLE_MINUTES))
+            return {source.value: cls._rollup_source(source, until, lock) for source in RollupSource}
+        finally:
+            try:
+                lock.release()
+            except Exception:
+                logger.warning("Failed to release app statistic rollup lock")
+
+    @classmethod
+    def _rollup_source(cls, source: RollupSource, until: datetime.datetime, lock: Any) -> datetime.datetime:
+        processed_until = cls._init_watermark(source, until)
+        batch = datetime.timedelta(hours=dify_config.APP_STATISTIC_ROLLUP_BATCH_HOURS)
+        while processed_until < until:
+            batch_end = min(processed_until + batch, until)
+            with Session(db.engine) as session:
+                if source == RollupSource.MESSAGES:
+                    cls._rollup_messages(session, processed_until, batch_end)
+                else:
+                    cls._rollup_workflow_runs(session, processed_until, batch_end)
+                # the watermark is moved only from where this batch started, a concurrent run cannot count twice
+                result = session.execute(
+                    update(StatisticRollupWatermark)
+                    .where(
+                        StatisticRollupWatermark.source == source.value,
+                        StatisticRollupWatermark.processed_until == processed_until,
+                    )
+                    .values(processed_until=batch_end, updated_at=naive_utc_now())
+                )
+                if result.rowcount != 1:  # type: ignore[attr-defined]
+                    session.rollback()
+                    logger.warning("App statistic watermark of %s moved concurrently, stopping", source.value)
+                    break
+                session.commit()
+            processed_until = batch_end
+            lock.reacquire()
+        return processed_until
+
+    @staticmethod
+    def _init_watermark(source: RollupSource, until: datetime.datetime) -> datetime.datetime:
+        with Session(db.engine) as session:
+            processed_until = session.scalar(
+                select(StatisticRollupWatermark.processed_until).where(StatisticRollupWatermark.source == source.value)
+            )
+            if processed_until is not None:
+                return processed_until
+
+            # the first run starts from the oldest row, so the rollups cover the whole history
+            model = Message if source == RollupSource.MESSAGES else WorkflowRun
+            oldest = session.scalar(select(func.min(model.created_at)))
+            start = min(floor_hour(oldest), until) if oldest else until
+            session.execute(
+                insert(StatisticRollupWatermark)
+                .values(source=source.value, processed_until=start)
+                .on_conflict_do_nothing(index_elements=["source"])
+            )
+            session.commit()
+            return session.execute(
+                select(StatisticRollupWatermark.processed_until).where(StatisticRollupWatermark.source == source.value)
+            ).scalar_one()
+
+    @classmethod
+    def _rollup_messages(cls, session: Session, start: datetime.datetime, end: datetime.datetime) -> None:
+        in_batch = and_(Message.created_at >= start, Message.created_at < end)
+        hour = _trunc_hour(Message.created_at)
+        cls._add_counters(
+            session,
+            select(
+                Message.app_id,
+                hour,
+                func.count(Message.id),
+                func.coalesce(func.sum(Message.message_tokens), 0),
+                func.coalesce(func.sum(Message.answer_tokens), 0),
+                func.coalesce(func.sum(Message.total_price), 0),
+                func.coalesce(func.sum(Message.provider_response_latency), 0),
+            )
+            .where(in_batch)
+            .group_by(Message.app_id, hour),
+            ["message_count", "message_tokens", "answer_tokens", "total_price", "provider_response_latency"],
+        )
+
+        conversation_hour = _trunc_hour(Conversation.created_at)
+        cls._add_counters(
+            session,
+            select(Conversation.app_id, conversation_hour, func.count(Message.id))
+            .select_from(Message)
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .where(in_batch)
+            .group_by(Conversation.app_id, conversation_hour),
+            ["session_message_count"],
+        )
+
+        cls._add_members(
+            session,
+            select(Message.app_id, literal(AppStatisticMemberKind.END_USER.value), hour, Message.from_end_user_id)
+            .where(in_batch, Message.from_end_user_id.isnot(None))
+            .distinct(),
+        )
+        cls._add_members(
+            session,
+            select(Message.app_id, literal(AppStatisticMemberKind.CONVERSATION.value), hour, Message.conversation_id)
+            .where(in_batch, Message.invoke_from != InvokeFrom.DEBUGGER.value)
+            .distinct(),
+        )
+        cls._add_members(
+            session,
+            select(
+                Conversation.app_id,
+                literal(AppStatisticMemberKind.SESSION.value),
+                conversation_hour,
+                Conversation.id,
+            )
+            .select_from(Message)
+            .join(Conversation, Conversation.id == Message.conversation_id)
+            .where(in_batch)
+            .distinct(),
+        )
+
+    @classmethod
+    def _rollup_workflow_runs(cls, session: Session, start: datetime.datetime, end: datetime.datetime) -> None:
+        in_batch = and_(
+            WorkflowRun.created_at >= start,
+            WorkflowRun.created_at < end,
+            WorkflowRun.triggered_from == WorkflowRunTriggeredFrom.APP_RUN.value,
+        )
+        hour = _trunc_hour(WorkflowRun.created_at)
+        cls._add_counters(
+            session,
+            select(
+                WorkflowRun.app_id,
+                hour,
+                func.count(WorkflowRun.id),
+                func.coalesce(func.sum(WorkflowRun.total_tokens), 0),
+            )
+            .where(in_batch)
+            .group_by(WorkflowRun.app_id, hour),
+            ["workflow_run_count", "workflow_total_tokens"],
+        )
+        cls._add_members(
+            session,
+            select(
+                WorkflowRun.app_id, literal(AppStatisticMemberKind.WORKFLOW_USER.value), hour, WorkflowRun.created_by
+            )
+            .where(in_batch)
+            .distinct(),
+        )
+
+    @staticmethod
+    def _add_counters(session: Session, rows: Select, columns: Sequence[str]) -> None:
+        table = AppStatisticHourly.__table__
+        stmt = insert(AppStatisticHourly).from_select(["app_id", "hour", *columns], rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["app_id", "hour"],
+            set_={
+                **{column: table.c[column] + stmt.excluded[column] for column in columns},
+                "updated_at": func.current_timestamp(),
+            },
+        )
+        session.execute(stmt)
+
+    @staticmethod
+    def _add_members(session: Session, rows: Select) -> None:
+        stmt = insert(AppStatisticHourlyMember).from_select(["app_id", "kind", "hour", "member_id"], rows)
+        session.execute(stmt.on_conflict_do_nothing())
+
+
+@dataclass
+class StatisticWindow:
+    """
+    Split of a requested range between rolled up hours and rows read live.
+
+    Hours in `[rollup_start, rollup_end)` are read from the rollups, `rollup_start` is None for an open start and
+    `rollup_end` is None when the rollups are not used at all. The remaining `live` segments, before the first
+    whole hour and from the watermark on, are aggregated from the source tables.
+    """
+
+    rollup_start: Optional[datetime.datetime] = None
+    rollup_end: Optional[datetime.datetime] = None
+    watermark: Optional[datetime.datetime] = None
+    live: list[tuple[Optional[datetime.datetime], Optional[datetime.datetime]]] = field(default_factory=list)
+
+    @property
+    def uses_rollup(self) -> bool:
+        return self.rollup_end is not None
+
+    def rollup_condition(self, column: Any) -> ColumnElement[bool]:
+        if self.rollup_end is None:
+            return false()
+        condition: ColumnElement[bool] = column < self.rollup_end
+        if self.rollup_start is None:
+            return condition
+        return and_(column >= self.rollup_start, condition)
+
+    def live_condition(self, column: Any) -> ColumnElement[bool]:
+        segments = []
+        for start, end in self.live:
+            bounds = []
+            if start is not None:
+                bounds.append(column >= start)
+            if end is not None:
+                bounds.append(column < end)
+            segments.append(and_(*bounds) if bounds else true())
+        return or_(*segments) if segments else false()
+
+
+class AppStatisticService:
+    """
+    Daily statistics of the app dashboards.
+
+    Whole hours before the rollup watermark are summed from `app_statistic_hourly` and the distinct counts are
+    taken over `app_statistic_hourly_members`, both grouped by the day in the account's timezone; only the
+    partial first hour and everything after the watermark are aggregated from the source tables. Timezones with
+    a non whole hour offset cannot be assembled from UTC hours and are always computed live.
+    """
+
+    @staticmethod
+    def parse_range(
+        start: Optional[str], end: Optional[str], timezone: str
+    ) -> tuple[Optional[datetime.datetime], Optional[datetime.datetime]]:
+        """Convert the `%Y-%m-%d %H:%M` bounds entered in `timezone` to naive UTC."""
+        tz = pytz.timezone(timezone)
+
+        def to_utc(value: Optional[str]) -> Optional[datetime.datetime]:
+            if not value:
+                return None
+            local = tz.localize(datetime.datetime.strptime(value, "%Y-%m-%d %H:%M").replace(second=0))
+            return local.astimezone(pytz.utc).replace(tzinfo=None)
+
+        return to_utc(start), to_utc(end)
+
+    @classmethod
+    def plan_window(
+        cls,
+        source: RollupSource,
+        timezone: str,
+        start: Optional[datetime.datetime],
+        end: Optional[datetime.datetime],
+    ) -> StatisticWindow:
+        watermark = db.session.scalar(
+            select(StatisticRollupWatermark.processed_until).where(StatisticRollupWatermark.source == source.value)
+        )
+        if watermark is None or not cls._has_whole_hour_offset(timezone, start, end):
+            return StatisticWindow(live=[(start, end)])
+
+        rollup_start = ceil_hour(start) if start else None
+        rollup_end = min(floor_hour(end), watermark) if end else watermark
+        if rollup_start is not None and rollup_start >= rollup_end:
+            return StatisticWindow(live=[(start, end)])
+
+        live: list[tuple[Optional[datetime.datetime], Optional[datetime.datetime]]] = []
+        if start is not None and rollup_start is not None and start < rollup_start:
+            live.append((start, rollup_start))
+        if end is None or rollup_end < end:
+            live.append((rollup_end, end))
+        return StatisticWindow(rollup_start=rollup_start, rollup_end=rollup_end, watermark=watermark, live=live)
+
+    @staticmethod
+    def _has_whole_hour_offset(timezone: str, *moments: Optional[datetime.datetime]) -> bool:
+        tz = pytz.timezone(timezone)
+        for moment in (*(m for m in moments if m is not None), naive_utc_now()):
+            offset = pytz.utc.localize(moment).astimezone(tz).utcoffset()
+            if offset is None or offset.total_seconds() % 3600:
+                return False
+        return True
+
+    @staticmethod
+    def _rollup_counters(
+        app_id: str,
+        timezone: str,
+        window: StatisticWindow,
+        columns: Mapping[str, Any],
+        present: ColumnElement[bool],
+    ) -> Select:
+        return select(
+            _local_date(AppStatisticHourly.hour, timezone).label("date"),
+            *[expression.label(name) for name, expression in columns.items()],
+        ).where(AppStatisticHourly.app_id == app_id, present, window.rollup_condition(AppStatisticHourly.hour))
+
+    @staticmethod
+    def _rollup_members(app_id: str, timezone: str, window: StatisticWindow, kind: AppStatisticMemberKind) -> Select:
+        return select(
+            _local_date(AppStatisticHourlyMember.hour, timezone).label("date"),
+            AppStatisticHourlyMember.member_id.label("member_id"),
+        ).where(
+            AppStatisticHourlyMember.app_id == app_id,
+            AppStatisticHourlyMember.kind == kind.value,
+            window.rollup_condition(AppStatisticHourlyMember.hour),
+        )
+
+    @staticmethod
+    def _sum_by_date(parts: Sequence[Select], columns: Sequence[str]) -> list[Any]:
+        subquery = (parts[0] if len(parts) == 1 else union_all(*parts)).subquery()
+        stmt = (
+            select(subquery.c.date, *[func.sum(subquery.c[column]).label(column) for column in columns])
+            .group_by(subquery.c.date)
+            .order_by(subquery.c.date)
+        )
+        return list(db.session.execute(stmt).all())
+
+    @staticmethod
+    def _count_distinct_by_date(parts: Sequence[Select]) -> list[Any]:
+        subquery = (parts[0] if len(parts) == 1 else union_all(*parts)).subquery()
+        stmt = (
+            select(subquery.c.date, func.count(subquery.c.member_id.distinct()).label("count"))
+            .group_by(subquery.c.date)
+            .order_by(subquery.c.date)
+        )
+        return list(db.session.execute(stmt).all())
+
+    @classmethod
+    def _message_sums(
+        cls,
+        app_id: str,
+        timezone: str,
+        start: Optional[datetime.datetime],
+        end: Optional[datetime.datetime],
+        columns: Mapping[str, tuple[Any, Any]],
+    ) -> list[Any]:
+        """Sum `columns`, name to (rollup column, live aggregate), by day for the days with messages."""
+        window = cls.plan_window(RollupSource.MESSAGES, timezone, start, end)
+        parts = []
+        if window.uses_rollup:
+            parts.append(
+                cls._rollup_counters(
+                    app_id,
+                    timezone,
+                    window,
+                    {name: rollup for name, (rollup, _) in columns.items()},
+                    AppStatisticHourly.message_count > 0,
+                )
+            )
+        if window.live:
+            parts.append(
+                select(
+                    _local_date(Message.created_at, timezone).label("date"),
+                    *[live.label(name) for name, (_, live) in columns.items()],
+                )
+                .where(Message.app_id == app_id, window.live_condition(Message.created_at))
+                .group_by("date")
+            )
+        return cls._sum_by_date(parts, list(columns))
+
+    @classmethod
+    def _message_members(
+        cls,
+        app_id: str,
+        timezone: str,
+        start: Optional[datetime.datetime],
+        end: Optional[datetime.datetime],
+        kind: AppStatisticMemberKind,
+        member: Any,
+        *conditions: ColumnElement[bool],
+        count_empty_days: bool = False,
+    ) -> list[Any]:
+        window = cls.plan_window(RollupSource.MESSAGES, timezone, start, end)
+        parts = []
+        if window.uses_rollup:
+            parts.append(cls._rollup_members(app_id, timezone, window, kind))
+            if count_empty_days:
+                # days with messages but no member are reported with a count of 0, as the live query does
+                parts.append(
+                    select(
+                        _local_date(AppStatisticHourly.hour, timezone).label("date"), null().label("member_id")
+                    ).where(
+                        AppStatisticHourly.app_id == app_id,
+                        AppStatisticHourly.message_count > 0,
+                        window.rollup_condition(AppStatisticHourly.hour),
+                    )
+                )
+        if window.live:
+            parts.append(
+                select(_local_date(Message.created_at, timezone).label("date"), member.label("member_id")).where(
+                    Message.app_id == app_id, window.live_condition(Message.created_at), *conditions
+                )
+            )
+        return cls._count_distinct_by_date(parts)
+
+    @classmethod
+    def daily_messages(
+        cls, app_id: str, timezone: str, start: Optional[datetime.datetime], end: Optional[datetime.datetime]
+    ) -> list[dict]:
+        rows = cls._message_sums(
+            app_id,
+            timezone,
+            start,
+            end,
+            {"message_count": (AppStatisticHourly.message_count, func.count(Message.id))},
+        )
+        return [{"date": str(row.date), "message_count": int(row.message_count)} for row in rows]
+
+    @classmethod
+    def daily_conversations(
+        cls, app_id: str, timezone: str, start: Optional[datetime.datetime], end: Optional[datetime.datetime]
+    ) -> list[dict]:
+        rows = cls._message_members(
+            app_id,
+            timezone,
+            start,
+            end,
+            AppStatisticMemberKind.CONVERSATION,
+            Message.conversation_id,
+            Message.invoke_from != InvokeFrom.DEBUGGER.value,
+        )
+        return [{"date": str(row.date), "conversation_count": row.count} for row in rows]
+
+    @classmethod
+    def daily_end_users(
+        cls, app_id: str, timezone: str, start: Optional[datetime.datetime], end: Optional[datetime.datetime]
+    ) -> list[dict]:
+        rows = cls._message_members(
+            app_id,
+            timezone,
+            start,
+            end,
+            AppStatisticMemberKind.END_USER,
+            Message.from_end_user_id,
+            count_empty_days=True,
+        )
+        return [{"date": str(row.date), "terminal_count": row.count} for row in rows]
+
+    @classmethod
+    def token_costs(
+        cls, app_id: str, timezone: str, start: Optional[datetime.datetime], end: Optional[datetime.datetime]
+    ) -> list[dict]:
+        rows = cls._message_sums(
+            app_id,
+            timezone,
+            start,
+            end,
+            {
+                "message_tokens": (AppStatisticHourly.message_tokens, func.sum(Message.message_tokens)),
+                "answer_tokens": (AppStatisticHourly.answer_tokens, func.sum(Message.answer_tokens)),
+                "total_price": (AppStatisticHourly.total_price, func.sum(Message.total_price)),
+            },
+        )
+        return [
+            {
+                "date": str(row.date),
+                "token_count": int(row.message_tokens + row.answer_tokens),
+                "total_price": row.total_price,
+                "currency": "USD",
+            }
+            for row in rows
+        ]
+
+    @classmethod
+    def average_session_interactions(
+        cls, app_id: str, timezone: str, start: Optional[datetime.datetime], end: Optional[datetime.datetime]
+    ) -> list[dict]:
+        """Average number of messages of the conversations created each day."""
+        window = cls.plan_window(RollupSource.MESSAGES, timezone, start, end)
+        # conversations of the rolled up hours may have received messages after the watermark
+        pending = (
+            and_(window.rollup_condition(Conversation.created_at), Message.created_at >= window.watermark)
+            if window.uses_rollup
+            else false()
+        )
+        live_conversations = or_(window.live_condition(Conversation.created_at), pending)
+        conversation_date = _local_date(Conversation.created_at, timezone).label("date")
+
+        count_parts: list[Select] = []
+        member_parts: list[Select] = []
+        if window.uses_rollup:
+            count_parts.append(
+                cls._rollup_counters(
+                    app_id,
+                    timezone,
+                    window,
+                    {"message_count": AppStatisticHourly.session_message_count},
+                    AppStatisticHourly.session_message_count > 0,
+                )
+            )
+            member_parts.append(cls._rollup_members(app_id, timezone, window, AppStatisticMemberKind.SESSION))
+        count_parts.append(
+            select(conversation_date, func.count(Message.id).label("message_count"))
+            .select_from(Conversation)
+            .join(Message, Message.conversation_id == Conversation.id)
+            .where(Conversation.app_id == app_id, live_conversations)
+            .group_by("date")
+        )
+        member_parts.append(
+            select(conversation_date, Conversation.id.label("member_id"))
+            .select_from(Conversation)
+            .join(Message, Message.conversation_id == Conversation.id)
+            .where(Conversation.app_id == app_id, live_conversations)
+        )
+
+        message_counts = {row.date: row.message_count for row in cls._sum_by_date(count_parts, ["message_count"])}
+        response_data = []
+        for row in cls._count_distinct_by_date(member_parts):
+            if not row.count:
+                continue
+            interactions = Decimal(message_counts.get(row.date, 0)) / row.count
+            response_data.append({"date": str(row.date), "interactions": float(interactions.quantize(Decimal("0.01")))})
+        return response_data
+
+    @classmethod
+    def user_satisfaction_rate(
+        cls, app_id: str, timezone: str, start: Optional[datetime.datetime], end: Optional[datetime.datetime]
+    ) -> list[dict]:
+        rows = cls._message_sums(
+            app_id,
+            timezone,
+            start,
+            end,
+            {"message_count": (AppStatisticHourly.message_count, func.count(Message.id))},
+        )
+        # likes are toggled after the fact, they are counted live from the feedback rows, which are few
+        like_stmt = (
+            select(
+                _local_date(Message.created_at, timezone).label("date"),
+                func.count(MessageFeedback.id).label("feedback_count"),
+            )
+            .select_from(MessageFeedback)
+            .join(Message, Message.id == MessageFeedback.message_id)
+            .where(MessageFeedback.app_id == app_id, MessageFeedback.rating == "like", Message.app_id == app_id)
+        )
+        if start is not None:
+            like_stmt = like_stmt.where(Message.created_at >= start)
+        if end is not None:
+            like_stmt = like_stmt.where(Message.created_at < end)
+        feedback_counts = {row.date: row.feedback_count for row in db.session.execute(like_stmt.group_by("date")).all()}
+        return [
+            {
+                "date": str(row.date),
+                "rate": round(
+                    (feedback_counts.get(row.date, 0) * 1000 / int(row.message_count)) if row.message_count > 0 else 0,
+                    2,
+                ),
+            }
+            for row in rows
+        ]
+
+    @classmethod
+    def average_response_time(
+        cls, app_id: str, timezone: str, start: Optional[datetime.datetime], end: Optional[datetime.datetime]
+    ) -> list[dict]:
+        rows = cls._message_sums(
+            app_id,
+            timezone,
+            start,
+            end,
+            {
+                "message_count": (AppStatisticHourly.message_count, func.count(Message.id)),
+                "latency": (AppStatisticHourly.provider_response_latency, func.sum(Message.provider_response_latency)),
+            },
+        )
+        return [
+            {"date": str(row.date), "latency": round(row.latency / int(row.message_count) * 1000, 4)}
+            for row in rows
+            if row.message_count
+        ]
+
+    @classmethod
+    def tokens_per_second(
+        cls, app_id: str, timezone: str, start: Optional[datetime.datetime], end: Optional[datetime.datetime]
+    ) -> list[dict]:
+        rows = cls._message_sums(
+            app_id,
+            timezone,
+            start,
+            end,
+            {
+                "answer_tokens": (AppStatisticHourly.answer_tokens, func.sum(Message.answer_tokens)),
+                "latency": (AppStatisticHourly.provider_response_latency, func.sum(Message.provider_response_latency)),
+            },
+        )
+        return [
+            {"date": str(row.date), "tps": round(int(row.answer_tokens) / row.latency if row.latency else 0, 4)}
+            for row in rows
+        ]
+
+    @classmethod
+    def _workflow_sums(
+        cls,
+        app_id: str,
+        timezone: str,
+        start: Optional[datetime.datetime],
+        end: Optional[datetime.datetime],
+    ) -> list[Any]:
+        window = cls.plan_window(RollupSource.WORKFLOW_RUNS, timezone, start, end)
+        parts = []
+        if window.uses_rollup:
+            parts.append(
+                cls._rollup_counters(
+                    app_id,
+                    timezone,
+                    window,
+                    {
+                        "runs": AppStatisticHourly.workflow_run_count,
+                        "token_count": AppStatisticHourly.workflow_total_tokens,
+                    },
+                    AppStatisticHourly.workflow_run_count > 0,
+                )
+            )
+        if window.live:
+            parts.append(
+                select(
+                    _local_date(WorkflowRun.created_at, timezone).label("date"),
+                    func.count(WorkflowRun.id).label("runs"),
+                    func.sum(WorkflowRun.total_tokens).label("token_count"),
+                )
+                .where(
+                    WorkflowRun.app_id == app_id,
+                    WorkflowRun.triggered_from == WorkflowRunTriggeredFrom.APP_RUN.value,
+                    window.live_condition(WorkflowRun.created_at),
+                )
+                .group_by("date")
+            )
+        return cls._sum_by_date(parts, ["runs", "token_count"])
+
+    @classmethod
+    def _workflow_users(
+        cls,
+        app_id: str,
+        timezone: str,
+        start: Optional[datetime.datetime],
+        end: Optional[datetime.datetime],
+    ) -> list[Any]:
+        window = cls.plan_window(RollupSource.WORKFLOW_RUNS, timezone, start, end)
+        parts = []
+        if window.uses_rollup:
+            parts.append(cls._rollup_members(app_id, timezone, window, AppStatisticMemberKind.WORKFLOW_USER))
+        if window.live:
+            parts.append(
+                select(
+                    _local_date(WorkflowRun.created_at, timezone).label("date"),
+                    WorkflowRun.created_by.label("member_id"),
+                ).where(
+                    WorkflowRun.app_id == app_id,
+                    WorkflowRun.triggered_from == WorkflowRunTriggeredFrom.APP_RUN.value,
+                    window.live_condition(WorkflowRun.created_at),
+                )
+            )
+        return cls._count_distinct_by_date(parts)
+
+    @classmethod
+    def workflow_daily_runs(
+        cls, app_id: str, timezone: str, start: Optional[datetime.datetime], end: Optional[datetime.datetime]
+    ) -> list[dict]:
+        return [
+            {"date": str(row.date), "runs": int(row.runs)} for row in cls._workflow_sums(app_id, timezone, start, end)
+        ]
+
+    @classmethod
+    def workflow_daily_terminals(
+        cls, app_id: str, timezone: str, start: Optional[datetime.datetime], end: Optional[datetime.datetime]
+    ) -> list[dict]:
+        return [
+            {"date": str(row.date), "terminal_count": row.count}
+            for row in cls._workflow_users(app_id, timezone, start, end)
+        ]
+
+    @classmethod
+    def workflow_token_costs(
+        cls, app_id: str, timezone: str, start: Optional[datetime.datetime], end: Optional[datetime.datetime]
+    ) -> list[dict]:
+        return [
+            {"date": str(row.date), "token_count": int(row.token_count) if row.token_count is not None else None}
+            for row in cls._workflow_sums(app_id, timezone, start, end)
+        ]
+
+    @classmethod
+    def workflow_average_app_interactions(
+        cls, app_id: str, timezone: str, start: Optional[datetime.datetime], end: Optional[datetime.datetime]
+    ) -> list[dict]:
+        """Average number of runs per user each day."""
+        runs = {row.date: row.runs for row in cls._workflow_sums(app_id, timezone, start, end)}
+        response_data = []
+        for row in cls._workflow_users(app_id, timezone, start, end):
+            if not row.count:
+                continue
+            interactions = Decimal(runs.get(row.date, 0)) / row.count
+            response_data.append({"date": str(row.date), "interactions": float(interactions.quantize(Decimal("0.01")))})
+        return response_data
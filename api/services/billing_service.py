@@ -1,12 +1,39 @@
+import logging
 import os
-from typing import Literal, Optional
+import threading
+from typing import Any, Literal, Optional
 
 import httpx
+from sqlalchemy import event, select
+from sqlalchemy.orm import Mapper, Session, object_session
 from tenacity import retry, retry_if_exception_type, stop_before_delay, wait_fixed
 
+from configs import dify_config
 from extensions.ext_database import db
 from libs.helper import RateLimiter
+from libs.tiered_cache import TieredCache
 from models.account import Account, TenantAccountJoin, TenantAccountRole
+from models.dataset import Document
+from models.model import App, MessageAnnotation
+
+logger = logging.getLogger(__name__)
+
+_PENDING_USAGE_CHANGES_KEY = "billing_usage_changes"
+
+_client: Optional[httpx.Client] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
+def _get_client() -> httpx.Client:
+    """One connection pool for all requests of the process, created in the process using it."""
+    global _client, _client_pid
+    with _client_lock:
+        # a client inherited from the process the workers forked from shares its connections with its siblings
+        if _client is None or _client_pid != os.getpid():
+            _client = httpx.Client()
+            _client_pid = os.getpid()
+        return _client
 
 
 class BillingService:
@@ -15,24 +42,55 @@ class BillingService:
 
     compliance_download_rate_limiter = RateLimiter("compliance_download_rate_limiter", 4, 60)
 
+    # subscriptions are read on most console and app requests, the billing service pushes their changes through
+    # the inner api, see `invalidate_tenant_cache`, and the usage counters they carry are dropped when the apps,
+    # members, documents or annotations of the tenant change
+    _info_cache = TieredCache(
+        "billing:subscription_info",
+        loader=lambda tenant_id: BillingService._fetch_tenant_subscription("/subscription/info", tenant_id),
+        ttl=dify_config.BILLING_INFO_CACHE_TTL,
+        stale_ttl=dify_config.BILLING_INFO_CACHE_STALE_TTL,
+        local_ttl=dify_config.BILLING_INFO_LOCAL_CACHE_TTL,
+    )
+    _knowledge_rate_limit_cache = TieredCache(
+        "billing:knowledge_rate_limit",
+        loader=lambda tenant_id: BillingService._fetch_tenant_subscription(
+            "/subscription/knowledge-rate-limit", tenant_id
+        ),
+        ttl=dify_config.BILLING_INFO_CACHE_TTL,
+        stale_ttl=dify_config.BILLING_INFO_CACHE_STALE_TTL,
+        local_ttl=dify_config.BILLING_INFO_LOCAL_CACHE_TTL,
+    )
+
     @classmethod
     def get_info(cls, tenant_id: str):
-        params = {"tenant_id": tenant_id}
-
-        billing_info = cls._send_request("GET", "/subscription/info", params=params)
-        return billing_info
+        return cls._info_cache.get(tenant_id)
 
     @classmethod
     def get_knowledge_rate_limit(cls, tenant_id: str):
-        params = {"tenant_id": tenant_id}
-
-        knowledge_rate_limit = cls._send_request("GET", "/subscription/knowledge-rate-limit", params=params)
+        knowledge_rate_limit = cls._knowledge_rate_limit_cache.get(tenant_id)
 
         return {
             "limit": knowledge_rate_limit.get("limit", 10),
             "subscription_plan": knowledge_rate_limit.get("subscription_plan", "sandbox"),
         }
 
+    @classmethod
+    def _fetch_tenant_subscription(cls, endpoint: str, tenant_id: str) -> dict:
+        result: dict = cls._send_request("GET", endpoint, params={"tenant_id": tenant_id})
+        return result
+
+    @classmethod
+    def invalidate_tenant_cache(cls, tenant_id: str):
+        """Drop the cached subscription of a tenant after it changed."""
+        cls._info_cache.invalidate(tenant_id)
+        cls._knowledge_rate_limit_cache.invalidate(tenant_id)
+
+    @classmethod
+    def invalidate_tenant_usage(cls, tenant_id: str):
+        """Drop the cached subscription of a tenant after resources counted against its plan limits changed."""
+        cls._info_cache.invalidate(tenant_id)
+
     @classmethod
     def get_subscription(cls, plan: str, interval: str, prefilled_email: str = "", tenant_id: str = ""):
         params = {"plan": plan, "interval": interval, "prefilled_email": prefilled_email, "tenant_id": tenant_id}
@@ -64,7 +122,7 @@ class BillingService:
         headers = {"Content-Type": "application/json", "Billing-Api-Secret-Key": cls.secret_key}
 
         url = f"{cls.base_url}{endpoint}"
-        response = httpx.request(method, url, json=json, params=params, headers=headers)
+        response = _get_client().request(method, url, json=json, params=params, headers=headers)
         if method == "GET" and response.status_code != httpx.codes.OK:
             raise ValueError("Unable to retrieve billing information. Please try again later or contact support.")
         return response.json()
@@ -141,7 +199,10 @@ class BillingService:
                 "token": token,
                 "role": role,
             }
-            return BillingService._send_request("POST", "/education/", json=json, params=params)
+            result = BillingService._send_request("POST", "/education/", json=json, params=params)
+            if account.current_tenant_id:
+                BillingService.invalidate_tenant_cache(account.current_tenant_id)
+            return result
 
         @classmethod
         def autocomplete(cls, keywords: str, page: int = 0, limit: int = 20):
@@ -173,3 +234,37 @@ class BillingService:
         res = cls._send_request("POST", "/compliance/download", json=json)
         cls.compliance_download_rate_limiter.increment_rate_limit(limiter_key)
         return res
+
+
+def _collect_usage_change(mapper: Mapper, connection: Any, target: Any) -> None:
+    session = object_session(target)
+    if session is None or not dify_config.BILLING_ENABLED:
+        return
+    if isinstance(target, MessageAnnotation):
+        tenant_id = connection.scalar(select(App.tenant_id).where(App.id == target.app_id))
+    else:
+        tenant_id = target.tenant_id
+    if tenant_id:
+        session.info.setdefault(_PENDING_USAGE_CHANGES_KEY, set()).add(tenant_id)
+
+
+# The plan limits are checked against the usage counters of the cached subscription, which must not lag behind the
+# resources created or deleted. Bulk query deletes do not emit mapper events, the counters then refresh with the cache.
+for _model in (App, TenantAccountJoin, Document, MessageAnnotation):
+    event.listen(_model, "after_insert", _collect_usage_change)
+    event.listen(_model, "after_delete", _collect_usage_change)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_usage_changes(session: Session) -> None:
+    tenant_ids = session.info.pop(_PENDING_USAGE_CHANGES_KEY, None)
+    for tenant_id in tenant_ids or ():
+        try:
+            BillingService.invalidate_tenant_usage(tenant_id)
+        except Exception:
+            logger.exception("Failed to invalidate the cached subscription, tenant_id=%s", tenant_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_usage_changes(session: Session) -> None:
+    session.info.pop(_PENDING_USAGE_CHANGES_KEY, None)
@@ -0,0 +1,252 @@
+from collections import defaultdict
+from collections.abc import Iterable, Sequence
+from typing import Any, Optional
+
+from sqlalchemy import func, select
+
+from core.workflow.entities.workflow_execution import WorkflowExecutionStatus
+from extensions.ext_database import db
+from models.account import Account
+from models.model import (
+    AppAnnotationHitHistory,
+    AppModelConfig,
+    Conversation,
+    EndUser,
+    Message,
+    MessageAgentThought,
+    MessageAnnotation,
+    MessageFeedback,
+)
+from models.workflow import WorkflowRun
+
+
+class Projection:
+    """
+    Read-only view of a model with properties precomputed for a whole page.
+
+    Precomputed values shadow the model attributes of the same name, anything else is read from the model, so the
+    marshalling fields work unchanged on a projection.
+    """
+
+    def __init__(self, model: Any, **values: Any):
+        self._model = model
+        self._values = values
+
+    def __getattr__(self, name: str) -> Any:
+        values = self.__dict__["_values"]
+        if name in values:
+            return values[name]
+        return getattr(self.__dict__["_model"], name)
+
+
+class ConversationProjectionService:
+    """
+    Load the per-row properties marshalled by the conversation and message list endpoints for a whole page at once.
+
+    Each property of `Conversation` and `Message` runs its own queries, so marshalling a page of 100 rows used to
+    issue over a thousand of them. Here every property is one grouped query for the page.
+    """
+
+    @classmethod
+    def project_conversations(cls, conversations: Sequence[Conversation]) -> list[Projection]:
+        if not conversations:
+            return []
+        conversation_ids = [conversation.id for conversation in conversations]
+
+        message_counts, status_counts = cls._load_message_counts(conversation_ids)
+        feedback_stats = cls._load_feedback_stats(conversation_ids)
+        first_messages = cls._load_first_rows(Message, Message.conversation_id, conversation_ids, Message.created_at)
+        annotations = cls._load_first_rows(
+            MessageAnnotation, MessageAnnotation.conversation_id, conversation_ids, MessageAnnotation.created_at
+        )
+        accounts = cls._load_accounts(
+            [conversation.from_account_id for conversation in conversations]
+            + [annotation.account_id for annotation in annotations.values()]
+        )
+        end_user_session_ids = cls._load_end_user_session_ids(
+            [conversation.from_end_user_id for conversation in conversations]
+        )
+        # serialized once per distinct config, conversations of an app mostly share it
+        app_model_configs = {
+            config_id: config.to_dict()
+            for config_id, config in cls._load_app_model_configs(
+                [c.app_model_config_id for c in conversations if c.uses_app_model_config]
+            ).items()
+        }
+
+        projections = []
+        for conversation in conversations:
+            first_message = first_messages.get(conversation.id)
+            annotation = annotations.get(conversation.id)
+            from_account = accounts.get(conversation.from_account_id) if conversation.from_account_id else None
+            projections.append(
+                Projection(
+                    conversation,
+                    message_count=message_counts.get(conversation.id, 0),
+                    status_count=status_counts.get(conversation.id),
+                    user_feedback_stats=feedback_stats[(conversation.id, "user")],
+                    admin_feedback_stats=feedback_stats[(conversation.id, "admin")],
+                    first_message=first_message,
+                    summary_or_query=conversation.summary or (first_message.query if first_message else ""),
+                    annotated=annotation is not None,
+                    annotation=cls._project_annotation(annotation, accounts),
+                    from_end_user_session_id=end_user_session_ids.get(conversation.from_end_user_id)
+                    if conversation.from_end_user_id
+                    else None,
+                    from_account_name=from_account.name if from_account else None,
+                    model_config=conversation.build_model_config(
+                        app_model_configs.get(conversation.app_model_config_id)
+                        if conversation.uses_app_model_config
+                        else None
+                    ),
+                )
+            )
+        return projections
+
+    @classmethod
+    def project_messages(cls, messages: Sequence[Message]) -> list[Projection]:
+        if not messages:
+            return []
+        message_ids = [message.id for message in messages]
+
+        feedbacks: dict[str, list[MessageFeedback]] = defaultdict(list)
+        for feedback in db.session.scalars(select(MessageFeedback).where(MessageFeedback.message_id.in_(message_ids))):
+            feedbacks[feedback.message_id].append(feedback)
+
+        annotations = cls._load_first_rows(
+            MessageAnnotation, MessageAnnotation.message_id, message_ids, MessageAnnotation.created_at
+        )
+
+        hit_annotations: dict[str, MessageAnnotation] = {}
+        hit_rows = db.session.execute(
+            select(AppAnnotationHitHistory.message_id, MessageAnnotation)
+            .join(MessageAnnotation, MessageAnnotation.id == AppAnnotationHitHistory.annotation_id)
+            .where(AppAnnotationHitHistory.message_id.in_(message_ids))
+            .order_by(AppAnnotationHitHistory.created_at.asc())
+        )
+        for message_id, annotation in hit_rows:
+            hit_annotations.setdefault(message_id, annotation)
+
+        agent_thoughts: dict[str, list[MessageAgentThought]] = defaultdict(list)
+        for thought in db.session.scalars(
+            select(MessageAgentThought)
+            .where(MessageAgentThought.message_id.in_(message_ids))
+            .order_by(MessageAgentThought.position.asc())
+        ):
+            agent_thoughts[thought.message_id].append(thought)
+
+        accounts = cls._load_accounts(
+            [feedback.from_account_id for items in feedbacks.values() for feedback in items]
+            + [annotation.account_id for annotation in annotations.values()]
+            + [annotation.account_id for annotation in hit_annotations.values()]
+        )
+
+        projections = []
+        for message in messages:
+            message_feedbacks = [
+                Projection(
+                    feedback,
+                    from_account=accounts.get(feedback.from_account_id) if feedback.from_account_id else None,
+                )
+                for feedback in feedbacks.get(message.id, [])
+            ]
+            projections.append(
+                Projection(
+                    message,
+                    feedbacks=message_feedbacks,
+                    user_feedback=next((f for f in message_feedbacks if f.from_source == "user"), None),
+                    admin_feedback=next((f for f in message_feedbacks if f.from_source == "admin"), None),
+                    annotation=cls._project_annotation(annotations.get(message.id), accounts),
+                    annotation_hit_history=cls._project_annotation(hit_annotations.get(message.id), accounts),
+                    agent_thoughts=agent_thoughts.get(message.id, []),
+                )
+            )
+        return projections
+
+    @staticmethod
+    def _project_annotation(
+        annotation: Optional[MessageAnnotation], accounts: dict[str, Account]
+    ) -> Optional[Projection]:
+        if annotation is None:
+            return None
+        account = accounts.get(annotation.account_id)
+        return Projection(annotation, account=account, annotation_create_account=account)
+
+    @staticmethod
+    def _load_message_counts(
+        conversation_ids: Sequence[str],
+    ) -> tuple[dict[str, int], dict[str, dict[str, int]]]:
+        rows = db.session.execute(
+            select(Message.conversation_id, WorkflowRun.status, func.count(Message.id))
+            .outerjoin(WorkflowRun, WorkflowRun.id == Message.workflow_run_id)
+            .where(Message.conversation_id.in_(conversation_ids))
+            .group_by(Message.conversation_id, WorkflowRun.status)
+        )
+        message_counts: dict[str, int] = defaultdict(int)
+        status_counts: dict[str, dict[str, int]] = {}
+        for conversation_id, status, count in rows:
+            message_counts[conversation_id] += count
+            counts = status_counts.setdefault(conversation_id, {"success": 0, "failed": 0, "partial_success": 0})
+            if status == WorkflowExecutionStatus.SUCCEEDED:
+                counts["success"] += count
+            elif status == WorkflowExecutionStatus.FAILED:
+                counts["failed"] += count
+            elif status == WorkflowExecutionStatus.PARTIAL_SUCCEEDED:
+                counts["partial_success"] += count
+        return message_counts, status_counts
+
+    @staticmethod
+    def _load_feedback_stats(conversation_ids: Sequence[str]) -> dict[tuple[str, str], dict[str, int]]:
+        rows = db.session.execute(
+            select(
+                MessageFeedback.conversation_id,
+                MessageFeedback.from_source,
+                MessageFeedback.rating,
+                func.count(MessageFeedback.id),
+            )
+            .where(MessageFeedback.conversation_id.in_(conversation_ids))
+            .group_by(MessageFeedback.conversation_id, MessageFeedback.from_source, MessageFeedback.rating)
+        )
+        stats: dict[tuple[str, str], dict[str, int]] = defaultdict(lambda: {"like": 0, "dislike": 0})
+        for conversation_id, from_source, rating, count in rows:
+            if rating in {"like", "dislike"}:
+                stats[(conversation_id, from_source)][rating] += count
+        return stats
+
+    @staticmethod
+    def _load_first_rows(model: Any, group_column: Any, group_ids: Sequence[str], order_column: Any) -> dict[str, Any]:
+        """First row of `model` per group, ranked with a window function in a single query."""
+        ranked = (
+            select(
+                model.id.label("id"),
+                func.row_number().over(partition_by=group_column, order_by=order_column.asc()).label("rank"),
+            )
+            .where(group_column.in_(group_ids))
+            .subquery()
+        )
+        rows = db.session.scalars(select(model).join(ranked, model.id == ranked.c.id).where(ranked.c.rank == 1))
+        return {getattr(row, group_column.key): row for row in rows}
+
+    @staticmethod
+    def _load_accounts(account_ids: Iterable[Optional[str]]) -> dict[str, Account]:
+        ids = {account_id for account_id in account_ids if account_id}
+        if not ids:
+            return {}
+        return {account.id: account for account in db.session.scalars(select(Account).where(Account.id.in_(ids)))}
+
+    @staticmethod
+    def _load_end_user_session_ids(end_user_ids: Iterable[Optional[str]]) -> dict[str, str]:
+        ids = {end_user_id for end_user_id in end_user_ids if end_user_id}
+        if not ids:
+            return {}
+        rows = db.session.execute(select(EndUser.id, EndUser.session_id).where(EndUser.id.in_(ids)))
+        return {row.id: row.session_id for row in rows}
+
+    @staticmethod
+    def _load_app_model_configs(app_model_config_ids: Iterable[Optional[str]]) -> dict[str, AppModelConfig]:
+        ids = {config_id for config_id in app_model_config_ids if config_id}
+        if not ids:
+            return {}
+        return {
+            config.id: config for config in db.session.scalars(select(AppModelConfig).where(AppModelConfig.id.in_(ids)))
+        }
@@ -0,0 +1,101 @@
+import logging
+from dataclasses import dataclass
+
+from sqlalchemy import CompoundSelect, Select, or_, select, text, union
+
+from extensions.ext_database import db
+from models.model import Conversation, EndUser, Message
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SearchIndex:
+    name: str
+    table: str
+    column: str
+
+
+# Trigram GIN indexes answering `ILIKE '%keyword%'` on the columns searched by the conversation logs. Postgres
+# maintains them on every insert and update, so new messages are searchable as soon as they are committed.
+CONVERSATION_SEARCH_INDEXES = (
+    SearchIndex("message_query_trgm_idx", "messages", "query"),
+    SearchIndex("message_answer_trgm_idx", "messages", "answer"),
+    SearchIndex("conversation_name_trgm_idx", "conversations", "name"),
+    SearchIndex("conversation_introduction_trgm_idx", "conversations", "introduction"),
+    SearchIndex("end_user_session_id_trgm_idx", "end_users", "session_id"),
+)
+
+
+class ConversationSearchService:
+    """
+    Keyword search over the conversation logs of an app.
+
+    The matching conversation ids are collected by a union of one subquery per searched table, each scoped to the
+    app and each able to use its own trigram index, and the page query filters with `Conversation.id IN (...)`.
+    The previous join of every message followed by `GROUP BY` had to scan all messages of the app.
+    Keywords shorter than three characters have no trigrams, Postgres falls back to scanning for those.
+    """
+
+    @staticmethod
+    def keyword_pattern(keyword: str) -> str:
+        return f"%{keyword}%"
+
+    @classmethod
+    def matching_conversation_ids(
+        cls, app_id: str, keyword: str, include_conversation_fields: bool = True
+    ) -> Select | CompoundSelect:
+        pattern = cls.keyword_pattern(keyword)
+        by_message = select(Message.conversation_id).where(
+            Message.app_id == app_id,
+            or_(Message.query.ilike(pattern), Message.answer.ilike(pattern)),
+        )
+        if not include_conversation_fields:
+            return by_message
+
+        by_conversation = select(Conversation.id).where(
+            Conversation.app_id == app_id,
+            or_(Conversation.name.ilike(pattern), Conversation.introduction.ilike(pattern)),
+        )
+        by_end_user = (
+            select(Conversation.id)
+            .join(EndUser, EndUser.id == Conversation.from_end_user_id)
+            .where(Conversation.app_id == app_id, EndUser.session_id.ilike(pattern))
+        )
+        return union(by_message, by_conversation, by_end_user)
+
+    @staticmethod
+    def ensure_indexes(rebuild_invalid: bool = True) -> list[str]:
+        """
+        Create the search indexes that are missing and rebuild the ones left invalid by an interrupted build.
+
+        Indexes are built with `CREATE INDEX CONCURRENTLY`, which does not block writes but cannot run in a
+        transaction, so every statement runs on its own autocommit connection. Returns the names of the built indexes.
+        """
+        built = []
+        with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for index in CONVERSATION_SEARCH_INDEXES:
+                valid = conn.execute(
+                    text(
+                        "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                        "WHERE c.relname = :name"
+                    ),
+                    {"name": index.name},
+                ).scalar()
+                if valid:
+                    continue
+                if valid is not None:
+                    if not rebuild_invalid:
+                        continue
+                    logger.info("Dropping invalid search index %s", index.name)
+                    conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}"))
+                logger.info("Building search index %s on %s.%s", index.name, index.table, index.column)
+                conn.execute(
+                    text(
+                        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index.name} "
+                        f"ON {index.table} USING gin ({index.column} gin_trgm_ops)"
+                    )
+                )
+                built.append(index.name)
+        return built
@@ -12,9 +12,12 @@ class EnterpriseRequest:
         "https": "",
     }
 
+    # one connection pool for all requests of the process instead of a new connection per request
+    _session = requests.Session()
+
     @classmethod
     def send_request(cls, method, endpoint, json=None, params=None):
         headers = {"Content-Type": "application/json", "Enterprise-Api-Secret-Key": cls.secret_key}
         url = f"{cls.base_url}{endpoint}"
-        response = requests.request(method, url, json=json, params=params, headers=headers, proxies=cls.proxies)
+        response = cls._session.request(method, url, json=json, params=params, headers=headers, proxies=cls.proxies)
         return response.json()
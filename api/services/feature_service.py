@@ -3,6 +3,7 @@ from enum import StrEnum
 from pydantic import BaseModel, ConfigDict, Field
 
 from configs import dify_config
+from libs.rate_limiter import SlidingWindowLimiter
 from services.billing_service import BillingService
 from services.enterprise.enterprise_service import EnterpriseService
 
@@ -134,6 +135,10 @@ class KnowledgeRateLimitModel(BaseModel):
     subscription_plan: str = ""
 
 
+# knowledge requests of each tenant in the last minute, checked against `KnowledgeRateLimitModel.limit`
+knowledge_rate_limiter = SlidingWindowLimiter("knowledge_rate_limit", window=60)
+
+
 class SystemFeatureModel(BaseModel):
     sso_enforced_for_signin: bool = False
     sso_enforced_for_signin_protocol: str = ""
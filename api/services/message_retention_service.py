@@ -0,0 +1,239 @@
+import datetime
+import logging
+import time
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from flask import Flask, current_app
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.orm import Session
+
+from configs import dify_config
+from extensions.ext_database import db
+from extensions.ext_redis import redis_client
+from models.model import (
+    App,
+    Message,
+    MessageAgentThought,
+    MessageAnnotation,
+    MessageChain,
+    MessageFeedback,
+    MessageFile,
+)
+from models.web import SavedMessage
+from services.feature_service import FeatureService
+
+logger = logging.getLogger(__name__)
+
+# tables holding rows that reference messages.id, cleared before the messages themselves
+MESSAGE_CHILD_MODELS = (
+    MessageFeedback,
+    MessageAnnotation,
+    MessageChain,
+    MessageAgentThought,
+    MessageFile,
+    SavedMessage,
+)
+
+# progress markers outlive a few missed runs, an expired marker only costs a rescan from the beginning
+PROGRESS_MARKER_TTL = 7 * 24 * 60 * 60
+
+
+@dataclass
+class RetentionCursor:
+    """Keyset position: every expired message ordered before it has been deleted."""
+
+    created_at: datetime.datetime
+    message_id: str
+
+    def dumps(self) -> str:
+        return f"{self.created_at.isoformat()}|{self.message_id}"
+
+    @classmethod
+    def loads(cls, value: str | bytes) -> "RetentionCursor":
+        if isinstance(value, bytes):
+            value = value.decode()
+        created_at, message_id = value.split("|", 1)
+        return cls(created_at=datetime.datetime.fromisoformat(created_at), message_id=message_id)
+
+
+@dataclass
+class TenantRetentionResult:
+    tenant_id: str
+    deleted_messages: int = 0
+    batches: int = 0
+    skipped: bool = False
+
+
+@dataclass
+class RateLimiter:
+    """Paces deletions of one worker to at most `rows_per_second` rows, 0 disables pacing."""
+
+    rows_per_second: int
+    _started_at: float = field(default_factory=time.monotonic)
+    _rows: int = 0
+
+    def throttle(self, rows: int) -> None:
+        if self.rows_per_second <= 0:
+            return
+        self._rows += rows
+        expected_elapsed = self._rows / self.rows_per_second
+        elapsed = time.monotonic() - self._started_at
+        if expected_elapsed > elapsed:
+            time.sleep(expected_elapsed - elapsed)
+
+
+class MessageRetentionService:
+    """
+    Bulk deletion of expired messages of sandbox tenants.
+
+    Each tenant is swept in keyset order over (created_at, id), deleting a whole batch of messages and their
+    child rows with one `message_id IN (...)` statement per table and a single commit. The last deleted
+    position is stored in Redis, so an interrupted run resumes where it stopped instead of rescanning.
+    """
+
+    @classmethod
+    def clean_expired_messages(
+        cls,
+        before: datetime.datetime,
+        batch_size: Optional[int] = None,
+        rows_per_second: Optional[int] = None,
+        tenant_workers: Optional[int] = None,
+    ) -> list[TenantRetentionResult]:
+        batch_size = batch_size or dify_config.MESSAGE_CLEAN_BATCH_SIZE
+        rows_per_second = dify_config.MESSAGE_CLEAN_MAX_ROWS_PER_SECOND if rows_per_second is None else rows_per_second
+        tenant_workers = tenant_workers or dify_config.MESSAGE_CLEAN_TENANT_WORKERS
+
+        tenant_ids = list(db.session.scalars(select(App.tenant_id).distinct()).all())
+        db.session.close()
+
+        flask_app: Flask = current_app._get_current_object()  # type: ignore
+        if tenant_workers <= 1:
+            return [
+                cls._clean_tenant_in_context(flask_app, tenant_id, before, batch_size, rows_per_second)
+                for tenant_id in tenant_ids
+            ]
+
+        with ThreadPoolExecutor(max_workers=tenant_workers) as executor:
+            return list(
+                executor.map(
+                    lambda tenant_id: cls._clean_tenant_in_context(
+                        flask_app, tenant_id, before, batch_size, rows_per_second
+                    ),
+                    tenant_ids,
+                )
+            )
+
+    @classmethod
+    def _clean_tenant_in_context(
+        cls, flask_app: Flask, tenant_id: str, before: datetime.datetime, batch_size: int, rows_per_second: int
+    ) -> TenantRetentionResult:
+        with flask_app.app_context():
+            try:
+                return cls.clean_tenant(tenant_id, before, batch_size, rows_per_second)
+            except Exception:
+                logger.exception("Failed to clean expired messages, tenant_id=%s", tenant_id)
+                return TenantRetentionResult(tenant_id=tenant_id, skipped=True)
+
+    @classmethod
+    def clean_tenant(
+        cls, tenant_id: str, before: datetime.datetime, batch_size: int, rows_per_second: int = 0
+    ) -> TenantRetentionResult:
+        result = TenantRetentionResult(tenant_id=tenant_id)
+        lock = redis_client.lock(f"clean_messages:lock:{tenant_id}", timeout=600)
+        if not lock.acquire(blocking=False):
+            # another worker is already sweeping this tenant
+            result.skipped = True
+            return result
+        try:
+            with Session(db.engine) as session:
+                app_ids = list(session.scalars(select(App.id).where(App.tenant_id == tenant_id)).all())
+            if not app_ids:
+                return result
+
+            cursor = cls._load_cursor(tenant_id)
+            limiter = RateLimiter(rows_per_second)
+            plan_checked = False
+            while True:
+                with Session(db.engine) as session:
+                    batch = cls._fetch_batch(session, app_ids, before, cursor, batch_size)
+                    if not batch:
+                        break
+                    # only ask billing about tenants that actually have expired messages
+                    if not plan_checked:
+                        if cls._get_plan(tenant_id) != "sandbox":
+                            result.skipped = True
+                            break
+                        plan_checked = True
+                    cls._delete_batch(session, [message_id for message_id, _ in batch])
+                    session.commit()
+
+                last_id, last_created_at = batch[-1]
+                cursor = RetentionCursor(created_at=last_created_at, message_id=last_id)
+                cls._save_cursor(tenant_id, cursor)
+                result.deleted_messages += len(batch)
+                result.batches += 1
+                lock.reacquire()
+                limiter.throttle(len(batch))
+                if len(batch) < batch_size:
+                    break
+            return result
+        finally:
+            try:
+                lock.release()
+            except Exception:
+                logger.warning("Failed to release clean messages lock, tenant_id=%s", tenant_id)
+
+    @staticmethod
+    def _fetch_batch(
+        session: Session,
+        app_ids: Sequence[str],
+        before: datetime.datetime,
+        cursor: Optional[RetentionCursor],
+        batch_size: int,
+    ) -> list[tuple[str, datetime.datetime]]:
+        stmt = select(Message.id, Message.created_at).where(Message.app_id.in_(app_ids), Message.created_at < before)
+        if cursor:
+            stmt = stmt.where(tuple_(Message.created_at, Message.id) > (cursor.created_at, cursor.message_id))
+        stmt = stmt.order_by(Message.created_at, Message.id).limit(batch_size)
+        return [(message_id, created_at) for message_id, created_at in session.execute(stmt).all()]
+
+    @staticmethod
+    def _delete_batch(session: Session, message_ids: Sequence[str]) -> None:
+        for model in MESSAGE_CHILD_MODELS:
+            session.execute(
+                delete(model).where(model.message_id.in_(message_ids)).execution_options(synchronize_session=False)
+            )
+        session.execute(delete(Message).where(Message.id.in_(message_ids)).execution_options(synchronize_session=False))
+
+    @staticmethod
+    def _get_plan(tenant_id: str) -> str:
+        features_cache_key = f"features:{tenant_id}"
+        plan_cache = redis_client.get(features_cache_key)
+        if plan_cache is not None:
+            cached_plan: str = plan_cache.decode()
+            return cached_plan
+        plan: str = FeatureService.get_features(tenant_id).billing.subscription.plan
+        redis_client.setex(features_cache_key, 600, plan)
+        return plan
+
+    @staticmethod
+    def _progress_key(tenant_id: str) -> str:
+        return f"clean_messages:progress:{tenant_id}"
+
+    @classmethod
+    def _load_cursor(cls, tenant_id: str) -> Optional[RetentionCursor]:
+        value = redis_client.get(cls._progress_key(tenant_id))
+        if not value:
+            return None
+        try:
+            return RetentionCursor.loads(value)
+        except ValueError:
+            logger.warning("Ignoring malformed clean messages progress marker, tenant_id=%s", tenant_id)
+            return None
+
+    @classmethod
+    def _save_cursor(cls, tenant_id: str, cursor: RetentionCursor) -> None:
+        redis_client.setex(cls._progress_key(tenant_id), PROGRESS_MARKER_TTL, cursor.dumps())
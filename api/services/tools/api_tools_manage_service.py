@@ -18,6 +18,7 @@ from core.tools.entities.tool_entities import (
 )
 from core.tools.tool_label_manager import ToolLabelManager
 from core.tools.tool_manager import ToolManager
+from core.tools.tool_runtime_cache import ToolRuntimeCache
 from core.tools.utils.encryption import create_tool_provider_encrypter
 from core.tools.utils.parser import ApiBasedToolSchemaParser
 from extensions.ext_database import db
@@ -172,6 +173,7 @@ class ApiToolManageService:
 
         db.session.add(db_provider)
         db.session.commit()
+        ToolRuntimeCache.invalidate_tenant(tenant_id)
 
         # update labels
         ToolLabelManager.update_tool_labels(provider_controller, labels)
@@ -310,6 +312,7 @@ class ApiToolManageService:
 
         db.session.add(provider)
         db.session.commit()
+        ToolRuntimeCache.invalidate_tenant(tenant_id)
 
         # delete cache
         cache.delete()
@@ -338,6 +341,7 @@ class ApiToolManageService:
 
         db.session.delete(provider)
         db.session.commit()
+        ToolRuntimeCache.invalidate_tenant(tenant_id)
 
         return {"result": "success"}
 
@@ -25,6 +25,7 @@ from core.tools.errors import ToolProviderNotFoundError
 from core.tools.plugin_tool.provider import PluginToolProviderController
 from core.tools.tool_label_manager import ToolLabelManager
 from core.tools.tool_manager import ToolManager
+from core.tools.tool_runtime_cache import ToolRuntimeCache
 from core.tools.utils.encryption import create_provider_encrypter
 from core.tools.utils.system_oauth_encryption import decrypt_system_oauth_params
 from extensions.ext_database import db
@@ -53,6 +54,7 @@ class BuiltinToolManageService:
                 plugin_id=tool_provider.plugin_id,
             ).delete()
             session.commit()
+        ToolRuntimeCache.invalidate_tenant(tenant_id)
         return {"result": "success"}
 
     @staticmethod
@@ -204,6 +206,7 @@ class BuiltinToolManageService:
             except Exception as e:
                 session.rollback()
                 raise ValueError(str(e))
+        ToolRuntimeCache.invalidate_tenant(tenant_id)
         return {"result": "success"}
 
     @staticmethod
@@ -281,6 +284,7 @@ class BuiltinToolManageService:
         except Exception as e:
             session.rollback()
             raise ValueError(str(e))
+        ToolRuntimeCache.invalidate_tenant(tenant_id)
         return {"result": "success"}
 
     @staticmethod
@@ -424,6 +428,7 @@ class BuiltinToolManageService:
             )
             cache.delete()
 
+        ToolRuntimeCache.invalidate_tenant(tenant_id)
         return {"result": "success"}
 
     @staticmethod
@@ -445,6 +450,7 @@ class BuiltinToolManageService:
             # set new default provider
             target_provider.is_default = True
             session.commit()
+        ToolRuntimeCache.invalidate_tenant(tenant_id)
         return {"result": "success"}
 
     @staticmethod
@@ -713,6 +719,7 @@ class BuiltinToolManageService:
                 custom_client_params.enabled = enable_oauth_custom_client
 
             session.commit()
+        ToolRuntimeCache.invalidate_tenant(tenant_id)
         return {"result": "success"}
 
     @staticmethod
@@ -14,6 +14,7 @@ from core.tools.entities.api_entities import ToolProviderApiEntity
 from core.tools.entities.common_entities import I18nObject
 from core.tools.entities.tool_entities import ToolProviderType
 from core.tools.mcp_tool.provider import MCPToolProviderController
+from core.tools.tool_runtime_cache import ToolRuntimeCache
 from core.tools.utils.encryption import ProviderConfigEncrypter
 from extensions.ext_database import db
 from models.tools import MCPToolProvider
@@ -94,6 +95,7 @@ class MCPToolManageService:
         )
         db.session.add(mcp_tool)
         db.session.commit()
+        ToolRuntimeCache.invalidate_tenant(tenant_id)
         return ToolTransformService.mcp_provider_to_user_provider(mcp_tool, for_list=True)
 
     @staticmethod
@@ -129,6 +131,7 @@ class MCPToolManageService:
             mcp_provider.authed = True
             mcp_provider.updated_at = datetime.now()
             db.session.commit()
+            ToolRuntimeCache.invalidate_tenant(tenant_id)
         except Exception:
             db.session.rollback()
             raise
@@ -154,6 +157,7 @@ class MCPToolManageService:
 
         db.session.delete(mcp_tool)
         db.session.commit()
+        ToolRuntimeCache.invalidate_tenant(tenant_id)
 
     @classmethod
     def update_mcp_provider(
@@ -198,6 +202,7 @@ class MCPToolManageService:
                     mcp_provider.encrypted_credentials = reconnect_result["encrypted_credentials"]
 
             db.session.commit()
+            ToolRuntimeCache.invalidate_tenant(tenant_id)
         except IntegrityError as e:
             db.session.rollback()
             error_msg = str(e.orig)
@@ -229,6 +234,7 @@ class MCPToolManageService:
         if not authed:
             mcp_provider.tools = "[]"
         db.session.commit()
+        ToolRuntimeCache.invalidate_tenant(mcp_provider.tenant_id)
 
     @classmethod
     def _re_connect_mcp_provider(cls, server_url: str, provider_id: str, tenant_id: str):
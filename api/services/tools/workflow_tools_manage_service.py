@@ -9,6 +9,7 @@ from core.model_runtime.utils.encoders import jsonable_encoder
 from core.tools.__base.tool_provider import ToolProviderController
 from core.tools.entities.api_entities import ToolApiEntity, ToolProviderApiEntity
 from core.tools.tool_label_manager import ToolLabelManager
+from core.tools.tool_runtime_cache import ToolRuntimeCache
 from core.tools.utils.workflow_configuration_sync import WorkflowToolConfigurationUtils
 from core.tools.workflow_as_tool.provider import WorkflowToolProviderController
 from core.tools.workflow_as_tool.tool import WorkflowTool
@@ -83,6 +84,7 @@ class WorkflowToolManageService:
 
         db.session.add(workflow_tool_provider)
         db.session.commit()
+        ToolRuntimeCache.invalidate_tenant(tenant_id)
 
         if labels is not None:
             ToolLabelManager.update_tool_labels(
@@ -170,6 +172,7 @@ class WorkflowToolManageService:
 
         db.session.add(workflow_tool_provider)
         db.session.commit()
+        ToolRuntimeCache.invalidate_tenant(tenant_id)
 
         if labels is not None:
             ToolLabelManager.update_tool_labels(
@@ -229,6 +232,7 @@ class WorkflowToolManageService:
         ).delete()
 
         db.session.commit()
+        ToolRuntimeCache.invalidate_tenant(tenant_id)
 
         return {"result": "success"}
 
@@ -1,17 +1,18 @@
 import dataclasses
 import datetime
 import logging
-from collections.abc import Mapping, Sequence
+from collections.abc import Iterable, Mapping, Sequence
 from enum import StrEnum
 from typing import Any, ClassVar
 
-from sqlalchemy import Engine, orm
+from sqlalchemy import Engine, event, orm, select, tuple_
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.sql.expression import and_, or_
 
 from core.app.entities.app_invoke_entities import InvokeFrom
 from core.file.models import File
+from core.helper import large_value_offload
 from core.variables import Segment, StringSegment, Variable
 from core.variables.consts import MIN_SELECTORS_LENGTH
 from core.variables.segments import ArrayFileSegment, FileSegment
@@ -231,6 +232,7 @@ class WorkflowDraftVariableService:
             variable.set_name(name)
         if value is not None:
             variable.set_value(value)
+            _offload_after_commit(self._session, variables=[variable])
         variable.last_edited_at = datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
         self._session.flush()
         return variable
@@ -248,6 +250,7 @@ class WorkflowDraftVariableService:
             return None
 
         variable.set_value(conv_var)
+        _offload_after_commit(self._session, variables=[variable])
         variable.last_edited_at = None
         self._session.add(variable)
         self._session.flush()
@@ -309,6 +312,7 @@ class WorkflowDraftVariableService:
         value_seg = WorkflowDraftVariable.build_segment_with_type(variable.value_type, output_value)
         # Extract variable value using unified logic
         variable.set_value(value_seg)
+        _offload_after_commit(self._session, variables=[variable])
         variable.last_edited_at = None  # Reset to indicate this is a reset operation
         self._session.flush()
         return variable
@@ -324,8 +328,11 @@ class WorkflowDraftVariableService:
 
     def delete_variable(self, variable: WorkflowDraftVariable):
         self._session.delete(variable)
+        if variable.value_storage_key is not None:
+            _offload_after_commit(self._session, storage_keys=[variable.value_storage_key])
 
     def delete_workflow_variables(self, app_id: str):
+        self._delete_offloaded_values(WorkflowDraftVariable.app_id == app_id)
         (
             self._session.query(WorkflowDraftVariable)
             .where(WorkflowDraftVariable.app_id == app_id)
@@ -336,10 +343,20 @@ class WorkflowDraftVariableService:
         return self._delete_node_variables(app_id, node_id)
 
     def _delete_node_variables(self, app_id: str, node_id: str):
-        self._session.query(WorkflowDraftVariable).where(
+        criteria = (
             WorkflowDraftVariable.app_id == app_id,
             WorkflowDraftVariable.node_id == node_id,
-        ).delete()
+        )
+        self._delete_offloaded_values(*criteria)
+        self._session.query(WorkflowDraftVariable).where(*criteria).delete()
+
+    def _delete_offloaded_values(self, *criteria):
+        storage_keys = self._session.scalars(
+            select(WorkflowDraftVariable.value_storage_key).where(
+                *criteria, WorkflowDraftVariable.value_storage_key.is_not(None)
+            )
+        ).all()
+        _offload_after_commit(self._session, storage_keys=[key for key in storage_keys if key is not None])
 
     def _get_conversation_id_from_draft_variable(self, app_id: str) -> str | None:
         draft_var = self._get_variable(
@@ -461,7 +478,20 @@ def _batch_upsert_draft_varaible(
     # For these reasons, we use the SQLAlchemy query builder and rely on dialect-specific
     # insert operations instead of the ORM layer.
     stmt = insert(WorkflowDraftVariable).values([_model_to_insertion_dict(v) for v in draft_vars])
+    selectors = [(v.app_id, v.node_id, v.name) for v in draft_vars]
     if policy == _UpsertPolicy.OVERWRITE:
+        # the values of the overwritten rows are deleted from the storage once the new ones are committed
+        replaced_storage_keys = session.scalars(
+            select(WorkflowDraftVariable.value_storage_key).where(
+                tuple_(WorkflowDraftVariable.app_id, WorkflowDraftVariable.node_id, WorkflowDraftVariable.name).in_(
+                    selectors
+                ),
+                WorkflowDraftVariable.value_storage_key.is_not(None),
+            )
+        ).all()
+        _offload_after_commit(
+            session, variables=draft_vars, storage_keys=[key for key in replaced_storage_keys if key is not None]
+        )
         stmt = stmt.on_conflict_do_update(
             index_elements=WorkflowDraftVariable.unique_app_id_node_id_name(),
             set_={
@@ -473,6 +503,7 @@ def _batch_upsert_draft_varaible(
                 "description": stmt.excluded.description,
                 "value_type": stmt.excluded.value_type,
                 "value": stmt.excluded.value,
+                "value_storage_key": stmt.excluded.value_storage_key,
                 "visible": stmt.excluded.visible,
                 "editable": stmt.excluded.editable,
                 "node_execution_id": stmt.excluded.node_execution_id,
@@ -480,11 +511,53 @@ def _batch_upsert_draft_varaible(
         )
     elif _UpsertPolicy.IGNORE:
         stmt = stmt.on_conflict_do_nothing(index_elements=WorkflowDraftVariable.unique_app_id_node_id_name())
+        # only the values of the inserted rows are saved to the storage
+        inserted = set(
+            session.execute(
+                stmt.returning(WorkflowDraftVariable.app_id, WorkflowDraftVariable.node_id, WorkflowDraftVariable.name)
+            ).tuples()
+        )
+        _offload_after_commit(
+            session, variables=[v for v, selector in zip(draft_vars, selectors) if selector in inserted]
+        )
+        return None
     else:
         raise Exception("Invalid value for update policy.")
     session.execute(stmt)
 
 
+_PENDING_OFFLOADS_KEY = "workflow_draft_variable_offloads"
+
+
+def _offload_after_commit(
+    session: Session, variables: Iterable[WorkflowDraftVariable] = (), storage_keys: Iterable[str] = ()
+) -> None:
+    """Save the values set on `variables` to the storage and delete `storage_keys` from it once `session` commits."""
+    pending_variables, pending_storage_keys = session.info.setdefault(_PENDING_OFFLOADS_KEY, ([], []))
+    pending_variables.extend(variables)
+    pending_storage_keys.extend(storage_keys)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_offloads(session: Session) -> None:
+    pending = session.info.pop(_PENDING_OFFLOADS_KEY, None)
+    if pending is None:
+        return
+    variables, storage_keys = pending
+    for variable in variables:
+        variable.save_offloaded_value()
+    large_value_offload.delete(storage_keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_offloads(session: Session) -> None:
+    pending = session.info.pop(_PENDING_OFFLOADS_KEY, None)
+    if pending is None:
+        return
+    for variable in pending[0]:
+        variable.discard_offloaded_value()
+
+
 def _model_to_insertion_dict(model: WorkflowDraftVariable) -> dict[str, Any]:
     d: dict[str, Any] = {
         "app_id": model.app_id,
@@ -494,6 +567,7 @@ def _model_to_insertion_dict(model: WorkflowDraftVariable) -> dict[str, Any]:
         "selector": model.selector,
         "value_type": model.value_type,
         "value": model.value,
+        "value_storage_key": model.value_storage_key,
         "node_execution_id": model.node_execution_id,
     }
     if model.visible is not None:
@@ -120,3 +120,24 @@ class WorkflowRunService:
             app_id=app_model.id,
             workflow_run_id=run_id,
         )
+
+    def get_workflow_run_node_execution(
+        self,
+        app_model: App,
+        run_id: str,
+        node_execution_id: str,
+    ) -> Optional[WorkflowNodeExecutionModel]:
+        """
+        Get a node execution of a workflow run
+        """
+        contexts.plugin_tool_providers.set({})
+        contexts.plugin_tool_providers_lock.set(threading.Lock())
+
+        node_execution = self._node_execution_service_repo.get_execution_by_id(
+            execution_id=node_execution_id,
+            tenant_id=app_model.tenant_id,
+        )
+        if not node_execution or node_execution.app_id != app_model.id or node_execution.workflow_run_id != run_id:
+            return None
+
+        return node_execution
@@ -0,0 +1,64 @@
+import json
+import logging
+import time
+from typing import Any
+
+import click
+from celery import shared_task  # type: ignore
+from flask import current_app
+from flask_login import user_logged_in  # type: ignore
+
+from core.app.apps.base_app_generate_response_converter import AppGenerateResponseConverter
+from core.app.apps.stream_event_bus import PING_FRAME, AppStreamEventBus
+from core.app.entities.app_invoke_entities import InvokeFrom
+from extensions.ext_database import db
+from models.model import App, EndUser
+
+
+@shared_task(queue="generation")
+def generate_app_stream_task(
+    stream_id: str, app_id: str, end_user_id: str, args: dict[str, Any], invoke_from: str
+) -> None:
+    """
+    Run a streaming app generation and publish its events to the stream of the request.
+
+    Args:
+        stream_id: Id of the Redis Stream the API tails
+        app_id: App ID
+        end_user_id: End user who sent the request
+        args: Parsed request arguments
+        invoke_from: Source of the request
+    """
+    from services.app_generate_service import AppGenerateService
+
+    logging.info(click.style(f"Start generate app stream: {stream_id}", fg="green"))
+    start_at = time.perf_counter()
+
+    try:
+        app_model = db.session.query(App).filter(App.id == app_id).first()
+        end_user = db.session.query(EndUser).filter(EndUser.id == end_user_id).first()
+        if not app_model or not end_user:
+            raise ValueError("App or end user not found.")
+
+        # the generators copy the request context into their worker threads
+        with current_app.test_request_context():
+            # log the end user in as the service API does, the workflows read their environment variables for them
+            current_app.login_manager._update_request_context_with_user(end_user)  # type: ignore
+            user_logged_in.send(current_app._get_current_object(), user=end_user)  # type: ignore
+            response = AppGenerateService.generate_in_process(
+                app_model=app_model, user=end_user, args=args, invoke_from=InvokeFrom(invoke_from), streaming=True
+            )
+            for frame in response:
+                # tailing clients are pinged by the API process
+                if frame != PING_FRAME:
+                    AppStreamEventBus.publish(stream_id, frame)
+
+        end_at = time.perf_counter()
+        logging.info(click.style(f"App stream generated: {stream_id} latency: {end_at - start_at}", fg="green"))
+    except Exception as e:
+        logging.exception("Generate app stream %s failed", stream_id)
+        data = AppGenerateResponseConverter.error_to_stream_response(e)
+        AppStreamEventBus.publish(stream_id, f"data: {json.dumps({'event': 'error', **data})}\n\n")
+    finally:
+        AppStreamEventBus.close(stream_id)
+        db.session.close()
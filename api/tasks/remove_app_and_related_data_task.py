@@ -30,10 +30,12 @@ from models import (
     TagBinding,
     TraceAppConfig,
 )
+from models.statistic import AppStatisticHourly, AppStatisticHourlyMember
 from models.tools import WorkflowToolProvider
 from models.web import PinnedConversation, SavedMessage
 from models.workflow import ConversationVariable, Workflow, WorkflowAppLog
 from repositories.factory import DifyAPIRepositoryFactory
+from services.api_token_service import ApiTokenService
 
 
 @shared_task(queue="app_deletion", bind=True, max_retries=3)
@@ -61,6 +63,7 @@ def remove_app_and_related_data_task(self, tenant_id: str, app_id: str):
         _delete_end_users(tenant_id, app_id)
         _delete_trace_app_configs(tenant_id, app_id)
         _delete_conversation_variables(app_id=app_id)
+        _delete_app_statistics(app_id=app_id)
 
         end_at = time.perf_counter()
         logging.info(click.style(f"App and related data deleted: {app_id} latency: {end_at - start_at}", fg="green"))
@@ -112,6 +115,8 @@ def _delete_app_api_tokens(tenant_id: str, app_id: str):
     _delete_records(
         """select id from api_tokens where app_id=:app_id limit 1000""", {"app_id": app_id}, del_api_token, "api token"
     )
+    # bulk deletes emit no mapper events, retire the cached lookups of the deleted tokens explicitly
+    ApiTokenService.invalidate_tenant(tenant_id)
 
 
 def _delete_installed_apps(tenant_id: str, app_id: str):
@@ -255,6 +260,14 @@ def _delete_conversation_variables(*, app_id: str):
         logging.info(click.style(f"Deleted conversation variables for app {app_id}", fg="green"))
 
 
+def _delete_app_statistics(*, app_id: str):
+    with db.engine.connect() as conn:
+        conn.execute(delete(AppStatisticHourly).where(AppStatisticHourly.app_id == app_id))
+        conn.execute(delete(AppStatisticHourlyMember).where(AppStatisticHourlyMember.app_id == app_id))
+        conn.commit()
+        logging.info(click.style(f"Deleted app statistics for app {app_id}", fg="green"))
+
+
 def _delete_app_messages(tenant_id: str, app_id: str):
     def del_message(message_id: str):
         db.session.query(MessageFeedback).where(MessageFeedback.message_id == message_id).delete(
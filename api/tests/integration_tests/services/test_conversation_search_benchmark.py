@@ -0,0 +1,86 @@
+import os
+import time
+import uuid
+
+import pytest
+from sqlalchemy import func, or_, select, text
+from sqlalchemy.orm import Session
+
+from models import db
+from models.model import Conversation, Message
+from services.conversation_search_service import ConversationSearchService
+
+# Seeding millions of rows takes minutes, the benchmark only runs when a size is given, e.g. 5000000.
+BENCHMARK_MESSAGES = int(os.environ.get("CONVERSATION_SEARCH_BENCHMARK_MESSAGES", "0"))
+MESSAGES_PER_CONVERSATION = 10
+
+
+def _seed(session: Session, app_id: str, messages: int) -> None:
+    conversations = max(messages // MESSAGES_PER_CONVERSATION, 1)
+    session.execute(
+        text(
+            "INSERT INTO conversations (id, app_id, mode, name, status, from_source, dialogue_count) "
+            "SELECT md5(:app_id || i)::uuid, :app_id, 'chat', 'conversation ' || i, 'normal', 'api', 0 "
+            "FROM generate_series(1, :conversations) AS i"
+        ),
+        {"app_id": app_id, "conversations": conversations},
+    )
+    session.execute(
+        text(
+            "INSERT INTO messages (app_id, conversation_id, query, message, message_unit_price, answer, "
+            "answer_unit_price, currency, from_source) "
+            "SELECT :app_id, md5(:app_id || (i % :conversations + 1))::uuid, 'question ' || md5(i::text), '{}', 0, "
+            "'answer ' || md5((i * 7)::text) || ' ' || md5((i * 13)::text), 0, 'USD', 'api' "
+            "FROM generate_series(1, :messages) AS i"
+        ),
+        {"app_id": app_id, "conversations": conversations, "messages": messages},
+    )
+    session.execute(text("ANALYZE messages"))
+    session.execute(text("ANALYZE conversations"))
+
+
+def _timed(session: Session, stmt) -> tuple[float, int]:
+    start = time.perf_counter()
+    rows = session.execute(stmt.limit(20)).all()
+    return time.perf_counter() - start, len(rows)
+
+
+@pytest.mark.skipif(not BENCHMARK_MESSAGES, reason="set CONVERSATION_SEARCH_BENCHMARK_MESSAGES to run")
+def test_conversation_keyword_search_benchmark(flask_app):
+    app_id = str(uuid.uuid4())
+    with flask_app.app_context():
+        ConversationSearchService.ensure_indexes()
+        with Session(db.engine) as session:
+            _seed(session, app_id, BENCHMARK_MESSAGES)
+            # an md5 fragment of one answer, rare enough to make the scan the dominant cost
+            keyword = session.scalar(
+                select(func.substr(Message.answer, 8, 12)).where(Message.app_id == app_id).limit(1)
+            )
+            pattern = ConversationSearchService.keyword_pattern(keyword)
+
+            legacy = (
+                select(Conversation.id)
+                .join(Message, Message.conversation_id == Conversation.id)
+                .where(
+                    Conversation.app_id == app_id,
+                    or_(Message.query.ilike(pattern), Message.answer.ilike(pattern), Conversation.name.ilike(pattern)),
+                )
+                .group_by(Conversation.id)
+                .order_by(Conversation.id)
+            )
+            indexed = (
+                select(Conversation.id)
+                .where(
+                    Conversation.app_id == app_id,
+                    Conversation.id.in_(ConversationSearchService.matching_conversation_ids(app_id, keyword)),
+                )
+                .order_by(Conversation.id)
+            )
+
+            legacy_elapsed, legacy_rows = _timed(session, legacy)
+            indexed_elapsed, indexed_rows = _timed(session, indexed)
+            session.rollback()
+
+    assert indexed_rows == legacy_rows
+    assert indexed_rows >= 1
+    assert indexed_elapsed < legacy_elapsed
@@ -0,0 +1,28 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from core.rag.datasource.vdb.pg_vector_params import encode_vector_binary, encode_vector_text
+
+DIMENSION = 1536
+# the benchmark only runs when a number of vectors is given, e.g. 10000
+BENCHMARK_VECTORS = int(os.environ.get("PG_VECTOR_PARAMS_BENCHMARK_VECTORS", "0"))
+
+
+@pytest.mark.skipif(not BENCHMARK_VECTORS, reason="set PG_VECTOR_PARAMS_BENCHMARK_VECTORS to run")
+def test_vector_encoding_benchmark():
+    vectors = np.random.default_rng(0).uniform(-1, 1, (BENCHMARK_VECTORS, DIMENSION)).tolist()
+
+    start = time.perf_counter()
+    text_size = sum(len(encode_vector_text(vector)) for vector in vectors)
+    text_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    binary_size = sum(len(encode_vector_binary(vector)) for vector in vectors)
+    binary_elapsed = time.perf_counter() - start
+
+    assert binary_size == BENCHMARK_VECTORS * (4 + 4 * DIMENSION)
+    assert binary_size < text_size / 3
+    assert binary_elapsed < text_elapsed
@@ -224,15 +224,15 @@ class TestBillingResourceLimits:
 class TestRateLimiting:
     """Test rate limiting decorator"""
 
-    @patch("controllers.console.wraps.redis_client")
+    @patch("controllers.console.wraps.knowledge_rate_limiter")
     @patch("controllers.console.wraps.db")
-    def test_should_allow_requests_within_rate_limit(self, mock_db, mock_redis):
+    def test_should_allow_requests_within_rate_limit(self, mock_db, mock_limiter):
         """Test that requests within rate limit are allowed"""
         # Arrange
         mock_rate_limit = MagicMock()
         mock_rate_limit.enabled = True
         mock_rate_limit.limit = 10
-        mock_redis.zcard.return_value = 5  # 5 requests in window
+        mock_limiter.acquire.return_value = True
 
         @cloud_edition_billing_rate_limit_check("knowledge")
         def knowledge_request():
@@ -247,12 +247,13 @@ class TestRateLimiting:
 
         # Assert
         assert result == "knowledge_success"
-        mock_redis.zadd.assert_called_once()
-        mock_redis.zremrangebyscore.assert_called_once()
+        mock_limiter.acquire.assert_called_once()
+        assert mock_limiter.acquire.call_args.args[1] == 10
+        mock_db.session.add.assert_not_called()
 
-    @patch("controllers.console.wraps.redis_client")
+    @patch("controllers.console.wraps.knowledge_rate_limiter")
     @patch("controllers.console.wraps.db")
-    def test_should_reject_requests_over_rate_limit(self, mock_db, mock_redis):
+    def test_should_reject_requests_over_rate_limit(self, mock_db, mock_limiter):
         """Test that requests over rate limit are rejected and logged"""
         # Arrange
         app = create_app_with_login()
@@ -260,7 +261,7 @@ class TestRateLimiting:
         mock_rate_limit.enabled = True
         mock_rate_limit.limit = 10
         mock_rate_limit.subscription_plan = "pro"
-        mock_redis.zcard.return_value = 11  # Over limit
+        mock_limiter.acquire.return_value = False  # Over limit
 
         mock_session = MagicMock()
         mock_db.session = mock_session
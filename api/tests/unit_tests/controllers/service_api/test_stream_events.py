@@ -0,0 +1,55 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask
+from werkzeug.exceptions import BadRequest, NotFound
+
+from controllers.service_api.app import completion
+from controllers.service_api.app.completion import GenerateStreamEventsApi
+
+STREAM_ID = "4b7f0c6e-1d2a-4c8e-9f3b-2a1d5e6f7a8b"
+
+
+@pytest.fixture
+def bus():
+    with patch.object(completion, "AppStreamEventBus") as bus:
+        bus.is_owner.return_value = True
+        bus.tail.return_value = iter([f"id: {STREAM_ID}/1700000000000-2\ndata: c\n\n"])
+        yield bus
+
+
+def _get(app: Flask, headers: dict | None = None):
+    # the app token is validated by the decorator, call the view itself
+    view = GenerateStreamEventsApi.get.__wrapped__
+    app_model, end_user = MagicMock(id="app-1"), MagicMock(id="user-1")
+    with app.test_request_context(f"/v1/streams/{STREAM_ID}/events", headers=headers or {}):
+        response = view(GenerateStreamEventsApi(), app_model, end_user, STREAM_ID)
+        return response, response.get_data(as_text=True)
+
+
+def test_events_are_resumed_after_last_event_id(app: Flask, bus):
+    bus.parse_last_event_id.return_value = "1700000000000-1"
+
+    response, body = _get(app, {"Last-Event-ID": f"{STREAM_ID}/1700000000000-1"})
+
+    assert response.mimetype == "text/event-stream"
+    assert body == f"id: {STREAM_ID}/1700000000000-2\ndata: c\n\n"
+    bus.is_owner.assert_called_once_with(STREAM_ID, "app-1", "user-1")
+    bus.parse_last_event_id.assert_called_once_with(STREAM_ID, f"{STREAM_ID}/1700000000000-1")
+    bus.tail.assert_called_once_with(STREAM_ID, "1700000000000-1")
+
+
+def test_stream_of_another_user_is_not_found(app: Flask, bus):
+    bus.is_owner.return_value = False
+
+    with pytest.raises(NotFound):
+        _get(app)
+    bus.tail.assert_not_called()
+
+
+def test_invalid_last_event_id_is_rejected(app: Flask, bus):
+    bus.parse_last_event_id.side_effect = ValueError("Last-Event-ID does not belong to this stream.")
+
+    with pytest.raises(BadRequest):
+        _get(app, {"Last-Event-ID": "other-stream/1700000000000-1"})
+    bus.tail.assert_not_called()
@@ -0,0 +1,79 @@
+from unittest.mock import MagicMock, patch
+
+from core.agent.base_agent_runner import BaseAgentRunner
+from core.model_runtime.entities import LLMUsage
+
+
+def _runner() -> BaseAgentRunner:
+    runner = object.__new__(BaseAgentRunner)
+    runner.user_id = "user"
+    runner.queue_manager = MagicMock()
+    runner.agent_thought_count = 0
+    runner._agent_thoughts = {}
+    runner._inserted_agent_thought_ids = set()
+    runner._unsaved_agent_thought_ids = set()
+    return runner
+
+
+def _save(runner: BaseAgentRunner, agent_thought_id: str, **kwargs) -> None:
+    arguments = {
+        "tool_name": None,
+        "tool_input": None,
+        "thought": None,
+        "observation": None,
+        "tool_invoke_meta": None,
+        "answer": None,
+        "messages_ids": [],
+    }
+    runner.save_agent_thought(agent_thought_id=agent_thought_id, **(arguments | kwargs))
+
+
+@patch("core.agent.base_agent_runner.ToolManager.get_tool_label", return_value=None)
+@patch("core.agent.base_agent_runner.db")
+def test_agent_thoughts_are_persisted_once_per_step(db, get_tool_label):
+    runner = _runner()
+
+    first_id = runner.create_agent_thought("message", "", "", "", [])
+    _save(
+        runner, first_id, thought="search the weather", tool_name="weather", tool_input={"weather": {"city": "Paris"}}
+    )
+    _save(runner, first_id, observation={"weather": "sunny"}, llm_usage=LLMUsage.empty_usage())
+    second_id = runner.create_agent_thought("message", "", "", "", [])
+    db.session.execute.assert_not_called()
+    db.session.commit.assert_not_called()
+
+    runner.flush_agent_thoughts()
+
+    db.session.execute.assert_called_once()
+    rows = db.session.execute.call_args.args[1]
+    assert [row["id"] for row in rows] == [first_id, second_id]
+    assert rows[0]["position"] == 1
+    assert rows[0]["thought"] == "search the weather"
+    assert rows[0]["observation"] == '{"weather": "sunny"}'
+    assert rows[0]["tool_labels_str"] == '{"weather": {"en_US": "weather", "zh_Hans": "weather"}}'
+    db.session.commit.assert_called_once()
+    get_tool_label.assert_called_with("weather")
+
+    # thoughts already inserted are updated, unchanged ones are left alone
+    db.reset_mock()
+    runner.flush_agent_thoughts()
+    db.session.execute.assert_not_called()
+    _save(runner, second_id, answer="It is sunny in Paris.")
+    runner.flush_agent_thoughts()
+    statement, rows = db.session.execute.call_args.args
+    assert statement.is_update
+    assert [(row["id"], row["answer"]) for row in rows] == [(second_id, "It is sunny in Paris.")]
+
+
+@patch("core.agent.base_agent_runner.db")
+def test_published_agent_thought_carries_its_state(db):
+    runner = _runner()
+    agent_thought_id = runner.create_agent_thought("message", "", "", "", ["file"])
+    _save(runner, agent_thought_id, thought="thinking")
+
+    runner.publish_agent_thought(agent_thought_id)
+
+    event = runner.queue_manager.publish.call_args.args[0]
+    assert event.agent_thought_id == agent_thought_id
+    assert (event.position, event.thought, event.message_files) == (1, "thinking", ["file"])
+    db.session.execute.assert_not_called()
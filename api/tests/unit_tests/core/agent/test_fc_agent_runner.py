@@ -0,0 +1,75 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+
+from configs import dify_config
+from core.agent.fc_agent_runner import FunctionCallAgentRunner
+
+
+def _runner() -> FunctionCallAgentRunner:
+    runner = object.__new__(FunctionCallAgentRunner)
+    runner.message = MagicMock(id="message")
+    return runner
+
+
+def test_tool_calls_run_concurrently_in_order():
+    running = 0
+    max_running = 0
+    lock = threading.Lock()
+    later_calls_done = threading.Event()
+    first_call_overlapped = False
+
+    def invoke_tool_call(tool_call, tool_instances, trace_manager):
+        nonlocal running, max_running, first_call_overlapped
+        with lock:
+            running += 1
+            max_running = max(max_running, running)
+        if tool_call[0] == "call-0":
+            # only returns once all the later calls ran beside it
+            first_call_overlapped = later_calls_done.wait(5)
+        elif tool_call[0] == "call-4":
+            later_calls_done.set()
+        with lock:
+            running -= 1
+        return {"tool_call_id": tool_call[0], "tool_response": tool_call[1]}, [f"file-{tool_call[0]}"]
+
+    runner = _runner()
+    tool_calls = [(f"call-{i}", f"tool-{i}", {}) for i in range(5)]
+    with (
+        Flask(__name__).app_context(),
+        patch.object(runner, "_invoke_tool_call", side_effect=invoke_tool_call),
+        patch.object(dify_config, "AGENT_TOOL_CALL_MAX_CONCURRENCY", 2),
+    ):
+        results = runner._invoke_tool_calls(tool_calls, {})
+
+    assert [(response["tool_call_id"], files) for response, files in results] == [
+        (f"call-{i}", [f"file-call-{i}"]) for i in range(5)
+    ]
+    assert max_running == 2
+    # a slow call does not hold back the calls after it
+    assert first_call_overlapped
+
+
+def test_tool_call_timeout():
+    release = threading.Event()
+
+    def invoke_tool_call(tool_call, tool_instances, trace_manager):
+        if tool_call[1] == "slow":
+            release.wait(5)
+        return {"tool_call_id": tool_call[0], "tool_call_name": tool_call[1], "tool_response": "done"}, []
+
+    runner = _runner()
+    with (
+        Flask(__name__).app_context(),
+        patch.object(runner, "_invoke_tool_call", side_effect=invoke_tool_call),
+        patch.object(dify_config, "AGENT_TOOL_CALL_TIMEOUT", 1),
+    ):
+        results = runner._invoke_tool_calls([("call-0", "slow", {}), ("call-1", "fast", {})], {})
+    release.set()
+
+    (slow, slow_files), (fast, _) = results
+    assert slow["tool_response"] == "tool slow did not respond within 1 seconds"
+    assert slow["meta"]["error"] == slow["tool_response"]
+    assert slow_files == []
+    assert fast["tool_response"] == "done"
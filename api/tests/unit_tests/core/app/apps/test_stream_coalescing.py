@@ -0,0 +1,94 @@
+import json
+from unittest.mock import patch
+
+from core.app.apps import stream_coalescing
+from core.app.apps.base_app_generator import BaseAppGenerator
+from core.app.apps.stream_coalescing import coalesce_text_chunks
+
+
+def _message(answer: str, message_id: str = "m-1") -> dict:
+    return {
+        "event": "message",
+        "conversation_id": "c-1",
+        "message_id": message_id,
+        "created_at": 1700000000,
+        "task_id": "t-1",
+        "id": message_id,
+        "answer": answer,
+    }
+
+
+def _text_chunk(text: str, selector: list[str]) -> dict:
+    return {
+        "event": "text_chunk",
+        "workflow_run_id": "r-1",
+        "task_id": "t-1",
+        "data": {"text": text, "from_variable_selector": selector},
+    }
+
+
+def _coalesce(stream, max_chars=8, max_latency_ms=10_000) -> list:
+    return list(coalesce_text_chunks(stream, max_chars=max_chars, max_latency_ms=max_latency_ms))
+
+
+def test_consecutive_chunks_are_merged_up_to_max_chars():
+    stream = [_message(token) for token in ["He", "llo", ", ", "wor", "ld", "!"]]
+
+    assert _coalesce(stream) == [_message("Hello, wor"), _message("ld!")]
+
+
+def test_other_events_flush_the_merged_text():
+    stream = [
+        _message("a"),
+        _message("b"),
+        "ping",
+        _message("c"),
+        _message("d", message_id="m-2"),
+        {"event": "message_end", "id": "m-2"},
+    ]
+
+    assert _coalesce(stream) == [
+        _message("ab"),
+        "ping",
+        _message("c"),
+        _message("d", message_id="m-2"),
+        {"event": "message_end", "id": "m-2"},
+    ]
+
+
+def test_text_chunks_of_different_variables_are_not_merged():
+    stream = [_text_chunk("a", ["llm", "text"]), _text_chunk("b", ["llm", "text"]), _text_chunk("c", ["llm2", "text"])]
+
+    assert _coalesce(stream) == [_text_chunk("ab", ["llm", "text"]), _text_chunk("c", ["llm2", "text"])]
+
+
+def test_merged_text_is_sent_after_max_latency():
+    clock = iter([0.0, 0.01, 0.06, 0.07, 0.08])
+
+    with patch.object(stream_coalescing.time, "monotonic", side_effect=lambda: next(clock)):
+        merged = _coalesce([_message("a"), _message("b"), _message("c")], max_chars=100, max_latency_ms=50)
+
+    assert merged == [_message("ab"), _message("c")]
+
+
+def test_coalesced_event_stream_carries_the_same_text():
+    tokens = ["你", "好", ", ", "wor", "ld"]
+    stream = BaseAppGenerator.convert_to_event_stream(
+        (message for message in [*(_message(token) for token in tokens), "ping"]), coalesce=True
+    )
+
+    frames = list(stream)
+    assert frames[-1] == "event: ping\n\n"
+    answers = [json.loads(frame.removeprefix("data: "))["answer"] for frame in frames[:-1]]
+    assert "".join(answers) == "你好, world"
+    assert len(answers) < len(tokens)
+
+
+def test_coalescing_reduces_the_number_of_events():
+    tokens = [f"tok{index % 10} " for index in range(1000)]
+
+    plain = list(BaseAppGenerator.convert_to_event_stream((_message(token) for token in tokens), coalesce=False))
+    coalesced = list(BaseAppGenerator.convert_to_event_stream((_message(token) for token in tokens), coalesce=True))
+
+    assert len(plain) == 1000
+    assert len(coalesced) < len(plain) / 10
@@ -0,0 +1,117 @@
+from unittest.mock import patch
+
+import pytest
+
+from core.app.apps import stream_event_bus
+from core.app.apps.stream_event_bus import PING_FRAME, AppStreamEventBus
+
+STREAM_ID = "4b7f0c6e-1d2a-4c8e-9f3b-2a1d5e6f7a8b"
+
+
+class _FakeRedis:
+    """In-memory stand-in for the stream commands used by the bus, values are returned as bytes like redis-py."""
+
+    def __init__(self):
+        self.streams: dict[str, list[tuple[bytes, dict[bytes, bytes]]]] = {}
+        self.values: dict[str, bytes] = {}
+        self.expires: dict[str, int] = {}
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    def xadd(self, name, fields):
+        entries = self.streams.setdefault(name, [])
+        entry_id = f"1700000000000-{len(entries)}".encode()
+        entries.append((entry_id, {k.encode(): v.encode() for k, v in fields.items()}))
+        return entry_id
+
+    def expire(self, name, ttl):
+        self.expires[name] = ttl
+
+    def setex(self, name, ttl, value):
+        self.values[name] = value.encode()
+        self.expires[name] = ttl
+
+    def get(self, name):
+        return self.values.get(name)
+
+    def xread(self, streams, count=None, block=None):
+        ((name, last_id),) = streams.items()
+        last = tuple(int(part) for part in last_id.split("-"))
+        entries = [
+            (entry_id, fields)
+            for entry_id, fields in self.streams.get(name, [])
+            if tuple(int(part) for part in entry_id.decode().split("-")) > last
+        ][:count]
+        return [[name.encode(), entries]] if entries else []
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, item):
+        return lambda *args, **kwargs: self.calls.append((item, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.redis, item)(*args, **kwargs) for item, args, kwargs in self.calls]
+
+
+@pytest.fixture
+def redis():
+    fake = _FakeRedis()
+    with patch.object(stream_event_bus, "redis_client", fake):
+        yield fake
+
+
+def test_tail_yields_frames_with_ids_until_the_end(redis):
+    AppStreamEventBus.publish(STREAM_ID, 'data: {"event": "message", "answer": "Hel"}\n\n')
+    AppStreamEventBus.publish(STREAM_ID, 'data: {"event": "message", "answer": "lo"}\n\n')
+    AppStreamEventBus.close(STREAM_ID)
+    AppStreamEventBus.publish(STREAM_ID, "data: {}\n\n")
+
+    frames = list(AppStreamEventBus.tail(STREAM_ID))
+
+    assert frames == [
+        f'id: {STREAM_ID}/1700000000000-0\ndata: {{"event": "message", "answer": "Hel"}}\n\n',
+        f'id: {STREAM_ID}/1700000000000-1\ndata: {{"event": "message", "answer": "lo"}}\n\n',
+    ]
+    assert redis.expires[f"generate_task_events:{STREAM_ID}"] > 0
+
+
+def test_resume_after_last_event_id(redis):
+    for answer in ("a", "b", "c"):
+        AppStreamEventBus.publish(STREAM_ID, f"data: {answer}\n\n")
+    AppStreamEventBus.close(STREAM_ID)
+
+    last_entry_id = AppStreamEventBus.parse_last_event_id(STREAM_ID, f"{STREAM_ID}/1700000000000-1")
+    frames = list(AppStreamEventBus.tail(STREAM_ID, last_entry_id))
+
+    assert frames == [f"id: {STREAM_ID}/1700000000000-2\ndata: c\n\n"]
+
+
+def test_tail_pings_while_waiting(redis):
+    tail = AppStreamEventBus.tail(STREAM_ID, block_ms=1)
+    assert next(tail) == PING_FRAME
+
+    AppStreamEventBus.publish(STREAM_ID, "data: a\n\n")
+    AppStreamEventBus.close(STREAM_ID)
+    assert list(tail) == [f"id: {STREAM_ID}/1700000000000-0\ndata: a\n\n"]
+
+
+def test_ownership(redis):
+    AppStreamEventBus.open(STREAM_ID, "app-1", "user-1")
+
+    assert AppStreamEventBus.is_owner(STREAM_ID, "app-1", "user-1")
+    assert not AppStreamEventBus.is_owner(STREAM_ID, "app-1", "user-2")
+    assert not AppStreamEventBus.is_owner("other-stream", "app-1", "user-1")
+
+
+def test_parse_last_event_id():
+    assert AppStreamEventBus.parse_last_event_id(STREAM_ID, None) == "0-0"
+    assert AppStreamEventBus.parse_last_event_id(STREAM_ID, "1700000000000-3") == "1700000000000-3"
+    with pytest.raises(ValueError):
+        AppStreamEventBus.parse_last_event_id(STREAM_ID, "other-stream/1700000000000-3")
+    with pytest.raises(ValueError):
+        AppStreamEventBus.parse_last_event_id(STREAM_ID, f"{STREAM_ID}/$")
@@ -0,0 +1,82 @@
+import base64
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from core.app.entities.queue_entities import QueueTextChunkEvent
+from core.base.tts import app_generator_tts_publisher
+from core.base.tts.app_generator_tts_publisher import AppGeneratorTTSPublisher
+from core.base.tts.tts_scheduler import TTSScheduler
+
+
+def _publisher(scheduler: TTSScheduler, invoke_tts=None) -> AppGeneratorTTSPublisher:
+    model_instance = MagicMock()
+    model_instance.get_tts_voices.return_value = [{"value": "alloy"}]
+    model_instance.invoke_tts.side_effect = invoke_tts or (lambda content_text, **kwargs: [content_text.encode()])
+    with patch.object(app_generator_tts_publisher, "ModelManager") as model_manager:
+        model_manager.return_value.get_default_model_instance.return_value = model_instance
+        return AppGeneratorTTSPublisher("tenant-1", "alloy")
+
+
+def _collect(publisher: AppGeneratorTTSPublisher) -> list[str]:
+    texts = []
+    while True:
+        audio = publisher.wait_for_audio(timeout=5)
+        assert audio is not None
+        if audio.status == "finish":
+            return texts
+        texts.append(base64.b64decode(audio.audio).decode())
+
+
+def test_sentences_are_synthesized_in_growing_batches():
+    scheduler = TTSScheduler(max_workers=2)
+    with patch.object(app_generator_tts_publisher, "get_tts_scheduler", return_value=scheduler):
+        publisher = _publisher(scheduler)
+        text = "One. Two! Three? Four. Five. Six. Seven. Eight. Nine. Ten"
+        for i in range(0, len(text), 3):
+            publisher.publish(SimpleNamespace(event=QueueTextChunkEvent(text=text[i : i + 3])))
+        publisher.publish(None)
+
+        assert _collect(publisher) == ["One. Two!", "Three? Four. Five.", "Six. Seven. Eight. Nine.", "Ten"]
+        # the finish chunk is returned again once reached
+        assert publisher.check_and_get_audio().status == "finish"
+
+
+def test_failed_synthesis_finishes_the_stream():
+    def invoke_tts(content_text, **kwargs):
+        raise RuntimeError("tts unavailable")
+
+    scheduler = TTSScheduler(max_workers=1)
+    with patch.object(app_generator_tts_publisher, "get_tts_scheduler", return_value=scheduler):
+        publisher = _publisher(scheduler, invoke_tts)
+        publisher.publish(SimpleNamespace(event=QueueTextChunkEvent(text="One. Two. Three.")))
+
+        assert _collect(publisher) == []
+
+
+class _Session:
+    def __init__(self, tenant_id: str, name: str, order: list[str], gate: threading.Event):
+        self.tenant_id = tenant_id
+        self.name = name
+        self.order = order
+        self.gate = gate
+
+    def synthesize_next(self) -> None:
+        self.gate.wait(5)
+        self.order.append(self.name)
+
+
+def test_scheduler_is_fair_across_tenants():
+    scheduler = TTSScheduler(max_workers=1)
+    order: list[str] = []
+    gate = threading.Event()
+
+    # keep the only worker busy while the sessions queue up
+    scheduler.schedule(_Session("tenant-0", "blocker", order, gate))
+    for name in ("a1", "a2", "a3"):
+        scheduler.schedule(_Session("tenant-a", name, order, gate))
+    scheduler.schedule(_Session("tenant-b", "b1", order, gate))
+    gate.set()
+    scheduler._executor.shutdown(wait=True)
+
+    assert order == ["blocker", "a1", "b1", "a2", "a3"]
@@ -0,0 +1,162 @@
+import gzip
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from configs import dify_config
+from core.helper import large_value_offload
+from core.variables.segments import StringSegment
+from models.workflow import WorkflowDraftVariable, WorkflowNodeExecutionModel
+
+
+class FakeStorage:
+    def __init__(self) -> None:
+        self.objects: dict[str, bytes] = {}
+
+    def save(self, filename: str, data: bytes) -> None:
+        self.objects[filename] = data
+
+    def load_once(self, filename: str) -> bytes:
+        if filename not in self.objects:
+            raise FileNotFoundError(filename)
+        return self.objects[filename]
+
+    def delete(self, filename: str) -> None:
+        self.objects.pop(filename, None)
+
+
+@pytest.fixture
+def storage():
+    storage = FakeStorage()
+    with (
+        patch.object(large_value_offload, "storage", storage),
+        patch.object(dify_config, "WORKFLOW_LARGE_VALUE_OFFLOAD_THRESHOLD", 1024),
+    ):
+        yield storage
+
+
+def test_truncate_keeps_the_shape():
+    value = {"text": "a" * 5000, "items": list(range(100)), "nested": [{"text": "b" * 5000}], "count": 3}
+
+    preview = large_value_offload.truncate(value)
+
+    assert preview == {
+        "text": "a" * large_value_offload.PREVIEW_MAX_STRING_LENGTH,
+        "items": list(range(large_value_offload.PREVIEW_MAX_ITEMS)),
+        "nested": [{"text": "b" * large_value_offload.PREVIEW_MAX_STRING_LENGTH}],
+        "count": 3,
+    }
+
+
+def test_should_offload_counts_bytes(storage):
+    assert not large_value_offload.should_offload("a" * 1024)
+    assert large_value_offload.should_offload("a" * 1025)
+    # 3 bytes per character in UTF-8
+    assert large_value_offload.should_offload("文" * 400)
+
+
+def test_large_draft_variable_is_offloaded(storage):
+    text = "x" * 10_000
+    variable = WorkflowDraftVariable.new_node_variable(
+        app_id="app", node_id="llm", name="text", value=StringSegment(value=text), node_execution_id="exec"
+    )
+
+    assert variable.is_truncated
+    assert len(variable.value) < 2000
+    # nothing is saved before the row is committed
+    assert storage.objects == {}
+    variable.save_offloaded_value()
+    assert gzip.decompress(storage.objects[variable.value_storage_key]) == json.dumps(text).encode()
+
+    # as loaded from the database, the value is only read from the storage when needed
+    variable._init_on_load()
+    storage.load_once = MagicMock(wraps=storage.load_once)  # type: ignore[method-assign]
+    assert variable.get_value_preview().value == text[: large_value_offload.PREVIEW_MAX_STRING_LENGTH]
+    storage.load_once.assert_not_called()
+    assert variable.get_value().value == text
+    assert variable.get_value().value == text
+    storage.load_once.assert_called_once()
+
+
+def test_small_draft_variable_stays_in_the_row(storage):
+    variable = WorkflowDraftVariable.new_node_variable(
+        app_id="app", node_id="llm", name="text", value=StringSegment(value="short"), node_execution_id="exec"
+    )
+    assert not variable.is_truncated
+    assert json.loads(variable.value) == "short"
+    assert storage.objects == {}
+
+    # replacing a large value with a small one keeps it in the row
+    variable.set_value(StringSegment(value="x" * 10_000))
+    variable.set_value(StringSegment(value="short again"))
+    assert variable.value_storage_key is None
+    assert json.loads(variable.value) == "short again"
+    variable.save_offloaded_value()
+    assert storage.objects == {}
+
+
+def test_replaced_draft_variable_value_is_deleted_once_committed(storage):
+    variable = WorkflowDraftVariable.new_conversation_variable(
+        app_id="app", name="history", value=StringSegment(value="x" * 10_000)
+    )
+    variable.save_offloaded_value()
+    old_key = variable.value_storage_key
+
+    variable.set_value(StringSegment(value="y" * 10_000))
+    # the committed row still points to the old value until the new one is committed
+    assert list(storage.objects) == [old_key]
+    variable.save_offloaded_value()
+    assert list(storage.objects) == [variable.value_storage_key]
+    assert variable.value_storage_key != old_key
+
+    variable.set_value(StringSegment(value="short"))
+    variable.save_offloaded_value()
+    assert storage.objects == {}
+
+
+def test_renamed_draft_variable_keeps_its_value(storage):
+    variable = WorkflowDraftVariable.new_conversation_variable(
+        app_id="app", name="history", value=StringSegment(value="x" * 10_000)
+    )
+    variable.save_offloaded_value()
+    storage_key = variable.value_storage_key
+
+    variable.set_name("memory")
+
+    assert variable.value_storage_key == storage_key
+    variable._init_on_load()
+    assert variable.get_value().value == "x" * 10_000
+
+
+def test_node_execution_payloads_are_loaded_lazily(storage):
+    execution = WorkflowNodeExecutionModel()
+    execution.id = "exec"
+    execution.tenant_id = "tenant"
+    outputs = {"text": "x" * 10_000, "usage": {"total_tokens": 10}}
+    execution.set_payload("inputs", {"query": "hello"})
+    execution.set_payload("outputs", outputs)
+    execution.set_payload("process_data", None)
+
+    assert execution.inputs_storage_key is None
+    assert execution.outputs_storage_key == "workflow_node_executions/tenant/exec/outputs.json.gz"
+    assert execution.storage_keys == [execution.outputs_storage_key]
+    assert execution.process_data is None
+    # nothing is saved before the row is committed
+    assert storage.objects == {}
+
+    execution.save_offloaded_payloads()
+    assert list(storage.objects) == [execution.outputs_storage_key]
+    execution._init_on_load()
+    assert execution.inputs_dict == {"query": "hello"}
+    assert execution.outputs_truncated
+    assert execution.outputs_preview == {
+        "text": "x" * large_value_offload.PREVIEW_MAX_STRING_LENGTH,
+        "usage": {"total_tokens": 10},
+    }
+    assert execution.outputs_dict == outputs
+
+    # the preview is returned when the payload is missing from the storage
+    execution._init_on_load()
+    storage.objects.clear()
+    assert execution.outputs_dict == execution.outputs_preview
@@ -0,0 +1,121 @@
+import json
+from unittest.mock import MagicMock, call, patch
+
+import pytest
+
+from core.helper.provider_quota_ledger import _DEDUCT_SCRIPT, _SETTLE_SCRIPT, ProviderQuotaLedger
+from extensions.ext_redis import redis_client
+
+
+@pytest.fixture
+def scripts():
+    scripts = {_DEDUCT_SCRIPT: MagicMock(return_value=1), _SETTLE_SCRIPT: MagicMock(return_value=0)}
+    with patch.object(ProviderQuotaLedger, "_scripts", scripts):
+        yield scripts
+
+
+def test_deduct_checks_the_limit_in_redis(scripts):
+    assert ProviderQuotaLedger.deduct(
+        tenant_id="tenant", provider_name="openai", quota_type="trial", amount=20, quota_used=100, quota_limit=200
+    )
+
+    scripts[_DEDUCT_SCRIPT].assert_called_once_with(
+        keys=["{provider_quota_ledger}:tenant:openai:trial", "{provider_quota_ledger}:pending"],
+        args=[20, 100, 200, "tenant:openai:trial"],
+    )
+
+    scripts[_DEDUCT_SCRIPT].return_value = 0
+    assert not ProviderQuotaLedger.deduct(
+        tenant_id="tenant", provider_name="openai", quota_type="trial", amount=20, quota_used=200, quota_limit=200
+    )
+
+
+def test_get_pending_skips_reconciled_quotas():
+    with patch.object(redis_client, "mget", return_value=[b"42", None, b"0"]) as mget:
+        pending = ProviderQuotaLedger.get_pending(
+            "tenant", [("openai", "trial"), ("anthropic", "trial"), ("openai", "paid"), ("openai", "trial")]
+        )
+
+    assert pending == {("openai", "trial"): 42}
+    mget.assert_called_once_with(
+        [
+            "{provider_quota_ledger}:tenant:openai:trial",
+            "{provider_quota_ledger}:tenant:anthropic:trial",
+            "{provider_quota_ledger}:tenant:openai:paid",
+        ]
+    )
+
+
+def test_reconcile_settles_what_was_stored(scripts):
+    events = MagicMock()
+    session = events.session
+    session.execute.return_value.rowcount = 1
+    members = ["tenant-1:openai:trial", "tenant-2:langgenius/openai/openai:paid", "tenant-3:openai:trial"]
+
+    with (
+        patch("core.helper.provider_quota_ledger.Session") as session_cls,
+        patch("core.helper.provider_quota_ledger.db"),
+        patch("core.helper.provider_quota_ledger.uuid.uuid4", return_value="batch"),
+        patch.object(redis_client, "mget", return_value=[b"10", b"5", None]),
+        patch.object(redis_client, "hset", events.hset),
+    ):
+        session_cls.return_value.__enter__.return_value = session
+        scripts[_SETTLE_SCRIPT].side_effect = events.settle
+        assert ProviderQuotaLedger._reconcile_batch(members) == 2
+
+    pending = {"tenant-1:openai:trial": 10, "tenant-2:langgenius/openai/openai:paid": 5, "tenant-3:openai:trial": 0}
+    assert events.mock_calls[0] == call.hset(
+        "{provider_quota_ledger}:batch", mapping={"id": "batch", "pending": json.dumps(pending)}
+    )
+    assert session.execute.call_count == 3
+    params = session.execute.call_args_list[1].args[0].compile().params
+    assert params["tenant_id_1"] == "tenant-2"
+    assert params["provider_name_1"] == "langgenius/openai/openai"
+    assert params["quota_type_1"] == "paid"
+    assert params["quota_used_1"] == 5
+    assert session.add.call_args.args[0].id == "batch"
+    # the counters are only decreased once the usage and the batch are committed
+    settle = call.settle(
+        keys=[
+            "{provider_quota_ledger}:pending",
+            "{provider_quota_ledger}:batch",
+            *(f"{{provider_quota_ledger}}:{member}" for member in members),
+        ],
+        args=["batch", members[0], 10, members[1], 5, members[2], 0],
+    )
+    assert events.mock_calls.index(call.session.commit()) < events.mock_calls.index(settle)
+
+
+@pytest.mark.parametrize("stored", [True, False])
+def test_interrupted_batch_is_settled_only_if_it_was_stored(scripts, stored):
+    pending = {"tenant-1:openai:trial": 10}
+    session = MagicMock()
+    session.get.return_value = MagicMock() if stored else None
+
+    with (
+        patch("core.helper.provider_quota_ledger.Session") as session_cls,
+        patch("core.helper.provider_quota_ledger.db"),
+        patch.object(redis_client, "hmget", return_value=[b"batch", json.dumps(pending).encode()]),
+        patch.object(redis_client, "delete") as delete,
+    ):
+        session_cls.return_value.__enter__.return_value = session
+        ProviderQuotaLedger._settle_interrupted_batch()
+
+    if stored:
+        # the usage is not written again, only subtracted from the counters before the batch is dropped
+        (statement,) = session.execute.call_args.args
+        assert statement.table.name == "provider_quota_reconcile_batches"
+        assert session.execute.call_count == 1
+        scripts[_SETTLE_SCRIPT].assert_called_once_with(
+            keys=[
+                "{provider_quota_ledger}:pending",
+                "{provider_quota_ledger}:batch",
+                "{provider_quota_ledger}:tenant-1:openai:trial",
+            ],
+            args=["batch", "tenant-1:openai:trial", 10],
+        )
+        delete.assert_not_called()
+    else:
+        scripts[_SETTLE_SCRIPT].assert_not_called()
+        session.execute.assert_not_called()
+        delete.assert_called_once_with("{provider_quota_ledger}:batch")
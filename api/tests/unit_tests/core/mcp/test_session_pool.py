@@ -0,0 +1,222 @@
+"""
+Tests for the MCP session pool against a local streamable HTTP MCP server stub.
+"""
+
+import json
+import threading
+import time
+from collections import Counter
+from collections.abc import Generator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from core.mcp import session_pool, types
+from core.mcp.error import MCPConnectionError
+from core.mcp.mcp_client import MCPClient
+from core.mcp.session_pool import MCPSessionPool
+
+
+class StubMCPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), StubMCPHandler)
+        self.calls: Counter[str] = Counter()
+        self.failing_calls = 0
+        self.call_delay = 0.0
+        self._lock = threading.Lock()
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.calls[name] += 1
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StubMCPHandler(BaseHTTPRequestHandler):
+    server: StubMCPServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: dict | None = None, headers: dict[str, str] | None = None) -> None:
+        payload = json.dumps(body).encode() if body is not None else b""
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if body is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):  # noqa: N802
+        # the stub only speaks streamable HTTP, a GET without session is the client probing for SSE
+        if not self.headers.get("mcp-session-id"):
+            self.server.count("sse_probe")
+        self._send(405)
+
+    def do_DELETE(self):  # noqa: N802
+        self.server.count("terminate")
+        self._send(200)
+
+    def do_POST(self):  # noqa: N802
+        message = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        method = message["method"]
+        self.server.count(method)
+        if "id" not in message:
+            self._send(202)
+            return
+
+        headers = {}
+        if method == "initialize":
+            result: dict = {
+                "protocolVersion": types.LATEST_PROTOCOL_VERSION,
+                "capabilities": {"tools": {"listChanged": False}},
+                "serverInfo": {"name": "stub", "version": "1.0"},
+            }
+            headers["mcp-session-id"] = f"session-{self.server.calls['initialize']}"
+        elif method == "tools/call":
+            if self.server.failing_calls > 0:
+                self.server.failing_calls -= 1
+                self._send(500)
+                return
+            time.sleep(self.server.call_delay)
+            arguments = message["params"]["arguments"]
+            result = {"content": [{"type": "text", "text": json.dumps(arguments)}], "isError": False}
+        else:
+            result = {}
+        self._send(200, {"jsonrpc": "2.0", "id": message["id"], "result": result}, headers)
+
+
+@pytest.fixture
+def server() -> Generator[StubMCPServer, None, None]:
+    server = StubMCPServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _pool(**kwargs) -> MCPSessionPool:
+    options: dict = {
+        "max_size": 4,
+        "idle_timeout": 300,
+        "health_check_interval": 300,
+        "max_concurrent_requests": 8,
+    }
+    options.update(kwargs)
+    pool = MCPSessionPool(**options)
+    # the stub needs no credentials, which would otherwise be loaded from the provider
+    pool._create_client = lambda server_url, provider_id, tenant_id: MCPClient(  # type: ignore[method-assign]
+        server_url,
+        provider_id,
+        tenant_id,
+        authed=False,
+        connection_method=pool._connection_methods.get(server_url),
+    )
+    return pool
+
+
+def _call(pool: MCPSessionPool, url: str, value: int) -> dict:
+    with pool.session(url, "provider", "tenant") as client:
+        result = client.invoke_tool("echo", {"value": value})
+    content = result.content[0]
+    assert isinstance(content, types.TextContent)
+    return json.loads(content.text)
+
+
+def test_session_is_initialized_once(server: StubMCPServer):
+    url = f"{server.url}/mcp"
+    pool = _pool()
+    try:
+        assert [_call(pool, url, value) for value in range(25)] == [{"value": i} for i in range(25)]
+    finally:
+        pool.close_all()
+
+    assert server.calls["initialize"] == 1
+    assert server.calls["tools/call"] == 25
+    assert server.calls["terminate"] == 1
+
+
+def test_process_pool_is_closed_on_shutdown(server: StubMCPServer, monkeypatch):
+    pool = _pool()
+    monkeypatch.setattr(session_pool, "_pool", pool)
+    _call(pool, f"{server.url}/mcp", 1)
+
+    session_pool.close_mcp_session_pool(sender=None)
+
+    assert server.calls["terminate"] == 1
+
+
+def test_transport_is_probed_once(server: StubMCPServer):
+    pool = _pool(max_size=1)
+    url = f"{server.url}/server"
+    try:
+        _call(pool, url, 1)
+        pool.close_all()
+        _call(pool, url, 2)
+    finally:
+        pool.close_all()
+
+    assert server.calls["initialize"] == 2
+    assert server.calls["sse_probe"] == 1
+
+
+def test_idle_session_is_pinged_then_evicted(server: StubMCPServer):
+    pool = _pool(health_check_interval=0, idle_timeout=0.2)
+    url = f"{server.url}/mcp"
+    try:
+        _call(pool, url, 1)
+        _call(pool, url, 2)
+        assert server.calls["ping"] == 1
+        time.sleep(0.3)
+        _call(pool, url, 3)
+    finally:
+        pool.close_all()
+
+    assert server.calls["initialize"] == 2
+    assert server.calls["terminate"] == 2
+
+
+def test_failed_session_is_not_reused(server: StubMCPServer):
+    pool = _pool()
+    url = f"{server.url}/mcp"
+    server.failing_calls = 1
+    try:
+        with pytest.raises(MCPConnectionError):
+            _call(pool, url, 1)
+        assert _call(pool, url, 2) == {"value": 2}
+    finally:
+        pool.close_all()
+
+    assert server.calls["initialize"] == 2
+
+
+def test_concurrent_calls_get_their_own_session(server: StubMCPServer):
+    pool = _pool(max_size=2)
+    url = f"{server.url}/mcp"
+    server.call_delay = 0.2
+    barrier = threading.Barrier(3)
+    results: list[dict] = []
+
+    def call(value: int) -> None:
+        barrier.wait()
+        results.append(_call(pool, url, value))
+
+    threads = [threading.Thread(target=call, args=(value,)) for value in range(3)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(result["value"] for result in results) == [0, 1, 2]
+        assert server.calls["initialize"] == 3
+        # only max_size sessions stay open once the calls are done
+        assert server.calls["terminate"] == 1
+    finally:
+        pool.close_all()
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from core.moderation.keywords.keywords import KeywordsModeration
+from core.moderation.keywords.matcher import KeywordMatcher, get_keyword_matcher
+
+_rng = np.random.default_rng(7)
+
+
+def _config(keywords: str) -> dict:
+    return {
+        "keywords": keywords,
+        "inputs_config": {"enabled": True, "preset_response": "blocked input"},
+        "outputs_config": {"enabled": True, "preset_response": "blocked output"},
+    }
+
+
+def _random_words(word_count: int) -> list[str]:
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    lengths = _rng.integers(3, 10, size=word_count)
+    return ["".join(_rng.choice(letters, size=length)) for length in lengths]
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("ushers", True),
+        ("a history lesson", True),
+        ("xxabx", False),
+        ("ABCD", True),
+        ("h e", False),
+        ("", False),
+    ],
+)
+def test_matcher_matches_like_substring_search(text, expected):
+    keywords = ["he", "she", "his", "hers", "abcd", "bc"]
+    matcher = KeywordMatcher(keywords)
+
+    assert matcher.search(text) is expected
+    assert any(keyword in text.lower() for keyword in keywords) is expected
+
+
+def test_matcher_follows_failure_links():
+    # "abce" fails inside "abcd" and must continue from the "bc" prefix of "bce"
+    matcher = KeywordMatcher(["abcd", "bce"])
+
+    assert matcher.search("abce")
+    assert not matcher.search("abcf")
+    assert not KeywordMatcher([]).search("anything")
+
+
+def test_stream_matches_keywords_split_across_chunks():
+    stream = KeywordMatcher(["forbidden"]).stream()
+
+    assert not stream.feed("this is forb")
+    assert not stream.feed("")
+    assert stream.feed("IDDEN text")
+    assert stream.feed("clean text")
+    assert stream.matched
+
+
+def test_matchers_are_cached_per_keyword_set():
+    matcher = get_keyword_matcher(["Foo", "bar", ""])
+
+    assert get_keyword_matcher(["bar", "foo"]) is matcher
+    assert get_keyword_matcher(["bar", "baz"]) is not matcher
+
+
+def test_keywords_moderation_inputs():
+    moderation = KeywordsModeration("app-1", "tenant-1", _config("refund\nLawsuit\n"))
+
+    result = moderation.moderation_for_inputs({"topic": "weather", "count": 3}, query="a lawsuit about it")
+    assert result.flagged
+    assert result.preset_response == "blocked input"
+
+    assert not moderation.moderation_for_inputs({"topic": "weather"}, query="hello").flagged
+
+
+def test_keywords_moderation_outputs_only_scan_appended_text(monkeypatch):
+    moderation = KeywordsModeration("app-1", "tenant-1", _config("refund"))
+    scanned: list[str] = []
+    advance = KeywordMatcher.advance
+
+    def spy(self, state, text):
+        scanned.append(text)
+        return advance(self, state, text)
+
+    monkeypatch.setattr(KeywordMatcher, "advance", spy)
+
+    assert not moderation.moderation_for_outputs("You can ask for a re").flagged
+    result = moderation.moderation_for_outputs("You can ask for a refund")
+    assert result.flagged
+    assert result.preset_response == "blocked output"
+    assert scanned == ["you can ask for a re", "fund"]
+
+    # a buffer that is not a continuation is scanned from the start
+    assert not moderation.moderation_for_outputs("Something else").flagged
+    assert scanned[-1] == "something else"
+
+
+def test_matcher_agrees_with_substring_search_on_random_text():
+    words = _random_words(20_000)
+    text = " ".join(words)
+    absent = [f"{word}q{index}" for index, word in enumerate(words[:100])]
+    present = [*absent[:99], words[-1]]
+
+    for keywords in (absent, present):
+        expected = any(keyword.lower() in text.lower() for keyword in keywords)
+        assert get_keyword_matcher(keywords).search(text) is expected
+
+        # output moderation receives the grown buffer every 300 characters
+        moderation = KeywordsModeration("app-1", "tenant-1", _config("\n".join(keywords)))
+        buffers = range(300, len(text) + 300, 300)
+        assert any(moderation.moderation_for_outputs(text[:end]).flagged for end in buffers) is expected
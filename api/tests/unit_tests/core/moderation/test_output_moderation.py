@@ -0,0 +1,119 @@
+from typing import Optional
+from unittest.mock import MagicMock
+
+import pytest
+
+from configs import dify_config
+from core.app.apps.base_app_queue_manager import AppQueueManager
+from core.moderation import output_moderation
+from core.moderation.base import ModerationAction, ModerationOutputsResult
+from core.moderation.output_moderation import ModerationRule, OutputModeration
+
+
+class _FakeModeration:
+    def __init__(
+        self,
+        incremental: bool,
+        flag_on: Optional[str] = None,
+        action: ModerationAction = ModerationAction.DIRECT_OUTPUT,
+    ):
+        self.supports_incremental_output = incremental
+        self.flag_on = flag_on
+        self.action = action
+        self.texts: list[str] = []
+
+    def moderation_for_outputs(self, text: str) -> ModerationOutputsResult:
+        self.texts.append(text)
+        flagged = self.flag_on is not None and self.flag_on in text
+        return ModerationOutputsResult(
+            flagged=flagged,
+            action=self.action,
+            preset_response="blocked",
+            text=text.replace(self.flag_on, "***") if self.flag_on else text,
+        )
+
+
+@pytest.fixture(autouse=True)
+def _small_windows(monkeypatch):
+    monkeypatch.setattr(dify_config, "MODERATION_BUFFER_SIZE", 10)
+    monkeypatch.setattr(dify_config, "MODERATION_WINDOW_OVERLAP", 3)
+
+
+def _handler(monkeypatch, moderation: _FakeModeration) -> OutputModeration:
+    monkeypatch.setattr(output_moderation, "ModerationFactory", lambda **kwargs: moderation)
+    return OutputModeration(
+        tenant_id="tenant-1",
+        app_id="app-1",
+        rule=ModerationRule(type="fake", config={}),
+        queue_manager=MagicMock(spec=AppQueueManager),
+    )
+
+
+def _stream(handler: OutputModeration, tokens: list[str]) -> None:
+    for token in tokens:
+        handler.append_new_token(token)
+        with handler._condition:
+            handler._condition.wait_for(lambda: not handler._checking)
+
+
+def test_incremental_provider_only_receives_new_text_with_overlap(monkeypatch):
+    moderation = _FakeModeration(incremental=True)
+    handler = _handler(monkeypatch, moderation)
+
+    _stream(handler, ["a" * 6, "a" * 4, "b" * 10, "c" * 5])
+    assert moderation.texts == ["a" * 10, "aaa" + "b" * 10]
+
+    handler.stop_checking()
+    completion, flagged = handler.moderation_completion("a" * 10 + "b" * 10 + "c" * 5)
+    assert not flagged
+    assert moderation.texts[-1] == "bbb" + "c" * 5
+
+
+def test_other_providers_receive_the_whole_output(monkeypatch):
+    moderation = _FakeModeration(incremental=False)
+    handler = _handler(monkeypatch, moderation)
+
+    _stream(handler, ["a" * 10, "b" * 10])
+    handler.stop_checking()
+    handler.moderation_completion("a" * 10 + "b" * 10 + "c")
+
+    assert moderation.texts == ["a" * 10, "a" * 10 + "b" * 10, "a" * 10 + "b" * 10 + "c"]
+
+
+def test_direct_output_stops_the_checks(monkeypatch):
+    moderation = _FakeModeration(incremental=True, flag_on="bad")
+    handler = _handler(monkeypatch, moderation)
+
+    _stream(handler, ["this is bad", "more text after it"])
+
+    assert handler.should_direct_output()
+    assert handler.get_final_output() == "blocked"
+    assert len(moderation.texts) == 1
+    handler.queue_manager.publish.assert_called_once()
+
+
+def test_overridden_window_is_moderated_again_as_a_whole(monkeypatch):
+    moderation = _FakeModeration(incremental=True, flag_on="bad", action=ModerationAction.OVERRIDDEN)
+    handler = _handler(monkeypatch, moderation)
+
+    _stream(handler, ["a" * 10, "b" * 7 + "bad"])
+
+    assert moderation.texts == ["a" * 10, "aaa" + "b" * 7 + "bad", "a" * 10 + "b" * 7 + "bad"]
+    event = handler.queue_manager.publish.call_args.args[0]
+    assert event.text == "a" * 10 + "b" * 7 + "***"
+    assert not handler.should_direct_output()
+
+
+def test_final_check_does_not_wait_forever_for_a_hung_streaming_check(monkeypatch):
+    monkeypatch.setattr(dify_config, "MODERATION_CHECK_TIMEOUT", 0.05)
+    moderation = _FakeModeration(incremental=True, flag_on="bad")
+    handler = _handler(monkeypatch, moderation)
+    # a streaming check that never returns
+    handler._checking = True
+
+    completion, flagged = handler.moderation_completion("this is bad")
+
+    assert flagged
+    assert completion == "blocked"
+    assert not handler.running
+    assert moderation.texts == ["this is bad"]
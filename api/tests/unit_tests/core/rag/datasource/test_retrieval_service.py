@@ -0,0 +1,51 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.rag.datasource.retrieval_service import RetrievalService
+
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(max_workers=1)
+    with (
+        patch("core.rag.datasource.retrieval_service._get_executor", return_value=executor),
+        patch("core.rag.datasource.retrieval_service._SEARCH_TIMEOUT", 0.2),
+        patch.object(RetrievalService, "_get_dataset", return_value=MagicMock()),
+    ):
+        yield executor
+    executor.shutdown(wait=True)
+
+
+def test_search_queued_on_a_saturated_pool_is_cancelled(executor):
+    release = threading.Event()
+    executor.submit(release.wait)
+
+    with (
+        patch.object(RetrievalService, "embedding_search") as embedding_search,
+        pytest.raises(ValueError, match="embedding_search of dataset dataset did not start within 0.2s, the retrieval"),
+    ):
+        RetrievalService.retrieve("semantic_search", "dataset", "what is dify", 2)
+    release.set()
+
+    executor.shutdown(wait=True)
+    embedding_search.assert_not_called()
+
+
+def test_search_is_timed_from_its_start(executor):
+    executor.submit(time.sleep, 0.15)
+
+    # starts 0.15s into the wait and finishes past the first 0.2s, but within 0.2s of its own start
+    with patch.object(RetrievalService, "embedding_search", side_effect=lambda **kwargs: time.sleep(0.1)):
+        assert RetrievalService.retrieve("semantic_search", "dataset", "what is dify", 2) == []
+
+
+def test_slow_search_is_reported(executor):
+    with (
+        patch.object(RetrievalService, "embedding_search", side_effect=lambda **kwargs: time.sleep(0.5)),
+        pytest.raises(ValueError, match="embedding_search of dataset dataset did not finish within 0.2s"),
+    ):
+        RetrievalService.retrieve("semantic_search", "dataset", "what is dify", 2)
@@ -0,0 +1,126 @@
+import json
+import struct
+import uuid
+from unittest.mock import MagicMock
+
+import numpy as np
+import psycopg2.errors
+
+from core.rag.datasource.vdb.pg_vector_params import (
+    build_copy_binary_payload,
+    decode_vector_binary,
+    encode_vector_binary,
+    encode_vector_text,
+    execute_prepared,
+    prepared_statement_name,
+)
+
+DIMENSION = 1536
+_rng = np.random.default_rng(0)
+
+
+def _random_vector(dimension: int = DIMENSION) -> list[float]:
+    return _rng.uniform(-1, 1, dimension).tolist()
+
+
+def test_encode_vector_binary_round_trip():
+    vector = _random_vector()
+    data = encode_vector_binary(vector)
+
+    assert len(data) == 4 + 4 * DIMENSION
+    assert struct.unpack_from(">HH", data) == (DIMENSION, 0)
+    decoded = decode_vector_binary(data)
+    assert len(decoded) == DIMENSION
+    assert all(abs(a - b) < 1e-6 for a, b in zip(vector, decoded))
+
+
+def test_build_copy_binary_payload_layout():
+    row_id = str(uuid.uuid4())
+    payload = build_copy_binary_payload([(row_id, "hello", {"doc_id": row_id}, [0.5, -0.25])]).getvalue()
+
+    assert payload.startswith(b"PGCOPY\n\377\r\n\0")
+    assert payload.endswith(struct.pack(">h", -1))
+    offset = 19
+    (field_count,) = struct.unpack_from(">h", payload, offset)
+    assert field_count == 4
+    offset += 2
+    fields = []
+    for _ in range(field_count):
+        (length,) = struct.unpack_from(">i", payload, offset)
+        offset += 4
+        fields.append(payload[offset : offset + length])
+        offset += length
+    assert fields[0] == uuid.UUID(row_id).bytes
+    assert fields[1] == b"hello"
+    assert fields[2][:1] == b"\x01"
+    assert json.loads(fields[2][1:]) == {"doc_id": row_id}
+    assert decode_vector_binary(fields[3]) == [0.5, -0.25]
+
+
+def test_execute_prepared_prepares_once_per_connection():
+    cursor = MagicMock()
+    cursor.connection.prepared_statements = set()
+    statement = "SELECT 1 FROM t WHERE id = ANY($1) LIMIT $2"
+    name = prepared_statement_name(statement)
+
+    execute_prepared(cursor, statement, ("text[]", "int"), (["a", "b"], 3))
+    execute_prepared(cursor, statement, ("text[]", "int"), (["c"], 3))
+
+    executed = [call.args[0] for call in cursor.execute.call_args_list]
+    assert executed == [
+        f"PREPARE {name} (text[], int) AS {statement}",
+        f"EXECUTE {name} (%s, %s)",
+        f"EXECUTE {name} (%s, %s)",
+    ]
+    assert cursor.execute.call_args_list[-1].args[1] == (["c"], 3)
+
+
+def test_execute_prepared_reprepares_when_session_lost_statement():
+    cursor = MagicMock()
+    statement = "SELECT 1 LIMIT $1"
+    name = prepared_statement_name(statement)
+    cursor.connection.prepared_statements = {name}
+    cursor.execute.side_effect = [psycopg2.errors.InvalidSqlStatementName(), None, None]
+
+    execute_prepared(cursor, statement, ("int",), (1,))
+
+    cursor.connection.rollback.assert_called_once()
+    assert cursor.execute.call_args_list[1].args[0] == f"PREPARE {name} (int) AS {statement}"
+
+
+def test_execute_prepared_executes_statement_the_session_has_already():
+    cursor = MagicMock()
+    cursor.connection.prepared_statements = set()
+    statement = "SELECT 1 LIMIT $1"
+    name = prepared_statement_name(statement)
+    cursor.execute.side_effect = [psycopg2.errors.DuplicatePreparedStatement(), None]
+
+    execute_prepared(cursor, statement, ("int",), (1,))
+
+    cursor.connection.rollback.assert_called_once()
+    assert [call.args for call in cursor.execute.call_args_list] == [
+        (f"PREPARE {name} (int) AS {statement}",),
+        (f"EXECUTE {name} (%s)", (1,)),
+    ]
+    assert cursor.connection.prepared_statements == {name}
+
+
+def test_binary_encoding_is_smaller_than_text():
+    vector = _random_vector()
+
+    text_payload = encode_vector_text(vector)
+    binary_payload = encode_vector_binary(vector)
+
+    assert len(binary_payload) == 4 + 4 * DIMENSION
+    assert len(binary_payload) < len(text_payload) / 3
+
+
+def test_execute_prepared_without_session_bookkeeping_binds_directly():
+    cursor = MagicMock()
+    cursor.connection = object()
+
+    execute_prepared(cursor, "SELECT 1 FROM t WHERE id = ANY($1) LIMIT $2", ("text[]", "int"), (["a"], 2))
+
+    cursor.execute.assert_called_once_with(
+        "SELECT 1 FROM t WHERE id = ANY(%(p1)s) LIMIT %(p2)s", {"p1": ["a"], "p2": 2}
+    )
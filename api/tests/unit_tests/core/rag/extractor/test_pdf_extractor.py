@@ -0,0 +1,81 @@
+import pytest
+
+from configs import dify_config
+from core.rag.extractor import pdf_extractor
+from core.rag.extractor.pdf_extractor import PdfExtractor
+
+
+def _write_pdf(path, page_texts: list[str]) -> None:
+    """Write a minimal PDF with one line of Helvetica text per page."""
+    page_count = len(page_texts)
+    font_id = 3 + 2 * page_count
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids ["
+        + b" ".join(f"{3 + 2 * i} 0 R".encode() for i in range(page_count))
+        + f"] /Count {page_count} >>".encode(),
+    ]
+    for i, text in enumerate(page_texts):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>".encode()
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    content = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(content))
+        content += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref_offset = len(content)
+    content += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    content += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    content += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+    path.write_bytes(content)
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = tmp_path / "sample.pdf"
+    _write_pdf(path, [f"page {i}" for i in range(7)])
+    return path
+
+
+def test_extract_sequential(pdf_path, monkeypatch):
+    monkeypatch.setattr(dify_config, "PDF_EXTRACT_PARALLEL_WORKERS", 0)
+
+    documents = PdfExtractor(str(pdf_path)).extract()
+
+    assert [document.page_content.strip() for document in documents] == [f"page {i}" for i in range(7)]
+    assert [document.metadata["page"] for document in documents] == list(range(7))
+
+
+def test_extract_parallel_keeps_page_order(pdf_path, monkeypatch):
+    monkeypatch.setattr(dify_config, "PDF_EXTRACT_PARALLEL_WORKERS", 2)
+    monkeypatch.setattr(dify_config, "PDF_EXTRACT_PAGES_PER_TASK", 2)
+    try:
+        parallel = PdfExtractor(str(pdf_path)).extract()
+        pool = pdf_extractor._page_pool
+    finally:
+        pdf_extractor._reset_page_pool()
+    sequential = list(PdfExtractor(str(pdf_path)).load())
+
+    assert [document.page_content for document in parallel] == [document.page_content for document in sequential]
+    assert [document.metadata for document in parallel] == [document.metadata for document in sequential]
+    # workers are spawned, never forked from a gevent patched or multi-threaded worker
+    assert pool._mp_context.get_start_method() == "spawn"  # type: ignore[attr-defined]
+
+
+def test_page_pool_is_created_in_each_process(monkeypatch):
+    try:
+        pool = pdf_extractor._get_page_pool(1)
+        assert pdf_extractor._get_page_pool(1) is pool
+
+        # as in a worker forked after the pool was created
+        monkeypatch.setattr(pdf_extractor.os, "getpid", lambda: -1)
+        assert pdf_extractor._get_page_pool(1) is not pool
+    finally:
+        pdf_extractor._reset_page_pool()
+        pool.shutdown()
@@ -0,0 +1,92 @@
+from unittest.mock import patch
+
+from flask import Flask
+
+from core.rag.models.document import Document
+from core.rag.retrieval.dataset_retrieval import DatasetRetrieval
+from models.dataset import Dataset
+
+
+def _dataset(
+    dataset_id: str,
+    embedding_model: str = "text-embedding-3-small",
+    indexing_technique: str = "high_quality",
+    search_method: str = "semantic_search",
+    provider: str = "vendor",
+) -> Dataset:
+    return Dataset(
+        id=dataset_id,
+        tenant_id="tenant",
+        provider=provider,
+        indexing_technique=indexing_technique,
+        embedding_model_provider="openai",
+        embedding_model=embedding_model,
+        retrieval_model={
+            "search_method": search_method,
+            "reranking_enable": False,
+            "top_k": 2,
+            "score_threshold_enabled": False,
+        },
+    )
+
+
+@patch("core.rag.retrieval.dataset_retrieval.ModelManager")
+@patch("core.rag.retrieval.dataset_retrieval.CacheEmbedding")
+def test_query_is_embedded_once_per_embedding_model(cache_embedding, model_manager):
+    cache_embedding.return_value.embed_query.side_effect = lambda query: [float(cache_embedding.call_count)]
+    datasets = [
+        _dataset("semantic"),
+        _dataset("hybrid", search_method="hybrid_search"),
+        _dataset("large", embedding_model="text-embedding-3-large"),
+        _dataset("full-text", embedding_model="bge-m3", search_method="full_text_search"),
+        _dataset("economy", embedding_model="bge-m3", indexing_technique="economy"),
+        _dataset("external", embedding_model="bge-m3", provider="external"),
+    ]
+
+    query_vectors = DatasetRetrieval()._embed_query("what is dify", 2, datasets)
+
+    assert query_vectors == {("openai", "text-embedding-3-small"): [1.0], ("openai", "text-embedding-3-large"): [2.0]}
+    assert cache_embedding.return_value.embed_query.call_count == 2
+
+
+@patch("core.rag.retrieval.dataset_retrieval.ModelManager")
+@patch("core.rag.retrieval.dataset_retrieval.CacheEmbedding")
+def test_query_is_not_embedded_without_top_k(cache_embedding, model_manager):
+    query_vectors = DatasetRetrieval()._embed_query("what is dify", 0, [_dataset("semantic")])
+
+    assert query_vectors == {}
+    cache_embedding.return_value.embed_query.assert_not_called()
+
+
+@patch("core.rag.retrieval.dataset_retrieval.RetrievalService.retrieve")
+def test_datasets_share_the_query_vector(retrieve):
+    datasets = [_dataset("first"), _dataset("second")]
+    retrieve.side_effect = lambda dataset_id, **kwargs: [Document(page_content=dataset_id, metadata={"score": 0.9})]
+    retrieval = DatasetRetrieval()
+
+    with (
+        Flask(__name__).app_context(),
+        patch.object(retrieval, "_embed_query", return_value={("openai", "text-embedding-3-small"): [0.5]}),
+        patch.object(retrieval, "_on_query"),
+        patch.object(retrieval, "_on_retrieval_end"),
+        patch("core.rag.retrieval.dataset_retrieval.Session") as session,
+        patch("core.rag.retrieval.dataset_retrieval.db"),
+    ):
+        session.return_value.__enter__.return_value.query.return_value.where.return_value.first.return_value = datasets[
+            0
+        ]
+        documents = retrieval.multiple_retrieve(
+            app_id="app",
+            tenant_id="tenant",
+            user_id="user",
+            user_from="account",
+            available_datasets=datasets,
+            query="what is dify",
+            top_k=4,
+            score_threshold=0.0,
+            reranking_mode="reranking_model",
+            reranking_enable=False,
+        )
+
+    assert [call.kwargs["query_vector"] for call in retrieve.call_args_list] == [[0.5], [0.5]]
+    assert len(documents) == 2
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from core.rag.splitter.fixed_text_splitter import FixedRecursiveCharacterTextSplitter
+from core.rag.splitter.text_splitter import CachedLengthFunction, RecursiveCharacterTextSplitter
+
+_rng = np.random.default_rng(42)
+_WORDS = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta", "iota", "kappa"]
+
+
+def _random_text(word_count: int) -> str:
+    words = _rng.choice(_WORDS, size=word_count)
+    breaks = _rng.choice([" ", " ", " ", " ", "\n", "\n\n"], size=word_count)
+    return "".join(f"{word}{sep}" for word, sep in zip(words, breaks))
+
+
+def _legacy_merge_splits(splitter, splits, separator, lengths):
+    """The list slicing implementation _merge_splits replaced, kept as a reference."""
+    separator_len = splitter._length_function([separator])[0]
+    docs = []
+    current_doc: list[str] = []
+    total = 0
+    for d, _len in zip(splits, lengths):
+        if total + _len + (separator_len if len(current_doc) > 0 else 0) > splitter._chunk_size:
+            if len(current_doc) > 0:
+                doc = splitter._join_docs(current_doc, separator)
+                if doc is not None:
+                    docs.append(doc)
+                while total > splitter._chunk_overlap or (
+                    total + _len + (separator_len if len(current_doc) > 0 else 0) > splitter._chunk_size and total > 0
+                ):
+                    total -= splitter._length_function([current_doc[0]])[0] + (
+                        separator_len if len(current_doc) > 1 else 0
+                    )
+                    current_doc = current_doc[1:]
+        current_doc.append(d)
+        total += _len + (separator_len if len(current_doc) > 1 else 0)
+    doc = splitter._join_docs(current_doc, separator)
+    if doc is not None:
+        docs.append(doc)
+    return docs
+
+
+@pytest.mark.parametrize(("chunk_size", "chunk_overlap"), [(50, 0), (50, 10), (200, 50), (500, 100)])
+@pytest.mark.parametrize("separator", ["", " ", "\n"])
+def test_merge_splits_matches_reference(chunk_size, chunk_overlap, separator):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    splits = _random_text(400).split()
+    lengths = splitter._length_function(splits)
+
+    assert splitter._merge_splits(splits, separator, lengths) == _legacy_merge_splits(
+        splitter, splits, separator, lengths
+    )
+
+
+def test_merge_splits_uses_precomputed_lengths():
+    calls: list[list[str]] = []
+
+    def length_function(texts: list[str]) -> list[int]:
+        calls.append(texts)
+        return [len(text) for text in texts]
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=30, chunk_overlap=10, length_function=length_function)
+    splits = _random_text(200).split()
+    lengths = [len(split) for split in splits]
+
+    splitter._merge_splits(splits, " ", lengths)
+
+    # only the separator is measured, popped splits reuse their precomputed lengths
+    assert calls == [[" "]]
+
+
+def test_cached_length_function_batches_unseen_texts():
+    calls: list[list[str]] = []
+
+    def length_function(texts: list[str]) -> list[int]:
+        calls.append(list(texts))
+        return [len(text) for text in texts]
+
+    cached = CachedLengthFunction(length_function)
+
+    assert cached(["a", "bb", "a"]) == [1, 2, 1]
+    assert cached(["bb", "ccc"]) == [2, 3]
+    assert cached([]) == []
+    assert calls == [["a", "bb"], ["ccc"]]
+
+
+def test_cached_length_function_handles_batches_larger_than_cache():
+    cached = CachedLengthFunction(lambda texts: [len(text) for text in texts], max_size=2)
+
+    assert cached(["a", "bb", "ccc", "dddd"]) == [1, 2, 3, 4]
+
+
+def test_split_large_document():
+    """Split a large document with the fixed separator splitter used for indexing."""
+    text = _random_text(200_000)
+    splitter = FixedRecursiveCharacterTextSplitter.from_encoder(
+        embedding_model_instance=None, chunk_size=1000, chunk_overlap=100, fixed_separator="\n\n\n"
+    )
+
+    chunks = splitter.split_text(text)
+
+    assert chunks
+    assert all(len(chunk) <= 1000 for chunk in chunks)
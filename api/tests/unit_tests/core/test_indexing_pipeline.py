@@ -0,0 +1,179 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.indexing_pipeline import IndexingPipeline
+from core.indexing_runner import DocumentIsPausedError
+from core.rag.models.document import Document
+from models.dataset import Dataset, DatasetProcessRule
+from models.dataset import Document as DatasetDocument
+
+DATASET = SimpleNamespace(
+    id="dataset-1",
+    tenant_id="tenant-1",
+    indexing_technique="high_quality",
+    embedding_model_provider="openai",
+    embedding_model="text-embedding-3-small",
+)
+
+
+def _dataset_document(document_id: str):
+    return SimpleNamespace(
+        id=document_id,
+        dataset_id=DATASET.id,
+        dataset_process_rule_id="rule-1",
+        doc_form="text_model",
+        doc_language="English",
+    )
+
+
+def _segments(document_id: str, count: int) -> list[Document]:
+    return [
+        Document(page_content=f"{document_id} chunk {i}", metadata={"doc_id": f"{document_id}-{i}"})
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def mock_db():
+    documents = {"doc-1": _dataset_document("doc-1"), "doc-2": _dataset_document("doc-2")}
+    rule = SimpleNamespace(to_dict=lambda: {"mode": "automatic"})
+
+    def query(model):
+        chain = MagicMock()
+        if model is Dataset:
+            chain.filter_by.return_value.first.return_value = DATASET
+        elif model is DatasetProcessRule:
+            chain.where.return_value.first.return_value = rule
+        elif model is DatasetDocument:
+            chain.filter_by.side_effect = lambda id: MagicMock(first=MagicMock(return_value=documents.get(id)))
+        return chain
+
+    with patch("core.indexing_pipeline.db") as db:
+        db.session.query.side_effect = query
+        yield db
+
+
+def _runner(segments_by_document: dict[str, list[Document]]):
+    runner = MagicMock()
+    runner.extract.side_effect = lambda _processor, dataset_document, _rule: [
+        Document(page_content="raw", metadata={"document_id": dataset_document.id})
+    ]
+    runner.transform.side_effect = lambda _processor, _dataset, text_docs, *_: segments_by_document[
+        text_docs[0].metadata["document_id"]
+    ]
+    runner.check_document_paused_status.return_value = None
+    return runner
+
+
+def _embedding(max_chunks: int):
+    embedding = MagicMock()
+    embedding.get_max_chunks.return_value = max_chunks
+    embedding.embed_documents.side_effect = lambda texts: [[float(len(text))] for text in texts]
+    return embedding
+
+
+def test_pipeline_batches_embeddings_across_documents(mock_db):
+    runner = _runner({"doc-1": _segments("doc-1", 3), "doc-2": _segments("doc-2", 3)})
+    model_instance = MagicMock()
+    model_instance.get_text_embedding_num_tokens.side_effect = lambda texts: [1] * len(texts)
+    runner.model_manager.get_model_instance.return_value = model_instance
+    embedding = _embedding(max_chunks=4)
+    vector = MagicMock()
+
+    with (
+        patch("core.indexing_pipeline.IndexProcessorFactory"),
+        patch("core.indexing_pipeline.CacheEmbedding", return_value=embedding),
+        patch("core.indexing_pipeline.Vector", return_value=vector) as vector_cls,
+    ):
+        pipeline = IndexingPipeline(runner, queue_size=2, batch_wait=0.5)
+        pipeline.run([_dataset_document("doc-1"), _dataset_document("doc-2")])
+
+    batches = [call.args[0] for call in embedding.embed_documents.call_args_list]
+    # the first batch fills up to max chunks with segments from both documents
+    assert batches[0] == ["doc-1 chunk 0", "doc-1 chunk 1", "doc-1 chunk 2", "doc-2 chunk 0"]
+    assert sum(len(batch) for batch in batches) == 6
+    # model and vector clients are resolved once for the whole run
+    runner.model_manager.get_model_instance.assert_called_once()
+    vector_cls.assert_called_once()
+
+    stored = [doc.page_content for call in vector.create_with_embeddings.call_args_list for doc in call.args[0]]
+    assert sorted(stored) == sorted(f"doc-{d} chunk {i}" for d in (1, 2) for i in range(3))
+
+    completed = {
+        call.kwargs["document_id"]: call.kwargs["extra_update_params"][DatasetDocument.tokens]
+        for call in runner.update_document_index_status.call_args_list
+        if call.kwargs["after_indexing_status"] == "completed"
+    }
+    assert completed == {"doc-1": 3, "doc-2": 3}
+    assert pipeline.metrics["embed"].items == 6
+    assert pipeline.metrics["load"].items == 6
+
+
+def test_pipeline_isolates_failed_document(mock_db):
+    runner = _runner({"doc-1": _segments("doc-1", 2), "doc-2": _segments("doc-2", 2)})
+    runner.transform.side_effect = [RuntimeError("split failed"), _segments("doc-2", 2)]
+    runner.model_manager.get_model_instance.return_value = MagicMock(
+        get_text_embedding_num_tokens=MagicMock(side_effect=lambda texts: [1] * len(texts))
+    )
+
+    with (
+        patch("core.indexing_pipeline.IndexProcessorFactory"),
+        patch("core.indexing_pipeline.CacheEmbedding", return_value=_embedding(max_chunks=10)),
+        patch("core.indexing_pipeline.Vector"),
+        patch.object(IndexingPipeline, "_fail_document") as fail_document,
+    ):
+        IndexingPipeline(runner, batch_wait=0.01).run([_dataset_document("doc-1"), _dataset_document("doc-2")])
+
+    fail_document.assert_called_once()
+    assert fail_document.call_args.args[0] == "doc-1"
+
+    completed = [
+        call.kwargs["document_id"]
+        for call in runner.update_document_index_status.call_args_list
+        if call.kwargs["after_indexing_status"] == "completed"
+    ]
+    assert completed == ["doc-2"]
+
+
+def test_pipeline_reports_paused_document(mock_db):
+    runner = _runner({"doc-1": _segments("doc-1", 2)})
+    runner.check_document_paused_status.side_effect = DocumentIsPausedError()
+    runner.model_manager.get_model_instance.return_value = MagicMock()
+    embedding = _embedding(max_chunks=10)
+
+    with (
+        patch("core.indexing_pipeline.IndexProcessorFactory"),
+        patch("core.indexing_pipeline.CacheEmbedding", return_value=embedding),
+        patch("core.indexing_pipeline.Vector"),
+    ):
+        with pytest.raises(DocumentIsPausedError):
+            IndexingPipeline(runner, batch_wait=0.01).run([_dataset_document("doc-1")])
+
+    embedding.embed_documents.assert_not_called()
+
+
+def test_pipeline_fails_in_flight_documents_when_a_stage_raises(mock_db):
+    runner = _runner({"doc-1": _segments("doc-1", 3), "doc-2": _segments("doc-2", 3)})
+    runner.model_manager.get_model_instance.return_value = MagicMock(
+        get_text_embedding_num_tokens=MagicMock(side_effect=lambda texts: [1] * len(texts))
+    )
+    error = RuntimeError("embedding stage crashed")
+
+    with (
+        patch("core.indexing_pipeline.IndexProcessorFactory"),
+        patch("core.indexing_pipeline.CacheEmbedding", return_value=_embedding(max_chunks=2)),
+        patch("core.indexing_pipeline.Vector"),
+        patch.object(IndexingPipeline, "_embed", side_effect=error),
+    ):
+        pipeline = IndexingPipeline(runner, queue_size=1, batch_wait=0.01)
+        pipeline.run([_dataset_document("doc-1"), _dataset_document("doc-2")])
+
+    assert pipeline.errors == [error]
+    assert pipeline._is_failed("doc-1")
+    assert pipeline._is_failed("doc-2")
+    assert not any(
+        call.kwargs["after_indexing_status"] == "completed"
+        for call in runner.update_document_index_status.call_args_list
+    )
@@ -0,0 +1,99 @@
+import time
+from unittest.mock import patch
+
+import pytest
+
+from core.app.entities.app_invoke_entities import InvokeFrom
+from core.tools.__base.tool_runtime import ToolRuntime
+from core.tools.entities.common_entities import I18nObject
+from core.tools.entities.tool_entities import CredentialType, ToolEntity, ToolIdentity, ToolInvokeFrom, ToolProviderType
+from core.tools.tool_manager import ToolManager
+from core.tools.tool_runtime_cache import ToolRuntimeCache, ToolRuntimeTemplate
+from core.tools.workflow_as_tool.tool import WorkflowTool
+from extensions.ext_redis import redis_client
+
+
+def _tool() -> WorkflowTool:
+    entity = ToolEntity(
+        identity=ToolIdentity(author="test", name="test tool", label=I18nObject(en_US="test tool"), provider="test"),
+        parameters=[],
+        description=None,
+        output_schema=None,
+        has_runtime_parameters=False,
+    )
+    return WorkflowTool(
+        workflow_app_id="",
+        workflow_as_tool_id="",
+        version="1",
+        workflow_entities={},
+        workflow_call_depth=1,
+        entity=entity,
+        runtime=ToolRuntime(tenant_id="tenant"),
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    ToolRuntimeCache.clear()
+    yield
+    ToolRuntimeCache.clear()
+
+
+def test_fork_gives_each_invocation_its_own_runtime():
+    template = ToolRuntimeTemplate(
+        tool=_tool(), credentials={"api_key": "secret"}, credential_type=CredentialType.OAUTH2
+    )
+
+    first = template.fork("tenant", InvokeFrom.SERVICE_API, ToolInvokeFrom.WORKFLOW)
+    second = template.fork("tenant", InvokeFrom.DEBUGGER, ToolInvokeFrom.AGENT)
+    assert first.runtime is not None
+    assert second.runtime is not None
+    first.runtime.credentials["api_key"] = "changed"
+
+    assert second.runtime.credentials == {"api_key": "secret"}
+    assert template.credentials == {"api_key": "secret"}
+    assert first.runtime.credential_type == CredentialType.OAUTH2
+    assert first.runtime.invoke_from == InvokeFrom.SERVICE_API
+    assert second.runtime.tool_invoke_from == ToolInvokeFrom.AGENT
+
+
+def test_expired_template_is_not_served():
+    key = ("tenant", "builtin", "provider", "tool", "")
+    ToolRuntimeCache.set(key, None, ToolRuntimeTemplate(tool=_tool(), expires_at=int(time.time()) + 30))
+    assert ToolRuntimeCache.get(key, "tenant") is None
+
+    template = ToolRuntimeTemplate(tool=_tool(), expires_at=int(time.time()) + 3600)
+    ToolRuntimeCache.set(key, None, template)
+    assert ToolRuntimeCache.get(key, "tenant") is template
+
+
+def test_tenant_version_change_retires_entries():
+    key = ("tenant", "api", "provider", "tool", "")
+    template = ToolRuntimeTemplate(tool=_tool())
+    ToolRuntimeCache.set(key, None, template)
+    assert ToolRuntimeCache.get(key, "tenant") is template
+
+    ToolRuntimeCache.invalidate_tenant("tenant")
+    redis_client.incr.assert_called_once_with("tool_runtime_cache:tenant_version:tenant")  # type: ignore[attr-defined]
+    with patch.object(redis_client, "get", return_value=b"1"):
+        assert ToolRuntimeCache.get(key, "tenant") is None
+
+
+def test_get_tool_runtime_resolves_once():
+    template = ToolRuntimeTemplate(tool=_tool(), credentials={"api_key": "secret"})
+    with patch.object(ToolManager, "_resolve_tool_runtime", return_value=template) as resolve:
+        tools = [
+            ToolManager.get_tool_runtime(
+                provider_type=ToolProviderType.API,
+                provider_id="provider",
+                tool_name="tool",
+                tenant_id="tenant",
+                invoke_from=InvokeFrom.SERVICE_API,
+                tool_invoke_from=ToolInvokeFrom.WORKFLOW,
+            )
+            for _ in range(3)
+        ]
+
+    assert resolve.call_count == 1
+    assert len({id(tool) for tool in tools}) == 3
+    assert all(tool.runtime is not None and tool.runtime.credentials == {"api_key": "secret"} for tool in tools)
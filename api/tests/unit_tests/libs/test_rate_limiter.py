@@ -0,0 +1,107 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from core.app.features.rate_limiting import RateLimit
+from core.errors.error import AppInvokeQuotaExceededError
+from libs.rate_limiter import (
+    _CONCURRENCY_ACQUIRE_SCRIPT,
+    _SLIDING_WINDOW_SCRIPT,
+    _TOKEN_BUCKET_SCRIPT,
+    ConcurrencyLimiter,
+    SlidingWindowLimiter,
+    TokenBucketLimiter,
+    _ScriptLimiter,
+)
+
+
+@pytest.fixture
+def scripts():
+    scripts = {
+        source: MagicMock(return_value=1)
+        for source in (_SLIDING_WINDOW_SCRIPT, _TOKEN_BUCKET_SCRIPT, _CONCURRENCY_ACQUIRE_SCRIPT)
+    }
+    with (
+        patch.object(_ScriptLimiter, "_scripts", scripts),
+        patch.object(_ScriptLimiter, "_now_ms", return_value=1_000_000),
+    ):
+        yield scripts
+
+
+def test_sliding_window(scripts):
+    limiter = SlidingWindowLimiter("knowledge_rate_limit", window=60)
+    assert limiter.acquire("tenant", 10)
+
+    kwargs = scripts[_SLIDING_WINDOW_SCRIPT].call_args.kwargs
+    assert kwargs["keys"] == ["knowledge_rate_limit:tenant"]
+    now, window, limit, member = kwargs["args"]
+    assert (now, window, limit) == (1_000_000, 60_000, 10)
+
+    # requests in the same millisecond are counted apart
+    limiter.acquire("tenant", 10)
+    assert scripts[_SLIDING_WINDOW_SCRIPT].call_args.kwargs["args"][3] != member
+
+    scripts[_SLIDING_WINDOW_SCRIPT].return_value = 0
+    assert not limiter.acquire("tenant", 10)
+
+
+def test_token_bucket(scripts):
+    limiter = TokenBucketLimiter("bucket", capacity=20, rate=5)
+    assert limiter.acquire("tenant", cost=2)
+
+    scripts[_TOKEN_BUCKET_SCRIPT].assert_called_once_with(keys=["bucket:tenant"], args=[1_000_000, 20, 5, 2])
+
+
+def test_concurrency_slots(scripts):
+    limiter = ConcurrencyLimiter("slots", lease=600)
+    assert limiter.acquire("app", "request", 3)
+
+    scripts[_CONCURRENCY_ACQUIRE_SCRIPT].assert_called_once_with(
+        keys=["slots:app"], args=[1_000_000, 600_000, 3, "request"]
+    )
+    with patch("libs.rate_limiter.redis_client") as redis:
+        limiter.release("app", "request")
+    redis.zrem.assert_called_once_with("slots:app", "request")
+
+
+def test_rate_limit_holds_a_slot_per_request(scripts):
+    acquire = scripts[_CONCURRENCY_ACQUIRE_SCRIPT]
+    rate_limit = RateLimit("test-rate-limit-app", 2)
+
+    with patch("libs.rate_limiter.redis_client") as redis:
+        request_id = rate_limit.enter()
+        acquire.return_value = 0
+        with pytest.raises(AppInvokeQuotaExceededError):
+            rate_limit.enter()
+        rate_limit.exit(request_id)
+
+    assert acquire.call_args.kwargs["keys"] == ["dify:rate_limit:active_request_leases:test-rate-limit-app"]
+    assert acquire.call_args.kwargs["args"][1:3] == [600_000, 2]
+    redis.zrem.assert_called_once_with("dify:rate_limit:active_request_leases:test-rate-limit-app", request_id)
+
+
+class _CountingRedis:
+    """Redis client recording the commands it receives, one round trip each."""
+
+    def __init__(self) -> None:
+        self.commands: list[str] = []
+
+    def __getattr__(self, name):
+        def command(*args, **kwargs):
+            self.commands.append(name)
+            return 0
+
+        return command
+
+    def register_script(self, source):
+        return self.__getattr__("evalsha")
+
+
+def test_limiter_makes_one_round_trip_per_request():
+    requests = 50
+    redis = _CountingRedis()
+    limiter = SlidingWindowLimiter("knowledge_rate_limit", window=60)
+    with patch("libs.rate_limiter.redis_client", redis), patch.object(_ScriptLimiter, "_scripts", {}):
+        for _ in range(requests):
+            limiter.acquire("tenant", 10)
+    assert redis.commands == ["evalsha"] * requests
@@ -1,7 +1,13 @@
+import base64
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
 import rsa as pyrsa
 from Crypto.PublicKey import RSA
 
-from libs import gmpy2_pkcs10aep_cipher
+from core.helper import encrypter
+from libs import gmpy2_pkcs10aep_cipher, rsa
 
 
 def test_gmpy2_pkcs10aep_cipher() -> None:
@@ -27,3 +33,97 @@ def test_gmpy2_pkcs10aep_cipher() -> None:
     encrypted_by_private_key = private_cipher_rsa.encrypt(message=raw_text_bytes)
     decrypted_by_private_key = private_cipher_rsa.decrypt(encrypted_by_private_key)
     assert decrypted_by_private_key == raw_text_bytes
+
+
+class _FakeStorage:
+    def __init__(self):
+        self.files: dict[str, bytes] = {}
+        self.loads = 0
+
+    def save(self, filename, data):
+        self.files[filename] = data
+
+    def load(self, filename):
+        self.loads += 1
+        if filename not in self.files:
+            raise FileNotFoundError(filename)
+        return self.files[filename]
+
+    def exists(self, filename):
+        return filename in self.files
+
+    def delete(self, filename):
+        self.files.pop(filename, None)
+
+
+@pytest.fixture
+def key_store():
+    fake_storage = _FakeStorage()
+    redis = MagicMock()
+    redis.get.return_value = None
+    with patch.object(rsa, "storage", fake_storage), patch.object(rsa, "redis_client", redis):
+        rsa._decodings.clear()
+        yield fake_storage
+        rsa._decodings.clear()
+
+
+def test_decodings_are_imported_once_per_process(key_store):
+    public_key = rsa.generate_key_pair("tenant-cache")
+    encrypted = rsa.encrypt("secret", public_key)
+
+    with patch.object(rsa.RSA, "import_key", wraps=rsa.RSA.import_key) as import_key:
+        assert rsa.decrypt(encrypted, "tenant-cache") == "secret"
+        assert rsa.decrypt(encrypted, "tenant-cache") == "secret"
+
+    assert import_key.call_count == 1
+    assert key_store.loads == 1
+
+
+def test_envelope_encryption_round_trip(key_store):
+    public_key = rsa.generate_key_pair("tenant-envelope")
+    hybrid = rsa.encrypt("hybrid secret", public_key)
+
+    envelope = rsa.encrypt_with_data_key("envelope secret", "tenant-envelope")
+
+    assert envelope.startswith(rsa.prefix_envelope)
+    assert "privkeys/tenant-envelope/data_key.bin" in key_store.files
+    assert rsa.decrypt(envelope, "tenant-envelope") == "envelope secret"
+    # values encrypted before keep decrypting
+    assert rsa.decrypt(hybrid, "tenant-envelope") == "hybrid secret"
+
+    tampered = envelope[:-1] + bytes([envelope[-1] ^ 1])
+    with pytest.raises(ValueError):
+        rsa.decrypt(tampered, "tenant-envelope")
+
+
+def test_reset_key_pair_drops_the_data_key(key_store):
+    rsa.generate_key_pair("tenant-reset")
+    rsa.encrypt_with_data_key("secret", "tenant-reset")
+
+    rsa.generate_key_pair("tenant-reset")
+
+    assert "privkeys/tenant-reset/data_key.bin" not in key_store.files
+    with pytest.raises(rsa.DataKeyNotFoundError):
+        rsa.decrypt(rsa.prefix_envelope + b"\0" * 40, "tenant-reset")
+
+
+def test_envelope_encrypt_tokens(key_store):
+    public_key = rsa.generate_key_pair("tenant-migrate")
+    token = base64.b64encode(rsa.encrypt("api-key", public_key)).decode()
+    config = json.dumps({"api_key": token, "base_url": "https://example.com", "headers": [token], "retries": 3})
+
+    migrated = json.loads(encrypter.envelope_encrypt_serialized_tokens("tenant-migrate", config))
+
+    assert migrated["base_url"] == "https://example.com"
+    assert migrated["retries"] == 3
+    for value in (migrated["api_key"], migrated["headers"][0]):
+        assert base64.b64decode(value).startswith(rsa.prefix_envelope)
+        assert encrypter.decrypt_token("tenant-migrate", value) == "api-key"
+
+    # converted values are left as they are
+    converted = json.dumps(migrated)
+    assert encrypter.envelope_encrypt_serialized_tokens("tenant-migrate", converted) == converted
+    assert (
+        encrypter.decrypt_token("tenant-migrate", encrypter.envelope_encrypt_serialized_tokens("tenant-migrate", token))
+        == "api-key"
+    )
@@ -0,0 +1,117 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from libs import tiered_cache
+from libs.tiered_cache import TieredCache
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value).encode()
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+class _ImmediateExecutor:
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+@pytest.fixture
+def redis():
+    redis = _FakeRedis()
+    with (
+        patch.object(tiered_cache, "redis_client", redis),
+        patch.object(tiered_cache, "_refresh_executor", _ImmediateExecutor()),
+    ):
+        yield redis
+
+
+def _cache(loader, local_ttl=5) -> TieredCache:
+    return TieredCache("test", loader=loader, ttl=60, stale_ttl=600, local_ttl=local_ttl)
+
+
+def test_values_are_served_from_both_tiers(redis):
+    loads = []
+    cache = _cache(lambda key: loads.append(key) or {"plan": "team"})
+
+    assert cache.get("tenant-1") == {"plan": "team"}
+    assert cache.get("tenant-1") == {"plan": "team"}
+    # another process only has the redis tier
+    assert _cache(lambda key: loads.append(key), local_ttl=0).get("tenant-1") == {"plan": "team"}
+    assert loads == ["tenant-1"]
+
+
+def test_stale_values_are_served_while_refreshing(redis):
+    plans = iter(["sandbox", "team"])
+    cache = _cache(lambda key: {"plan": next(plans)}, local_ttl=0)
+    assert cache.get("tenant-1") == {"plan": "sandbox"}
+
+    with patch.object(tiered_cache.time, "time", return_value=time.time() + 120):
+        assert cache.get("tenant-1") == {"plan": "sandbox"}
+    assert cache.get("tenant-1") == {"plan": "team"}
+    assert "test:tenant-1:refreshing" not in redis.data
+
+
+def test_failed_refresh_keeps_the_stale_value(redis):
+    cache = _cache(lambda key: {"plan": "sandbox"}, local_ttl=0)
+    cache.get("tenant-1")
+
+    cache.loader = lambda key: 1 / 0
+    with patch.object(tiered_cache.time, "time", return_value=time.time() + 120):
+        assert cache.get("tenant-1") == {"plan": "sandbox"}
+
+
+def test_concurrent_misses_share_one_load(redis):
+    started = threading.Event()
+    release = threading.Event()
+    loads = []
+
+    def loader(key):
+        loads.append(key)
+        started.set()
+        release.wait(5)
+        return {"plan": "team"}
+
+    cache = _cache(loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("tenant-1"))) for _ in range(8)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert loads == ["tenant-1"]
+    assert results == [{"plan": "team"}] * 8
+
+
+def test_invalidate_drops_both_tiers_and_loads_in_flight(redis):
+    plans = iter(["sandbox", "team"])
+    cache = _cache(lambda key: {"plan": next(plans)})
+    cache.get("tenant-1")
+
+    cache.invalidate("tenant-1")
+    assert cache.get("tenant-1") == {"plan": "team"}
+
+    # a load that read the subscription before the change is not stored
+    cache.loader = lambda key: cache.invalidate(key) or {"plan": "outdated"}
+    cache.invalidate("tenant-1")
+    assert cache.get("tenant-1") == {"plan": "outdated"}
+    assert "test:tenant-1" not in redis.data
@@ -10,7 +10,14 @@ from core.variables import FloatVariable, IntegerVariable, SecretVariable, Strin
 from core.variables.segments import IntegerSegment, Segment
 from factories.variable_factory import build_segment
 from models.model import EndUser
-from models.workflow import Workflow, WorkflowDraftVariable, WorkflowNodeExecutionModel, is_system_variable_editable
+from models.workflow import (
+    Workflow,
+    WorkflowDraftVariable,
+    WorkflowGraphBlob,
+    WorkflowNodeExecutionModel,
+    WorkflowRun,
+    is_system_variable_editable,
+)
 
 
 def test_environment_variables():
@@ -313,3 +320,32 @@ class TestWorkflowDraftVariableGetValue:
         draft_var.set_value(int_var)
         value = draft_var.get_value()
         assert value == int_var
+
+
+class TestWorkflowGraphBlob:
+    def test_serialize_ignores_key_order(self):
+        graph_hash, serialized = WorkflowGraphBlob.serialize({"nodes": [{"id": "start"}], "edges": []})
+
+        assert (graph_hash, serialized) == WorkflowGraphBlob.serialize({"edges": [], "nodes": [{"id": "start"}]})
+        assert json.loads(serialized) == {"nodes": [{"id": "start"}], "edges": []}
+        assert len(graph_hash) == 64
+
+    def test_graph_dict_reads_the_blob(self):
+        graph_hash, serialized = WorkflowGraphBlob.serialize({"nodes": [], "edges": []})
+        run = WorkflowRun(tenant_id=str(uuid4()), graph=None, graph_hash=graph_hash)
+
+        with mock.patch("models.workflow.db") as db:
+            db.session.scalar.return_value = serialized
+            assert run.graph_dict == {"nodes": [], "edges": []}
+            # graphs never change once stored, they are cached
+            assert run.graph_dict == {"nodes": [], "edges": []}
+
+        db.session.scalar.assert_called_once()
+
+    def test_graph_dict_reads_the_legacy_graph(self):
+        run = WorkflowRun(tenant_id=str(uuid4()), graph='{"nodes": []}', graph_hash=None)
+
+        with mock.patch("models.workflow.db") as db:
+            assert run.graph_dict == {"nodes": []}
+
+        db.session.scalar.assert_not_called()
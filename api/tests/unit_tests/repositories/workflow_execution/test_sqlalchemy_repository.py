@@ -0,0 +1,54 @@
+"""
+Unit tests for the SQLAlchemy implementation of WorkflowExecutionRepository.
+"""
+
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from core.repositories.sqlalchemy_workflow_execution_repository import SQLAlchemyWorkflowExecutionRepository
+from core.workflow.entities.workflow_execution import WorkflowExecution, WorkflowExecutionStatus, WorkflowType
+from models.account import Account
+from models.enums import WorkflowRunTriggeredFrom
+from models.workflow import WorkflowGraphBlob
+
+
+def test_save_stores_the_graph_once():
+    session = MagicMock(spec=Session)
+    session.__enter__ = MagicMock(return_value=session)
+    session.__exit__ = MagicMock(return_value=None)
+    session_factory = MagicMock(spec=sessionmaker)
+    session_factory.return_value = session
+    user = Account()
+    user.id = "test-user-id"
+    user._current_tenant = MagicMock()
+    user._current_tenant.id = "test-tenant"
+    repository = SQLAlchemyWorkflowExecutionRepository(
+        session_factory=session_factory,
+        user=user,
+        app_id="test-app",
+        triggered_from=WorkflowRunTriggeredFrom.APP_RUN,
+    )
+    graph = {"nodes": [{"id": "start"}], "edges": []}
+    execution = WorkflowExecution.new(
+        id_="test-run",
+        workflow_id="test-workflow",
+        workflow_type=WorkflowType.WORKFLOW,
+        workflow_version="1",
+        graph=graph,
+        inputs={},
+        started_at=datetime.now(),
+    )
+
+    repository.save(execution)
+    execution.status = WorkflowExecutionStatus.SUCCEEDED
+    repository.save(execution)
+
+    graph_hash, serialized = WorkflowGraphBlob.serialize(graph)
+    session.execute.assert_called_once()
+    params = session.execute.call_args.args[0].compile().params
+    assert (params["tenant_id"], params["graph_hash"], params["graph"]) == ("test-tenant", graph_hash, serialized)
+    run = session.merge.call_args.args[0]
+    assert run.graph is None
+    assert run.graph_hash == graph_hash
@@ -107,6 +107,21 @@ def test_save(repository, session):
     session_obj.merge.assert_called_once_with(execution)
 
 
+def test_save_offloads_payloads_after_commit(repository, session):
+    """Test large payloads are only saved to the storage once the row is committed."""
+    session_obj, _ = session
+    calls = MagicMock()
+    execution = MagicMock(spec=WorkflowNodeExecutionModel)
+    execution.node_execution_id = None
+    execution.save_offloaded_payloads = calls.save_offloaded_payloads
+    session_obj.commit = calls.commit
+    repository.to_db_model = MagicMock(return_value=execution)
+
+    repository.save(execution)
+
+    assert [call[0] for call in calls.mock_calls] == ["commit", "save_offloaded_payloads"]
+
+
 def test_save_with_existing_tenant_id(repository, session):
     """Test save method with existing tenant_id."""
     session_obj, _ = session
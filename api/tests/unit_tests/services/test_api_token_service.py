@@ -0,0 +1,153 @@
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from flask import Flask
+
+from configs import dify_config
+from controllers.service_api.wraps import validate_and_get_api_token
+from models.model import ApiToken
+from services import api_token_service
+from services.api_token_service import ApiTokenService
+
+
+@pytest.fixture(autouse=True)
+def _reset_cache(monkeypatch):
+    ApiTokenService.clear()
+    ApiTokenService._pending_last_used = {}
+    # no background flush thread in tests
+    monkeypatch.setattr(ApiTokenService, "_flusher", MagicMock())
+    yield
+    ApiTokenService.clear()
+    ApiTokenService._pending_last_used = {}
+
+
+@pytest.fixture
+def versions():
+    """Tenant versions stored in the mocked Redis."""
+    store: dict[str, bytes] = {}
+
+    def incr(key):
+        store[key] = str(int(store.get(key, b"0")) + 1).encode()
+
+    with patch.object(api_token_service, "redis_client") as redis:
+        redis.get.side_effect = store.get
+        redis.incr.side_effect = incr
+        yield store
+
+
+def test_entry_is_retired_when_tenant_changes(versions):
+    version = ApiTokenService.get_tenant_version("tenant-1")
+    ApiTokenService.set("key", "tenant-1", version, "value")
+    assert ApiTokenService.get("key") == "value"
+
+    ApiTokenService.invalidate_tenant("tenant-2")
+    assert ApiTokenService.get("key") == "value"
+
+    ApiTokenService.invalidate_tenant("tenant-1")
+    assert ApiTokenService.get("key") is None
+
+
+def test_cache_disabled(versions, monkeypatch):
+    monkeypatch.setattr(dify_config, "SERVICE_API_AUTH_CACHE_TTL", 0)
+    ApiTokenService.set("key", "tenant-1", None, "value")
+    assert ApiTokenService.get("key") is None
+
+
+def test_invalidations_are_applied_after_commit(versions):
+    session = SimpleNamespace(info={})
+    target = SimpleNamespace(tenant_id="tenant-1")
+    with patch.object(api_token_service, "object_session", return_value=session):
+        api_token_service._collect_invalidation(MagicMock(), MagicMock(), target)
+    assert not versions
+
+    api_token_service._apply_invalidations(session)
+    assert versions == {"service_api_auth:tenant_version:tenant-1": b"1"}
+    assert session.info == {}
+
+
+def test_invalidations_are_discarded_on_rollback(versions):
+    session = SimpleNamespace(info={})
+    with patch.object(api_token_service, "object_session", return_value=session):
+        api_token_service._collect_invalidation(MagicMock(), MagicMock(), SimpleNamespace(tenant_id="tenant-1"))
+
+    api_token_service._discard_invalidations(session)
+    api_token_service._apply_invalidations(session)
+    assert not versions
+
+
+def test_account_status_change_invalidates_its_tenants(versions):
+    session = SimpleNamespace(info={})
+    connection = MagicMock()
+    connection.scalars.return_value = ["tenant-1", "tenant-2"]
+    with (
+        patch.object(api_token_service, "object_session", return_value=session),
+        patch.object(api_token_service, "get_history") as get_history,
+    ):
+        get_history.return_value.has_changes.return_value = False
+        api_token_service._collect_account_invalidation(MagicMock(), connection, SimpleNamespace(id="account-1"))
+        assert session.info == {}
+
+        get_history.return_value.has_changes.return_value = True
+        api_token_service._collect_account_invalidation(MagicMock(), connection, SimpleNamespace(id="account-1"))
+
+    api_token_service._apply_invalidations(session)
+    assert versions == {
+        "service_api_auth:tenant_version:tenant-1": b"1",
+        "service_api_auth:tenant_version:tenant-2": b"1",
+    }
+
+
+def test_last_used_at_flusher_is_started_once(app: Flask, monkeypatch):
+    monkeypatch.setattr(ApiTokenService, "_flusher", None)
+    with (
+        patch.object(api_token_service.threading, "Thread") as thread_cls,
+        patch.object(api_token_service.atexit, "register") as register,
+    ):
+        ApiTokenService.record_last_used("t1")
+        ApiTokenService.record_last_used("t2")
+
+    thread_cls.assert_called_once()
+    thread_cls.return_value.start.assert_called_once()
+    register.assert_called_once_with(ApiTokenService._flush_at_exit, app)
+
+
+def test_last_used_at_is_flushed_in_one_batch(monkeypatch):
+    monkeypatch.setattr(dify_config, "API_TOKEN_LAST_USED_FLUSH_INTERVAL", 3600)
+    with patch.object(api_token_service, "db"), patch.object(api_token_service, "Session") as session_cls:
+        session = session_cls.return_value.__enter__.return_value
+        for token_id in ("t1", "t2", "t1"):
+            ApiTokenService.record_last_used(token_id)
+        session.execute.assert_not_called()
+
+        ApiTokenService.flush_last_used()
+
+    session.execute.assert_called_once()
+    rows = session.execute.call_args.args[1]
+    assert sorted(row["id"] for row in rows) == ["t1", "t2"]
+    session.commit.assert_called_once()
+
+
+def test_validate_and_get_api_token_uses_cache(app: Flask, versions, monkeypatch):
+    monkeypatch.setattr(dify_config, "API_TOKEN_LAST_USED_FLUSH_INTERVAL", 3600)
+    api_token = ApiToken(id="token-1", tenant_id="tenant-1", app_id="app-1", type="app", token="app-secret")
+
+    with (
+        patch("controllers.service_api.wraps.db"),
+        patch("controllers.service_api.wraps.Session") as session_cls,
+    ):
+        session = session_cls.return_value.__enter__.return_value
+        session.scalar.return_value = api_token
+        for _ in range(3):
+            with app.test_request_context(headers={"Authorization": "Bearer app-secret"}):
+                assert validate_and_get_api_token("app") is api_token
+
+        assert session.scalar.call_count == 1
+
+        # deleting the token retires the cached lookup in every process
+        ApiTokenService.invalidate_tenant("tenant-1")
+        with app.test_request_context(headers={"Authorization": "Bearer app-secret"}):
+            validate_and_get_api_token("app")
+        assert session.scalar.call_count == 2
+
+    assert list(ApiTokenService._pending_last_used) == ["token-1"]
@@ -0,0 +1,224 @@
+import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from configs import dify_config
+from services import app_statistic_service
+from services.app_statistic_service import (
+    AppStatisticRollupService,
+    AppStatisticService,
+    RollupSource,
+    StatisticWindow,
+    ceil_hour,
+    floor_hour,
+)
+
+WATERMARK = datetime.datetime(2025, 1, 10, 6)
+
+
+def _compile(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+@pytest.fixture
+def session():
+    session = MagicMock()
+    session.scalar.return_value = WATERMARK
+    with patch.object(app_statistic_service, "db", SimpleNamespace(session=session)):
+        yield session
+
+
+def test_hour_rounding():
+    moment = datetime.datetime(2025, 1, 1, 10, 30)
+    assert floor_hour(moment) == datetime.datetime(2025, 1, 1, 10)
+    assert ceil_hour(moment) == datetime.datetime(2025, 1, 1, 11)
+    assert ceil_hour(datetime.datetime(2025, 1, 1, 10)) == datetime.datetime(2025, 1, 1, 10)
+
+
+def test_parse_range_converts_to_naive_utc():
+    start, end = AppStatisticService.parse_range("2025-01-01 08:00", "2025-01-02 08:00", "Asia/Shanghai")
+    assert start == datetime.datetime(2025, 1, 1, 0)
+    assert end == datetime.datetime(2025, 1, 2, 0)
+    assert AppStatisticService.parse_range(None, None, "UTC") == (None, None)
+
+
+def test_plan_window_splits_partial_hours_and_recent_rows(session):
+    start = datetime.datetime(2025, 1, 1, 10, 30)
+    end = datetime.datetime(2025, 1, 12)
+
+    window = AppStatisticService.plan_window(RollupSource.MESSAGES, "UTC", start, end)
+
+    assert window.rollup_start == datetime.datetime(2025, 1, 1, 11)
+    assert window.rollup_end == WATERMARK
+    assert window.live == [(start, datetime.datetime(2025, 1, 1, 11)), (WATERMARK, end)]
+
+
+def test_plan_window_without_bounds(session):
+    window = AppStatisticService.plan_window(RollupSource.MESSAGES, "America/New_York", None, None)
+
+    assert window.rollup_start is None
+    assert window.rollup_end == WATERMARK
+    assert window.live == [(WATERMARK, None)]
+
+
+def test_plan_window_range_before_watermark_needs_no_live_rows(session):
+    start = datetime.datetime(2025, 1, 1)
+    end = datetime.datetime(2025, 1, 5)
+
+    window = AppStatisticService.plan_window(RollupSource.MESSAGES, "UTC", start, end)
+
+    assert (window.rollup_start, window.rollup_end, window.live) == (start, end, [])
+
+
+def test_plan_window_falls_back_to_live(session):
+    start = datetime.datetime(2025, 1, 1)
+    end = datetime.datetime(2025, 1, 5)
+
+    # no whole hour of the day in India starts at a UTC hour
+    window = AppStatisticService.plan_window(RollupSource.MESSAGES, "Asia/Kolkata", start, end)
+    assert not window.uses_rollup
+    assert window.live == [(start, end)]
+
+    # the rollup task never ran
+    session.scalar.return_value = None
+    window = AppStatisticService.plan_window(RollupSource.MESSAGES, "UTC", start, end)
+    assert not window.uses_rollup
+
+    # the range lies after the watermark
+    session.scalar.return_value = WATERMARK
+    later = WATERMARK + datetime.timedelta(minutes=30)
+    window = AppStatisticService.plan_window(RollupSource.MESSAGES, "UTC", later, None)
+    assert not window.uses_rollup
+    assert window.live == [(later, None)]
+
+
+def test_window_conditions():
+    column = app_statistic_service.Message.created_at
+    window = StatisticWindow(
+        rollup_start=datetime.datetime(2025, 1, 1, 11),
+        rollup_end=WATERMARK,
+        watermark=WATERMARK,
+        live=[(datetime.datetime(2025, 1, 1, 10, 30), datetime.datetime(2025, 1, 1, 11)), (WATERMARK, None)],
+    )
+
+    assert _compile(window.rollup_condition(column)) == (
+        "messages.created_at >= '2025-01-01 11:00:00' AND messages.created_at < '2025-01-10 06:00:00'"
+    )
+    assert _compile(window.live_condition(column)) == (
+        "messages.created_at >= '2025-01-01 10:30:00' AND messages.created_at < '2025-01-01 11:00:00' "
+        "OR messages.created_at >= '2025-01-10 06:00:00'"
+    )
+    assert _compile(StatisticWindow(live=[]).live_condition(column)) == "false"
+    assert _compile(StatisticWindow(live=[(None, None)]).live_condition(column)) == "true"
+
+
+def test_daily_messages_combines_rollups_and_live_rows(session):
+    session.execute.return_value.all.return_value = [
+        SimpleNamespace(date=datetime.date(2025, 1, 1), message_count=Decimal(12)),
+    ]
+
+    data = AppStatisticService.daily_messages("app-1", "UTC", datetime.datetime(2025, 1, 1, 10, 30), None)
+
+    assert data == [{"date": "2025-01-01", "message_count": 12}]
+    sql = _compile(session.execute.call_args.args[0])
+    assert "FROM app_statistic_hourly" in sql
+    assert "app_statistic_hourly.message_count > 0" in sql
+    assert "UNION ALL" in sql
+    assert "count(messages.id)" in sql
+    assert "timezone('UTC', messages.created_at)" in sql
+
+
+def test_average_session_interactions_reads_messages_after_watermark(session):
+    day = datetime.date(2025, 1, 1)
+    session.execute.return_value.all.side_effect = [
+        [SimpleNamespace(date=day, message_count=Decimal(7))],
+        [SimpleNamespace(date=day, count=3)],
+    ]
+
+    data = AppStatisticService.average_session_interactions("app-1", "UTC", None, None)
+
+    assert data == [{"date": "2025-01-01", "interactions": 2.33}]
+    counts_sql = _compile(session.execute.call_args_list[0].args[0])
+    assert "sum(app_statistic_hourly.session_message_count)" not in counts_sql
+    assert "app_statistic_hourly.session_message_count AS message_count" in counts_sql
+    assert "messages.created_at >= '2025-01-10 06:00:00'" in counts_sql
+
+
+def test_rollup_statements():
+    session = MagicMock()
+    start = datetime.datetime(2025, 1, 1)
+    AppStatisticRollupService._rollup_messages(session, start, start + datetime.timedelta(hours=24))
+    AppStatisticRollupService._rollup_workflow_runs(session, start, start + datetime.timedelta(hours=24))
+
+    statements = [_compile(call.args[0]) for call in session.execute.call_args_list]
+    assert len(statements) == 7
+    counters = statements[0]
+    assert counters.startswith("INSERT INTO app_statistic_hourly (app_id, hour, message_count")
+    assert "GROUP BY messages.app_id, date_trunc('hour', messages.created_at)" in counters
+    assert "message_count = (app_statistic_hourly.message_count + excluded.message_count)" in counters
+    assert "JOIN conversations" in statements[1]
+    assert all("ON CONFLICT DO NOTHING" in statement for statement in statements[2:5])
+    assert "messages.invoke_from != 'debugger'" in statements[3]
+    assert "workflow_runs.triggered_from = 'app-run'" in statements[5]
+
+
+class _Lock:
+    def acquire(self, blocking=True):
+        return True
+
+    def reacquire(self):
+        pass
+
+    def release(self):
+        pass
+
+
+def test_rollup_advances_watermark_in_batches(monkeypatch):
+    monkeypatch.setattr(dify_config, "APP_STATISTIC_ROLLUP_SETTLE_MINUTES", 60)
+    monkeypatch.setattr(dify_config, "APP_STATISTIC_ROLLUP_BATCH_HOURS", 24)
+    now = datetime.datetime(2025, 1, 3, 12, 20)
+    batches = []
+
+    with (
+        patch.object(app_statistic_service, "redis_client") as redis,
+        patch.object(app_statistic_service, "db"),
+        patch.object(app_statistic_service, "Session") as session_cls,
+        patch.object(AppStatisticRollupService, "_init_watermark", return_value=datetime.datetime(2025, 1, 1)),
+        patch.object(AppStatisticRollupService, "_rollup_messages", side_effect=lambda s, a, b: batches.append((a, b))),
+        patch.object(AppStatisticRollupService, "_rollup_workflow_runs"),
+    ):
+        redis.lock.return_value = _Lock()
+        session_cls.return_value.__enter__.return_value.execute.return_value.rowcount = 1
+        watermarks = AppStatisticRollupService.rollup(now=now)
+
+    assert watermarks == {
+        "messages": datetime.datetime(2025, 1, 3, 11),
+        "workflow_runs": datetime.datetime(2025, 1, 3, 11),
+    }
+    assert batches == [
+        (datetime.datetime(2025, 1, 1), datetime.datetime(2025, 1, 2)),
+        (datetime.datetime(2025, 1, 2), datetime.datetime(2025, 1, 3)),
+        (datetime.datetime(2025, 1, 3), datetime.datetime(2025, 1, 3, 11)),
+    ]
+
+
+def test_rollup_stops_when_watermark_moved_concurrently():
+    with (
+        patch.object(app_statistic_service, "db"),
+        patch.object(app_statistic_service, "Session") as session_cls,
+        patch.object(AppStatisticRollupService, "_init_watermark", return_value=datetime.datetime(2025, 1, 1)),
+        patch.object(AppStatisticRollupService, "_rollup_messages"),
+    ):
+        session = session_cls.return_value.__enter__.return_value
+        session.execute.return_value.rowcount = 0
+        processed_until = AppStatisticRollupService._rollup_source(
+            RollupSource.MESSAGES, datetime.datetime(2025, 1, 5), _Lock()
+        )
+
+    assert processed_until == datetime.datetime(2025, 1, 1)
+    session.rollback.assert_called_once()
+    session.commit.assert_not_called()
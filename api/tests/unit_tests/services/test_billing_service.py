@@ -0,0 +1,147 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.orm import Session
+
+from configs import dify_config
+from libs import tiered_cache
+from libs.tiered_cache import TieredCache
+from models.model import App
+from services import billing_service
+from services.billing_service import BillingService
+from services.feature_service import FeatureService
+
+BILLING_LATENCY = 0.2
+
+SUBSCRIPTION_INFO = {
+    "enabled": True,
+    "subscription": {"plan": "team", "interval": "month"},
+    "members": {"size": 2, "limit": 50},
+    "apps": {"size": 3, "limit": 200},
+}
+
+
+class _StubBillingHandler(BaseHTTPRequestHandler):
+    requests: list[str] = []
+
+    def do_GET(self):  # noqa: N802
+        type(self).requests.append(self.path)
+        time.sleep(BILLING_LATENCY)
+        body = json.dumps(SUBSCRIPTION_INFO).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value).encode()
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+
+@pytest.fixture
+def billing_server(monkeypatch):
+    _StubBillingHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubBillingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    monkeypatch.setattr(dify_config, "BILLING_ENABLED", True)
+    monkeypatch.setattr(BillingService, "base_url", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(tiered_cache, "redis_client", _FakeRedis())
+    monkeypatch.setattr(
+        BillingService,
+        "_info_cache",
+        TieredCache(
+            "billing:subscription_info",
+            loader=lambda tenant_id: BillingService._fetch_tenant_subscription("/subscription/info", tenant_id),
+            ttl=60,
+            stale_ttl=600,
+            local_ttl=5,
+        ),
+    )
+    yield _StubBillingHandler
+    server.shutdown()
+    server.server_close()
+
+
+def test_features_are_read_from_the_cache(billing_server):
+    features = FeatureService.get_features("tenant-1")
+    for _ in range(100):
+        assert FeatureService.get_features("tenant-1") == features
+
+    assert features.billing.subscription.plan == "team"
+    assert features.apps.limit == 200
+    assert billing_server.requests == ["/subscription/info?tenant_id=tenant-1"]
+
+
+def test_concurrent_cold_reads_make_one_billing_request(billing_server):
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        plans = list(executor.map(lambda _: BillingService.get_info("tenant-1")["subscription"]["plan"], range(16)))
+
+    assert plans == ["team"] * 16
+    assert len(billing_server.requests) == 1
+
+
+def test_subscription_change_invalidates_the_cache(billing_server):
+    BillingService.get_info("tenant-1")
+    BillingService.get_info("tenant-2")
+
+    with patch.object(BillingService._knowledge_rate_limit_cache, "invalidate") as invalidate_rate_limit:
+        BillingService.invalidate_tenant_cache("tenant-1")
+    invalidate_rate_limit.assert_called_once_with("tenant-1")
+
+    BillingService.get_info("tenant-1")
+    BillingService.get_info("tenant-2")
+    assert billing_server.requests == [
+        "/subscription/info?tenant_id=tenant-1",
+        "/subscription/info?tenant_id=tenant-2",
+        "/subscription/info?tenant_id=tenant-1",
+    ]
+
+
+@pytest.mark.parametrize("committed", [True, False])
+def test_created_resources_invalidate_the_cached_usage(billing_server, committed):
+    BillingService.get_info("tenant-1")
+    session = Session()
+    app = App(tenant_id="tenant-1")
+    session.add(app)
+
+    billing_service._collect_usage_change(App.__mapper__, None, app)
+    if committed:
+        billing_service._apply_usage_changes(session)
+    else:
+        billing_service._discard_usage_changes(session)
+    BillingService.get_info("tenant-1")
+
+    assert len(billing_server.requests) == (2 if committed else 1)
+
+
+def test_http_client_is_created_in_each_process(monkeypatch):
+    monkeypatch.setattr(billing_service, "_client", None)
+    client = billing_service._get_client()
+    assert billing_service._get_client() is client
+
+    # as in a worker forked after the client was created
+    monkeypatch.setattr(billing_service.os, "getpid", lambda: -1)
+    assert billing_service._get_client() is not client
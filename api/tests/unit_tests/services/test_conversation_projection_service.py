@@ -0,0 +1,174 @@
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+from flask_restful import marshal
+
+from fields.conversation_fields import conversation_with_summary_fields, message_detail_fields
+from models.account import Account
+from models.model import AppModelConfig, Conversation, Message, MessageAnnotation, MessageFeedback
+from services.conversation_projection_service import ConversationProjectionService, Projection
+
+CREATED_AT = datetime(2025, 1, 1)
+
+
+def _conversation(conversation_id: str, **kwargs) -> Conversation:
+    values = {
+        "id": conversation_id,
+        "app_id": "app-1",
+        "app_model_config_id": "config-1",
+        "mode": "chat",
+        "name": f"name {conversation_id}",
+        "summary": None,
+        "status": "normal",
+        "from_source": "api",
+        "created_at": CREATED_AT,
+        "updated_at": CREATED_AT,
+    }
+    values.update(kwargs)
+    return Conversation(**values)
+
+
+def _message(message_id: str, conversation_id: str, query: str = "hello") -> Message:
+    return Message(
+        id=message_id,
+        app_id="app-1",
+        conversation_id=conversation_id,
+        query=query,
+        answer="world",
+        created_at=CREATED_AT,
+    )
+
+
+class FakeSession:
+    """Answers the page queries by the table they read, counting every round trip."""
+
+    def __init__(self, results: dict[str, list]):
+        self.results = results
+        self.calls = 0
+
+    def _result(self, stmt) -> list:
+        self.calls += 1
+        sql = str(stmt)
+        for marker, rows in self.results.items():
+            if marker in sql:
+                return rows
+        return []
+
+    def execute(self, stmt):
+        return self._result(stmt)
+
+    def scalars(self, stmt):
+        return self._result(stmt)
+
+
+@pytest.fixture
+def fake_session():
+    session = FakeSession({})
+    with patch("services.conversation_projection_service.db", SimpleNamespace(session=session)):
+        yield session
+
+
+def test_project_conversations(fake_session):
+    conversations = [
+        _conversation("c1", summary=None, from_end_user_id="eu-1"),
+        _conversation("c2", summary="custom summary", from_account_id="acc-1"),
+        _conversation("c3", from_end_user_id="eu-2"),
+    ]
+    annotation = MessageAnnotation(id="a1", conversation_id="c2", account_id="acc-1", question="q", content="c")
+    fake_session.results = {
+        "FROM messages LEFT OUTER JOIN workflow_runs": [
+            ("c1", None, 2),
+            ("c2", "succeeded", 3),
+            ("c2", "failed", 1),
+        ],
+        "FROM message_feedbacks": [("c1", "user", "like", 2), ("c1", "admin", "dislike", 1)],
+        "FROM messages JOIN": [_message("m1", "c1", query="first question")],
+        "FROM message_annotations JOIN": [annotation],
+        "FROM accounts": [Account(id="acc-1", name="Alice", email="alice@example.com")],
+        "FROM end_users": [SimpleNamespace(id="eu-1", session_id="session-1")],
+        "FROM app_model_configs": [AppModelConfig(id="config-1", provider="openai", model_id="gpt")],
+    }
+
+    with patch.object(AppModelConfig, "to_dict", return_value={"pre_prompt": "be brief"}) as to_dict:
+        projections = ConversationProjectionService.project_conversations(conversations)
+
+    # one query per property for the whole page
+    assert fake_session.calls == 7
+    to_dict.assert_called_once()
+    c1, c2, c3 = projections
+    assert c1.message_count == 2
+    assert c1.status_count == {"success": 0, "failed": 0, "partial_success": 0}
+    assert c2.status_count == {"success": 3, "failed": 1, "partial_success": 0}
+    assert c3.message_count == 0
+    assert c3.status_count is None
+    assert c1.user_feedback_stats == {"like": 2, "dislike": 0}
+    assert c1.admin_feedback_stats == {"like": 0, "dislike": 1}
+    assert c2.user_feedback_stats == {"like": 0, "dislike": 0}
+    assert c1.summary_or_query == "first question"
+    assert c2.summary_or_query == "custom summary"
+    assert c3.summary_or_query == ""
+    assert (c1.annotated, c2.annotated) == (False, True)
+    assert c2.annotation.account.name == "Alice"
+    assert c1.from_end_user_session_id == "session-1"
+    assert c3.from_end_user_session_id is None
+    assert c2.from_account_name == "Alice"
+    assert c1.model_config == {"pre_prompt": "be brief", "model_id": None, "provider": None}
+
+    # the existing marshalling fields read the projection, falling back to the model columns
+    data = marshal(c2, conversation_with_summary_fields)
+    assert data["id"] == "c2"
+    assert data["name"] == "name c2"
+    assert data["from_account_name"] == "Alice"
+    assert data["message_count"] == 4
+    assert data["annotated"] is True
+
+
+def test_project_messages(fake_session):
+    messages = [_message("m1", "c1"), _message("m2", "c1")]
+    annotation = MessageAnnotation(id="a1", message_id="m2", account_id="acc-1", question="q", content="c")
+    fake_session.results = {
+        "FROM message_feedbacks": [
+            MessageFeedback(id="f1", message_id="m1", from_source="user", rating="like"),
+            MessageFeedback(id="f2", message_id="m1", from_source="admin", rating="dislike", from_account_id="acc-1"),
+        ],
+        "FROM message_annotations JOIN": [annotation],
+        "FROM app_annotation_hit_histories": [("m1", annotation)],
+        "FROM message_agent_thoughts": [],
+        "FROM accounts": [Account(id="acc-1", name="Alice", email="alice@example.com")],
+    }
+
+    projections = ConversationProjectionService.project_messages(messages)
+
+    assert fake_session.calls == 5
+    m1, m2 = projections
+    assert [feedback.rating for feedback in m1.feedbacks] == ["like", "dislike"]
+    assert m1.user_feedback.rating == "like"
+    assert m1.admin_feedback.from_account.name == "Alice"
+    assert m2.feedbacks == []
+    assert m2.user_feedback is None
+    assert m1.annotation is None
+    assert m2.annotation.account.name == "Alice"
+    assert m1.annotation_hit_history.annotation_create_account.name == "Alice"
+    assert m2.annotation_hit_history is None
+    assert m1.agent_thoughts == []
+
+    feedbacks = marshal(m1, {"feedbacks": message_detail_fields["feedbacks"]})["feedbacks"]
+    assert feedbacks[1]["from_account"]["name"] == "Alice"
+
+
+def test_projection_falls_back_to_model():
+    message = _message("m1", "c1", query="question")
+    projection = Projection(message, answer="overridden")
+
+    assert projection.query == "question"
+    assert projection.answer == "overridden"
+    with pytest.raises(AttributeError):
+        _ = projection.missing_attribute
+
+
+def test_empty_page_runs_no_query(fake_session):
+    assert ConversationProjectionService.project_conversations([]) == []
+    assert ConversationProjectionService.project_messages([]) == []
+    assert fake_session.calls == 0
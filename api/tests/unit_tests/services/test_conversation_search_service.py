@@ -0,0 +1,85 @@
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from models.model import Conversation
+from services.conversation_search_service import CONVERSATION_SEARCH_INDEXES, ConversationSearchService
+
+
+def _compile(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def test_chat_search_unions_one_subquery_per_table():
+    stmt = select(Conversation).where(
+        Conversation.id.in_(ConversationSearchService.matching_conversation_ids("app-1", "refund"))
+    )
+    sql = _compile(stmt)
+
+    assert "GROUP BY" not in sql
+    assert sql.count("UNION") == 2
+    assert "messages.query ILIKE" in sql
+    assert "messages.answer ILIKE" in sql
+    assert "conversations.name ILIKE" in sql
+    assert "conversations.introduction ILIKE" in sql
+    assert "end_users.session_id ILIKE" in sql
+    # every branch is scoped to the app
+    assert sql.count("app_id = ") == 3
+
+
+def test_completion_search_only_reads_messages():
+    stmt = ConversationSearchService.matching_conversation_ids("app-1", "refund", include_conversation_fields=False)
+    sql = _compile(stmt)
+
+    assert "UNION" not in sql
+    assert "FROM messages" in sql
+    assert "conversations" not in sql
+    assert stmt.compile().params["query_1"] == "%refund%"
+
+
+def _connection(valid_by_name: dict[str, bool]) -> MagicMock:
+    conn = MagicMock()
+
+    def execute(stmt, params=None):
+        result = MagicMock()
+        result.scalar.return_value = valid_by_name.get(params["name"]) if params else None
+        return result
+
+    conn.execute.side_effect = execute
+    return conn
+
+
+def _executed_sql(conn: MagicMock) -> list[str]:
+    return [str(call.args[0]) for call in conn.execute.call_args_list if not call.args[1:]]
+
+
+def test_ensure_indexes_builds_missing_and_invalid():
+    valid_by_name = {index.name: True for index in CONVERSATION_SEARCH_INDEXES}
+    valid_by_name.pop("message_query_trgm_idx")
+    valid_by_name["message_answer_trgm_idx"] = False
+    conn = _connection(valid_by_name)
+
+    with patch("services.conversation_search_service.db") as db:
+        db.engine.connect.return_value.execution_options.return_value.__enter__.return_value = conn
+        built = ConversationSearchService.ensure_indexes()
+
+    assert built == ["message_query_trgm_idx", "message_answer_trgm_idx"]
+    statements = _executed_sql(conn)
+    assert statements[0] == "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+    assert "DROP INDEX CONCURRENTLY IF EXISTS message_answer_trgm_idx" in statements
+    assert (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS message_query_trgm_idx ON messages USING gin (query gin_trgm_ops)"
+        in statements
+    )
+
+
+def test_ensure_indexes_can_leave_invalid_indexes():
+    conn = _connection({index.name: False for index in CONVERSATION_SEARCH_INDEXES})
+
+    with patch("services.conversation_search_service.db") as db:
+        db.engine.connect.return_value.execution_options.return_value.__enter__.return_value = conn
+        built = ConversationSearchService.ensure_indexes(rebuild_invalid=False)
+
+    assert built == []
+    assert _executed_sql(conn) == ["CREATE EXTENSION IF NOT EXISTS pg_trgm"]
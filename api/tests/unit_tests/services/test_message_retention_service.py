@@ -0,0 +1,135 @@
+import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from services.message_retention_service import (
+    MESSAGE_CHILD_MODELS,
+    MessageRetentionService,
+    RetentionCursor,
+)
+
+BEFORE = datetime.datetime(2025, 1, 1)
+
+
+def _rows(start: int, count: int) -> list[tuple[str, datetime.datetime]]:
+    return [(f"message-{i}", BEFORE - datetime.timedelta(days=100 - i)) for i in range(start, start + count)]
+
+
+@pytest.fixture
+def mock_session():
+    session = MagicMock()
+    session.scalars.return_value.all.return_value = ["app-1", "app-2"]
+    with (
+        patch("services.message_retention_service.db"),
+        patch("services.message_retention_service.Session") as session_cls,
+    ):
+        session_cls.return_value.__enter__.return_value = session
+        yield session
+
+
+@pytest.fixture
+def mock_redis():
+    with patch("services.message_retention_service.redis_client") as redis:
+        redis.get.side_effect = lambda key: b"sandbox" if key.startswith("features:") else None
+        redis.lock.return_value.acquire.return_value = True
+        yield redis
+
+
+def test_cursor_round_trip():
+    cursor = RetentionCursor(created_at=datetime.datetime(2024, 5, 6, 7, 8, 9, 123), message_id="abc")
+    assert RetentionCursor.loads(cursor.dumps().encode()) == cursor
+
+
+def test_clean_tenant_deletes_batches_and_records_progress(mock_session, mock_redis):
+    batches = [_rows(0, 3), _rows(3, 3), _rows(6, 1)]
+    with (
+        patch.object(MessageRetentionService, "_fetch_batch", side_effect=batches) as fetch_batch,
+        patch.object(MessageRetentionService, "_delete_batch") as delete_batch,
+    ):
+        result = MessageRetentionService.clean_tenant("tenant-1", BEFORE, batch_size=3)
+
+    assert result.deleted_messages == 7
+    assert result.batches == 3
+    assert [call.args[1] for call in delete_batch.call_args_list] == [
+        [message_id for message_id, _ in batch] for batch in batches
+    ]
+    # the keyset cursor advances to the last row of the previous batch
+    assert fetch_batch.call_args_list[0].args[3] is None
+    assert fetch_batch.call_args_list[1].args[3].message_id == "message-2"
+    assert fetch_batch.call_args_list[2].args[3].message_id == "message-5"
+    assert mock_session.commit.call_count == 3
+
+    progress = [call.args for call in mock_redis.setex.call_args_list if call.args[0].startswith("clean_messages:")]
+    assert progress[-1][0] == "clean_messages:progress:tenant-1"
+    assert RetentionCursor.loads(progress[-1][2]).message_id == "message-6"
+    mock_redis.lock.return_value.release.assert_called_once()
+
+
+def test_clean_tenant_resumes_from_progress_marker(mock_session, mock_redis):
+    marker = RetentionCursor(created_at=BEFORE - datetime.timedelta(days=3), message_id="message-42")
+    mock_redis.get.side_effect = lambda key: marker.dumps().encode() if key.startswith("clean_messages:") else None
+
+    with patch.object(MessageRetentionService, "_fetch_batch", return_value=[]) as fetch_batch:
+        MessageRetentionService.clean_tenant("tenant-1", BEFORE, batch_size=10)
+
+    assert fetch_batch.call_args.args[3] == marker
+
+
+def test_clean_tenant_skips_paid_plan(mock_session, mock_redis):
+    mock_redis.get.side_effect = lambda key: b"professional" if key.startswith("features:") else None
+
+    with (
+        patch.object(MessageRetentionService, "_fetch_batch", return_value=_rows(0, 2)),
+        patch.object(MessageRetentionService, "_delete_batch") as delete_batch,
+    ):
+        result = MessageRetentionService.clean_tenant("tenant-1", BEFORE, batch_size=10)
+
+    assert result.skipped
+    delete_batch.assert_not_called()
+
+
+def test_clean_tenant_skips_locked_tenant(mock_session, mock_redis):
+    mock_redis.lock.return_value.acquire.return_value = False
+
+    with patch.object(MessageRetentionService, "_fetch_batch") as fetch_batch:
+        result = MessageRetentionService.clean_tenant("tenant-1", BEFORE, batch_size=10)
+
+    assert result.skipped
+    fetch_batch.assert_not_called()
+
+
+def test_delete_batch_issues_one_statement_per_table():
+    session = MagicMock()
+    MessageRetentionService._delete_batch(session, ["m1", "m2"])
+
+    statements = [str(call.args[0].compile(dialect=postgresql.dialect())) for call in session.execute.call_args_list]
+    assert len(statements) == len(MESSAGE_CHILD_MODELS) + 1
+    assert all("IN (__[POSTCOMPILE_" in statement for statement in statements)
+    assert statements[-1].startswith("DELETE FROM messages")
+
+
+def test_fetch_batch_uses_keyset_pagination():
+    session = MagicMock()
+    session.execute.return_value.all.return_value = []
+    cursor = RetentionCursor(created_at=BEFORE - datetime.timedelta(days=1), message_id="m1")
+    MessageRetentionService._fetch_batch(session, ["app-1"], BEFORE, cursor, 500)
+
+    sql = str(session.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "(messages.created_at, messages.id) > (" in sql
+    assert "ORDER BY messages.created_at, messages.id" in sql
+    assert "OFFSET" not in sql
+
+
+def test_clean_expired_messages_sequentially_skips_failing_tenant():
+    with (
+        patch("services.message_retention_service.db") as db,
+        patch.object(MessageRetentionService, "clean_tenant") as clean_tenant,
+    ):
+        db.session.scalars.return_value.all.return_value = ["tenant-1", "tenant-2"]
+        clean_tenant.side_effect = [RuntimeError("database is gone"), MagicMock(tenant_id="tenant-2", skipped=False)]
+
+        results = MessageRetentionService.clean_expired_messages(BEFORE, batch_size=10, tenant_workers=1)
+
+    assert [(result.tenant_id, result.skipped) for result in results] == [("tenant-1", True), ("tenant-2", False)]
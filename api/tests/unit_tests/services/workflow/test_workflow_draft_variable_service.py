@@ -1,9 +1,10 @@
 import dataclasses
+import json
 import secrets
 from unittest.mock import MagicMock, Mock, patch
 
 import pytest
-from sqlalchemy import Engine
+from sqlalchemy import Engine, create_engine
 from sqlalchemy.orm import Session
 
 from core.variables import StringSegment
@@ -27,6 +28,7 @@ def mock_engine() -> Engine:
 def mock_session(mock_engine) -> Session:
     mock_session = Mock(spec=Session)
     mock_session.get_bind.return_value = mock_engine
+    mock_session.info = {}
     return mock_session
 
 
@@ -389,3 +391,31 @@ class TestWorkflowDraftVariableService:
         assert node_var.visible == True
         assert node_var.editable == True
         assert node_var.node_execution_id == "exec-id"
+
+    @pytest.mark.parametrize("committed", [True, False])
+    def test_updated_value_is_offloaded_once_committed(self, committed):
+        session = Session(create_engine("sqlite://"))
+        # as after the update is flushed
+        session.connection()
+        variable = WorkflowDraftVariable.new_conversation_variable(
+            app_id="app", name="history", value=StringSegment(value="short")
+        )
+        variable.editable = True
+        service = WorkflowDraftVariableService(session)
+
+        with (
+            patch("core.helper.large_value_offload.should_offload", return_value=True),
+            patch("core.helper.large_value_offload.save") as save,
+        ):
+            service.update_variable(variable, value=StringSegment(value="x" * 10_000))
+            save.assert_not_called()
+            if committed:
+                session.commit()
+            else:
+                session.rollback()
+
+        if committed:
+            save.assert_called_once_with(variable.value_storage_key, json.dumps("x" * 10_000))
+        else:
+            save.assert_not_called()
+        assert session.info == {}
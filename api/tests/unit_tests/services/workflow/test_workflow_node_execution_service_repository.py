@@ -1,5 +1,6 @@
 from datetime import datetime
-from unittest.mock import MagicMock
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
 from uuid import uuid4
 
 import pytest
@@ -10,6 +11,14 @@ from repositories.sqlalchemy_api_workflow_node_execution_repository import (
     DifyAPISQLAlchemyWorkflowNodeExecutionRepository,
 )
 
+_MODULE = "repositories.sqlalchemy_api_workflow_node_execution_repository"
+
+
+def _row(execution_id: str, **storage_keys: str) -> SimpleNamespace:
+    keys = dict.fromkeys(("inputs_storage_key", "process_data_storage_key", "outputs_storage_key"))
+    keys.update(storage_keys)
+    return SimpleNamespace(id=execution_id, **keys)
+
 
 class TestSQLAlchemyWorkflowNodeExecutionServiceRepository:
     @pytest.fixture
@@ -162,14 +171,14 @@ class TestSQLAlchemyWorkflowNodeExecutionServiceRepository:
         repository._session_maker.return_value.__enter__.return_value = mock_session
 
         # Mock the select query to return some IDs first time, then empty to stop loop
-        execution_ids = ["id1", "id2"]  # Less than batch_size to trigger break
+        rows = [_row("id1"), _row("id2")]  # Less than batch_size to trigger break
 
         # Mock execute method to handle both select and delete statements
         def mock_execute(stmt):
             mock_result = MagicMock()
             # For select statements, return execution IDs
             if hasattr(stmt, "limit"):  # This is our select statement
-                mock_result.scalars.return_value.all.return_value = execution_ids
+                mock_result.all.return_value = rows
             else:  # This is our delete statement
                 mock_result.rowcount = 2
             return mock_result
@@ -197,14 +206,14 @@ class TestSQLAlchemyWorkflowNodeExecutionServiceRepository:
         repository._session_maker.return_value.__enter__.return_value = mock_session
 
         # Mock the select query to return some IDs first time, then empty to stop loop
-        execution_ids = ["id1", "id2"]
+        rows = [_row("id1"), _row("id2", outputs_storage_key="outputs-key")]
 
         # Mock execute method to handle both select and delete statements
         def mock_execute(stmt):
             mock_result = MagicMock()
             # For select statements, return execution IDs
             if hasattr(stmt, "limit"):  # This is our select statement
-                mock_result.scalars.return_value.all.return_value = execution_ids
+                mock_result.all.return_value = rows
             else:  # This is our delete statement
                 mock_result.rowcount = 2
             return mock_result
@@ -212,16 +221,19 @@ class TestSQLAlchemyWorkflowNodeExecutionServiceRepository:
         mock_session.execute.side_effect = mock_execute
 
         # Act
-        result = repository.delete_executions_by_app(
-            tenant_id="tenant-123",
-            app_id="app-456",
-            batch_size=1000,
-        )
+        with patch(f"{_MODULE}.large_value_offload.delete") as delete_offloaded:
+            result = repository.delete_executions_by_app(
+                tenant_id="tenant-123",
+                app_id="app-456",
+                batch_size=1000,
+            )
 
         # Assert
         assert result == 2
         assert mock_session.execute.call_count == 2  # One select call, one delete call
         mock_session.commit.assert_called_once()
+        # The payloads saved to the storage are deleted with their executions
+        assert list(delete_offloaded.call_args.args[0]) == ["outputs-key"]
 
     def test_get_expired_executions_batch(self, repository):
         """Test getting expired executions batch for backup."""
@@ -258,20 +270,24 @@ class TestSQLAlchemyWorkflowNodeExecutionServiceRepository:
         mock_session = MagicMock(spec=Session)
         repository._session_maker.return_value.__enter__.return_value = mock_session
 
-        # Mock the delete query result
-        mock_result = MagicMock()
-        mock_result.rowcount = 3
-        mock_session.execute.return_value = mock_result
+        # Mock the select query of the storage keys, then the delete query result
+        select_result = MagicMock()
+        select_result.all.return_value = [_row("id1", inputs_storage_key="inputs-key"), _row("id2"), _row("id3")]
+        delete_result = MagicMock()
+        delete_result.rowcount = 3
+        mock_session.execute.side_effect = [select_result, delete_result]
 
         execution_ids = ["id1", "id2", "id3"]
 
         # Act
-        result = repository.delete_executions_by_ids(execution_ids)
+        with patch(f"{_MODULE}.large_value_offload.delete") as delete_offloaded:
+            result = repository.delete_executions_by_ids(execution_ids)
 
         # Assert
         assert result == 3
-        mock_session.execute.assert_called_once()
+        assert mock_session.execute.call_count == 2
         mock_session.commit.assert_called_once()
+        assert list(delete_offloaded.call_args.args[0]) == ["inputs-key"]
 
     def test_delete_executions_by_ids_empty_list(self, repository):
         """Test deleting executions with empty ID list."""
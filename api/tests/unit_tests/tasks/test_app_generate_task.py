@@ -0,0 +1,88 @@
+import json
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+import pytest
+from flask import Flask
+from flask_login import LoginManager  # type: ignore
+
+from core.app.apps.stream_event_bus import PING_FRAME
+from core.variables import StringVariable
+from models.model import EndUser
+from models.workflow import Workflow
+from services.app_generate_service import AppGenerateService
+from tasks import app_generate_task
+from tasks.app_generate_task import generate_app_stream_task
+
+STREAM_ID = "4b7f0c6e-1d2a-4c8e-9f3b-2a1d5e6f7a8b"
+
+
+@pytest.fixture
+def login_app(app: Flask, monkeypatch) -> Flask:
+    # the app is shared by the whole session, other tests may have left a mocked login manager on it
+    monkeypatch.setattr(app, "login_manager", LoginManager(), raising=False)
+    return app
+
+
+@pytest.fixture
+def bus(login_app):
+    with patch.object(app_generate_task, "AppStreamEventBus") as bus, patch.object(app_generate_task, "db") as db:
+        db.session.query.return_value.filter.return_value.first.return_value = MagicMock()
+        yield bus
+
+
+def test_workflow_reads_its_environment_variables_as_the_end_user(bus):
+    workflow = Workflow(
+        tenant_id="tenant",
+        app_id="app-1",
+        type="workflow",
+        version="1",
+        graph="{}",
+        features="{}",
+        created_by="account",
+        environment_variables=[],
+        conversation_variables=[],
+    )
+    variable = StringVariable.model_validate(
+        {"name": "city", "value": "Paris", "id": str(uuid4()), "selector": ["env", "city"]}
+    )
+    # as stored by the draft workflow sync of the console
+    workflow._environment_variables = json.dumps({variable.name: variable.model_dump()})
+    app_generate_task.db.session.query.return_value.filter.return_value.first.side_effect = [
+        MagicMock(),
+        EndUser(id="user-1", tenant_id="tenant", app_id="app-1", type="service_api", session_id="user"),
+    ]
+
+    def generate_in_process(**kwargs):
+        # as the workflow and advanced chat runners do when they build the variable pool
+        yield f"data: {json.dumps({'city': workflow.environment_variables[0].value})}\n\n"
+
+    with patch.object(AppGenerateService, "generate_in_process", side_effect=generate_in_process):
+        generate_app_stream_task(STREAM_ID, "app-1", "user-1", {"inputs": {}}, "service-api")
+
+    assert [call.args for call in bus.publish.call_args_list] == [(STREAM_ID, 'data: {"city": "Paris"}\n\n')]
+
+
+def test_frames_are_published_and_the_stream_closed(bus):
+    frames = ['data: {"event": "message", "answer": "Hi"}\n\n', PING_FRAME, 'data: {"event": "message_end"}\n\n']
+    with patch.object(AppGenerateService, "generate_in_process", return_value=iter(frames)) as generate:
+        generate_app_stream_task(STREAM_ID, "app-1", "user-1", {"query": "hello"}, "service-api")
+
+    assert generate.call_args.kwargs["args"] == {"query": "hello"}
+    assert [call.args for call in bus.publish.call_args_list] == [(STREAM_ID, frames[0]), (STREAM_ID, frames[2])]
+    bus.close.assert_called_once_with(STREAM_ID)
+
+
+def test_errors_are_published_as_error_events(bus):
+    with patch.object(AppGenerateService, "generate_in_process", side_effect=ValueError("Conversation Not Exists.")):
+        generate_app_stream_task(STREAM_ID, "app-1", "user-1", {"query": "hello"}, "service-api")
+
+    ((stream_id, frame),) = [call.args for call in bus.publish.call_args_list]
+    assert stream_id == STREAM_ID
+    assert json.loads(frame.removeprefix("data: ")) == {
+        "event": "error",
+        "code": "invalid_param",
+        "message": "Conversation Not Exists.",
+        "status": 400,
+    }
+    bus.close.assert_called_once_with(STREAM_ID)